@@ -69,3 +69,37 @@ def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")):
         )
         
     return x_api_key
+
+
+# --------------------------------------------------------------------------
+# ADMIN API KEY (operational endpoints: dead letters, re-drives, rule reloads)
+# --------------------------------------------------------------------------
+
+@lru_cache()
+def get_expected_admin_api_key() -> str:
+    """Retrieves the FIN_TRAQ_ADMIN_API_KEY (separate from the key shipped in the app)."""
+    return os.getenv("FIN_TRAQ_ADMIN_API_KEY", "")
+
+def verify_admin_api_key(x_admin_key: str = Header(None, alias="X-Admin-Key")):
+    """
+    FastAPI Dependency guarding the operator-only endpoints. They read every user's data
+    or act fleet-wide, so the client X-API-Key is not enough; with no admin key configured
+    they are disabled.
+    """
+    expected_key = get_expected_admin_api_key()
+
+    # Check 1: Admin endpoints disabled (403 Forbidden)
+    if not expected_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled: FIN_TRAQ_ADMIN_API_KEY not set."
+        )
+
+    # Check 2: Key Validation (401 Unauthorized)
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, expected_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing X-Admin-Key"
+        )
+
+    return x_admin_key
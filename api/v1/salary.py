@@ -1,7 +1,7 @@
 # api/v1/salary.py
 
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from typing import Annotated
 
@@ -14,7 +14,7 @@ router = APIRouter(
     tags=["Salary Allocation"]
 )
 
-DBDependency = Annotated[Session, Depends(get_db)]
+DBDependency = Annotated[AsyncSession, Depends(get_db)]
 
 @router.post(
     "/allocation", 
@@ -22,7 +22,7 @@ DBDependency = Annotated[Session, Depends(get_db)]
     status_code=status.HTTP_201_CREATED,
     summary="Create or Update Salary Allocation Profile for a Period"
 )
-def create_salary_allocation_profile(
+async def create_salary_allocation_profile(
     profile_data: SalaryAllocationProfileCreate, 
     db: DBDependency,
     user_id: str = Depends(lambda: "user_popeelots_123") 
@@ -57,7 +57,7 @@ def create_salary_allocation_profile(
     )
 
     db.add(db_profile)
-    db.commit()
-    db.refresh(db_profile)
+    await db.commit()
+    await db.refresh(db_profile)
 
     return db_profile
@@ -1,7 +1,7 @@
 # api/v1/schemas/transaction.py
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 class RawTransactionIn(BaseModel):
     """Schema for raw transaction data ingested from the Android app."""
@@ -14,10 +14,35 @@ class RawTransactionIn(BaseModel):
 class CategorizedTransactionOut(BaseModel):
     """Schema for the final processed and categorized transaction."""
     
-    transaction_id: str
-    user_id: str
+    transaction_id: int
+    user_id: int
     amount: float
-    merchant: str
+    description: str = Field(..., description="The raw SMS text stored with the transaction.")
     category: str = Field(..., description="The categorization result from the ML model.")
     # This reflects the core Fin-Traq V2 focus: assessing initial leak against the DMB.
     leak_potential: float = Field(..., description="Initial assessment of leak based on category/amount.")
+    # 'already_ingested' when the SMS was a resend of a stored message (the stored transaction is returned)
+    ingest_status: Literal["ingested", "already_ingested"] = Field("ingested", description="Whether this call stored the transaction or it already existed.")
+
+class TransactionCategoryOverrideIn(BaseModel):
+    """Schema for a user's manual correction of a transaction's category."""
+
+    category: str = Field(..., min_length=1, description="The corrected category (e.g., 'Variable_Essential_Groceries').")
+
+class BatchIngestItemResult(BaseModel):
+    """Outcome of a single message within a batch ingestion request."""
+
+    index: int = Field(..., description="Position of the message in the submitted batch (0-based).")
+    status: Literal["ingested", "already_ingested", "skipped", "failed"]
+    transaction: Optional[CategorizedTransactionOut] = None
+    error: Optional[str] = Field(None, description="Reason the message was rejected or skipped (e.g. a credit).")
+
+class BatchIngestOut(BaseModel):
+    """Schema for the response of the batch SMS ingestion endpoint."""
+
+    total: int
+    succeeded: int
+    already_ingested: int = Field(0, description="Resent messages that were already stored (not counted as succeeded).")
+    skipped: int = Field(0, description="Credit messages, which are not spend and are not stored.")
+    failed: int
+    results: List[BatchIngestItemResult]
@@ -1,14 +1,17 @@
 # api/v1/smart_rule.py
 
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from typing import Annotated, List, Optional
 
 # Import components from our new structure
 from ...schemas.smart_rule import SmartTransferRuleCreate, SmartTransferRuleUpdate, SmartTransferRuleOut
 from ...db.database import get_db
+from ..dependencies import get_current_user_id
 from ...db.smart_transfer_rule import SmartTransferRule 
+from ...services.suggestion_plan import bump_rules_version
 
 # Initialize the FastAPI Router
 router = APIRouter(
@@ -17,12 +20,26 @@ router = APIRouter(
 )
 
 # Define the database dependency type for convenience
-DBDependency = Annotated[Session, Depends(get_db)]
+DBDependency = Annotated[AsyncSession, Depends(get_db)]
 
 # Placeholder for user_id dependency (will be replaced by actual authentication)
 def get_user_id() -> str:
     return "user_popeelots_123"
 
+# The materialized suggestion plans (v2) are keyed by the integer users.id, so the rules
+# version is bumped for the account resolved by the same dependency as the v2 routes
+AccountIdDependency = Annotated[int, Depends(get_current_user_id)]
+
+async def _get_user_rule(db: AsyncSession, rule_id: int, user_id: str) -> Optional[SmartTransferRule]:
+    """Fetches one of the user's rules by ID (None if missing or owned by someone else)."""
+    result = await db.execute(
+        select(SmartTransferRule).where(
+            SmartTransferRule.rule_id == rule_id,
+            SmartTransferRule.user_id == user_id
+        )
+    )
+    return result.scalar_one_or_none()
+
 # --- CREATE Rule ---
 @router.post(
     "/", 
@@ -30,9 +47,10 @@ def get_user_id() -> str:
     status_code=status.HTTP_201_CREATED,
     summary="Create a new automatic transfer rule"
 )
-def create_smart_rule(
+async def create_smart_rule(
     rule_data: SmartTransferRuleCreate, 
     db: DBDependency,
+    account_id: AccountIdDependency,
     user_id: str = Depends(get_user_id) 
 ):
     try:
@@ -42,12 +60,15 @@ def create_smart_rule(
         )
 
         db.add(db_rule)
-        db.commit()
-        db.refresh(db_rule)
+        # The materialized suggestion plans allocate over the active rules: a new rules
+        # version makes them stale (rebuilt on the next read)
+        await bump_rules_version(db, account_id)
+        await db.commit()
+        await db.refresh(db_rule)
 
         return db_rule
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A rule with this name already exists for the user."
@@ -59,12 +80,12 @@ def create_smart_rule(
     response_model=List[SmartTransferRuleOut], 
     summary="Get all active and inactive rules for the user"
 )
-def get_all_smart_rules(
+async def get_all_smart_rules(
     db: DBDependency,
     user_id: str = Depends(get_user_id)
 ):
-    rules = db.query(SmartTransferRule).filter(SmartTransferRule.user_id == user_id).all()
-    return rules
+    result = await db.execute(select(SmartTransferRule).where(SmartTransferRule.user_id == user_id))
+    return result.scalars().all()
 
 # --- READ Single Rule ---
 @router.get(
@@ -72,15 +93,12 @@ def get_all_smart_rules(
     response_model=SmartTransferRuleOut, 
     summary="Get a specific rule by ID"
 )
-def get_smart_rule(
+async def get_smart_rule(
     rule_id: int, 
     db: DBDependency,
     user_id: str = Depends(get_user_id)
 ):
-    rule = db.query(SmartTransferRule).filter(
-        SmartTransferRule.rule_id == rule_id,
-        SmartTransferRule.user_id == user_id
-    ).first()
+    rule = await _get_user_rule(db, rule_id, user_id)
     
     if not rule:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Smart rule not found.")
@@ -93,16 +111,14 @@ def get_smart_rule(
     response_model=SmartTransferRuleOut, 
     summary="Update an existing rule (e.g., change allocation or activate/deactivate)"
 )
-def update_smart_rule(
+async def update_smart_rule(
     rule_id: int,
     rule_data: SmartTransferRuleUpdate, 
     db: DBDependency,
+    account_id: AccountIdDependency,
     user_id: str = Depends(get_user_id)
 ):
-    db_rule = db.query(SmartTransferRule).filter(
-        SmartTransferRule.rule_id == rule_id,
-        SmartTransferRule.user_id == user_id
-    ).first()
+    db_rule = await _get_user_rule(db, rule_id, user_id)
 
     if not db_rule:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Smart rule not found.")
@@ -112,8 +128,9 @@ def update_smart_rule(
     for key, value in update_data.items():
         setattr(db_rule, key, value)
         
-    db.commit()
-    db.refresh(db_rule)
+    await bump_rules_version(db, account_id)
+    await db.commit()
+    await db.refresh(db_rule)
     return db_rule
 
 # --- DELETE Rule ---
@@ -122,20 +139,19 @@ def update_smart_rule(
     status_code=status.HTTP_204_NO_CONTENT, 
     summary="Delete a smart transfer rule"
 )
-def delete_smart_rule(
+async def delete_smart_rule(
     rule_id: int, 
     db: DBDependency,
+    account_id: AccountIdDependency,
     user_id: str = Depends(get_user_id)
 ):
-    db_rule = db.query(SmartTransferRule).filter(
-        SmartTransferRule.rule_id == rule_id,
-        SmartTransferRule.user_id == user_id
-    ).first()
+    db_rule = await _get_user_rule(db, rule_id, user_id)
 
     if not db_rule:
         # Return 204 even if not found, to be idempotent (it's gone either way)
         return
 
-    db.delete(db_rule)
-    db.commit()
+    await db.delete(db_rule)
+    await bump_rules_version(db, account_id)
+    await db.commit()
     return
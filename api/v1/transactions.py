@@ -1,43 +1,57 @@
 # api/v1/transactions.py - UPDATED
 
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
-from typing import Annotated
+import json
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Any, Dict, List
 
-from ..schemas.transaction import RawTransactionIn, CategorizedTransactionOut
+from .schemas.transaction import RawTransactionIn, CategorizedTransactionOut, BatchIngestOut, TransactionCategoryOverrideIn
 from ...db.database import get_db
-from ...services.transaction_service import TransactionService # <--- NEW IMPORT
+from ..dependencies import get_current_user_id
+from ...services.transaction_service import TransactionService, InvalidCategoryOverride, CreditMessageSkipped # <--- NEW IMPORT
+
+# Upper bound on messages per batch request (keeps the multi-row INSERT under
+# PostgreSQL's bind-parameter limit). Clients should chunk larger backlogs.
+MAX_INGEST_BATCH_SIZE = 2000
 
 router = APIRouter(
     prefix="/transactions",
     tags=["Transaction Ingestion & Categorization"]
 )
 
-DBDependency = Annotated[Session, Depends(get_db)]
+DBDependency = Annotated[AsyncSession, Depends(get_db)]
+# Transactions are owned by the integer users.id (transactions.user_id FK)
+UserIdDependency = Annotated[int, Depends(get_current_user_id)]
 
 @router.post(
-    "/ingest-raw", 
-    response_model=CategorizedTransactionOut, 
+    "/ingest-raw",
+    response_model=CategorizedTransactionOut,
     status_code=status.HTTP_202_ACCEPTED,
+    responses={status.HTTP_204_NO_CONTENT: {"description": "Credit message: not spend, nothing was stored."}},
     summary="Ingest raw transaction SMS text for categorization and processing."
 )
-def ingest_raw_transaction(
-    raw_data: RawTransactionIn, 
+async def ingest_raw_transaction(
+    raw_data: RawTransactionIn,
     db: DBDependency,
-    user_id: str = Depends(lambda: "user_popeelots_123") 
+    user_id: UserIdDependency
 ):
     """
-    Receives raw SMS text, extracts transaction details, categorizes it, 
+    Receives raw SMS text, extracts transaction details, categorizes it,
     assesses initial leak potential, and stores the transaction.
+    A resent SMS returns the stored transaction with ingest_status='already_ingested'.
+    A credit SMS (salary, refund) is not spend and is answered with 204, nothing stored.
     """
-    
+
     # Instantiate the Transaction Service
     txn_service = TransactionService(db=db)
-    
+
     # Call the service to process the data
     try:
-        final_transaction = txn_service.process_raw_transaction(raw_data, user_id)
+        final_transaction = await txn_service.process_raw_transaction(raw_data, user_id)
         return final_transaction
+    except CreditMessageSkipped:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
         # Log the exception for debugging
         print(f"Error processing transaction: {e}")
@@ -45,3 +59,108 @@ def ingest_raw_transaction(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process and categorize transaction."
         )
+
+
+def _parse_batch_payload(body: bytes, content_type: str) -> List[Any]:
+    """Decodes the batch body, either a JSON array or NDJSON (one message per line)."""
+    if content_type.startswith("application/x-ndjson"):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    payload = json.loads(body)
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of messages.")
+    return payload
+
+
+@router.post(
+    "/ingest-raw/batch",
+    response_model=BatchIngestOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Ingest a batch of raw SMS messages (JSON array or NDJSON) in a single request."
+)
+async def ingest_raw_transactions_batch(
+    request: Request,
+    db: DBDependency,
+    user_id: UserIdDependency
+):
+    """
+    Bulk variant of /ingest-raw for backlogged SMS uploads (e.g. after a reinstall).
+    Messages are categorized together and written with one multi-row insert.
+    Each message gets its own success/failure entry in the response.
+    """
+    try:
+        payload = _parse_batch_payload(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid batch payload: {e}"
+        )
+
+    if len(payload) > MAX_INGEST_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds the maximum of {MAX_INGEST_BATCH_SIZE} messages."
+        )
+
+    # 1. Validate each message individually so one bad item doesn't reject the batch
+    results: List[Dict[str, Any]] = [None] * len(payload)
+    valid_items: List[RawTransactionIn] = []
+    valid_indexes: List[int] = []
+    for index, item in enumerate(payload):
+        try:
+            valid_items.append(RawTransactionIn.model_validate(item))
+            valid_indexes.append(index)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "failed", "error": f"Invalid message: {e.errors()[0]['msg']}"}
+
+    # 2. Categorize and store the valid messages in one round trip
+    txn_service = TransactionService(db=db)
+    try:
+        processed = await txn_service.process_raw_transactions_batch(valid_items, user_id)
+    except Exception as e:
+        print(f"Error processing transaction batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to process and categorize transaction batch."
+        )
+
+    for batch_index, item_result in zip(valid_indexes, processed):
+        item_result["index"] = batch_index
+        results[batch_index] = item_result
+
+    succeeded = sum(1 for r in results if r["status"] == "ingested")
+    already_ingested = sum(1 for r in results if r["status"] == "already_ingested")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "already_ingested": already_ingested,
+        "skipped": skipped,
+        "failed": len(results) - succeeded - already_ingested - skipped,
+        "results": results,
+    }
+
+
+@router.patch(
+    "/{transaction_id}/category",
+    response_model=CategorizedTransactionOut,
+    summary="Manually override the category assigned to a transaction."
+)
+async def override_transaction_category(
+    transaction_id: int,
+    override: TransactionCategoryOverrideIn,
+    db: DBDependency,
+    user_id: UserIdDependency
+):
+    """
+    Records the user's category correction (is_manual_override) and drops the cached
+    merchant -> category mapping so future messages from that merchant are re-categorized.
+    A category without an SDS class prefix (e.g. 'Income_Salary') is rejected with 422.
+    """
+    txn_service = TransactionService(db=db)
+    try:
+        return await txn_service.apply_manual_override(transaction_id, user_id, override.category)
+    except InvalidCategoryOverride as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -1,7 +1,8 @@
 # api/v1/user_profile.py
 
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import Annotated
 
 # Import components from our new structure
@@ -18,7 +19,7 @@ router = APIRouter(
 )
 
 # Define the database dependency type for convenience
-DBDependency = Annotated[Session, Depends(get_db)]
+DBDependency = Annotated[AsyncSession, Depends(get_db)]
 
 @router.post(
     "/efs", 
@@ -26,7 +27,7 @@ DBDependency = Annotated[Session, Depends(get_db)]
     status_code=status.HTTP_201_CREATED,
     summary="Create or Update User Profile and Calculate Equivalent Family Size (EFS)"
 )
-def create_or_update_user_profile(
+async def create_or_update_user_profile(
     profile_data: UserProfileCreate, 
     db: DBDependency,
     # 🚨 NOTE: 'user_id' must be injected here from an authentication system (placeholder for now)
@@ -59,7 +60,8 @@ def create_or_update_user_profile(
     # ----------------------------------------------------
 
     # Check for existing profile
-    db_profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+    result = await db.execute(select(UserProfile).where(UserProfile.user_id == user_id))
+    db_profile = result.scalar_one_or_none()
     
     if db_profile:
         # UPDATE existing profile
@@ -80,8 +82,8 @@ def create_or_update_user_profile(
         db.add(db_profile)
 
     # Save changes to database
-    db.commit()
-    db.refresh(db_profile)
+    await db.commit()
+    await db.refresh(db_profile)
 
     # Return the saved profile
     return db_profile
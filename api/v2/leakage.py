@@ -1,12 +1,15 @@
 # api/v2/leakage.py (FastAPI Router for ML Initialization and Leak View)
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query # <-- FIXED: Added HTTPException and Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 from datetime import date # <-- FIXED: Added date import
+import os
 
 # Import dependencies
 from ...dependencies import get_db, get_current_user_id
+from ...api.database_setup import AsyncSessionLocal
 
 # Import services
 from ...services.financial_profile_service import FinancialProfileService
@@ -22,6 +25,9 @@ router = APIRouter(
     tags=["Leakage & ML (EFS/DMB)"],
 )
 
+# Longest range one /history request may cover
+LEAKAGE_HISTORY_MAX_MONTHS = int(os.getenv("LEAKAGE_HISTORY_MAX_MONTHS", "36"))
+
 # ----------------------------------------------------------------------
 # ENDPOINT 1: INITIALIZE / UPDATE EFS & DMB (The ML Engine Trigger)
 # ----------------------------------------------------------------------
@@ -80,7 +86,49 @@ async def get_current_leakage_view(
 
     leak_service = LeakageService(db_session, user_id)
     
-    # The calculate_leakage method calculates and returns the full profile leak data
-    leak_data = await leak_service.calculate_leakage(reporting_period)
+    # Served from the versioned leakage cache; recomputed only when its inputs changed
+    leak_data = await leak_service.get_leakage(reporting_period)
 
     return leak_data
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT 3: MULTI-MONTH LEAKAGE HISTORY (Trend Charts)
+# ----------------------------------------------------------------------
+@router.get(
+    "/history",
+    summary="Streams per-month leakage (spend vs. baseline, month-over-month deltas) for a range of months as NDJSON."
+)
+async def get_leakage_history(
+    from_str: str = Query(..., alias="from", description="First month of the range (YYYY-MM-DD)"),
+    to_str: str = Query(..., alias="to", description="Last month of the range (YYYY-MM-DD)"),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Replaces one current-leak-view call per month for the leak trend: the whole range
+    comes from a single windowed query over the monthly category totals, so latency
+    stays flat as the range grows. One JSON object per month, oldest first.
+    """
+    try:
+        from_period = date.fromisoformat(from_str).replace(day=1)
+        to_period = date.fromisoformat(to_str).replace(day=1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Must be YYYY-MM-DD."
+        )
+
+    months = (to_period.year - from_period.year) * 12 + to_period.month - from_period.month + 1
+    if months < 1 or months > LEAKAGE_HISTORY_MAX_MONTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'to' must not precede 'from' and the range is limited to {LEAKAGE_HISTORY_MAX_MONTHS} months."
+        )
+
+    async def ndjson_lines():
+        # Own session: the get_db session is closed before a streamed body is sent
+        async with AsyncSessionLocal() as db_session:
+            async for line in LeakageService(db_session, user_id).stream_leakage_history(from_period, to_period):
+                yield line
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,164 @@
+# api/v2/ops.py (Operational metrics for in-process subsystems)
+
+import asyncio
+from fastapi import APIRouter, Depends, status
+from pydantic import BaseModel, Field
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, Optional
+
+from ...dependencies import get_db, verify_admin_api_key
+from ...api.database_setup import AsyncSessionLocal
+from ...models.categorization_dead_letter import CategorizationDeadLetter
+
+# Import the process-wide subsystems
+from ...services.categorization_worker import categorization_pool
+from ...services.sms_parsers import sms_parser_registry
+from ...services.categorization_cache import merchant_category_cache
+from ...services.categorizer_client import categorizer_client
+from ...services.dedup import duplicate_suppressor
+from ...services.categorization_sweeper import categorization_sweeper
+from ...services.categorization_retry import redrive_dead_letters
+from ...services.leakage_cache import leakage_cache
+from ...services.insight_rules import insight_rule_engine
+from ...services.insight_cards import insight_card_metrics
+from ...services.transfer_executor import transfer_executor
+from ...services.transfer_resume_sweeper import transfer_resume_sweeper
+from ...services.idempotency import idempotency_store
+from ...services.salary_profile_cas import salary_profile_cas_metrics
+from ...services.suggestion_plan import suggestion_plan_metrics
+
+
+class DeadLetterRedriveIn(BaseModel):
+    """Selects the dead letters to re-drive: explicit IDs, one user's, or all (up to max_rows)."""
+    ids: Optional[List[int]] = Field(None, description="Dead-letter IDs to re-drive (default: all).")
+    user_id: Optional[int] = Field(None, description="Restrict the re-drive to one user.")
+    max_rows: int = Field(10000, ge=1, le=1000000)
+
+
+router = APIRouter(
+    prefix="/ops",
+    tags=["Operations & Metrics"],
+)
+
+# Operator-only endpoints: they expose every user's data or act fleet-wide, so they
+# require the admin key on top of the client X-API-Key
+admin_router = APIRouter(
+    prefix="/ops",
+    tags=["Operations & Metrics"],
+    dependencies=[Depends(verify_admin_api_key)],
+)
+
+# ----------------------------------------------------------------------
+# ENDPOINT: RUNTIME METRICS (per gunicorn worker process)
+# ----------------------------------------------------------------------
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    summary="Returns runtime metrics of the background subsystems running in this worker process."
+)
+async def get_runtime_metrics() -> Dict[str, Any]:
+    """
+    Metrics are per process: each gunicorn worker runs its own pools and caches,
+    so scrape every worker (or aggregate upstream) for a fleet-wide view.
+    """
+    return {
+        "categorization_workers": categorization_pool.metrics(),
+        "sms_parser_hit_rates": sms_parser_registry.stats(),
+        "merchant_category_cache": merchant_category_cache.stats(),
+        "categorizer_client": categorizer_client.metrics(),
+        "duplicate_suppression": duplicate_suppressor.stats(),
+        "categorization_retry_sweeper": categorization_sweeper.metrics(),
+        "leakage_cache": leakage_cache.stats(),
+        "insight_rules": insight_rule_engine.stats(),
+        "insight_cards": insight_card_metrics.stats(),
+        "transfer_executor": transfer_executor.metrics(),
+        "transfer_resume_sweeper": transfer_resume_sweeper.metrics(),
+        "idempotency_keys": idempotency_store.metrics(),
+        "salary_profile_cas": salary_profile_cas_metrics.stats(),
+        "suggestion_plans": suggestion_plan_metrics.stats(),
+    }
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT: DEAD-LETTER QUEUE (categorization poison messages)
+# ----------------------------------------------------------------------
+@admin_router.get(
+    "/dead-letters",
+    status_code=status.HTTP_200_OK,
+    summary="Lists the most recent categorization dead letters and the total count."
+)
+async def list_dead_letters(
+    limit: int = 50,
+    db_session: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    total = (await db_session.execute(select(func.count()).select_from(CategorizationDeadLetter))).scalar_one()
+    recent = (await db_session.execute(
+        select(CategorizationDeadLetter).order_by(CategorizationDeadLetter.dead_lettered_at.desc()).limit(min(limit, 500))
+    )).scalars().all()
+    return {
+        "total": total,
+        "items": [
+            {
+                "id": item.id,
+                "raw_transaction_id": item.raw_transaction_id,
+                "user_id": item.user_id,
+                "attempts": item.categorization_attempts,
+                "last_error": item.last_error,
+                "dead_lettered_at": item.dead_lettered_at,
+            }
+            for item in recent
+        ],
+    }
+
+
+@admin_router.post(
+    "/dead-letters/redrive",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Re-drives dead letters back into the categorization pipeline in bulk."
+)
+async def redrive_dead_letter_queue(redrive: DeadLetterRedriveIn) -> Dict[str, Any]:
+    """
+    Rows are moved back to raw_transactions (original IDs, fresh attempt budget) in
+    bounded batches and categorized by the retry sweeper on its next ticks.
+    """
+    return await redrive_dead_letters(
+        AsyncSessionLocal,
+        ids=redrive.ids,
+        user_id=redrive.user_id,
+        max_rows=redrive.max_rows,
+    )
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT: INSIGHT RULES HOT RELOAD
+# ----------------------------------------------------------------------
+@admin_router.post(
+    "/insight-rules/reload",
+    status_code=status.HTTP_200_OK,
+    summary="Recompiles the insight rules from INSIGHT_RULES_PATH in this worker process."
+)
+async def reload_insight_rules() -> Dict[str, Any]:
+    """
+    Workers also pick up file changes on their own within INSIGHT_RULES_RELOAD_SECONDS;
+    this forces it now. An invalid file is rejected and the previous rules stay active.
+    """
+    # File read and compile off the event loop
+    reloaded = await asyncio.to_thread(insight_rule_engine.reload)
+    return {"reloaded": reloaded, **insight_rule_engine.stats()}
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT: IDEMPOTENCY KEY RETENTION
+# ----------------------------------------------------------------------
+@admin_router.post(
+    "/idempotency-keys/prune",
+    status_code=status.HTTP_200_OK,
+    summary="Deletes Idempotency-Key rows older than IDEMPOTENCY_TTL_SECONDS."
+)
+async def prune_idempotency_keys() -> Dict[str, Any]:
+    """
+    Expired keys are never replayed (a new request reclaims them), so this only bounds
+    the table; schedule it (e.g. hourly) from one place, not per worker.
+    """
+    return {"deleted": await idempotency_store.prune(), "ttl_seconds": idempotency_store.ttl_seconds}
@@ -0,0 +1,99 @@
+# api/v2/statements.py (Streaming bank-statement import for historical backfill)
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+# Import dependencies
+from ...dependencies import get_db, get_current_user_id
+
+# Import services and schemas
+from ...services.statement_import_service import StatementImportService
+from ...services.statement_parsers import STATEMENT_PARSERS
+from ...models.statement_import_job import StatementImportJob
+from ...schemas.statement_import import StatementImportJobOut
+
+router = APIRouter(
+    prefix="/statements",
+    tags=["Statement Import (Historical Backfill)"],
+)
+
+# Content types accepted when no explicit format is given
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "CSV",
+    "application/csv": "CSV",
+    "application/x-ofx": "OFX",
+    "application/ofx": "OFX",
+}
+
+
+def _job_out(job: StatementImportJob) -> StatementImportJobOut:
+    return StatementImportJobOut(
+        job_id=job.id,
+        status=job.status.value,
+        statement_format=job.statement_format,
+        filename=job.filename,
+        bytes_read=job.bytes_read,
+        rows_read=job.rows_read,
+        rows_imported=job.rows_imported,
+        rows_skipped=job.rows_skipped,
+        rows_failed=job.rows_failed,
+        last_error=job.last_error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at,
+    )
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT 1: STREAMING UPLOAD
+# ----------------------------------------------------------------------
+@router.post(
+    "/import",
+    response_model=StatementImportJobOut,
+    status_code=status.HTTP_201_CREATED,
+    summary="Streams a CSV/OFX bank statement (raw request body) into the transaction history."
+)
+async def import_statement(
+    request: Request,
+    statement_format: Optional[str] = Query(None, description="'csv' or 'ofx'. Defaults to the Content-Type."),
+    filename: Optional[str] = Query(None, max_length=255),
+    db_session: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    The body is read as a stream (never buffered whole), parsed row by row and written
+    in chunks. Progress can be polled on GET /statements/jobs/{job_id} while the upload runs.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    resolved_format = (statement_format or CONTENT_TYPE_FORMATS.get(content_type, "")).upper()
+    if resolved_format not in STATEMENT_PARSERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported statement format. Use ?statement_format=csv|ofx or a text/csv / application/x-ofx body."
+        )
+
+    import_service = StatementImportService(db_session, user_id)
+    job = await import_service.create_job(resolved_format, filename)
+    job = await import_service.run_import(job, request.stream())
+
+    return _job_out(job)
+
+
+# ----------------------------------------------------------------------
+# ENDPOINT 2: JOB STATUS
+# ----------------------------------------------------------------------
+@router.get(
+    "/jobs/{job_id}",
+    response_model=StatementImportJobOut,
+    summary="Returns the progress of a statement import job."
+)
+async def get_import_job(
+    job_id: int,
+    db_session: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    job = await StatementImportService(db_session, user_id).get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found.")
+    return _job_out(job)
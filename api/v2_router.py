@@ -1,22 +1,28 @@
 # api/v2_router.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from datetime import date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 
 # 🌟 CRITICAL: Use AsyncSession for SQLAlchemy
 from sqlalchemy.ext.asyncio import AsyncSession 
+from sqlalchemy import select
 
 # Assuming standard FastAPI dependencies and utility functions
 from ..dependencies import get_db, get_current_user_id 
 
 # Import the core services
 from ..services.orchestration_service import OrchestrationService
+from ..services.insight_cards import etag_matches, insight_card_metrics, load_card_set
+from ..services.idempotency import IdempotencyClaim, IdempotencyError, idempotency_store, request_hash
+from ..models.smart_transfer import SmartTransferLog
 
 # --- V2 ADDITION: Import the Leakage Router ---
 # Assuming 'leakage.py' is in 'api/v2/leakage.py' (This path should be confirmed, but structure is fine)
 from .v2.leakage import router as leakage_router 
+from .v2.ops import router as ops_router, admin_router as ops_admin_router
+from .v2.statements import router as statements_router
 
 # 🌟 FIX: Import the CORRECTED Pydantic schemas
 from ..schemas.orchestration_data import (
@@ -26,6 +32,8 @@ from ..schemas.orchestration_data import (
     ExecutionResponse,
     # RecalculationResponse is correct
     RecalculationResponse,
+    InsightCardsResponse,
+    TransferStatusOut,
     # We need the Input model for the POST /consent endpoint
     TransferSuggestion
 )
@@ -48,6 +56,9 @@ router = APIRouter(
 
 # Include the new Leakage Router. 
 router.include_router(leakage_router)
+router.include_router(ops_router)
+router.include_router(ops_admin_router)
+router.include_router(statements_router)
 
 
 # ----------------------------------------------------------------------
@@ -62,12 +73,20 @@ router.include_router(leakage_router)
 )
 async def transaction_hook_trigger_orchestration(
     reporting_period_str: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db_session: AsyncSession = Depends(get_db), 
     user_id: int = Depends(get_current_user_id) 
 ):
     """
     Called by the internal categorization worker after a raw SMS/UPI message 
     has been successfully converted into a clean Transaction record. 
+
+    The response carries an ETag of its content; a client sending it back in
+    If-None-Match gets 304 (no body) while nothing it displays has changed. A
+    conditional request is checked against the period's stored card set first (its
+    etag is the content of the last recalculation), so a match costs one primary-key
+    lookup and no leakage or rule evaluation.
     """
     try:
         reporting_period = date.fromisoformat(reporting_period_str)
@@ -77,14 +96,68 @@ async def transaction_hook_trigger_orchestration(
             detail="Invalid date format. Must be YYYY-MM-DD."
         )
 
+    if if_none_match:
+        card_set = await load_card_set(db_session, user_id, reporting_period)
+        if card_set is not None and etag_matches(if_none_match, card_set.etag):
+            insight_card_metrics.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": f'"{card_set.etag}"'})
+
     orch_service = OrchestrationService(db_session, user_id) 
     
     # This executes the 'recalculate_current_period_leakage' method
     result = await orch_service.recalculate_current_period_leakage(reporting_period)
 
+    etag_header = f'"{result["etag"]}"'
+    if etag_matches(if_none_match, result["etag"]):
+        insight_card_metrics.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag_header})
+    response.headers["ETag"] = etag_header
     return result
 
 
+@router.get(
+    "/autopilot/insights",
+    response_model=InsightCardsResponse,
+    summary="Returns the persisted insight cards of a period (conditional GET via ETag)."
+)
+async def get_insight_cards(
+    reporting_period_str: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db_session: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Read-only view of the cards stored by the last recalculation: one primary-key
+    lookup, no leakage or rule evaluation. Poll with If-None-Match for a 304.
+    """
+    try:
+        reporting_period = date.fromisoformat(reporting_period_str)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Invalid date format. Must be YYYY-MM-DD."
+        )
+
+    card_set = await load_card_set(db_session, user_id, reporting_period)
+    if card_set is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No insight cards generated for this period yet."
+        )
+
+    etag_header = f'"{card_set.etag}"'
+    if etag_matches(if_none_match, card_set.etag):
+        insight_card_metrics.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag_header})
+    response.headers["ETag"] = etag_header
+    return {
+        "reporting_period": card_set.reporting_period,
+        "generated_at": card_set.generated_at,
+        "cards": card_set.cards,
+    }
+
+
 # ----------------------------------------------------------------------
 # GUIDED EXECUTION: SUGGESTION ENDPOINT
 # ----------------------------------------------------------------------
@@ -102,6 +175,10 @@ async def get_suggestion_plan(
     """
     Fetches the Autopilot's recommended allocation plan for the current available 
     reclaimable fund, prioritizing tax savings and goals.
+
+    The plan is materialized by the transaction hook, so this is normally one
+    primary-key read; it is rebuilt here when a rule edit, a consent or a new day
+    made it stale.
     """
     try:
         reporting_period = date.fromisoformat(reporting_period_str)
@@ -129,12 +206,21 @@ async def get_suggestion_plan(
 async def execute_autopilot_consent(
     consent_data: ConsentMoveIn,
     db_session: AsyncSession = Depends(get_db), 
-    user_id: int = Depends(get_current_user_id)
+    user_id: int = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(
+        None, max_length=128,
+        description="Client-generated key (e.g. a UUID) per consent; retries with the same key replay the first response.",
+    ),
 ):
     """
     This endpoint executes the final step of the Guided Orchestration. 
     It records the consent, logs the transfers with the audit field, 
     and updates the Salary Allocation Profile.
+
+    With an Idempotency-Key, the first request executes and its response is stored with
+    its transfers; retries get that response back (Idempotent-Replayed: true) without
+    executing again, and a duplicate sent while the first is running waits for it.
+    Reusing a key with a different body is rejected with 422.
     """
     try:
         reporting_period = date.fromisoformat(consent_data.reporting_period)
@@ -149,9 +235,70 @@ async def execute_autopilot_consent(
     # Convert TransferSuggestion list to a list of dictionaries 
     transfer_plan_dicts = [item.model_dump() for item in consent_data.transfer_plan]
 
-    result = await orch_service.record_consent_and_update_balance(
-        transfer_plan=transfer_plan_dicts, 
-        reporting_period=reporting_period
+    if idempotency_key is None:
+        return await orch_service.record_consent_and_update_balance(
+            transfer_plan=transfer_plan_dicts, 
+            reporting_period=reporting_period
+        )
+
+    # 1. Replay a stored response, or claim the key for this execution
+    try:
+        claim = await idempotency_store.begin(
+            user_id, idempotency_key, request_hash("POST", "/v2/autopilot/consent", consent_data.model_dump(mode="json"))
+        )
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if not isinstance(claim, IdempotencyClaim):
+        return Response(
+            content=claim.body, status_code=claim.status_code, media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    # 2. Execute; the serialized response is stored in the consent's own transaction
+    stored = []
+
+    async def store_response(result: Dict[str, Any]):
+        body = ExecutionResponse.model_validate(result).model_dump_json()
+        stored.append(await idempotency_store.complete(db_session, claim, status.HTTP_200_OK, body))
+
+    try:
+        await orch_service.record_consent_and_update_balance(
+            transfer_plan=transfer_plan_dicts, 
+            reporting_period=reporting_period,
+            before_commit=store_response,
+        )
+    except IdempotencyError as e:
+        await idempotency_store.abort(claim)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except BaseException:
+        await idempotency_store.abort(claim)
+        raise
+
+    # 3. Publish to local duplicates and answer with the exact bytes retries will get
+    idempotency_store.finish(claim, stored[0])
+    return Response(content=stored[0].body, status_code=stored[0].status_code, media_type="application/json")
+
+
+# ----------------------------------------------------------------------
+# GUIDED EXECUTION: TRANSFER STATUS (async completion of consented transfers)
+# ----------------------------------------------------------------------
+
+@router.get(
+    "/autopilot/transfers",
+    response_model=List[TransferStatusOut],
+    summary="Returns the execution status of consented transfers (PENDING, COMPLETED or FAILED)."
+)
+async def get_transfer_status(
+    ids: List[int] = Query(..., description="transfer_ids returned by POST /autopilot/consent."),
+    db_session: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """The client polls this after consent; transfers settle in the background executor."""
+    if len(ids) > 500:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At most 500 transfer ids per request.")
+    result = await db_session.execute(
+        select(SmartTransferLog)
+        .where(SmartTransferLog.user_id == user_id, SmartTransferLog.id.in_(ids))
+        .order_by(SmartTransferLog.id)
     )
-    
-    return result
+    return result.scalars().all()
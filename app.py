@@ -7,6 +7,14 @@ from fastapi.middleware.cors import CORSMiddleware # Recommended for web/mobile
 
 # Import Dependencies and DB Setup
 from api.dependencies import verify_api_key, get_db 
+from services.categorization_worker import categorization_pool
+from services.categorization_sweeper import categorization_sweeper
+from services.categorizer_client import categorizer_client
+from services.categorization_cache import merchant_category_cache
+from services.transfer_executor import transfer_executor
+from services.transfer_resume_sweeper import transfer_resume_sweeper
+from services.dedup import warm_duplicate_suppressor
+from api.database_setup import AsyncSessionLocal
 # Import DB Setup components (assuming you have them)
 # from api.database_setup import engine 
 
@@ -20,6 +28,27 @@ async def lifespan(app: FastAPI):
     print("Application Startup: Initializing services...")
     # NOTE: You would typically start your SQLAlchemy engine here.
     # e.g., await engine.connect()
+
+    # Open the micro-batching client for the external categorizer service
+    await categorizer_client.start()
+    # Merchant cache invalidations published by the other workers (shared tier only)
+    await merchant_category_cache.start()
+
+    # Pre-load recent SMS fingerprints so resends right after a restart are caught early
+    try:
+        await warm_duplicate_suppressor(AsyncSessionLocal)
+    except Exception as e:
+        print(f"Warning: duplicate filter warm-up failed ({e}); continuing with an empty filter.")
+
+    # Start the in-process categorization worker pool (one per gunicorn worker)
+    await categorization_pool.start()
+    # Retries failed/backlogged categorizations and quarantines poison messages
+    await categorization_sweeper.start()
+
+    # Outbound UPI transfers (consent returns before the money moves); the resume
+    # sweeper periodically claims transfers left PENDING (by a previous process too)
+    await transfer_executor.start()
+    await transfer_resume_sweeper.start()
     
     yield
     
@@ -27,6 +56,12 @@ async def lifespan(app: FastAPI):
     # SHUTDOWN: Database Cleanup
     # ----------------------------------------
     print("Application Shutdown: Cleaning up resources...")
+    await transfer_resume_sweeper.stop()
+    await transfer_executor.stop()
+    await categorization_sweeper.stop()
+    await categorization_pool.stop()
+    await categorizer_client.stop()
+    await merchant_category_cache.stop()
     # e.g., await engine.dispose()
 
 
@@ -47,8 +82,8 @@ app = FastAPI(
     version="2.0.0",
     # CRITICAL FIX: ENABLE GLOBAL SECURITY
     dependencies=[Depends(verify_api_key)], 
-    # CRITICAL FIX: Enable DB Lifespan management
-    # lifespan=lifespan, 
+    # CRITICAL FIX: Enable DB Lifespan management (starts/stops background workers)
+    lifespan=lifespan, 
 )
 
 # Optional: Add CORS Middleware if frontend clients (web/mobile) access this service
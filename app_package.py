@@ -0,0 +1,69 @@
+# app_package.py
+#
+# The application modules import each other relatively (services/* -> ..models, ..db),
+# i.e. they expect the repository root to be a package. Operator CLIs, benchmarks and
+# tests are run from the repository root (python -m tools.bulk_load, python -m
+# benchmarks.bench_leakage, python -m pytest tests), where api/, db/, models/, services/
+# ... would otherwise be top-level packages and every relative import beyond them fails.
+#
+# install() registers the repository root as the package APP_PACKAGE and redirects the
+# top-level names (services.x, models.x, ...) to APP_PACKAGE.services.x, ... so both
+# spellings resolve to the same module objects (one SQLAlchemy metadata, one set of
+# process-wide pools and caches). Called from tools/__init__.py, benchmarks/__init__.py
+# and tests/conftest.py before anything else is imported.
+
+import importlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import types
+
+APP_PACKAGE = "finance_app_backend"
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Top-level directories that are subpackages of the application package
+APP_SUBPACKAGES = ("api", "db", "ml", "models", "schemas", "services", "utils")
+
+
+class _AliasLoader(importlib.abc.Loader):
+    """Returns the module already imported under the application package name."""
+
+    def __init__(self, target: str):
+        self.target = target
+
+    def create_module(self, spec):
+        return importlib.import_module(self.target)
+
+    def exec_module(self, module):
+        pass # Executed once, under its APP_PACKAGE name
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    """Maps 'services.x' to 'finance_app_backend.services.x' (and so on) on import."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.partition(".")[0] not in APP_SUBPACKAGES:
+            return None
+        target_name = f"{APP_PACKAGE}.{fullname}"
+        target_spec = importlib.util.find_spec(target_name)
+        if target_spec is None:
+            return None
+        return importlib.machinery.ModuleSpec(
+            fullname,
+            _AliasLoader(target_name),
+            is_package=target_spec.submodule_search_locations is not None,
+        )
+
+
+def install():
+    """Idempotent: registers APP_PACKAGE and the top-level aliases in this process."""
+    if APP_PACKAGE not in sys.modules:
+        package = types.ModuleType(APP_PACKAGE)
+        package.__path__ = [APP_ROOT]
+        package.__package__ = APP_PACKAGE
+        package.__spec__ = importlib.machinery.ModuleSpec(APP_PACKAGE, None, is_package=True)
+        package.__spec__.submodule_search_locations = package.__path__
+        sys.modules[APP_PACKAGE] = package
+    if not any(isinstance(finder, _AliasFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _AliasFinder())
@@ -0,0 +1,8 @@
+# benchmarks/__init__.py
+#
+# Benchmarks, run from the repository root (python -m benchmarks.<name>): resolve the
+# application modules as one package before any benchmark imports them (see app_package.py).
+
+import app_package
+
+app_package.install()
@@ -0,0 +1,78 @@
+# benchmarks/bench_categorizer_batching.py
+#
+# Measures the micro-batching categorizer client against one-call-per-message,
+# using the in-process stub categorizer (httpx ASGI transport, no network).
+#
+# Usage:
+#   python -m benchmarks.bench_categorizer_batching --messages 2000 --concurrency 200
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.stub_categorizer import build_stub_app
+from services.categorizer_client import MicroBatchingCategorizerClient
+
+
+async def _run(app, messages: int, concurrency: int, max_batch_size: int, max_wait_ms: float) -> dict:
+    client = MicroBatchingCategorizerClient(
+        base_url="http://stub-categorizer",
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        timeout_seconds=30.0,
+        transport=httpx.ASGITransport(app=app),
+    )
+    await client.start()
+    app.state.requests = 0
+    app.state.messages = 0
+
+    texts = [f"Paid Rs.{100 + i % 900}.00 to SWIGGY{i}@icici via UPI" for i in range(messages)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_ingest(text: str):
+        # Each coroutine stands for one in-flight ingest request
+        async with semaphore:
+            return await client.categorize(text)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_ingest(text) for text in texts))
+    elapsed = time.perf_counter() - start
+    metrics = client.metrics()
+    await client.stop()
+
+    assert len(results) == messages and all(r["category"] for r in results)
+    return {
+        "elapsed": elapsed,
+        "http_requests": app.state.requests,
+        "fallbacks": metrics["fallback_messages_total"],
+        "avg_batch": metrics["avg_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching categorizer client vs one call per message.")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Simultaneous in-flight ingests.")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--request-overhead-ms", type=float, default=20.0, help="Simulated per-request network/serving cost.")
+    parser.add_argument("--per-message-ms", type=float, default=0.2, help="Simulated per-message inference cost.")
+    args = parser.parse_args()
+
+    app = build_stub_app(args.request_overhead_ms, args.per_message_ms)
+
+    # 1. Unbatched: every message is its own HTTP call (batch size 1, no wait)
+    single = asyncio.run(_run(app, args.messages, args.concurrency, 1, 0.0))
+    # 2. Micro-batched: flush at N messages or T ms
+    batched = asyncio.run(_run(app, args.messages, args.concurrency, args.batch_size, args.max_wait_ms))
+
+    for label, run in (("one call per message", single), ("micro-batched", batched)):
+        print(f"{label:22s} {args.messages / run['elapsed']:10.1f} msg/s   "
+              f"http requests: {run['http_requests']:6d}   avg batch: {run['avg_batch']:6.1f}   fallbacks: {run['fallbacks']}")
+    print(f"speedup:               {single['elapsed'] / batched['elapsed']:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
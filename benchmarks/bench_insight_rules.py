@@ -0,0 +1,128 @@
+# benchmarks/bench_insight_rules.py
+#
+# Per-bucket cost of the insight rule engine as the rule set grows: the compiled
+# (category, sds_class) index against a linear scan that checks every rule's match keys
+# for every bucket. Also exercises a hot reload from a rules file. Runs fully offline.
+#
+# Usage:
+#   python -m benchmarks.bench_insight_rules --rules 10 1000 10000 --buckets 20000
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+from services.insight_rules import DEFAULT_INSIGHT_RULES, CompiledRuleSet, InsightRuleEngine, _bucket_values
+
+SDS_CLASSES = ["Variable_Essential", "Pure_Discretionary"]
+
+
+def _rules(count: int, categories: int):
+    """The built-in rules plus `count` synthetic per-category rules."""
+    specs = list(DEFAULT_INSIGHT_RULES)
+    for i in range(count):
+        specs.append({
+            "id": f"synthetic_{i}",
+            "categories": [f"Category_{i % categories}"],
+            "sds_classes": [SDS_CLASSES[i % 2]],
+            "when": [["leak_amount", ">", str(100 + i % 5000)]],
+            "priority": "LOW",
+            "title": "{category} over by {leak_amount}",
+            "body": "Spent {spend} against {baseline_threshold}.",
+            "call_to_action": "VIEW",
+        })
+    return specs
+
+
+def _buckets(count: int, categories: int, rng: random.Random):
+    buckets = []
+    for _ in range(count):
+        index = rng.randrange(categories)
+        spend = Decimal(rng.randint(0, 2_000_000)).scaleb(-2)
+        baseline = Decimal(rng.randint(0, 1_000_000)).scaleb(-2)
+        buckets.append({
+            "category": f"Category_{index}",
+            "sds_weight_class": SDS_CLASSES[index % 2],
+            "spend": spend,
+            "baseline_threshold": baseline,
+            "leak_amount": max(spend - baseline, Decimal("0.00")),
+        })
+    return buckets
+
+
+def _linear_scan(specs, buckets) -> int:
+    """Every rule's match keys checked for every bucket (what an unindexed rule list costs)."""
+    keyed = [(spec.get("categories"), spec.get("sds_classes")) for spec in specs if spec.get("scope", "bucket") == "bucket"]
+    matched = 0
+    for bucket in buckets:
+        values = _bucket_values(bucket)
+        for categories, sds_classes in keyed:
+            if (not categories or values["category"] in categories) and (not sds_classes or values["sds_class"] in sds_classes):
+                matched += 1
+    return matched
+
+
+async def bench(rule_count: int, bucket_count: int, categories: int, rng: random.Random):
+    specs = _rules(rule_count, categories)
+    buckets = _buckets(bucket_count, categories, rng)
+
+    engine = InsightRuleEngine(path=None)
+    engine.rules = CompiledRuleSet(specs, "bench")
+    start = time.perf_counter()
+    for offset in range(0, len(buckets), 10):
+        await engine.evaluate(1, buckets[offset:offset + 10])
+    indexed_us = (time.perf_counter() - start) / len(buckets) * 1e6
+
+    start = time.perf_counter()
+    _linear_scan(specs, buckets)
+    linear_us = (time.perf_counter() - start) / len(buckets) * 1e6
+
+    print(f"rules: {len(specs):7d}   indexed: {indexed_us:8.1f} us/bucket   "
+          f"linear match scan: {linear_us:10.1f} us/bucket   rules checked/bucket: {engine.rules_checked / len(buckets):5.2f}")
+
+
+async def check_hot_reload():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "insight_rules.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_INSIGHT_RULES, f)
+        engine = InsightRuleEngine(path=path, reload_seconds=0)
+        before = engine.rules.rule_count
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_rules(50, 10), f)
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        await engine.evaluate(1, [])
+        print(f"hot reload: {before} -> {engine.rules.rule_count} rules, reloads={engine.reloads}")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[{\"id\": \"broken\"")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        await engine.evaluate(1, [])
+        print(f"bad file:   kept {engine.rules.rule_count} rules, reload_errors={engine.reload_errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed insight rule evaluation vs linear scan.")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--buckets", type=int, default=20000)
+    parser.add_argument("--categories", type=int, default=2000, help="Distinct synthetic categories.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    asyncio.run(_run(args))
+
+
+async def _run(args):
+    rng = random.Random(args.seed)
+    await check_hot_reload()
+    for rule_count in args.rules:
+        await bench(rule_count, args.buckets, args.categories, rng)
+
+
+if __name__ == "__main__":
+    main()
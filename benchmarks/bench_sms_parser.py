@@ -0,0 +1,96 @@
+# benchmarks/bench_sms_parser.py
+#
+# Compares the precompiled SMS parser registry against the mock ML categorizer
+# path over a synthetic corpus of bank SMS alerts. Runs fully offline.
+#
+# Usage:
+#   python -m benchmarks.bench_sms_parser --messages 50000 --ml-latency-ms 25
+
+import argparse
+import json
+import random
+import time
+
+from services.sms_parsers import SmsParserRegistry
+
+MERCHANTS = ["SWIGGY", "ZOMATO", "UBER", "BESCOM", "BIGBASKET", "NETFLIX", "AMAZON", "LOCAL KIRANA STORE"]
+
+CORPUS_TEMPLATES = [
+    ("HDFC", "Rs.{amt} debited from a/c **1234 on 12-10-25 to VPA {vpa}@icici (UPI Ref No {ref})."),
+    ("HDFC", "Rs.{amt} credited to a/c **1234 on 01-10-25 by a/c linked to VPA payroll@hdfcbank (UPI Ref No {ref})."),
+    ("HDFC", "Update! INR {amt} debited from HDFC Bank XX1234 on 12-OCT-25. Info: POS*{merchant}. Avl bal:INR 10,000.00"),
+    ("ICICI", "ICICI Bank Acct XX123 debited for Rs {amt} on 12-Oct-25; {merchant} credited. UPI:{ref}. Call 18002662 for dispute."),
+    ("ICICI", "Dear Customer, Acct XX123 is credited with Rs {amt} on 01-Oct-25 from ACME CORP. UPI:{ref}"),
+    ("ICICI", "INR {amt} spent using ICICI Bank Card XX1234 on 12-Oct-25 on {merchant}. Avl Limit: INR 50,000.00"),
+    ("SBI", "Dear UPI user A/C X1234 debited by {amt} on date 12Oct25 trf to {merchant} Refno {ref}. If not u? call 1800111109. -SBI"),
+    ("SBI", "Dear SBI UPI User, ur A/cX1234 credited by Rs{amt} on 01Oct25 by {merchant} (Ref no {ref})"),
+    ("GPAY", "Paid Rs.{amt} to {merchant} via UPI on 12-10-2025 14:32. UPI Ref: {ref}"),
+    # Formats no template knows about (must fall through to the ML categorizer)
+    ("KOTAK", "Sent Rs.{amt} from Kotak Bank AC X1234 to {vpa}@ybl on 12-10-25.UPI Ref {ref}."),
+    ("AXIS", "INR {amt} debited A/c no. XX1234 12-10-25 10:11:12 UPI/P2M/{ref}/{merchant}"),
+]
+
+
+def synthetic_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        bank, template = rng.choice(CORPUS_TEMPLATES)
+        merchant = rng.choice(MERCHANTS)
+        corpus.append((bank, template.format(
+            amt=f"{rng.randint(10, 5000)}.{rng.randint(0, 99):02d}",
+            merchant=merchant,
+            vpa=merchant.lower().replace(" ", ""),
+            ref=rng.randint(10**11, 10**12 - 1),
+        )))
+    return corpus
+
+
+def mock_ml_categorizer(transaction_text: str, latency_s: float) -> dict:
+    """Stand-in for TransactionService._call_ml_categorizer plus one HTTP round trip."""
+    if latency_s:
+        time.sleep(latency_s)
+    return {"merchant": "Zomato/Swiggy/CloudKitchen", "category": "Discretionary_Food_Delivery", "amount": 450.00, "type": "DEBIT"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMS parser registry vs mock ML categorizer.")
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--ml-latency-ms", type=float, default=25.0, help="Simulated categorizer round trip.")
+    parser.add_argument("--ml-sample", type=int, default=200, help="ML calls actually timed (the rest is extrapolated).")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.messages)
+    registry = SmsParserRegistry()
+
+    # 1. Registry path: parse everything, only the misses would go to ML
+    start = time.perf_counter()
+    needs_ml = 0
+    for bank, text in corpus:
+        parsed = registry.parse(bank, text)
+        if parsed is None or parsed.category is None:
+            needs_ml += 1
+    parse_elapsed = time.perf_counter() - start
+
+    # 2. Mock ML path: time a sample and extrapolate to the corpus
+    sample = corpus[:args.ml_sample]
+    start = time.perf_counter()
+    for _, text in sample:
+        mock_ml_categorizer(text, args.ml_latency_ms / 1000)
+    ml_per_call = (time.perf_counter() - start) / len(sample)
+
+    ml_only_total = ml_per_call * len(corpus)
+    registry_total = parse_elapsed + ml_per_call * needs_ml
+
+    print(f"messages:                 {len(corpus)}")
+    print(f"parse cost:               {parse_elapsed / len(corpus) * 1e6:8.2f} us/msg")
+    print(f"resolved without ML:      {1 - needs_ml / len(corpus):8.2%}")
+    print(f"ML-only path:             {len(corpus) / ml_only_total:10.1f} msg/s")
+    print(f"registry + ML fallback:   {len(corpus) / registry_total:10.1f} msg/s")
+    print(f"speedup:                  {ml_only_total / registry_total:10.1f}x")
+    print("hit rates:")
+    print(json.dumps(registry.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
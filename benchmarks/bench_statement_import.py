@@ -0,0 +1,62 @@
+# benchmarks/bench_statement_import.py
+#
+# Streams a synthetic CSV bank statement through the statement parser and reports
+# throughput and peak Python memory for growing file sizes (memory should stay flat).
+# Runs fully offline; the DB write path is not included.
+#
+# Usage:
+#   python -m benchmarks.bench_statement_import --rows 10000 100000 500000
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from services.statement_parsers import parse_csv_statement, StatementRow
+
+HEADER = b"Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance\n"
+MERCHANTS = ["swiggy", "zomato", "uber", "bescom", "bigbasket", "localkirana"]
+
+
+async def synthetic_statement(rows: int, chunk_size: int = 64 * 1024):
+    """Yields the statement in upload-sized byte chunks without materializing the file."""
+    buffer = bytearray(HEADER)
+    for i in range(rows):
+        merchant = MERCHANTS[i % len(MERCHANTS)]
+        day = 1 + i % 28
+        buffer += (
+            f'{day:02d}/04/25,"UPI-{merchant.upper()}-{merchant}{i % 97}@icici-REF{i}",{400000 + i},'
+            f'{day:02d}/04/25,"{100 + i % 4900}.00",,{1000000 - i}\n'
+        ).encode()
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _consume(rows: int) -> int:
+    parsed = 0
+    async for item in parse_csv_statement(synthetic_statement(rows)):
+        if isinstance(item, StatementRow):
+            parsed += 1
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming statement parser throughput and memory.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 300000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        tracemalloc.start()
+        start = time.perf_counter()
+        parsed = asyncio.run(_consume(rows))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"rows: {rows:8d}   parsed: {parsed:8d}   {parsed / elapsed:10.1f} rows/s   peak memory: {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
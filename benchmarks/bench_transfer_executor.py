@@ -0,0 +1,96 @@
+# benchmarks/bench_transfer_executor.py
+#
+# Throughput of the transfer executor against the in-process stub UPI gateway (httpx
+# ASGI transport, no network, outcomes collected in memory instead of the database):
+# transfers awaited one by one (what the consent request did inline) against the
+# bounded-concurrency executor, with injected declines, 5xx errors and hung requests.
+#
+# Usage:
+#   python -m benchmarks.bench_transfer_executor --transfers 2000 --users 200 --failure-rate 0.05 --error-rate 0.02
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from decimal import Decimal
+
+import httpx
+
+from benchmarks.stub_upi_gateway import build_stub_app
+from services.transfer_executor import TransferExecutor, TransferRequest
+
+
+async def _run(args, global_concurrency: int, per_user_concurrency: int) -> dict:
+    app = build_stub_app(args.latency_ms, args.settle_ms, args.failure_rate, args.error_rate, args.hang_rate, args.hang_seconds)
+    outcomes = Counter()
+
+    async def recorder(transfer, outcome):
+        outcomes[outcome.status] += 1
+        return True
+
+    executor = TransferExecutor(
+        base_url="http://stub-upi-gateway",
+        global_concurrency=global_concurrency,
+        per_user_concurrency=per_user_concurrency,
+        timeout_seconds=args.timeout,
+        poll_interval_seconds=args.poll_interval,
+        max_polls=args.max_polls,
+        recorder=recorder,
+        transport=httpx.ASGITransport(app=app),
+    )
+    await executor.start()
+
+    transfers = [
+        TransferRequest(log_id=i, user_id=i % args.users, rule_id=i, amount=Decimal(100 + i % 900), destination=f"Stash_Goal_{i % 7}")
+        for i in range(args.transfers)
+    ]
+    start = time.perf_counter()
+    executor.submit(transfers)
+    await executor.wait_idle()
+    elapsed = time.perf_counter() - start
+    metrics = executor.metrics()
+    await executor.stop()
+
+    return {
+        "elapsed": elapsed,
+        "completed": outcomes["COMPLETED"],
+        "failed": outcomes["FAILED"],
+        "unknown": metrics["unknown_total"],
+        "retries": metrics["retries_total"],
+        "http_requests": metrics["http_requests_total"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent transfer executor vs sequential transfers (stub gateway).")
+    parser.add_argument("--transfers", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200, help="Distinct users the transfers belong to.")
+    parser.add_argument("--sequential-transfers", type=int, default=100, help="Transfers for the (slow) sequential run.")
+    parser.add_argument("--global-concurrency", type=int, default=64)
+    parser.add_argument("--per-user-concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Simulated per-request gateway latency.")
+    parser.add_argument("--settle-ms", type=float, default=200.0, help="Simulated time until a transfer settles.")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--max-polls", type=int, default=40)
+    args = parser.parse_args()
+
+    # 1. Sequential: one transfer at a time (the old inline behaviour, minus the mock)
+    sequential_args = argparse.Namespace(**{**vars(args), "transfers": args.sequential_transfers, "users": 1})
+    sequential = asyncio.run(_run(sequential_args, 1, 1))
+    # 2. Executor: bounded global and per-user concurrency
+    concurrent = asyncio.run(_run(args, args.global_concurrency, args.per_user_concurrency))
+
+    for label, count, run in (("sequential", args.sequential_transfers, sequential), ("executor", args.transfers, concurrent)):
+        print(f"{label:12s} {count / run['elapsed']:10.1f} transfers/s   completed: {run['completed']:6d}   "
+              f"failed: {run['failed']:5d}   unknown: {run['unknown']:4d}   retries: {run['retries']:5d}   "
+              f"http requests: {run['http_requests']:7d}")
+    print(f"speedup:     {(args.transfers / concurrent['elapsed']) / (args.sequential_transfers / sequential['elapsed']):10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
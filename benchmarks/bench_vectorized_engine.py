@@ -0,0 +1,134 @@
+# benchmarks/bench_vectorized_engine.py
+#
+# ml/vectorized_engine against the scalar per-user Decimal loops it replaces for cohort
+# jobs: first a randomized parity check (every threshold, DMB and leak must match the
+# scalar functions to the paisa, including exact .005 ties), then users/sec of both.
+# Runs fully offline.
+#
+# The scalar side runs under an exact Decimal context: with ml/scaling_logic's
+# module-level prec=4, calculate_dynamic_baseline rounds its intermediate products (and
+# .quantize raises InvalidOperation for amounts >= 100.00).
+#
+# Usage:
+#   python -m benchmarks.bench_vectorized_engine --users 200000 --check-users 20000 --seed 7
+
+import argparse
+import random
+import time
+from decimal import Decimal, localcontext
+
+from ml.scaling_logic import BASE_NEEDS_INDEX, CITY_COST_MULTIPLIERS, DEFAULT_EFFICIENCY_FACTORS, calculate_dynamic_baseline
+from ml.vectorized_engine import (
+    city_multiplier_column,
+    compute_dynamic_baselines,
+    compute_leaks,
+    compute_minimal_baselines,
+    efficiency_factor_column,
+    from_paise,
+    to_fixed_point,
+)
+from services.dmb_logic.dmb_calculator import SDS_WEIGHTS, calculate_dynamic_minimal_baseline
+
+CITY_TIERS = list(CITY_COST_MULTIPLIERS) + ["Unknown Tier"]
+INCOME_SLABS = list(DEFAULT_EFFICIENCY_FACTORS) + ["Unknown Slab"]
+DMB_CATEGORIES = list(SDS_WEIGHTS) + ["Uncategorized"]
+
+
+def _cohort(users: int, rng: random.Random):
+    """Random cohort of two-place EFS/factors; the 0.85 margin produces plenty of exact .005 ties."""
+    efs = [Decimal(rng.randint(100, 900)).scaleb(-2) for _ in range(users)]
+    tiers = [rng.choice(CITY_TIERS) for _ in range(users)]
+    slabs = [rng.choice(INCOME_SLABS) for _ in range(users)]
+    benchmarks = [Decimal(rng.randint(70, 130)).scaleb(-2) if rng.random() < 0.3 else None for _ in range(users)]
+    spend = [[Decimal(rng.randint(0, 4_000_000)).scaleb(-2) for _ in BASE_NEEDS_INDEX] for _ in range(users)]
+    return efs, tiers, slabs, benchmarks, spend
+
+
+def _scalar(efs, tiers, slabs, benchmarks, spend):
+    """The per-user loop: one calculate_dynamic_baseline + Python leak loop per user."""
+    categories = list(BASE_NEEDS_INDEX)
+    results = []
+    with localcontext() as ctx:
+        ctx.prec = 28
+        for i in range(len(efs)):
+            baselines = calculate_dynamic_baseline(Decimal("0"), efs[i], tiers[i], slabs[i], benchmarks[i])
+            leaks = [max(spend[i][k] - baselines[category], Decimal("0.00")) for k, category in enumerate(categories)]
+            dmb = [calculate_dynamic_minimal_baseline(category, efs[i]) for category in DMB_CATEGORIES]
+            results.append((baselines, leaks, dmb))
+    return results
+
+
+def _columns(efs, tiers, slabs, benchmarks, spend):
+    """Decimal cohort -> the engine's int64 columns (a batch job would SELECT these directly)."""
+    return (
+        to_fixed_point(efs, 2),
+        city_multiplier_column(tiers),
+        efficiency_factor_column(slabs, benchmarks),
+        to_fixed_point([value for row in spend for value in row], 2).reshape(len(efs), -1),
+    )
+
+
+def _vectorized(efs, city_multiplier, efficiency_factor, spend):
+    baselines = compute_dynamic_baselines(efs, city_multiplier, efficiency_factor)
+    leaks, _ = compute_leaks(spend, baselines.thresholds)
+    dmb = compute_minimal_baselines(efs, SDS_WEIGHTS, DMB_CATEGORIES)
+    return baselines, leaks, dmb
+
+
+def check(users: int, rng: random.Random) -> int:
+    cohort = _cohort(users, rng)
+    expected = _scalar(*cohort)
+    baselines, leaks, dmb = _vectorized(*_columns(*cohort))
+
+    mismatches = 0
+    for i, (scalar_baselines, scalar_leaks, scalar_dmb) in enumerate(expected):
+        got = dict(zip(baselines.categories, from_paise(baselines.thresholds[i])))
+        (got["Total_Leakage_Threshold"],) = from_paise(baselines.total_leakage_threshold[i])
+        (got["Total_Minimal_Need_DMB"],) = from_paise(baselines.total_minimal_need_dmb[i])
+        (got["Potential_Recoverable_Fund"],) = from_paise(baselines.potential_recoverable_fund[i])
+        if got != scalar_baselines or from_paise(leaks[i]) != scalar_leaks or from_paise(dmb[i]) != scalar_dmb:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH user {i}: efs={cohort[0][i]} tier={cohort[1][i]} slab={cohort[2][i]} benchmark={cohort[3][i]}")
+    print(f"parity: {users} users, {mismatches} mismatches")
+    return mismatches
+
+
+def bench(users: int, rng: random.Random, scalar_sample: int):
+    cohort = _cohort(users, rng)
+
+    start = time.perf_counter()
+    columns = _columns(*cohort)
+    conversion_s = time.perf_counter() - start
+    start = time.perf_counter()
+    _vectorized(*columns)
+    vectorized_s = time.perf_counter() - start
+
+    sample = tuple(column[:scalar_sample] for column in cohort)
+    start = time.perf_counter()
+    _scalar(*sample)
+    scalar_rate = scalar_sample / (time.perf_counter() - start)
+
+    vectorized_rate = users / vectorized_s
+    print(f"users: {users:8d}   vectorized: {vectorized_s * 1000:8.1f} ms ({vectorized_rate:12.0f} users/s, "
+          f"+{conversion_s * 1000:.0f} ms Decimal->paise conversion)   "
+          f"scalar: {scalar_rate:10.0f} users/s   speedup: {vectorized_rate / scalar_rate:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs scalar DMB/leakage engine: parity and throughput.")
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 200000])
+    parser.add_argument("--check-users", type=int, default=20000, help="Cohort size for the parity check (0 to skip).")
+    parser.add_argument("--scalar-sample", type=int, default=10000, help="Users timed on the scalar path.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.check_users and check(args.check_users, rng):
+        raise SystemExit(1)
+    for users in args.users:
+        bench(users, rng, min(args.scalar_sample, users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/stub_categorizer.py
+#
+# Local stand-in for the 'transaction-categorizer' service. It speaks the same
+# batch protocol as the production service (POST /categorize/batch {"texts": [...]}
+# -> {"results": [...]}) and simulates a fixed per-request network/serving overhead
+# plus a small per-message inference cost, so batching gains can be measured offline.
+#
+# Usage:
+#   In-process (no network): httpx.ASGITransport(app=build_stub_app())
+#   As a server:             python -m benchmarks.stub_categorizer --port 8081
+#                            CATEGORIZER_URL=http://127.0.0.1:8081 gunicorn app:app ...
+
+import argparse
+import asyncio
+from typing import List
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from services.categorizer_client import mock_categorize
+from services.sms_parsers import resolve_category, DEBIT
+
+
+class CategorizeBatchIn(BaseModel):
+    texts: List[str]
+
+
+def build_stub_app(request_overhead_ms: float = 20.0, per_message_ms: float = 0.2) -> FastAPI:
+    """Creates the stub categorizer app with the given simulated latencies."""
+    app = FastAPI(title="Stub Transaction Categorizer")
+    app.state.requests = 0
+    app.state.messages = 0
+
+    def _categorize(text: str) -> dict:
+        result = mock_categorize(text)
+        # Keyword categories make the stub's answers depend on the input text
+        result["category"] = resolve_category(text, DEBIT) or result["category"]
+        return result
+
+    @app.post("/categorize/batch")
+    async def categorize_batch(payload: CategorizeBatchIn):
+        app.state.requests += 1
+        app.state.messages += len(payload.texts)
+        await asyncio.sleep((request_overhead_ms + per_message_ms * len(payload.texts)) / 1000.0)
+        return {"results": [_categorize(text) for text in payload.texts]}
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "messages": app.state.messages}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stub categorizer as a local HTTP server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--request-overhead-ms", type=float, default=20.0)
+    parser.add_argument("--per-message-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(build_stub_app(args.request_overhead_ms, args.per_message_ms), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/stub_upi_gateway.py
+#
+# Local stand-in for the UPI/bank transfer gateway. It speaks the protocol the
+# transfer executor expects:
+#   POST /transfers {"reference", "amount", "destination", "user_id"}
+#        -> 202 {"reference", "status": "PENDING", "gateway_reference"}   (idempotent per reference)
+#   GET  /transfers/{reference}
+#        -> 200 {"reference", "status": "PENDING" | "COMPLETED" | "FAILED", "gateway_reference", "failure_reason"}
+# and injects latency, settlement delay, declined transfers, 5xx errors and hung
+# requests, so executor throughput and failure handling can be tested offline.
+#
+# Usage:
+#   In-process (no network): httpx.ASGITransport(app=build_stub_app())
+#   As a server:             python -m benchmarks.stub_upi_gateway --port 8082 --failure-rate 0.05
+#                            UPI_GATEWAY_URL=http://127.0.0.1:8082 gunicorn app:app ...
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class TransferIn(BaseModel):
+    reference: str
+    amount: str
+    destination: str
+    user_id: int
+
+
+def build_stub_app(
+    latency_ms: float = 30.0,
+    settle_ms: float = 200.0,
+    failure_rate: float = 0.0,
+    error_rate: float = 0.0,
+    hang_rate: float = 0.0,
+    hang_seconds: float = 30.0,
+    seed: int = 7,
+) -> FastAPI:
+    """
+    Creates the stub gateway app. Every request waits latency_ms; a transfer settles
+    settle_ms after its first POST, FAILED with probability failure_rate. error_rate of
+    requests answer 503 and hang_rate of requests sleep hang_seconds (client timeouts).
+    """
+    app = FastAPI(title="Stub UPI Gateway")
+    rng = random.Random(seed)
+    transfers: Dict[str, dict] = {}
+    app.state.requests = 0
+    app.state.posts = 0
+    app.state.duplicate_posts = 0
+    app.state.injected_errors = 0
+
+    async def _simulate_network():
+        app.state.requests += 1
+        if hang_rate and rng.random() < hang_rate:
+            await asyncio.sleep(hang_seconds)
+        await asyncio.sleep(latency_ms / 1000.0)
+        if error_rate and rng.random() < error_rate:
+            app.state.injected_errors += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Injected gateway error")
+
+    def _state(transfer: dict) -> dict:
+        if transfer["status"] == "PENDING" and time.monotonic() >= transfer["settles_at"]:
+            transfer["status"] = transfer["outcome"]
+        return {
+            "reference": transfer["reference"],
+            "status": transfer["status"],
+            "gateway_reference": transfer["gateway_reference"],
+            "failure_reason": "Declined by beneficiary bank" if transfer["status"] == "FAILED" else None,
+        }
+
+    @app.post("/transfers")
+    async def create_transfer(payload: TransferIn):
+        await _simulate_network()
+        app.state.posts += 1
+        transfer = transfers.get(payload.reference)
+        if transfer is None:
+            transfer = transfers[payload.reference] = {
+                "reference": payload.reference,
+                "gateway_reference": f"UPI{len(transfers):012d}",
+                "status": "PENDING",
+                "outcome": "FAILED" if failure_rate and rng.random() < failure_rate else "COMPLETED",
+                "settles_at": time.monotonic() + settle_ms / 1000.0,
+            }
+        else:
+            app.state.duplicate_posts += 1
+        return JSONResponse(_state(transfer), status_code=status.HTTP_202_ACCEPTED)
+
+    @app.get("/transfers/{reference}")
+    async def get_transfer(reference: str):
+        await _simulate_network()
+        transfer = transfers.get(reference)
+        if transfer is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown reference")
+        return _state(transfer)
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": app.state.requests,
+            "posts": app.state.posts,
+            "duplicate_posts": app.state.duplicate_posts,
+            "injected_errors": app.state.injected_errors,
+            "transfers": len(transfers),
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stub UPI gateway as a local HTTP server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--settle-ms", type=float, default=200.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of transfers that settle FAILED.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that hang for --hang-seconds.")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(
+        build_stub_app(args.latency_ms, args.settle_ms, args.failure_rate, args.error_rate, args.hang_rate, args.hang_seconds),
+        host=args.host, port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# db/base.py
+
+from sqlalchemy.orm import DeclarativeBase
+
+class Base(DeclarativeBase):
+    """Declarative base of every model in models/ (one MetaData for create_all and Alembic)."""
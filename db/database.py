@@ -68,7 +68,7 @@ async def create_db_and_tables():
     """
     async with engine.begin() as conn:
         # Import all model modules so that SQLAlchemy knows about them
-        from ..models import user_profile, financial_profile, salary_profile, transaction, smart_transfer # Ensure all models are imported here
+        from ..models import user_profile, financial_profile, salary_profile, transaction, raw_transaction, statement_import_job, categorization_dead_letter, smart_transfer, category_period_total, leakage_job_checkpoint, category_daily_spend, spend_projection_curve, insight_card_set, notification_outbox, insight_campaign_checkpoint, idempotency_key, suggestion_plan, smart_rule_version # Ensure all models are imported here
         
         # Drop all tables (CAUTION: Only for development/testing)
         # await conn.run_sync(Base.metadata.drop_all)
@@ -0,0 +1,71 @@
+# db/delta_triggers.py
+
+from typing import List
+
+from .enums import TransactionStatus
+
+# ----------------------------------------------------------------------
+# DELTA TRIGGERS ON `transactions`
+# ----------------------------------------------------------------------
+# Statement-level triggers with transition tables: every INSERT (ORM add, executemany,
+# ON CONFLICT DO NOTHING, COPY from tools/bulk_load), UPDATE (category override, status
+# change) and DELETE applies ONE grouped upsert of the net deltas to the aggregate table,
+# whatever the writer. Groups are upserted in key order so concurrent writers lock rows
+# in the same order. Only COMPLETED transactions count.
+_UPSERT_DELTAS = """
+        INSERT INTO {table} AS t (user_id, {key_column}, category, sds_class, spend, txn_count, updated_at)
+        SELECT user_id, {key_expression}, category, sds_class, SUM(amount), SUM(n), now() AT TIME ZONE 'utc'
+        FROM ({deltas}) AS deltas
+        GROUP BY 1, 2, 3, 4
+        HAVING SUM(n) <> 0 OR SUM(amount) <> 0
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (user_id, {key_column}, category, sds_class) DO UPDATE
+        SET spend = t.spend + EXCLUDED.spend,
+            txn_count = t.txn_count + EXCLUDED.txn_count,
+            updated_at = EXCLUDED.updated_at;"""
+
+_NEW_ROWS = f"SELECT user_id, transaction_date, category, sds_class, amount, 1 AS n FROM new_rows WHERE status = '{TransactionStatus.COMPLETED.value}'"
+_OLD_ROWS = f"SELECT user_id, transaction_date, category, sds_class, -amount AS amount, -1 AS n FROM old_rows WHERE status = '{TransactionStatus.COMPLETED.value}'"
+
+
+def delta_trigger_ddl(table: str, key_column: str, key_expression: str, trigger_name: str, after_deltas: str = "") -> List[str]:
+    """
+    The trigger function `<table>_apply_deltas` and its INSERT/UPDATE/DELETE triggers
+    (`trg_transactions_<trigger_name>_<op>`), one DDL per statement. The aggregate table
+    is keyed by (user_id, key_column, category, sds_class), key_column being
+    `key_expression` of transaction_date. `after_deltas` is run after the upsert with
+    the same `{deltas}` subquery (e.g. a version bump of the users touched).
+    """
+    def apply(deltas: str) -> str:
+        statements = _UPSERT_DELTAS.format(table=table, key_column=key_column, key_expression=key_expression, deltas=deltas)
+        return statements + after_deltas.format(deltas=deltas)
+
+    function = f"{table}_apply_deltas"
+    return [
+        f"""
+    CREATE OR REPLACE FUNCTION {function}() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN{apply(_NEW_ROWS)}
+        ELSIF TG_OP = 'DELETE' THEN{apply(_OLD_ROWS)}
+        ELSE{apply(_NEW_ROWS + " UNION ALL " + _OLD_ROWS)}
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+        f"""
+    CREATE OR REPLACE TRIGGER trg_transactions_{trigger_name}_insert
+    AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """,
+        f"""
+    CREATE OR REPLACE TRIGGER trg_transactions_{trigger_name}_update
+    AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """,
+        f"""
+    CREATE OR REPLACE TRIGGER trg_transactions_{trigger_name}_delete
+    AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """,
+    ]
@@ -28,6 +28,13 @@ class TransactionStatus(enum.Enum):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
 
+class ImportJobStatus(enum.Enum):
+    """Lifecycle of a bank-statement import job."""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
 # Custom TypeDecorator for storing Python Enums as native Postgres ENUMs (if using native ENUMs)
 # For simplicity with Supabase (which often uses TEXT fields for enums), we can use String type
 class EnumString(TypeDecorator):
@@ -0,0 +1,190 @@
+# ml/vectorized_engine.py
+#
+# Cohort-wide (columnar) versions of ml/scaling_logic.calculate_dynamic_baseline and
+# services/dmb_logic/dmb_calculator.calculate_dynamic_minimal_baseline, for batch jobs
+# and analytics over hundreds of thousands of users at once.
+#
+# All money is int64 PAISE and all factors are int64 fixed-point HUNDREDTHS (EFS 1.83 ->
+# 183, Tier 1 multiplier 1.25 -> 125), so every step is exact integer arithmetic and each
+# Decimal .quantize(Decimal("0.01")) of the scalar code becomes one ROUND_HALF_EVEN
+# integer division. Results match the scalar functions to the paisa when those run under
+# an exact Decimal context (the module-level prec=4 of ml/scaling_logic rounds the
+# intermediate products; see benchmarks/bench_vectorized_engine.py --check).
+
+from decimal import Decimal, localcontext
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scaling_logic import (
+    BASE_NEEDS_INDEX,
+    CITY_COST_MULTIPLIERS,
+    DEFAULT_EFFICIENCY_FACTORS,
+    LEAK_SAVINGS_MARGIN_PERCENTAGE,
+)
+
+FACTOR_PLACES = 2   # EFS, multipliers, efficiency factors and the margin: hundredths
+MONEY_PLACES = 2    # paise
+
+
+class CohortBaselines(NamedTuple):
+    """Columnar calculate_dynamic_baseline output; matrices are (users, categories), paise."""
+    categories: List[str]
+    category_dmb: np.ndarray
+    thresholds: np.ndarray
+    total_leakage_threshold: np.ndarray
+    total_minimal_need_dmb: np.ndarray
+    potential_recoverable_fund: np.ndarray
+
+
+# ----------------------------------------------------------------------
+# FIXED-POINT CONVERSION (at the Decimal boundary only)
+# ----------------------------------------------------------------------
+def to_fixed_point(values: Sequence[Decimal], places: int) -> np.ndarray:
+    """
+    Decimals -> int64 array scaled by 10**places. Raises ValueError for values with more
+    decimal places than that, since they could not be matched to the paisa.
+    """
+    out = np.empty(len(values), dtype=np.int64)
+    with localcontext() as ctx:
+        ctx.prec = 28
+        for i, value in enumerate(values):
+            scaled = Decimal(value).scaleb(places)
+            if scaled != scaled.to_integral_value():
+                raise ValueError(f"{value} has more than {places} decimal places")
+            out[i] = int(scaled)
+    return out
+
+
+def from_paise(values: np.ndarray) -> List[Decimal]:
+    """int64 paise -> Decimals with two places (exact, whatever the caller's context precision)."""
+    with localcontext() as ctx:
+        ctx.prec = 28
+        return [Decimal(int(v)).scaleb(-MONEY_PLACES) for v in np.asarray(values).ravel()]
+
+
+def _round_half_even_div(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """numerator / denominator rounded like Decimal.quantize (ROUND_HALF_EVEN), in integers."""
+    quotient, remainder = np.divmod(numerator, denominator)   # floor division: 0 <= remainder < denominator
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+# ----------------------------------------------------------------------
+# COLUMN BUILDERS (the dict lookups of the scalar code)
+# ----------------------------------------------------------------------
+def _lookup_column(keys: Sequence[str], table: Dict[str, Decimal], default: Decimal) -> np.ndarray:
+    codes_by_name = {name: code for code, name in enumerate(table)}
+    codes = np.array([codes_by_name.get(key, len(table)) for key in keys], dtype=np.int64)
+    values = to_fixed_point(list(table.values()) + [default], FACTOR_PLACES)
+    return values[codes]
+
+
+def city_multiplier_column(city_tiers: Sequence[str]) -> np.ndarray:
+    """CITY_COST_MULTIPLIERS.get(tier, 1.00) per user, in hundredths."""
+    return _lookup_column(city_tiers, CITY_COST_MULTIPLIERS, Decimal("1.00"))
+
+
+def efficiency_factor_column(
+    income_slabs: Sequence[str],
+    benchmark_efficiency_factors: Optional[Sequence[Optional[Decimal]]] = None,
+) -> np.ndarray:
+    """Benchmark factor when given, else DEFAULT_EFFICIENCY_FACTORS.get(slab, 1.00); hundredths."""
+    factors = _lookup_column(income_slabs, DEFAULT_EFFICIENCY_FACTORS, Decimal("1.00"))
+    if benchmark_efficiency_factors is not None:
+        overrides = [i for i, factor in enumerate(benchmark_efficiency_factors) if factor is not None]
+        if overrides:
+            factors[overrides] = to_fixed_point([benchmark_efficiency_factors[i] for i in overrides], FACTOR_PLACES)
+    return factors
+
+
+def base_needs_paise(base_needs: Dict[str, Decimal] = BASE_NEEDS_INDEX) -> Tuple[List[str], np.ndarray]:
+    """Category names (column order) and their base costs in paise."""
+    return list(base_needs), to_fixed_point(list(base_needs.values()), MONEY_PLACES)
+
+
+# ----------------------------------------------------------------------
+# ENGINE
+# ----------------------------------------------------------------------
+def compute_dynamic_baselines(
+    efs: np.ndarray,
+    city_multiplier: np.ndarray,
+    efficiency_factor: np.ndarray,
+    base_needs: Dict[str, Decimal] = BASE_NEEDS_INDEX,
+    margin: Decimal = LEAK_SAVINGS_MARGIN_PERCENTAGE,
+) -> CohortBaselines:
+    """
+    calculate_dynamic_baseline for a whole cohort. The three factor columns are int64
+    hundredths, one entry per user (see the column builders above).
+    """
+    categories, base_cost = base_needs_paise(base_needs)
+    (margin_hundredths,) = to_fixed_point([margin], FACTOR_PLACES)
+    factor_scale = 10 ** (3 * FACTOR_PLACES)
+
+    # 1. Per-user combined factor (hundredths^3), then Category DMB = Base * EFS * City * Efficiency
+    combined = (
+        np.asarray(efs, dtype=np.int64)
+        * np.asarray(city_multiplier, dtype=np.int64)
+        * np.asarray(efficiency_factor, dtype=np.int64)
+    )
+    category_dmb = _round_half_even_div(combined[:, None] * base_cost[None, :], factor_scale)
+
+    # 2. Leakage Threshold = DMB * (1 - margin)
+    threshold_multiplier = 10 ** FACTOR_PLACES - int(margin_hundredths)
+    thresholds = _round_half_even_div(category_dmb * threshold_multiplier, 10 ** FACTOR_PLACES)
+
+    # 3. Totals (sums of already-quantized paise are exact)
+    total_leakage_threshold = thresholds.sum(axis=1)
+    total_minimal_need_dmb = category_dmb.sum(axis=1)
+    return CohortBaselines(
+        categories=categories,
+        category_dmb=category_dmb,
+        thresholds=thresholds,
+        total_leakage_threshold=total_leakage_threshold,
+        total_minimal_need_dmb=total_minimal_need_dmb,
+        potential_recoverable_fund=total_minimal_need_dmb - total_leakage_threshold,
+    )
+
+
+def compute_minimal_baselines(efs: np.ndarray, sds_weights: Dict[str, Decimal], categories: Sequence[str]) -> np.ndarray:
+    """
+    calculate_dynamic_minimal_baseline for every (user, category): SDS_Weight * EFS in
+    paise, 0 for categories without a weight. `efs` is int64 hundredths.
+    """
+    weights = to_fixed_point([sds_weights.get(category, Decimal("0.00")) for category in categories], MONEY_PLACES)
+    return _round_half_even_div(np.asarray(efs, dtype=np.int64)[:, None] * weights[None, :], 10 ** FACTOR_PLACES)
+
+
+def compute_leaks(spend: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Leak matrix max(spend - threshold, 0) and per-user total, all paise (users, categories)."""
+    leaks = np.maximum(np.asarray(spend, dtype=np.int64) - thresholds, 0)
+    return leaks, leaks.sum(axis=1)
+
+
+# ----------------------------------------------------------------------
+# SPEND PROJECTION CURVES (nightly pass, services/spend_projection.py)
+# ----------------------------------------------------------------------
+DAYS_PER_CURVE = 31
+
+
+def compute_cumulative_share_curves(daily_spend: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (series, months, 31) daily spend -> (series, 31) average cumulative share of the
+    month's spend reached by each day, and the (series,) number of months it averages.
+    Months without spend are ignored; a series with none gets the linear (run-rate) curve.
+    Days past the end of a shorter month hold no spend, so its share is already 1.0 there.
+    """
+    cumulative = np.cumsum(np.asarray(daily_spend, dtype=np.float64), axis=2)
+    month_totals = cumulative[:, :, -1]
+    has_spend = month_totals > 0
+    shares = np.divide(cumulative, month_totals[:, :, None], out=np.zeros_like(cumulative), where=has_spend[:, :, None])
+
+    history_months = has_spend.sum(axis=1)
+    linear = np.arange(1, DAYS_PER_CURVE + 1, dtype=np.float64) / DAYS_PER_CURVE
+    curves = np.where(
+        history_months[:, None] > 0,
+        shares.sum(axis=1) / np.maximum(history_months, 1)[:, None],
+        linear[None, :],
+    )
+    return curves, history_months
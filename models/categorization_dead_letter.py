@@ -0,0 +1,32 @@
+# models/categorization_dead_letter.py
+
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, ForeignKey, String, Text
+from datetime import datetime
+
+from ..db.base import Base
+
+class CategorizationDeadLetter(Base):
+    """
+    Raw messages that exhausted their categorization attempts (poison messages).
+    Rows are moved here from raw_transactions by the retry sweeper and moved back,
+    with the same ID, when an admin re-drives them.
+    """
+    __tablename__ = "categorization_dead_letters"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Original raw_transactions.id (restored on re-drive)
+    raw_transaction_id: Mapped[int] = mapped_column(Integer, unique=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+
+    # --- Copied Source Data ---
+    raw_text: Mapped[str] = mapped_column(Text)
+    source_type: Mapped[str] = mapped_column(String(20))
+    timestamp: Mapped[datetime] = mapped_column(DateTime)
+    sms_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    # --- Failure Details ---
+    categorization_attempts: Mapped[int] = mapped_column(Integer)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dead_lettered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
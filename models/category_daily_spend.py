@@ -0,0 +1,40 @@
+# models/category_daily_spend.py
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DECIMAL, Date, DateTime, ForeignKey, String, DDL, event
+from datetime import date, datetime
+from decimal import Decimal
+
+from ..db.base import Base
+from ..db.enums import SDSWeightClass, EnumString
+from ..db.delta_triggers import delta_trigger_ddl
+
+class CategoryDailySpend(Base):
+    """
+    Daily spend per (user, day, category, sds_class), maintained by delta from the
+    `transactions` triggers below. The nightly projection pass builds the cumulative
+    month curves (SpendProjectionCurve) from it instead of rescanning transactions.
+    """
+    __tablename__ = "category_daily_spend"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category: Mapped[str] = mapped_column(String(100), primary_key=True)
+    sds_class: Mapped[SDSWeightClass] = mapped_column(EnumString(SDSWeightClass), primary_key=True)
+
+    # --- Aggregates (COMPLETED transactions only) ---
+    spend: Mapped[Decimal] = mapped_column(DECIMAL(14, 2), default=Decimal("0.00"))
+    txn_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# ----------------------------------------------------------------------
+# DELTA TRIGGERS ON `transactions` (db/delta_triggers.py, as category_period_totals)
+# ----------------------------------------------------------------------
+CATEGORY_DAILY_SPEND_TRIGGER_DDL = delta_trigger_ddl(
+    "category_daily_spend", "day", "CAST(transaction_date AS DATE)", "daily_spend",
+)
+
+# Installed after create_all (all tables exist by then); one DDL per statement
+for _statement in CATEGORY_DAILY_SPEND_TRIGGER_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
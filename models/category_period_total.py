@@ -0,0 +1,68 @@
+# models/category_period_total.py
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, BigInteger, DECIMAL, Date, DateTime, ForeignKey, String, DDL, event
+from datetime import date, datetime
+from decimal import Decimal
+
+from ..db.base import Base
+from ..db.enums import SDSWeightClass, EnumString
+from ..db.delta_triggers import delta_trigger_ddl
+
+class CategoryPeriodTotal(Base):
+    """
+    Running MTD aggregate per (user, month, category, sds_class), maintained by delta
+    from the `transactions` triggers below, so leakage reads O(categories) rows instead
+    of rescanning the month. services/category_totals.py reconciles it with the raw rows.
+    """
+    __tablename__ = "category_period_totals"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    # First day of the month
+    period: Mapped[date] = mapped_column(Date, primary_key=True)
+    category: Mapped[str] = mapped_column(String(100), primary_key=True)
+    sds_class: Mapped[SDSWeightClass] = mapped_column(EnumString(SDSWeightClass), primary_key=True)
+
+    # --- Aggregates (COMPLETED transactions only) ---
+    spend: Mapped[Decimal] = mapped_column(DECIMAL(14, 2), default=Decimal("0.00"))
+    txn_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class CategoryTotalsVersion(Base):
+    """
+    Per-user counter bumped by the delta triggers (and by reconciliation repairs) in the
+    transaction that changes the user's category_period_totals: the watermark of the
+    leakage cache (see services/leakage_cache.py). The counter row lock serializes the
+    bumps, so the value only moves forward in commit order; a reader that sees version N
+    sees every delta committed with a version <= N.
+    """
+    __tablename__ = "category_totals_versions"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# ----------------------------------------------------------------------
+# DELTA TRIGGERS ON `transactions` (db/delta_triggers.py)
+# ----------------------------------------------------------------------
+# After the totals upsert the counter of every user touched is bumped (totals rows
+# first, counter row last, in every writer: no lock-order inversion).
+_BUMP_VERSIONS = """
+        INSERT INTO category_totals_versions AS v (user_id, version, updated_at)
+        SELECT DISTINCT user_id, 1, now() AT TIME ZONE 'utc'
+        FROM ({deltas}) AS deltas
+        ORDER BY 1
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = v.version + 1,
+            updated_at = EXCLUDED.updated_at;"""
+
+CATEGORY_TOTALS_TRIGGER_DDL = delta_trigger_ddl(
+    "category_period_totals", "period", "CAST(date_trunc('month', transaction_date) AS DATE)", "category_totals",
+    after_deltas=_BUMP_VERSIONS,
+)
+
+# Installed after create_all (all tables exist by then); one DDL per statement
+for _statement in CATEGORY_TOTALS_TRIGGER_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
@@ -29,6 +29,8 @@ class FinancialProfile(Base):
     essential_target: Mapped[Decimal] = mapped_column(DECIMAL(10, 2), default=Decimal("0.00"))
     
     # Metadata
+    # Bumped atomically on every DMB recalculation; part of the leakage cache key
+    version: Mapped[int] = mapped_column(Integer, default=1)
     last_calculated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -0,0 +1,32 @@
+# models/idempotency_key.py
+
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from datetime import datetime
+
+from ..db.base import Base
+
+class IdempotencyKey(Base):
+    """
+    One client Idempotency-Key per user (services/idempotency.py). The row is claimed
+    IN_PROGRESS before the request runs and completed in the same transaction as the
+    request's own writes, storing the response that every retry with the key replays.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(128), primary_key=True)
+
+    # sha256 of the method, path and canonical body: a reused key must carry the same request
+    request_hash: Mapped[str] = mapped_column(String(64))
+    # IN_PROGRESS -> COMPLETED
+    status: Mapped[str] = mapped_column(String(16), default="IN_PROGRESS")
+    # Random per claim: only the request holding the claim can complete or release it
+    claim_token: Mapped[str] = mapped_column(String(32))
+    response_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Serialized response body (JSON), replayed byte for byte
+    response_body: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,29 @@
+# models/insight_campaign_checkpoint.py
+
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, Date, DateTime, String
+from datetime import date, datetime
+
+from ..db.base import Base
+
+class InsightCampaignCheckpoint(Base):
+    """
+    Progress of one user-id stripe of an insight campaign run (tools/insight_campaign.py):
+    the last user id whose cards are in the outbox, committed in the same transaction as
+    the chunk's outbox rows, so a rerun resumes right after it.
+    """
+    __tablename__ = "insight_campaign_checkpoints"
+
+    campaign: Mapped[str] = mapped_column(String(64), primary_key=True)
+    campaign_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    # User-id stripe [stripe_start, stripe_end)
+    stripe_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stripe_end: Mapped[int] = mapped_column(Integer)
+
+    last_user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    users_scanned: Mapped[int] = mapped_column(Integer, default=0)
+    cards_written: Mapped[int] = mapped_column(Integer, default=0)
+    # Set when the stripe has no users left
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,29 @@
+# models/insight_card_set.py
+
+from typing import Any, Dict, List
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, DateTime, ForeignKey, String, JSON
+from datetime import date, datetime
+
+from ..db.base import Base
+
+class InsightCardSet(Base):
+    """
+    The insight cards last generated for a user and reporting period
+    (services/insight_cards.py). Regeneration is skipped while the input fingerprint
+    is unchanged, and the etag only changes when the served content does.
+    """
+    __tablename__ = "insight_card_sets"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    reporting_period: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    # sha256 of the rule-set version, projected reclaimable salary and leakage buckets
+    input_fingerprint: Mapped[str] = mapped_column(String(64))
+    # sha256 of the served content (buckets and cards, without timestamps)
+    etag: Mapped[str] = mapped_column(String(64))
+    cards: Mapped[List[Dict[str, Any]]] = mapped_column(JSON)
+
+    # When the content (etag) last changed
+    generated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,23 @@
+# models/leakage_job_checkpoint.py
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, Date, DateTime
+from datetime import date, datetime
+
+from ..db.base import Base
+
+class LeakageJobCheckpoint(Base):
+    """
+    One row per finished partition of the month-end leakage job (tools/month_end_leakage.py).
+    Written in the same transaction as the partition's bulk UPDATE, so after a crash a
+    rerun skips exactly the partitions that were committed.
+    """
+    __tablename__ = "leakage_job_checkpoints"
+
+    reporting_period: Mapped[date] = mapped_column(Date, primary_key=True)
+    # User-id range [partition_start, partition_end)
+    partition_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    partition_end: Mapped[int] = mapped_column(Integer)
+
+    users_updated: Mapped[int] = mapped_column(Integer, default=0)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,33 @@
+# models/notification_outbox.py
+
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, String, JSON, UniqueConstraint
+from datetime import date, datetime
+
+from ..db.base import Base
+
+class NotificationOutbox(Base):
+    """
+    Push notification cards waiting for the sender, written in bulk by the insight
+    campaign pipeline (services/insight_campaign.py). The unique key makes a campaign
+    run idempotent: a resumed or repeated run cannot queue a user's card twice.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        UniqueConstraint("campaign", "campaign_date", "user_id", "rule_id", name="uq_notification_outbox_campaign_user_rule"),
+        # The sender drains PENDING rows in id order
+        Index("ix_notification_outbox_status_id", "status", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    campaign: Mapped[str] = mapped_column(String(64))
+    campaign_date: Mapped[date] = mapped_column(Date)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    rule_id: Mapped[str] = mapped_column(String(64))
+
+    card: Mapped[Dict[str, Any]] = mapped_column(JSON)
+    # PENDING -> SENT / FAILED (owned by the sender)
+    status: Mapped[str] = mapped_column(String(16), default="PENDING")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,41 @@
+# models/raw_transaction.py
+
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, ForeignKey, String, Text, Index, text
+from datetime import datetime
+
+from ..db.base import Base
+
+class RawTransaction(Base):
+    __tablename__ = "raw_transactions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+
+    # --- Source Data (saved instantly on ingestion) ---
+    raw_text: Mapped[str] = mapped_column(Text)
+    source_type: Mapped[str] = mapped_column(String(20), default="SMS")
+    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Content fingerprint (bank + normalized text + SMS timestamp) used to drop client resends
+    sms_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    # --- Categorization Pipeline State ---
+    is_processed: Mapped[bool] = mapped_column(default=False)
+    categorization_attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Retry schedule (exponential backoff + jitter); NULL once attempts are exhausted,
+    # after which the retry sweeper moves the row to categorization_dead_letters
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, default=datetime.utcnow)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Link to the clean Transaction once categorization succeeds
+    transaction_id: Mapped[Optional[int]] = mapped_column(ForeignKey("transactions.id"), nullable=True)
+
+    __table_args__ = (
+        # Partial index used by the retry sweeper to claim due rows
+        # (SELECT ... WHERE NOT is_processed AND next_attempt_at <= now()
+        #  ORDER BY next_attempt_at, id FOR UPDATE SKIP LOCKED)
+        Index("ix_raw_transactions_unprocessed", "next_attempt_at", "id", postgresql_where=text("NOT is_processed")),
+        # Duplicate SMS suppression (INSERT ... ON CONFLICT DO NOTHING)
+        Index("uq_raw_transactions_user_fingerprint", "user_id", "sms_fingerprint", unique=True),
+    )
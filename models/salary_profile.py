@@ -34,5 +34,14 @@ class SalaryAllocationProfile(Base):
     # Total variable spend (for BEF calculation reference)
     variable_spend_total: Mapped[Decimal] = mapped_column(DECIMAL(10, 2), default=Decimal("0.00")) 
 
+    # Reclaimed salary already moved by consented Autopilot transfers this period
+    total_autotransferred: Mapped[Decimal] = mapped_column(DECIMAL(10, 2), default=Decimal("0.00"))
+
+    # Optimistic concurrency: every write sets version = version + 1, and read-modify-write
+    # writers update only WHERE version = <the version they read> (services/salary_profile_cas.py)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    # ORM flushes of a loaded profile are compare-and-swap too (StaleDataError on a lost race)
+    __mapper_args__ = {"version_id_col": version}
+
     # Relationships
     user: Mapped["User"] = relationship(back_populates="salary_profiles")
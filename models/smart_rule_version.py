@@ -0,0 +1,20 @@
+# models/smart_rule_version.py
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from datetime import datetime
+
+from ..db.base import Base
+
+class SmartRuleVersion(Base):
+    """
+    Per-user counter of Smart Rule edits, bumped in the same transaction as every rule
+    create/update/delete (services/suggestion_plan.bump_rules_version). A materialized
+    suggestion plan records the counter it was computed against and is stale once the
+    counter moves, whatever order a concurrent rebuild and the rule edit commit in.
+    """
+    __tablename__ = "smart_rule_versions"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,10 @@
 # models/smart_transfer.py
 
-from typing import Optional
+from typing import List, Optional
 # CRITICAL FIX: Add 'relationship' to the import list
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, DECIMAL, DateTime, ForeignKey, String
-from datetime import datetime
+from sqlalchemy import Integer, DECIMAL, Date, DateTime, ForeignKey, Index, String
+from datetime import date, datetime
 from decimal import Decimal
 
 from ..db.base import Base
@@ -37,8 +37,15 @@ class SmartTransferRule(Base):
     is_active: Mapped[bool] = mapped_column(default=True)
     last_executed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
+    # Relationships
+    logs: Mapped[List["SmartTransferLog"]] = relationship(back_populates="rule")
+
 class SmartTransferLog(Base):
     __tablename__ = "smart_transfer_logs"
+    __table_args__ = (
+        # The transfer resume sweeper claims PENDING transfers in executed_at order
+        Index("ix_smart_transfer_logs_status_executed_at", "execution_status", "executed_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     rule_id: Mapped[int] = mapped_column(ForeignKey("smart_transfer_rules.id"))
@@ -47,8 +54,18 @@ class SmartTransferLog(Base):
     amount_transferred: Mapped[Decimal] = mapped_column(DECIMAL(10, 2))
     executed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
-    # Status of the actual UPI/Bank transfer
+    # Status of the actual UPI/Bank transfer: PENDING -> COMPLETED / FAILED (TransactionStatus values)
     execution_status: Mapped[str] = mapped_column(String(50)) 
+
+    # --- Gateway execution (services/transfer_executor.py) ---
+    # Period whose SalaryAllocationProfile reserved the amount (released again if FAILED)
+    reporting_period: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    gateway_reference: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    failure_reason: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Set when a worker claims the PENDING transfer for resubmission; others skip it until then
+    resume_lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Relationships 
     rule: Mapped["SmartTransferRule"] = relationship(back_populates="logs") # <--- relationship is now imported
@@ -0,0 +1,28 @@
+# models/spend_projection_curve.py
+
+from typing import List
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, ForeignKey, String, JSON
+from datetime import datetime
+
+from ..db.base import Base
+from ..db.enums import SDSWeightClass, EnumString
+
+class SpendProjectionCurve(Base):
+    """
+    Typical intra-month spend curve per (user, category, sds_class): the average share of
+    a full month's spend reached by each day of the month, from the user's recent full
+    months. Rebuilt by the nightly pass (services/spend_projection.py) and read by the
+    leakage engine to extrapolate month-to-date spend to month end.
+    """
+    __tablename__ = "spend_projection_curves"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    category: Mapped[str] = mapped_column(String(100), primary_key=True)
+    sds_class: Mapped[SDSWeightClass] = mapped_column(EnumString(SDSWeightClass), primary_key=True)
+
+    # 31 values: cumulative share of the month's spend by day 1..31 (last value 1.0)
+    cumulative_share: Mapped[List[float]] = mapped_column(JSON)
+    # Full months with spend behind the curve (weights it against the plain run rate)
+    history_months: Mapped[int] = mapped_column(Integer, default=0)
+    computed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
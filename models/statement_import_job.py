@@ -0,0 +1,33 @@
+# models/statement_import_job.py
+
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, BigInteger, DateTime, ForeignKey, String, Text
+from datetime import datetime
+
+from ..db.base import Base
+from ..db.enums import ImportJobStatus, EnumString
+
+class StatementImportJob(Base):
+    __tablename__ = "statement_import_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+
+    # --- Upload Metadata ---
+    statement_format: Mapped[str] = mapped_column(String(10)) # 'CSV' or 'OFX'
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    # --- Progress (updated after every committed chunk) ---
+    status: Mapped[ImportJobStatus] = mapped_column(EnumString(ImportJobStatus), default=ImportJobStatus.PENDING)
+    bytes_read: Mapped[int] = mapped_column(BigInteger, default=0)
+    rows_read: Mapped[int] = mapped_column(Integer, default=0)
+    rows_imported: Mapped[int] = mapped_column(Integer, default=0)
+    rows_skipped: Mapped[int] = mapped_column(Integer, default=0) # Credits / non-spend rows / already imported
+    rows_failed: Mapped[int] = mapped_column(Integer, default=0)  # Unparseable rows
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # --- Timestamps ---
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,40 @@
+# models/suggestion_plan.py
+
+from typing import Any, List
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DECIMAL, Date, DateTime, ForeignKey, Integer, JSON
+from datetime import date, datetime
+from decimal import Decimal
+
+from ..db.base import Base
+
+class SuggestionPlan(Base):
+    """
+    The consent suggestion plan of a user and reporting period, materialized when its
+    inputs change (services/suggestion_plan.py) so GET /autopilot/suggestion-plan is a
+    primary-key read. The row is current while the SalaryAllocationProfile still has
+    profile_version, the user's SmartRuleVersion is still rules_version and valid_on
+    is today.
+    """
+    __tablename__ = "suggestion_plans"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    reporting_period: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    # --- Inputs the plan was computed from ---
+    salary_profile_id: Mapped[int] = mapped_column(ForeignKey("salary_allocation_profiles.id"))
+    profile_version: Mapped[int] = mapped_column(Integer)
+    # SmartRuleVersion.version (0 before the first rule edit), read before the rules
+    rules_version: Mapped[int] = mapped_column(BigInteger)
+    projected_reclaimable: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
+    # The projection moves with the day of the month
+    valid_on: Mapped[date] = mapped_column(Date)
+
+    # --- The plan ---
+    available_fund: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
+    remaining_unallocated: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
+    total_suggested: Mapped[Decimal] = mapped_column(DECIMAL(12, 2))
+    # Compact items: [[rule_id, destination, "amount", kind], ...], kind "T" (TAX_SAVING) / "G" (GOAL_STASH)
+    items: Mapped[List[List[Any]]] = mapped_column(JSON)
+
+    computed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
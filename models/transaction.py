@@ -3,7 +3,7 @@
 from typing import Optional
 # CRITICAL FIX: Add 'relationship'
 from sqlalchemy.orm import Mapped, mapped_column, relationship 
-from sqlalchemy import Integer, DECIMAL, DateTime, ForeignKey, String, Text
+from sqlalchemy import Integer, DECIMAL, DateTime, ForeignKey, String, Text, Index
 from datetime import datetime
 from decimal import Decimal
 
@@ -25,6 +25,8 @@ class Transaction(Base):
     transaction_date: Mapped[datetime] = mapped_column(DateTime)
     # The raw message/description from SMS or UPI
     description: Mapped[str] = mapped_column(Text)
+    # Content fingerprint of the source SMS or statement row (NULL for bulk-loaded rows without one); see services/dedup.py
+    sms_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     
     # --- Fin-Traq V2 Categorization (ML Outputs) ---
     
@@ -43,3 +45,13 @@ class Transaction(Base):
     
     # RECOMMENDED ADDITION: Define the relationship for ORM query efficiency
     # user: Mapped["User"] = relationship(back_populates="transactions")
+
+    __table_args__ = (
+        # Duplicate SMS suppression: a resent SMS conflicts instead of inflating leakage totals
+        Index("uq_transactions_user_fingerprint", "user_id", "sms_fingerprint", unique=True),
+        # Per-user period scans (LeakageService): index-only range scans for the aggregates
+        Index(
+            "ix_transactions_user_date", "user_id", "transaction_date",
+            postgresql_include=["sds_class", "category", "amount", "status"],
+        ),
+    )
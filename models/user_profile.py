@@ -10,9 +10,6 @@ from datetime import datetime
 from ..db.base import Base
 from ..db.enums import CityTier, EnumString # Import the Enum helper
 
-# CRITICAL FIX: Import related models for relationship type hinting
-from .financial_profile import FinancialProfile # <--- FIX
-from .salary_profile import SalaryAllocationProfile # <--- FIX (Assuming a salary_profile.py exists)
 
 class User(Base):
     __tablename__ = "users"
@@ -33,7 +30,11 @@ class User(Base):
     city_tier: Mapped[CityTier] = mapped_column(EnumString(CityTier), default=CityTier.TIER_2)
     
     # Relationships
-    # Note: We still use string literals in Mapped[] type hints, but the actual class
-    # must be imported above for the relationship() call to work correctly.
+    # Note: We still use string literals in Mapped[] type hints, but the actual classes
+    # must be imported (below, after User exists: they import it) for relationship() to resolve.
     financial_profile: Mapped["FinancialProfile"] = relationship(back_populates="user", uselist=False)
     salary_profiles: Mapped[List["SalaryAllocationProfile"]] = relationship(back_populates="user")
+
+
+# Related models for the relationships above (imported last: both modules import User)
+from . import financial_profile, salary_profile # noqa: E402
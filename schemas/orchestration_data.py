@@ -2,7 +2,8 @@
 
 from pydantic import BaseModel, Field, condecimal
 from decimal import Decimal
-from typing import List, Dict, Any
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
 
 # Define precision for all financial fields (up to 12 digits total, 2 decimal places)
 FinancialDecimal = condecimal(max_digits=12, decimal_places=2)
@@ -36,6 +37,13 @@ class RecalculationResponse(BaseModel):
     category_leaks: List[LeakageBucket] = Field(..., description="Category-wise leak breakdown for the Leak Bucket View.")
 
 
+class InsightCardsResponse(BaseModel):
+    """The persisted insight cards of a period (served with an ETag; 304 on If-None-Match)."""
+    reporting_period: date
+    generated_at: datetime = Field(..., description="When the card content last changed.")
+    cards: List[Dict[str, Any]] = Field(..., description="Insight cards as generated by the rule engine.")
+
+
 # ----------------------------------------------------------------------
 # V2 Guided Orchestration: Suggestion & Consent
 # ----------------------------------------------------------------------
@@ -62,3 +70,19 @@ class ExecutionResponse(BaseModel):
     message: str
     total_transferred: FinancialDecimal
     transfers_executed: List[TransferSuggestion]
+    transfer_ids: List[int] = Field(default_factory=list, description="SmartTransferLog IDs (poll GET /autopilot/transfers for their status).")
+
+
+class TransferStatusOut(BaseModel):
+    """Execution state of one consented transfer (PENDING -> COMPLETED / FAILED)."""
+    id: int
+    rule_id: int
+    amount_transferred: FinancialDecimal
+    execution_status: str
+    gateway_reference: Optional[str] = None
+    failure_reason: Optional[str] = None
+    executed_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
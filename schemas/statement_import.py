@@ -0,0 +1,22 @@
+# finance-app-backend/schemas/statement_import.py
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class StatementImportJobOut(BaseModel):
+    """Progress and outcome of a streaming bank-statement import."""
+    job_id: int
+    status: str = Field(..., description="PENDING, RUNNING, COMPLETED or FAILED.")
+    statement_format: str = Field(..., description="'CSV' or 'OFX'.")
+    filename: Optional[str] = None
+    bytes_read: int = Field(0, description="Bytes of the upload consumed so far.")
+    rows_read: int = Field(0, description="Statement rows parsed so far.")
+    rows_imported: int = Field(0, description="Rows written as transactions.")
+    rows_skipped: int = Field(0, description="Credit rows (not spend) and rows already imported by an earlier upload.")
+    rows_failed: int = Field(0, description="Rows that could not be parsed.")
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,215 @@
+# services/cache_backends.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Shared cache tier (optional): when set, every gunicorn worker reads/writes the
+# same Redis so a value computed by one worker is reused by all of them.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("CACHE_REDIS_TIMEOUT_SECONDS", "0.05"))
+# Pause before re-subscribing to the invalidation channel after a Redis error
+CACHE_REDIS_RESUBSCRIBE_SECONDS = float(os.getenv("CACHE_REDIS_RESUBSCRIBE_SECONDS", "1.0"))
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """
+    Bounded, thread-safe in-process cache with per-entry TTL and LRU eviction.
+    Used as the per-worker tier of the categorization and leakage caches.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # --- Counters ---
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        expires_at = time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is _MISSING:
+                return False
+            self.invalidations += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class RedisCacheTier:
+    """
+    Optional shared cache tier backed by Redis (string values, TTL enforced by Redis).
+
+    The 'redis' package is an optional dependency: it is only imported when a
+    CACHE_REDIS_URL is configured. The client is redis.asyncio, so a slow Redis never
+    blocks the event loop. Every operation is best-effort: a Redis error counts as a
+    miss and never fails the request.
+
+    Invalidations reach the other workers' local tiers over pub/sub: delete() publishes
+    the key on the namespace's channel, and subscribe() (started from the app lifespan)
+    runs the callback for every key published by any worker. Messages published while a
+    subscriber is disconnected are lost, so it reports a resubscribe as key None (the
+    caller drops its whole local tier).
+    """
+
+    def __init__(self, url: str, namespace: str, timeout_seconds: float = CACHE_REDIS_TIMEOUT_SECONDS):
+        import redis.asyncio as redis  # Optional dependency, see docstring
+
+        self.namespace = namespace
+        self.channel = f"fintraq:{namespace}:invalidations"
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout_seconds, socket_connect_timeout=timeout_seconds)
+        # Subscriber connection: blocks on the channel, so no read timeout
+        self._subscriber_client = redis.Redis.from_url(url, socket_connect_timeout=timeout_seconds)
+        self._subscriber: Optional[asyncio.Task] = None
+
+        # --- Counters ---
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations_published = 0
+        self.invalidations_received = 0
+        self.resubscribes = 0
+
+    def _key(self, key: str) -> str:
+        return f"fintraq:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self._client.get(self._key(key))
+        except Exception:
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode("utf-8")
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        try:
+            await self._client.set(self._key(key), value, ex=max(1, int(ttl_seconds)))
+        except Exception:
+            self.errors += 1
+
+    async def delete(self, key: str):
+        """Deletes the shared entry and tells every worker to drop its local copy."""
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.delete(self._key(key))
+                pipe.publish(self.channel, key)
+                await pipe.execute()
+            self.invalidations_published += 1
+        except Exception:
+            self.errors += 1
+
+    # ----------------------------------------------------------------------
+    # INVALIDATION SUBSCRIBER (one per worker, started from the app lifespan)
+    # ----------------------------------------------------------------------
+    async def subscribe(self, on_invalidate: Callable[[Optional[str]], None]):
+        if self._subscriber is None:
+            self._subscriber = asyncio.create_task(self._listen(on_invalidate), name=f"cache-invalidations-{self.namespace}")
+
+    async def unsubscribe(self):
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+            self._subscriber = None
+
+    async def _listen(self, on_invalidate: Callable[[Optional[str]], None]):
+        subscribed_before = False
+        while True:
+            try:
+                async with self._subscriber_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    if subscribed_before:
+                        # Invalidations may have been missed while disconnected
+                        self.resubscribes += 1
+                        on_invalidate(None)
+                    subscribed_before = True
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        self.invalidations_received += 1
+                        on_invalidate(message["data"].decode("utf-8"))
+            except asyncio.CancelledError:
+                return
+            except Exception:
+                self.errors += 1
+                subscribed_before = True
+            await asyncio.sleep(CACHE_REDIS_RESUBSCRIBE_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations_published": self.invalidations_published,
+            "invalidations_received": self.invalidations_received,
+            "resubscribes": self.resubscribes,
+        }
+
+
+def build_shared_tier(namespace: str) -> Optional[RedisCacheTier]:
+    """Returns the shared Redis tier when CACHE_REDIS_URL is configured, otherwise None."""
+    if not CACHE_REDIS_URL:
+        return None
+    try:
+        return RedisCacheTier(CACHE_REDIS_URL, namespace)
+    except ImportError:
+        print("Warning: CACHE_REDIS_URL is set but the 'redis' package is not installed; using in-process cache only.")
+        return None
@@ -0,0 +1,142 @@
+# services/categorization_cache.py
+
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from ..db.enums import SDSWeightClass
+from .cache_backends import TTLLRUCache, build_shared_tier
+
+# --- CACHE CONFIGURATION (Environment) ---
+MERCHANT_CACHE_MAX_ENTRIES = int(os.getenv("MERCHANT_CACHE_MAX_ENTRIES", "50000"))
+MERCHANT_CACHE_TTL_SECONDS = float(os.getenv("MERCHANT_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+
+# Category name prefixes -> SDS weight class (categories follow '<SDS class>_<Name>')
+SDS_CLASS_BY_PREFIX = [
+    ("Fixed_Essential", SDSWeightClass.FIXED_ESSENTIAL),
+    ("Variable_Essential", SDSWeightClass.VARIABLE_ESSENTIAL),
+    ("Pure_Discretionary", SDSWeightClass.PURE_DISCRETIONARY),
+    ("Discretionary", SDSWeightClass.PURE_DISCRETIONARY),
+    ("Tax_Optimization", SDSWeightClass.TAX_OPTIMIZATION),
+]
+
+_VPA_PATTERN = re.compile(r"([a-z0-9.\-_]+)@[a-z]+", re.IGNORECASE)
+_NON_ALPHA = re.compile(r"[^A-Z]+")
+
+
+def infer_sds_class(category: str) -> Optional[SDSWeightClass]:
+    """Derives the SDS weight class from the category name (None for income/unknown)."""
+    for prefix, sds_class in SDS_CLASS_BY_PREFIX:
+        if category.startswith(prefix):
+            return sds_class
+    return None
+
+
+def normalize_merchant_key(merchant: Optional[str]) -> Optional[str]:
+    """
+    Normalizes a merchant name or UPI VPA into a cache key, so that e.g.
+    'swiggy8@icici', 'SWIGGY' and 'Swiggy ' share one entry.
+    """
+    if not merchant:
+        return None
+    local_part = merchant.split("@", 1)[0]
+    key = _NON_ALPHA.sub("", local_part.upper())
+    return key or None
+
+
+def merchant_key_from_text(transaction_text: str) -> Optional[str]:
+    """Cache key for a raw message no template parsed: the first UPI VPA in the text."""
+    match = _VPA_PATTERN.search(transaction_text)
+    return normalize_merchant_key(match.group(1)) if match else None
+
+
+class MerchantCategoryCache:
+    """
+    Memoizes merchant -> (category, SDSWeightClass) in front of the ML categorizer.
+
+    Two tiers: a bounded LRU+TTL cache per process, and an optional shared Redis tier
+    (CACHE_REDIS_URL) so every gunicorn worker benefits from a categorization done
+    by any of them. Entries are invalidated when a user manually overrides a category,
+    in every worker: the invalidation is broadcast over the shared tier's pub/sub
+    channel, which start() subscribes to.
+    """
+
+    def __init__(self, max_entries: int = MERCHANT_CACHE_MAX_ENTRIES, ttl_seconds: float = MERCHANT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLLRUCache(max_entries, ttl_seconds)
+        self.shared = build_shared_tier("merchant_category")
+
+    @staticmethod
+    def _encode(category: str, sds_class: Optional[SDSWeightClass]) -> str:
+        return f"{category}|{sds_class.value if sds_class else ''}"
+
+    @staticmethod
+    def _decode(value: str) -> Tuple[str, Optional[SDSWeightClass]]:
+        category, _, sds_value = value.partition("|")
+        return category, SDSWeightClass(sds_value) if sds_value else None
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        """Subscribes to the invalidations published by the other workers."""
+        if self.shared is not None:
+            await self.shared.subscribe(self._on_remote_invalidation)
+
+    async def stop(self):
+        if self.shared is not None:
+            await self.shared.unsubscribe()
+
+    def _on_remote_invalidation(self, merchant_key: Optional[str]):
+        # None: the subscription was interrupted and messages may be lost
+        if merchant_key is None:
+            self.local.clear()
+        else:
+            self.local.delete(merchant_key)
+
+    # ----------------------------------------------------------------------
+    # CACHE API
+    # ----------------------------------------------------------------------
+    async def get(self, merchant_key: Optional[str]) -> Optional[Tuple[str, Optional[SDSWeightClass]]]:
+        if merchant_key is None:
+            return None
+
+        cached = self.local.get(merchant_key)
+        if cached is not None:
+            return cached
+
+        if self.shared is not None:
+            shared_value = await self.shared.get(merchant_key)
+            if shared_value is not None:
+                cached = self._decode(shared_value)
+                # Promote into the local tier for the next lookup
+                self.local.set(merchant_key, cached)
+                return cached
+        return None
+
+    async def put(self, merchant_key: Optional[str], category: str, sds_class: Optional[SDSWeightClass] = None):
+        if merchant_key is None or not category:
+            return
+        if sds_class is None:
+            sds_class = infer_sds_class(category)
+        self.local.set(merchant_key, (category, sds_class))
+        if self.shared is not None:
+            await self.shared.set(merchant_key, self._encode(category, sds_class), self.ttl_seconds)
+
+    async def invalidate(self, merchant_key: Optional[str]):
+        """Drops a merchant from both tiers and from every worker's local tier (e.g. after a manual category override)."""
+        if merchant_key is None:
+            return
+        self.local.delete(merchant_key)
+        if self.shared is not None:
+            await self.shared.delete(merchant_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+# Process-wide cache used by TransactionService and the categorization workers
+merchant_category_cache = MerchantCategoryCache()
@@ -0,0 +1,144 @@
+# services/categorization_retry.py
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..models.raw_transaction import RawTransaction
+
+# --- RETRY POLICY CONFIGURATION (Environment) ---
+CATEGORIZATION_MAX_ATTEMPTS = int(os.getenv("CATEGORIZATION_MAX_ATTEMPTS", "5"))
+CATEGORIZATION_RETRY_BASE_SECONDS = float(os.getenv("CATEGORIZATION_RETRY_BASE_SECONDS", "30"))
+CATEGORIZATION_RETRY_MAX_SECONDS = float(os.getenv("CATEGORIZATION_RETRY_MAX_SECONDS", str(6 * 60 * 60)))
+
+# Keeps tracebacks/HTTP bodies from bloating the raw_transactions rows
+MAX_ERROR_LENGTH = 2000
+
+
+def retry_delay_seconds(attempts: int, rng: random.Random = random) -> float:
+    """
+    Exponential backoff with 'equal jitter': half of the capped exponential delay is
+    fixed and half is random, so retries of a failed batch spread out instead of
+    hitting the categorizer again in lockstep.
+    """
+    ceiling = min(CATEGORIZATION_RETRY_MAX_SECONDS, CATEGORIZATION_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+def schedule_retry(raw_tx: RawTransaction, error: Union[Exception, str], now: Optional[datetime] = None) -> bool:
+    """
+    Records a failed attempt on a claimed row (categorization_attempts already counts it).
+    Returns True when the row is exhausted: next_attempt_at is cleared so it is no longer
+    claimed, and the retry sweeper moves it to the dead-letter table.
+    """
+    raw_tx.last_error = str(error)[:MAX_ERROR_LENGTH]
+    if raw_tx.categorization_attempts >= CATEGORIZATION_MAX_ATTEMPTS:
+        raw_tx.next_attempt_at = None
+        return True
+
+    now = now or datetime.utcnow()
+    raw_tx.next_attempt_at = now + timedelta(seconds=retry_delay_seconds(raw_tx.categorization_attempts))
+    return False
+
+
+# ----------------------------------------------------------------------
+# DEAD LETTER (set-based moves, one bounded batch per statement)
+# ----------------------------------------------------------------------
+DEAD_LETTER_BATCH_SQL = text("""
+    WITH exhausted AS (
+        DELETE FROM raw_transactions
+        WHERE id IN (
+            SELECT id FROM raw_transactions
+            WHERE NOT is_processed
+              AND next_attempt_at IS NULL
+              AND categorization_attempts >= :max_attempts
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, user_id, raw_text, source_type, timestamp, sms_fingerprint,
+                  categorization_attempts, last_error
+    )
+    INSERT INTO categorization_dead_letters (
+        raw_transaction_id, user_id, raw_text, source_type, timestamp, sms_fingerprint,
+        categorization_attempts, last_error, dead_lettered_at
+    )
+    SELECT id, user_id, raw_text, source_type, timestamp, sms_fingerprint,
+           categorization_attempts, last_error, now() AT TIME ZONE 'utc'
+    FROM exhausted
+    RETURNING id
+""")
+
+# Re-drive: move dead letters back under their original IDs with a fresh attempt budget.
+# ON CONFLICT covers a resend of the same SMS that was ingested while dead-lettered.
+REDRIVE_BATCH_SQL = text("""
+    WITH redriven AS (
+        DELETE FROM categorization_dead_letters
+        WHERE id IN (
+            SELECT id FROM categorization_dead_letters
+            WHERE (:all_ids OR id = ANY(:ids))
+              AND (CAST(:user_id AS INTEGER) IS NULL OR user_id = :user_id)
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING raw_transaction_id, user_id, raw_text, source_type, timestamp, sms_fingerprint
+    ),
+    requeued AS (
+        INSERT INTO raw_transactions (
+            id, user_id, raw_text, source_type, timestamp, sms_fingerprint,
+            is_processed, categorization_attempts, next_attempt_at, last_error
+        )
+        SELECT raw_transaction_id, user_id, raw_text, source_type, timestamp, sms_fingerprint,
+               FALSE, 0, now() AT TIME ZONE 'utc', NULL
+        FROM redriven
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    )
+    SELECT (SELECT count(*) FROM redriven) AS moved, (SELECT count(*) FROM requeued) AS requeued
+""").bindparams(bindparam("ids", type_=ARRAY(Integer)))
+
+
+async def move_exhausted_to_dead_letter(session_factory, batch_size: int) -> int:
+    """Moves one batch of exhausted raw rows to the dead-letter table. Returns rows moved."""
+    async with session_factory() as session:
+        result = await session.execute(
+            DEAD_LETTER_BATCH_SQL,
+            {"max_attempts": CATEGORIZATION_MAX_ATTEMPTS, "batch_size": batch_size}
+        )
+        moved = len(result.all())
+        await session.commit()
+    return moved
+
+
+async def redrive_dead_letters(
+    session_factory,
+    ids: Optional[List[int]] = None,
+    user_id: Optional[int] = None,
+    max_rows: int = 10000,
+    batch_size: int = 500,
+) -> Dict[str, int]:
+    """
+    Re-drives dead letters in bounded batches (one short transaction each), either the
+    given IDs, a user's, or all of them up to max_rows. Re-queued rows are picked up by
+    the retry sweeper on its next tick; 'skipped' counts dead letters whose SMS was
+    already re-ingested by a resend (dropped instead of duplicated).
+    """
+    moved = requeued = 0
+    while moved < max_rows:
+        limit = min(batch_size, max_rows - moved)
+        async with session_factory() as session:
+            counts = (await session.execute(
+                REDRIVE_BATCH_SQL,
+                {"all_ids": ids is None, "ids": ids or [], "user_id": user_id, "batch_size": limit}
+            )).one()
+            await session.commit()
+        moved += counts.moved
+        requeued += counts.requeued
+        if counts.moved < limit:
+            break
+    return {"requeued": requeued, "skipped": moved - requeued}
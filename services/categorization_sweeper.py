@@ -0,0 +1,144 @@
+# services/categorization_sweeper.py
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from ..api.database_setup import AsyncSessionLocal
+from .categorization_worker import categorization_pool, CategorizationWorkerPool
+from .categorization_retry import move_exhausted_to_dead_letter, CATEGORIZATION_MAX_ATTEMPTS
+
+# --- SWEEPER CONFIGURATION (Environment) ---
+# Upper bound on the drain rate per gunicorn worker:
+#   RETRY_SWEEP_BATCH_SIZE * RETRY_SWEEP_MAX_BATCHES_PER_TICK rows every RETRY_SWEEP_INTERVAL_SECONDS.
+# The sweeper holds at most ONE pooled connection at a time, so API requests keep the rest.
+RETRY_SWEEP_INTERVAL_SECONDS = float(os.getenv("RETRY_SWEEP_INTERVAL_SECONDS", "10"))
+RETRY_SWEEP_BATCH_SIZE = int(os.getenv("RETRY_SWEEP_BATCH_SIZE", "200"))
+RETRY_SWEEP_MAX_BATCHES_PER_TICK = int(os.getenv("RETRY_SWEEP_MAX_BATCHES_PER_TICK", "10"))
+# Pause between batches inside a tick (lets queued API requests grab the connection)
+RETRY_SWEEP_BATCH_PAUSE_SECONDS = float(os.getenv("RETRY_SWEEP_BATCH_PAUSE_SECONDS", "0.05"))
+
+
+class CategorizationRetrySweeper:
+    """
+    Periodic sweeper for the categorization pipeline.
+
+    Each tick it (1) claims due unprocessed RawTransaction rows in indexed batches
+    (next_attempt_at <= now, FOR UPDATE SKIP LOCKED) and runs them through the worker
+    pool's categorization path, which reschedules failures with exponential backoff
+    and jitter, and (2) moves rows that exhausted CATEGORIZATION_MAX_ATTEMPTS to the
+    dead-letter table. Work per tick is capped, so a backlog of millions of rows
+    drains at a predictable rate.
+    """
+
+    def __init__(
+        self,
+        pool: CategorizationWorkerPool = categorization_pool,
+        session_factory=AsyncSessionLocal,
+        interval_seconds: float = RETRY_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = RETRY_SWEEP_BATCH_SIZE,
+        max_batches_per_tick: int = RETRY_SWEEP_MAX_BATCHES_PER_TICK,
+    ):
+        self.pool = pool
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_batches_per_tick = max_batches_per_tick
+
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # --- Metrics ---
+        self._ticks = 0
+        self._claimed = 0
+        self._recovered = 0
+        self._dead_lettered = 0
+        self._last_tick_seconds = 0.0
+        self._backlog_capped_ticks = 0
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._run(), name="categorization-retry-sweeper")
+
+    async def stop(self):
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                print(f"Categorization retry sweeper error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    # ----------------------------------------------------------------------
+    # SWEEP
+    # ----------------------------------------------------------------------
+    async def sweep_once(self) -> Dict[str, int]:
+        """Runs one capped tick. Returns the rows claimed, recovered and dead-lettered."""
+        started_at = time.monotonic()
+        claimed_total = recovered_total = dead_lettered_total = 0
+        capped = True
+
+        # 1. Retry due rows, one bounded batch (= one claim query + one commit) at a time
+        for batch_no in range(self.max_batches_per_tick):
+            if batch_no:
+                await asyncio.sleep(RETRY_SWEEP_BATCH_PAUSE_SECONDS)
+            claimed, recovered = await self.pool.process_pending(limit=self.batch_size)
+            claimed_total += claimed
+            recovered_total += recovered
+            if claimed < self.batch_size:
+                capped = False
+                break
+
+        # 2. Quarantine poison messages, same batching
+        for _ in range(self.max_batches_per_tick):
+            moved = await move_exhausted_to_dead_letter(self.session_factory, self.batch_size)
+            dead_lettered_total += moved
+            if moved < self.batch_size:
+                break
+
+        self._ticks += 1
+        self._claimed += claimed_total
+        self._recovered += recovered_total
+        self._dead_lettered += dead_lettered_total
+        self._backlog_capped_ticks += int(capped)
+        self._last_tick_seconds = time.monotonic() - started_at
+
+        return {"claimed": claimed_total, "recovered": recovered_total, "dead_lettered": dead_lettered_total}
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "interval_seconds": self.interval_seconds,
+            "batch_size": self.batch_size,
+            "max_batches_per_tick": self.max_batches_per_tick,
+            "max_rows_per_minute": int(self.batch_size * self.max_batches_per_tick * 60 / self.interval_seconds),
+            "max_attempts": CATEGORIZATION_MAX_ATTEMPTS,
+            "ticks_total": self._ticks,
+            "claimed_total": self._claimed,
+            "recovered_total": self._recovered,
+            "dead_lettered_total": self._dead_lettered,
+            # Ticks that hit the per-tick cap, i.e. a backlog is draining at the capped rate
+            "backlog_capped_ticks_total": self._backlog_capped_ticks,
+            "last_tick_seconds": round(self._last_tick_seconds, 4),
+        }
+
+
+# Process-wide sweeper (one per gunicorn worker), started/stopped by the app lifespan
+categorization_sweeper = CategorizationRetrySweeper()
@@ -0,0 +1,256 @@
+# services/categorization_worker.py
+
+import asyncio
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from ..api.database_setup import AsyncSessionLocal
+from ..models.raw_transaction import RawTransaction
+from ..models.transaction import Transaction
+from .dedup import duplicate_suppressor
+from .categorization_retry import schedule_retry
+from .ingestion_service import IngestionService
+from .orchestration_service import OrchestrationService
+
+# --- WORKER POOL CONFIGURATION (Environment) ---
+CATEGORIZATION_WORKERS = int(os.getenv("CATEGORIZATION_WORKERS", "4"))
+CATEGORIZATION_QUEUE_SIZE = int(os.getenv("CATEGORIZATION_QUEUE_SIZE", "1000"))
+# Default max rows claimed per batch when sweeping for due rows
+CATEGORIZATION_CLAIM_BATCH_SIZE = int(os.getenv("CATEGORIZATION_CLAIM_BATCH_SIZE", "50"))
+
+
+class CategorizationWorkerPool:
+    """
+    In-process async worker pool for the categorization pipeline.
+
+    IngestionService.ingest_raw_data() feeds raw transaction IDs into a bounded
+    asyncio queue; N consumer tasks claim the rows with FOR UPDATE SKIP LOCKED
+    (so several gunicorn workers can share the table safely), categorize them,
+    and then run the leakage recalculation off the request path.
+
+    Rows rejected by backpressure, left over from a restart, or scheduled for a
+    retry are claimed in due-order batches by the CategorizationRetrySweeper.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, workers: int = CATEGORIZATION_WORKERS, queue_size: int = CATEGORIZATION_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+        # --- Metrics ---
+        self._enqueued = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._lag_total = 0.0
+        self._lag_samples = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        """Creates the queue on the running loop and spawns the consumer tasks."""
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._consume(worker_no), name=f"categorization-worker-{worker_no}")
+            for worker_no in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Stops the consumers. Queued IDs are dropped; their rows remain unprocessed (and due) in the DB."""
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ----------------------------------------------------------------------
+    # PRODUCER SIDE
+    # ----------------------------------------------------------------------
+    def submit(self, raw_transaction_id: int) -> bool:
+        """
+        Non-blocking enqueue of a freshly ingested raw transaction.
+        Safe to call from the event loop or from a threadpool worker.
+
+        Returns False when the pool is not running or the queue is full (backpressure);
+        the row is still durable and will be claimed by the retry sweeper.
+        """
+        if not self._running or self._queue is None:
+            return False
+        if self._queue.full():
+            self._rejected += 1
+            return False
+
+        item = (raw_transaction_id, time.monotonic())
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._offer(item)
+        else:
+            self._loop.call_soon_threadsafe(self._offer, item)
+        return True
+
+    def _offer(self, item: Tuple[int, float]):
+        try:
+            self._queue.put_nowait(item)
+            self._enqueued += 1
+        except asyncio.QueueFull:
+            self._rejected += 1
+
+    # ----------------------------------------------------------------------
+    # CONSUMER SIDE
+    # ----------------------------------------------------------------------
+    async def _consume(self, worker_no: int):
+        while self._running:
+            try:
+                raw_transaction_id, enqueued_at = await self._queue.get()
+            except asyncio.CancelledError:
+                return
+
+            self._record_lag(time.monotonic() - enqueued_at)
+
+            try:
+                await self.process_pending(raw_transaction_id)
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                print(f"Categorization worker {worker_no} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def process_pending(self, raw_transaction_id: Optional[int] = None, limit: int = CATEGORIZATION_CLAIM_BATCH_SIZE) -> Tuple[int, int]:
+        """
+        Claims unprocessed raw rows (a specific one, or the next batch of due rows when
+        sweeping), categorizes them in one DB transaction and then triggers orchestration.
+        Failed rows are rescheduled with backoff (see categorization_retry).
+        Returns (rows claimed, rows successfully categorized).
+        """
+        periods_to_recalculate: Set[Tuple[int, date]] = set()
+        processed = 0
+
+        async with self.session_factory() as session:
+            # 1. Claim rows; rows locked by another worker/process are skipped
+            stmt = select(RawTransaction).where(RawTransaction.is_processed == False)
+            if raw_transaction_id is not None:
+                stmt = stmt.where(RawTransaction.id == raw_transaction_id)
+            else:
+                # Due rows only, oldest schedule first (served by ix_raw_transactions_unprocessed)
+                stmt = stmt.where(RawTransaction.next_attempt_at <= datetime.utcnow()).order_by(
+                    RawTransaction.next_attempt_at, RawTransaction.id
+                ).limit(limit)
+            stmt = stmt.with_for_update(skip_locked=True)
+
+            claimed: List[RawTransaction] = (await session.execute(stmt)).scalars().all()
+            if not claimed:
+                return 0, 0
+
+            self._in_flight += len(claimed)
+            try:
+                # 2. Categorize each claimed row inside its own savepoint
+                for raw_tx in claimed:
+                    raw_tx.categorization_attempts += 1
+                    try:
+                        async with session.begin_nested():
+                            categorized_data = await IngestionService.categorize_raw_text(raw_tx.raw_text)
+                            new_transaction = IngestionService.build_transaction(raw_tx.user_id, raw_tx, categorized_data)
+                            session.add(new_transaction)
+                            await session.flush() # Get the new_transaction ID
+
+                            raw_tx.is_processed = True
+                            raw_tx.transaction_id = new_transaction.id
+                    except IntegrityError:
+                        # The same SMS was already ingested through /transactions/ingest-raw:
+                        # link to that transaction instead of retrying forever
+                        existing_id = (await session.execute(
+                            select(Transaction.id).where(
+                                Transaction.user_id == raw_tx.user_id,
+                                Transaction.sms_fingerprint == raw_tx.sms_fingerprint
+                            )
+                        )).scalar_one_or_none()
+                        if existing_id is None:
+                            self._failed += 1
+                            schedule_retry(raw_tx, "Transaction insert conflicted but no matching transaction was found.")
+                            continue
+                        raw_tx.is_processed = True
+                        raw_tx.transaction_id = existing_id
+                        duplicate_suppressor.record_conflict()
+                        continue
+                    except Exception as e:
+                        self._failed += 1
+                        schedule_retry(raw_tx, e)
+                        print(f"Error processing transaction {raw_tx.id} (attempt {raw_tx.categorization_attempts}): {e}")
+                        continue
+
+                    processed += 1
+                    periods_to_recalculate.add(
+                        (raw_tx.user_id, new_transaction.transaction_date.replace(day=1))
+                    )
+
+                # 3. Release the row locks
+                await session.commit()
+            finally:
+                self._in_flight -= len(claimed)
+
+            self._processed += processed
+
+            # 4. Trigger the Autopilot Orchestration on the new, clean data (off the request path)
+            for user_id, reporting_period in periods_to_recalculate:
+                try:
+                    orch_service = OrchestrationService(session, user_id)
+                    await orch_service.recalculate_current_period_leakage(reporting_period)
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    print(f"Leakage recalculation failed for user {user_id}: {e}")
+
+        return len(claimed), processed
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def _record_lag(self, lag_seconds: float):
+        self._last_lag = lag_seconds
+        self._max_lag = max(self._max_lag, lag_seconds)
+        self._lag_total += lag_seconds
+        self._lag_samples += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, lag and throughput counters for this process."""
+        return {
+            "running": self._running,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "in_flight": self._in_flight,
+            "enqueued_total": self._enqueued,
+            "rejected_backpressure_total": self._rejected,
+            "processed_total": self._processed,
+            "failed_total": self._failed,
+            "lag_seconds_last": round(self._last_lag, 4),
+            "lag_seconds_max": round(self._max_lag, 4),
+            "lag_seconds_avg": round(self._lag_total / self._lag_samples, 4) if self._lag_samples else 0.0,
+        }
+
+
+# Process-wide pool (one per gunicorn worker), started/stopped by the app lifespan
+categorization_pool = CategorizationWorkerPool()
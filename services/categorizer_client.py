@@ -0,0 +1,219 @@
+# services/categorizer_client.py
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sms_parsers import DEBIT
+
+# --- CATEGORIZER SERVICE CONFIGURATION (Environment) ---
+# Base URL of the 'transaction-categorizer' service (see cloudbuild.yml). When unset,
+# every call is answered by the mock categorizer.
+CATEGORIZER_URL = os.getenv("CATEGORIZER_URL")
+CATEGORIZER_BATCH_PATH = "/categorize/batch"
+# A batch is flushed when it reaches N messages or when its oldest message has waited T ms
+CATEGORIZER_BATCH_MAX_SIZE = int(os.getenv("CATEGORIZER_BATCH_MAX_SIZE", "64"))
+CATEGORIZER_BATCH_MAX_WAIT_MS = float(os.getenv("CATEGORIZER_BATCH_MAX_WAIT_MS", "10"))
+CATEGORIZER_TIMEOUT_SECONDS = float(os.getenv("CATEGORIZER_TIMEOUT_SECONDS", "2.0"))
+
+# 'source' of a result that did not come from the model (never memoized)
+FALLBACK_SOURCE = "fallback"
+
+
+def mock_categorize(transaction_text: str) -> Dict[str, Any]:
+    """
+    [MOCK] Local stand-in for the ML categorizer response, used when the service is
+    not configured or a batched call fails/times out. Marked with source='fallback'.
+    """
+    return {
+        "merchant": "Zomato/Swiggy/CloudKitchen",
+        "category": "Discretionary_Food_Delivery",
+        "amount": 450.00,
+        "type": DEBIT,
+        "source": FALLBACK_SOURCE,
+    }
+
+
+def is_fallback_result(result: Dict[str, Any]) -> bool:
+    """True for mock answers, which must not be written to the merchant cache."""
+    return result.get("source") == FALLBACK_SOURCE
+
+
+class MicroBatchingCategorizerClient:
+    """
+    Client for the external categorization service that coalesces concurrent calls.
+
+    Every in-flight ingest awaits its own future; messages are buffered until the
+    batch holds CATEGORIZER_BATCH_MAX_SIZE texts or CATEGORIZER_BATCH_MAX_WAIT_MS
+    elapses, then sent as ONE POST {"texts": [...]} and the results are fanned back
+    out in order. A failed or timed-out batch falls back to mock_categorize(); so does
+    a single result the service could not produce (null, or {"error": ...}).
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = CATEGORIZER_URL,
+        max_batch_size: int = CATEGORIZER_BATCH_MAX_SIZE,
+        max_wait_ms: float = CATEGORIZER_BATCH_MAX_WAIT_MS,
+        timeout_seconds: float = CATEGORIZER_TIMEOUT_SECONDS,
+        transport=None,
+    ):
+        self.base_url = base_url
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport # e.g. httpx.ASGITransport for the local stub server
+
+        self._http = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._sending: set = set()
+
+        # --- Metrics ---
+        self._requests = 0
+        self._batches = 0
+        self._batched_messages = 0
+        self._size_flushes = 0
+        self._timer_flushes = 0
+        self._fallback_messages = 0
+        self._errors = 0
+        self._item_errors = 0
+        self._round_trip_total = 0.0
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        """Binds the client to the running loop and opens the pooled HTTP connection."""
+        self._loop = asyncio.get_running_loop()
+        if self.base_url and self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                transport=self._transport,
+            )
+
+    async def stop(self):
+        """Flushes the buffered messages, waits for in-flight batches and closes the connection."""
+        if self._pending:
+            self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._loop = None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._http is not None
+
+    # ----------------------------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------------------------
+    async def categorize(self, transaction_text: str) -> Dict[str, Any]:
+        """Categorizes one message; concurrent callers share a single batched request."""
+        self._requests += 1
+        if not self.is_enabled:
+            self._fallback_messages += 1
+            return mock_categorize(transaction_text)
+
+        future = self._loop.create_future()
+        self._pending.append((transaction_text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._size_flushes += 1
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.max_wait_seconds, self._on_timer)
+
+        return await future
+
+    async def categorize_many(self, transaction_texts: List[str]) -> List[Dict[str, Any]]:
+        """Categorizes several messages (results in input order), batched with any other callers."""
+        return list(await asyncio.gather(*(self.categorize(text) for text in transaction_texts)))
+
+    # ----------------------------------------------------------------------
+    # BATCHING
+    # ----------------------------------------------------------------------
+    def _on_timer(self):
+        self._flush_handle = None
+        if self._pending:
+            self._timer_flushes += 1
+            self._flush()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        task = self._loop.create_task(self._send_batch(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        started_at = time.monotonic()
+        try:
+            response = await asyncio.wait_for(
+                self._http.post(CATEGORIZER_BATCH_PATH, json={"texts": texts}),
+                timeout=self.timeout_seconds,
+            )
+            response.raise_for_status()
+            results = response.json()["results"]
+            if len(results) != len(texts):
+                raise ValueError(f"Categorizer returned {len(results)} results for {len(texts)} texts.")
+        except Exception as e:
+            self._errors += 1
+            self._fallback_messages += len(texts)
+            print(f"Warning: Categorizer batch of {len(texts)} failed ({e!r}); using mock categorizer.")
+            results = [mock_categorize(text) for text in texts]
+        else:
+            self._batches += 1
+            self._batched_messages += len(texts)
+            self._round_trip_total += time.monotonic() - started_at
+            results = [self._result_or_fallback(text, result) for text, result in zip(texts, results)]
+
+        # Fan the results back out to the waiting callers (skip callers that gave up)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _result_or_fallback(self, text: str, result: Any) -> Dict[str, Any]:
+        """Partial failure: only the messages the service could not categorize fall back."""
+        if isinstance(result, dict) and result.get("category") and "error" not in result:
+            return result
+        self._item_errors += 1
+        self._fallback_messages += 1
+        return mock_categorize(text)
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of batching efficiency and fallback counters for this process."""
+        return {
+            "enabled": self.is_enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000.0,
+            "requests_total": self._requests,
+            "batches_total": self._batches,
+            "avg_batch_size": round(self._batched_messages / self._batches, 2) if self._batches else 0.0,
+            "size_flushes_total": self._size_flushes,
+            "timer_flushes_total": self._timer_flushes,
+            "pending": len(self._pending),
+            "fallback_messages_total": self._fallback_messages,
+            "errors_total": self._errors,
+            # Results within a successful batch that fell back on their own
+            "item_errors_total": self._item_errors,
+            "round_trip_seconds_avg": round(self._round_trip_total / self._batches, 4) if self._batches else 0.0,
+        }
+
+
+# Process-wide client (one per gunicorn worker), started/stopped by the app lifespan
+categorizer_client = MicroBatchingCategorizerClient()
@@ -0,0 +1,123 @@
+# services/category_totals.py
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.enums import TransactionStatus
+from ..models.category_period_total import CATEGORY_TOTALS_TRIGGER_DDL
+
+# ----------------------------------------------------------------------
+# RECONCILIATION (rebuild from raw rows, report drift, optionally repair)
+# ----------------------------------------------------------------------
+# Drift = any (user, month, category, sds_class) whose stored spend/count differs from the
+# aggregate of its COMPLETED transactions, including stored groups with no rows left.
+# With :fix the drifted groups are overwritten with the rebuilt values in the same
+# statement (emptied groups are zeroed, not deleted, and the totals version of every
+# repaired user is bumped so their cached leakage results are recomputed).
+RECONCILE_SQL = text("""
+    WITH actual AS (
+        SELECT user_id, CAST(date_trunc('month', transaction_date) AS DATE) AS period, category, sds_class,
+               SUM(amount) AS spend, COUNT(*) AS txn_count
+        FROM transactions
+        WHERE status = :completed
+          AND (CAST(:since AS DATE) IS NULL OR transaction_date >= :since)
+          AND (CAST(:user_id AS INTEGER) IS NULL OR user_id = :user_id)
+        GROUP BY 1, 2, 3, 4
+    ),
+    stored AS (
+        SELECT user_id, period, category, sds_class, spend, txn_count
+        FROM category_period_totals
+        WHERE (CAST(:since AS DATE) IS NULL OR period >= :since)
+          AND (CAST(:user_id AS INTEGER) IS NULL OR user_id = :user_id)
+    ),
+    drift AS (
+        SELECT user_id, period, category, sds_class,
+               COALESCE(a.spend, 0) AS actual_spend, COALESCE(s.spend, 0) AS stored_spend,
+               COALESCE(a.txn_count, 0) AS actual_count, COALESCE(s.txn_count, 0) AS stored_count
+        FROM actual a
+        FULL OUTER JOIN stored s USING (user_id, period, category, sds_class)
+        WHERE COALESCE(a.spend, 0) <> COALESCE(s.spend, 0)
+           OR COALESCE(a.txn_count, 0) <> COALESCE(s.txn_count, 0)
+    ),
+    repaired AS (
+        INSERT INTO category_period_totals AS t (user_id, period, category, sds_class, spend, txn_count, updated_at)
+        SELECT user_id, period, category, sds_class, actual_spend, actual_count, now() AT TIME ZONE 'utc'
+        FROM drift
+        WHERE :fix
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (user_id, period, category, sds_class) DO UPDATE
+        SET spend = EXCLUDED.spend, txn_count = EXCLUDED.txn_count, updated_at = EXCLUDED.updated_at
+        RETURNING user_id
+    ),
+    bumped AS (
+        INSERT INTO category_totals_versions AS v (user_id, version, updated_at)
+        SELECT DISTINCT user_id, 1, now() AT TIME ZONE 'utc'
+        FROM repaired
+        ORDER BY 1
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = v.version + 1, updated_at = EXCLUDED.updated_at
+    )
+    SELECT user_id, period, category, sds_class, actual_spend, stored_spend, actual_count, stored_count,
+           SUM(ABS(actual_spend - stored_spend)) OVER () AS spend_drift,
+           (SELECT COUNT(*) FROM repaired) AS groups_repaired
+    FROM drift
+    ORDER BY user_id, period, category, sds_class
+""")
+
+
+def _month_start(day: Optional[date]) -> Optional[date]:
+    return day.replace(day=1) if day else None
+
+
+async def reconcile_category_totals(
+    db: AsyncSession,
+    since: Optional[date] = None,
+    user_id: Optional[int] = None,
+    fix: bool = False,
+) -> Dict[str, Any]:
+    """
+    Rebuilds category_period_totals from the raw transactions (from the month of `since`,
+    optionally for one user) and reports every drifted group. With fix=True the table is
+    locked against concurrent delta writers first, so a transaction committing mid-repair
+    applies its delta on top of the rebuilt value instead of being lost. Caller commits.
+    """
+    if fix:
+        # Blocks the delta triggers (ROW EXCLUSIVE) until the caller commits; reads still work
+        await db.execute(text("LOCK TABLE category_period_totals IN SHARE ROW EXCLUSIVE MODE"))
+
+    rows = (await db.execute(RECONCILE_SQL, {
+        "completed": TransactionStatus.COMPLETED.value,
+        "since": _month_start(since),
+        "user_id": user_id,
+        "fix": fix,
+    })).all()
+
+    drift: List[Dict[str, Any]] = [
+        {
+            "user_id": row.user_id,
+            "period": row.period,
+            "category": row.category,
+            "sds_class": row.sds_class,
+            "actual_spend": row.actual_spend,
+            "stored_spend": row.stored_spend,
+            "actual_count": row.actual_count,
+            "stored_count": row.stored_count,
+        }
+        for row in rows
+    ]
+    return {
+        "drifted_groups": len(drift),
+        "spend_drift": rows[0].spend_drift if rows else Decimal("0.00"),
+        "groups_repaired": rows[0].groups_repaired if rows else 0,
+        "drift": drift,
+    }
+
+
+async def install_category_totals_triggers(db: AsyncSession):
+    """(Re)creates the delta trigger function and triggers on an existing database."""
+    for statement in CATEGORY_TOTALS_TRIGGER_DDL:
+        await db.execute(text(statement))
@@ -0,0 +1,182 @@
+# services/dedup.py
+
+import hashlib
+import math
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select
+
+from ..models.raw_transaction import RawTransaction
+from ..models.transaction import Transaction
+
+# --- DUPLICATE FILTER CONFIGURATION (Environment) ---
+# Sized for the fingerprints one worker sees between restarts; memory is
+# ~1.8 MB per million entries at a 0.1% false-positive rate.
+DEDUP_BLOOM_CAPACITY = int(os.getenv("DEDUP_BLOOM_CAPACITY", "1000000"))
+DEDUP_BLOOM_ERROR_RATE = float(os.getenv("DEDUP_BLOOM_ERROR_RATE", "0.001"))
+# Recent fingerprints loaded into the filter at startup (0 disables the warm-up)
+DEDUP_WARM_DAYS = int(os.getenv("DEDUP_WARM_DAYS", "30"))
+DEDUP_WARM_LIMIT = int(os.getenv("DEDUP_WARM_LIMIT", "200000"))
+
+# Filter scopes (one per table carrying a unique fingerprint index)
+RAW_TRANSACTIONS_SCOPE = "raw_transactions"
+TRANSACTIONS_SCOPE = "transactions"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def sms_fingerprint(bank_identifier: Optional[str], transaction_text: str, sms_date_time: Optional[str]) -> str:
+    """
+    Content fingerprint of an SMS: bank identifier + normalized text + SMS timestamp.
+    A client resend (retry, reinstall) of the same message yields the same fingerprint.
+    """
+    bank = (bank_identifier or "").strip().upper()
+    text = _WHITESPACE.sub(" ", transaction_text).strip().casefold()
+    timestamp = (sms_date_time or "").strip()
+    try:
+        timestamp = datetime.fromisoformat(timestamp).isoformat(timespec="seconds")
+    except ValueError:
+        pass # Keep the raw string; resends carry the same one
+    return hashlib.sha256(f"{bank}\x1f{text}\x1f{timestamp}".encode("utf-8")).hexdigest()
+
+
+def statement_row_identity(reference: Optional[str], description: str) -> str:
+    """The bank's reference for a statement row, or its normalized description when it has none."""
+    return (reference or "").strip().upper() or _WHITESPACE.sub(" ", description).strip().casefold()
+
+
+def statement_row_fingerprint(transaction_date: datetime, amount: Any, identity: str, occurrence: int = 0) -> str:
+    """
+    Content fingerprint of a bank-statement row: posting date + amount + identity
+    (statement_row_identity). occurrence tells apart identical rows on the same day, so
+    re-uploading a statement (or an overlapping one) maps every row onto the fingerprint
+    it was first imported with.
+    """
+    key = f"STATEMENT\x1f{transaction_date.date().isoformat()}\x1f{amount}\x1f{identity}\x1f{occurrence}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (double hashing over a 128-bit BLAKE2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class DuplicateSuppressor:
+    """
+    Per-worker probabilistic pre-filter in front of the unique fingerprint indexes.
+
+    A negative from the Bloom filter means "never seen by this worker", so the DB probe
+    is skipped and the row goes straight to INSERT ... ON CONFLICT DO NOTHING (which
+    still catches duplicates first seen by another worker). A positive is confirmed
+    with an indexed lookup before the message is reported as already ingested.
+    """
+
+    def __init__(self, capacity: int = DEDUP_BLOOM_CAPACITY, error_rate: float = DEDUP_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+
+        # --- Counters ---
+        self.checks = 0
+        self.bloom_positives = 0
+        self.confirmed_duplicates = 0
+        self.false_positives = 0
+        self.conflict_duplicates = 0
+
+    @staticmethod
+    def _key(scope: str, user_id: Any, fingerprint: str) -> str:
+        return f"{scope}:{user_id}:{fingerprint}"
+
+    def might_contain(self, scope: str, user_id: Any, fingerprint: str) -> bool:
+        """True if the fingerprint may have been ingested (needs a DB probe to confirm)."""
+        self.checks += 1
+        if self._key(scope, user_id, fingerprint) in self._bloom:
+            self.bloom_positives += 1
+            return True
+        return False
+
+    def remember(self, scope: str, user_id: Any, fingerprint: str):
+        self._bloom.add(self._key(scope, user_id, fingerprint))
+
+    def remember_many(self, scope: str, entries: Iterable[tuple]):
+        """Bulk-loads (user_id, fingerprint) pairs, e.g. at startup."""
+        for user_id, fingerprint in entries:
+            self.remember(scope, user_id, fingerprint)
+
+    def record_probe(self, was_duplicate: bool):
+        if was_duplicate:
+            self.confirmed_duplicates += 1
+        else:
+            self.false_positives += 1
+
+    def record_conflict(self, count: int = 1):
+        """Duplicates the filter missed but the unique index rejected (ON CONFLICT DO NOTHING)."""
+        self.conflict_duplicates += count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "target_error_rate": self.error_rate,
+            "entries": self._bloom.count,
+            "bits": self._bloom.num_bits,
+            "hashes": self._bloom.num_hashes,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "confirmed_duplicates": self.confirmed_duplicates,
+            "false_positives": self.false_positives,
+            "conflict_duplicates": self.conflict_duplicates,
+            "db_probes_skipped": self.checks - self.bloom_positives,
+        }
+
+
+# Process-wide filter (one per gunicorn worker)
+duplicate_suppressor = DuplicateSuppressor()
+
+
+async def warm_duplicate_suppressor(session_factory, days: int = DEDUP_WARM_DAYS, limit: int = DEDUP_WARM_LIMIT):
+    """
+    Loads recent fingerprints into the filter at startup, so resends arriving right
+    after a deploy/restart are still caught before categorization.
+    """
+    if days <= 0 or limit <= 0:
+        return
+    since = datetime.utcnow() - timedelta(days=days)
+    async with session_factory() as session:
+        for scope, model, created_column in (
+            (RAW_TRANSACTIONS_SCOPE, RawTransaction, RawTransaction.timestamp),
+            (TRANSACTIONS_SCOPE, Transaction, Transaction.created_at),
+        ):
+            stmt = (
+                select(model.user_id, model.sms_fingerprint)
+                .where(model.sms_fingerprint.is_not(None), created_column >= since)
+                .order_by(created_column.desc())
+                .limit(limit)
+            )
+            duplicate_suppressor.remember_many(scope, (await session.execute(stmt)).all())
@@ -139,6 +139,8 @@ class FinancialProfileService:
         # Save the final DMB
         profile.essential_target = dynamic_minimal_baseline.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
         profile.last_calculated_at = datetime.utcnow()
+        # SET version = version + 1 (atomic): a new version invalidates cached leakage views
+        profile.version = FinancialProfile.version + 1
         
         # The profile object is already 'dirty' in the session; 
         # we don't need a manual commit, but we should flush to ensure data is updated 
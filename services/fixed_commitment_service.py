@@ -1,7 +1,7 @@
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from datetime import date, timedelta
 
 # Import models
@@ -9,6 +9,7 @@ from ..db.base import User # Used for context if needed
 from ..db.models import SalaryAllocationProfile
 # 🚨 NOTE: Assuming you have a Transaction model for historical data analysis
 from ..db.models import Transaction 
+from .salary_profile_cas import with_profile_cas
 
 # --- SERVICE CONSTANTS ---
 LOOKBACK_MONTHS = 4  # Analyze the last 4 months to establish a pattern
@@ -28,27 +29,28 @@ class FixedCommitmentService:
     non-negotiable monthly fixed expenses.
     """
 
-    def __init__(self, db: Session, user_id: int):
+    def __init__(self, db: AsyncSession, user_id: int):
         self.db = db
         self.user_id = user_id
 
-    def _get_fixed_transactions(self, end_date: date) -> List[Transaction]:
+    async def _get_fixed_transactions(self, end_date: date) -> List[Transaction]:
         """
         Retrieves all transactions categorized as fixed commitments within the lookback window.
         """
         start_date = end_date - timedelta(days=30 * LOOKBACK_MONTHS)
 
         # 🚨 NOTE: This query requires 'Transaction' model to have a 'category' and 'date' field.
-        transactions = self.db.query(Transaction).filter(
+        stmt = select(Transaction).where(
             Transaction.user_id == self.user_id,
             Transaction.transaction_date >= start_date,
             Transaction.transaction_date <= end_date,
             Transaction.category.in_(FIXED_COMMITMENT_CATEGORIES)
-        ).all()
+        )
+        result = await self.db.execute(stmt)
         
-        return transactions
+        return result.scalars().all()
 
-    def calculate_fixed_total(self, reporting_period: date) -> Decimal:
+    async def calculate_fixed_total(self, reporting_period: date) -> Decimal:
         """
         Analyzes historical fixed spending and projects the monthly total.
 
@@ -57,7 +59,7 @@ class FixedCommitmentService:
         """
         
         # 1. Fetch relevant transactions
-        fixed_transactions = self._get_fixed_transactions(reporting_period)
+        fixed_transactions = await self._get_fixed_transactions(reporting_period)
 
         if not fixed_transactions:
             return Decimal("0.00")
@@ -96,36 +98,47 @@ class FixedCommitmentService:
         # Round the final result
         return projected_total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
-    def orchestrate_update(self, reporting_period: date) -> Decimal:
+    async def orchestrate_update(self, reporting_period: date) -> Decimal:
         """
         Calculates the fixed total and updates the SalaryAllocationProfile.
         This is the method called by the main Orchestration Service.
         """
         
         # 1. Calculate the fixed total
-        calculated_fixed_total = self.calculate_fixed_total(reporting_period)
+        calculated_fixed_total = await self.calculate_fixed_total(reporting_period)
         
-        # 2. Fetch or create the SalaryAllocationProfile for the month
-        salary_profile = self.db.query(SalaryAllocationProfile).filter(
-            SalaryAllocationProfile.user_id == self.user_id,
-            SalaryAllocationProfile.reporting_period == reporting_period
-        ).first()
-
-        if not salary_profile:
-            # 🚨 FAILURE PREVENTION: If profile doesn't exist, create a minimal one.
-            # Assuming you have a service to get the latest net income (or fetch it from User model)
-            user_info = self.db.query(User).filter(User.id == self.user_id).one() 
-
-            salary_profile = SalaryAllocationProfile(
-                user_id=self.user_id,
-                reporting_period=reporting_period,
-                net_monthly_income=user_info.monthly_salary,
-                # Other defaults will kick in
+        # 2. Fetch or create the SalaryAllocationProfile for the month and update the
+        #    CRITICAL FIELD. The flush is a compare-and-swap on the profile version
+        #    (version_id_col): if a concurrent writer got there first, re-read and retry.
+        async def write_fixed_total():
+            result = await self.db.execute(
+                select(SalaryAllocationProfile).where(
+                    SalaryAllocationProfile.user_id == self.user_id,
+                    SalaryAllocationProfile.reporting_period == reporting_period
+                ).order_by(SalaryAllocationProfile.id).limit(1).execution_options(populate_existing=True)
             )
-            self.db.add(salary_profile)
+            # The period's first profile row, like every other profile writer
+            salary_profile = result.scalar_one_or_none()
 
-        # 3. Update the CRITICAL FIELD and commit
-        salary_profile.fixed_commitment_total = calculated_fixed_total
-        self.db.commit()
+            if not salary_profile:
+                # 🚨 FAILURE PREVENTION: If profile doesn't exist, create a minimal one.
+                # Assuming you have a service to get the latest net income (or fetch it from User model)
+                user_info = (await self.db.execute(select(User).where(User.id == self.user_id))).scalar_one()
+
+                salary_profile = SalaryAllocationProfile(
+                    user_id=self.user_id,
+                    reporting_period=reporting_period,
+                    net_monthly_income=user_info.monthly_salary,
+                    # Other defaults will kick in
+                )
+                self.db.add(salary_profile)
+
+            salary_profile.fixed_commitment_total = calculated_fixed_total
+            await self.db.flush()
+
+        await with_profile_cas(self.db, "fixed_commitment", write_fixed_total)
+
+        # 3. Commit
+        await self.db.commit()
         
         return calculated_fixed_total
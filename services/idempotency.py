@@ -0,0 +1,324 @@
+# services/idempotency.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..api.database_setup import AsyncSessionLocal
+from .cache_backends import TTLLRUCache
+
+# --- IDEMPOTENCY CONFIGURATION (Environment) ---
+# How long a completed key is replayed; older keys are pruned or reclaimed by a new request
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCAL_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_LOCAL_MAX_ENTRIES", "10000"))
+# An IN_PROGRESS claim older than this belongs to a crashed request and can be taken over
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+# How long a duplicate waits for the first execution before answering 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_POLL_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL_SECONDS", "0.05"))
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+
+
+class StoredResponse(NamedTuple):
+    """A completed request: what every retry with the same key gets back."""
+    request_hash: str
+    status_code: int
+    body: str
+
+
+class IdempotencyClaim(NamedTuple):
+    """Ownership of a key: the holder executes the request, then complete()/finish() or abort()."""
+    user_id: int
+    key: str
+    request_hash: str
+    token: str
+
+
+class IdempotencyError(Exception):
+    """A key that cannot be used for this request; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def request_hash(method: str, path: str, payload: Any) -> str:
+    """sha256 of the request (method, path and canonical JSON body)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode()).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# KEY TABLE STATEMENTS
+# ----------------------------------------------------------------------
+# Claims a new key, or takes over one whose claim outlived the lease (crashed request)
+# or whose completed response expired. Concurrent claims of the same key serialize on
+# the primary key: exactly one of them gets a row back.
+CLAIM_SQL = text("""
+    INSERT INTO idempotency_keys (user_id, idempotency_key, request_hash, status, claim_token, created_at)
+    VALUES (:user_id, :key, :request_hash, :in_progress, :token, now() AT TIME ZONE 'utc')
+    ON CONFLICT (user_id, idempotency_key) DO UPDATE
+    SET request_hash = EXCLUDED.request_hash,
+        status = EXCLUDED.status,
+        claim_token = EXCLUDED.claim_token,
+        response_code = NULL,
+        response_body = NULL,
+        created_at = EXCLUDED.created_at,
+        completed_at = NULL
+    WHERE (idempotency_keys.status = :in_progress
+           AND idempotency_keys.created_at < (now() AT TIME ZONE 'utc') - make_interval(secs => CAST(:lease_seconds AS DOUBLE PRECISION)))
+       OR (idempotency_keys.status = :completed
+           AND idempotency_keys.completed_at < (now() AT TIME ZONE 'utc') - make_interval(secs => CAST(:ttl_seconds AS DOUBLE PRECISION)))
+    RETURNING (xmax = 0) AS inserted
+""")
+
+LOAD_SQL = text("""
+    SELECT request_hash, status, response_code, response_body
+    FROM idempotency_keys
+    WHERE user_id = :user_id AND idempotency_key = :key
+""")
+
+# Runs in the request's own transaction: the response is stored if and only if the
+# request's writes commit
+COMPLETE_SQL = text("""
+    UPDATE idempotency_keys
+    SET status = :completed, response_code = :response_code, response_body = :response_body,
+        completed_at = now() AT TIME ZONE 'utc'
+    WHERE user_id = :user_id AND idempotency_key = :key AND claim_token = :token AND status = :in_progress
+""")
+
+RELEASE_SQL = text("""
+    DELETE FROM idempotency_keys
+    WHERE user_id = :user_id AND idempotency_key = :key AND claim_token = :token AND status = :in_progress
+""")
+
+PRUNE_SQL = text("""
+    DELETE FROM idempotency_keys
+    WHERE COALESCE(completed_at, created_at) < (now() AT TIME ZONE 'utc') - make_interval(secs => CAST(:ttl_seconds AS DOUBLE PRECISION))
+""")
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key handling for non-repeatable POSTs (/autopilot/consent).
+
+    begin() either returns the StoredResponse of an earlier request with the key (from
+    the per-worker cache, else the key table) or claims the key and returns an
+    IdempotencyClaim. The claim is committed on its own, so duplicates in any worker
+    see it: a duplicate in the same process awaits the first execution's future, one in
+    another process polls the key row until it is completed. The owner stores the
+    response inside its own transaction (complete()), then publishes it (finish()); on
+    failure abort() releases the key so a retry executes afresh.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        local_max_entries: int = IDEMPOTENCY_LOCAL_MAX_ENTRIES,
+        lease_seconds: float = IDEMPOTENCY_LEASE_SECONDS,
+        wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS,
+        poll_interval_seconds: float = IDEMPOTENCY_POLL_INTERVAL_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        # (user_id, key) -> StoredResponse
+        self._responses = TTLLRUCache(local_max_entries, ttl_seconds)
+        # (user_id, key) -> future resolved with the StoredResponse (None: retry the claim)
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+
+        # --- Metrics ---
+        self._requests = 0
+        self._claimed = 0
+        self._taken_over = 0
+        self._executed = 0
+        self._aborted = 0
+        self._replayed_local = 0
+        self._replayed_db = 0
+        self._waited_local = 0
+        self._waited_db = 0
+        self._in_progress_conflicts = 0
+        self._key_reuse_rejected = 0
+        self._claims_lost = 0
+
+    # ----------------------------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------------------------
+    async def begin(self, user_id: int, key: str, request_digest: str) -> Union[StoredResponse, IdempotencyClaim]:
+        """Replays an earlier response for the key or claims it. Raises IdempotencyError (422/409)."""
+        self._requests += 1
+        cache_key = (user_id, key)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            # 1. Fast path: completed in this worker
+            stored = self._responses.get(cache_key)
+            if stored is not None:
+                self._replayed_local += 1
+                return self._checked(stored, request_digest)
+
+            # 2. Executing in this worker: wait for it instead of racing it
+            future = self._in_flight.get(cache_key)
+            if future is not None:
+                self._waited_local += 1
+                try:
+                    stored = await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    self._in_progress_conflicts += 1
+                    raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed; retry later.")
+                if stored is None:
+                    continue # the first execution failed and released the key: claim it ourselves
+                self._replayed_local += 1
+                return self._checked(stored, request_digest)
+
+            # 3. Claim in the key table (the future makes local duplicates wait on us)
+            future = self._in_flight[cache_key] = asyncio.get_running_loop().create_future()
+            try:
+                result = await self._claim_or_load(user_id, key, request_digest, deadline)
+            except BaseException:
+                self._resolve(cache_key, None)
+                raise
+            if isinstance(result, StoredResponse):
+                self._responses.set(cache_key, result)
+                self._resolve(cache_key, result)
+                return self._checked(result, request_digest)
+            return result
+
+    async def complete(self, db: AsyncSession, claim: IdempotencyClaim, status_code: int, body: str) -> StoredResponse:
+        """Stores the response in the caller's transaction (commit it together with the request's writes)."""
+        updated = await db.execute(COMPLETE_SQL, {
+            "user_id": claim.user_id,
+            "key": claim.key,
+            "token": claim.token,
+            "response_code": status_code,
+            "response_body": body,
+            "in_progress": IN_PROGRESS,
+            "completed": COMPLETED,
+        })
+        if updated.rowcount != 1:
+            # The lease expired and another request took the key over: do not commit twice
+            self._claims_lost += 1
+            raise IdempotencyError(409, "The Idempotency-Key claim expired while the request was running; retry later.")
+        return StoredResponse(claim.request_hash, status_code, body)
+
+    def finish(self, claim: IdempotencyClaim, stored: StoredResponse):
+        """After the commit: caches the response and wakes the local duplicates."""
+        cache_key = (claim.user_id, claim.key)
+        self._executed += 1
+        self._responses.set(cache_key, stored)
+        self._resolve(cache_key, stored)
+
+    async def abort(self, claim: IdempotencyClaim):
+        """The request failed (nothing committed): releases the key so it can be retried."""
+        self._aborted += 1
+        self._resolve((claim.user_id, claim.key), None)
+        try:
+            async with self._session_factory() as db:
+                await db.execute(RELEASE_SQL, {
+                    "user_id": claim.user_id, "key": claim.key, "token": claim.token, "in_progress": IN_PROGRESS,
+                })
+                await db.commit()
+        except Exception as e:
+            # The claim expires after the lease; until then retries get 409
+            print(f"Warning: Idempotency-Key release failed ({e!r}).")
+
+    async def prune(self) -> int:
+        """Deletes keys older than the TTL. Returns the number of rows deleted."""
+        async with self._session_factory() as db:
+            deleted = await db.execute(PRUNE_SQL, {"ttl_seconds": self.ttl_seconds})
+            await db.commit()
+        return deleted.rowcount
+
+    # ----------------------------------------------------------------------
+    # INTERNALS
+    # ----------------------------------------------------------------------
+    async def _claim_or_load(self, user_id: int, key: str, request_digest: str, deadline: float) -> Union[StoredResponse, IdempotencyClaim]:
+        params = {
+            "user_id": user_id,
+            "key": key,
+            "request_hash": request_digest,
+            "in_progress": IN_PROGRESS,
+            "completed": COMPLETED,
+            "lease_seconds": self.lease_seconds,
+            "ttl_seconds": self.ttl_seconds,
+        }
+        waited = False
+        while True:
+            token = uuid.uuid4().hex
+            async with self._session_factory() as db:
+                claimed = (await db.execute(CLAIM_SQL, {**params, "token": token})).first()
+                await db.commit()
+                if claimed is not None:
+                    self._claimed += 1
+                    if not claimed.inserted:
+                        self._taken_over += 1
+                    return IdempotencyClaim(user_id, key, request_digest, token)
+
+                # Held by another request: replay it if completed, else poll until it is
+                while True:
+                    row = (await db.execute(LOAD_SQL, params)).first()
+                    await db.rollback() # fresh snapshot for the next poll
+                    if row is None:
+                        break # released by a failed execution: try to claim again
+                    if row.status == COMPLETED:
+                        self._replayed_db += 1
+                        return StoredResponse(row.request_hash, row.response_code, row.response_body)
+                    if row.request_hash != request_digest:
+                        self._key_reuse_rejected += 1
+                        raise IdempotencyError(422, "Idempotency-Key was already used with a different request.")
+                    if not waited:
+                        waited = True
+                        self._waited_db += 1
+                    if time.monotonic() >= deadline:
+                        self._in_progress_conflicts += 1
+                        raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed; retry later.")
+                    await asyncio.sleep(self.poll_interval_seconds)
+
+    def _checked(self, stored: StoredResponse, request_digest: str) -> StoredResponse:
+        if stored.request_hash != request_digest:
+            self._key_reuse_rejected += 1
+            raise IdempotencyError(422, "Idempotency-Key was already used with a different request.")
+        return stored
+
+    def _resolve(self, cache_key: Tuple[int, str], stored: Optional[StoredResponse]):
+        future = self._in_flight.pop(cache_key, None)
+        if future is not None and not future.done():
+            future.set_result(stored)
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests_total": self._requests,
+            "claimed_total": self._claimed,
+            # Claims of keys left IN_PROGRESS past the lease or expired
+            "taken_over_total": self._taken_over,
+            "executed_total": self._executed,
+            "aborted_total": self._aborted,
+            "replayed_local_total": self._replayed_local,
+            "replayed_db_total": self._replayed_db,
+            "waited_local_total": self._waited_local,
+            "waited_db_total": self._waited_db,
+            "in_progress_conflicts_total": self._in_progress_conflicts,
+            "key_reuse_rejected_total": self._key_reuse_rejected,
+            "claims_lost_total": self._claims_lost,
+            "in_flight": len(self._in_flight),
+            "local_cache": self._responses.stats(),
+        }
+
+
+# Process-wide store (one per gunicorn worker); the key table is shared by all of them
+idempotency_store = IdempotencyStore()
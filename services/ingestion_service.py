@@ -1,104 +1,129 @@
 # services/ingestion_service.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
-from ..db.models import RawTransaction, Transaction
-from ..db.enums import TransactionType
+from ..models.transaction import Transaction
+from ..models.raw_transaction import RawTransaction
+from ..db.enums import SDSWeightClass
+from .categorization_cache import merchant_category_cache, merchant_key_from_text, infer_sds_class
+from .dedup import duplicate_suppressor, sms_fingerprint, RAW_TRANSACTIONS_SCOPE
+from .sms_parsers import DEBIT
 # from ..ml.categorization_engine import categorize_text # Conceptual ML import
 
+# Spend the categorizer could not place in an SDS class is treated as variable essential
+DEFAULT_INGEST_SDS_CLASS = SDSWeightClass.VARIABLE_ESSENTIAL
+
 class IngestionService:
     """
     Handles the high-speed ingestion of raw SMS/UPI data (Gap #1 fix). 
     It saves the raw data instantly and triggers the asynchronous categorization 
     pipeline, ensuring the 'Frictionless' flow.
     """
-    def __init__(self, db: Session, user_id: int):
+    def __init__(self, db: AsyncSession, user_id: int):
         self.db = db
         self.user_id = user_id
 
-    def ingest_raw_data(self, raw_message: str, source: str = 'SMS') -> RawTransaction:
+    async def ingest_raw_data(self, raw_message: str, source: str = 'SMS', bank_identifier: Optional[str] = None, sms_date_time: Optional[str] = None) -> Tuple[RawTransaction, bool]:
         """
         Saves the raw message instantly to the RawTransaction table.
         This is the primary function for securing data integrity.
+
+        Returns (raw_tx, is_duplicate): a resent message (same fingerprint) returns the
+        originally stored row with is_duplicate=True and is not queued for categorization.
         """
-        raw_tx = RawTransaction(
+        fingerprint = sms_fingerprint(bank_identifier, raw_message, sms_date_time)
+
+        # 1. Per-worker pre-filter: only possible duplicates pay for the indexed probe
+        if duplicate_suppressor.might_contain(RAW_TRANSACTIONS_SCOPE, self.user_id, fingerprint):
+            existing = await self._find_by_fingerprint(fingerprint)
+            duplicate_suppressor.record_probe(existing is not None)
+            if existing is not None:
+                return existing, True
+
+        # 2. Insert; the unique (user_id, sms_fingerprint) index settles races across workers
+        stmt = pg_insert(RawTransaction).values(
             user_id=self.user_id,
             raw_text=raw_message,
             source_type=source,
-            timestamp=datetime.utcnow()
-        )
-        self.db.add(raw_tx)
-        self.db.commit()
-        self.db.refresh(raw_tx) # Get the generated ID
-        
-        # --- Asynchronous Trigger (Conceptual) ---
-        # In a production system, this would trigger a dedicated background worker 
-        # (like Celery/RQ) to process the categorization using ML.
-        # Example: start_categorization_worker(raw_tx.id)
+            timestamp=datetime.utcnow(),
+            sms_fingerprint=fingerprint,
+            is_processed=False,
+            categorization_attempts=0,
+        ).on_conflict_do_nothing(
+            index_elements=[RawTransaction.user_id, RawTransaction.sms_fingerprint]
+        ).returning(RawTransaction.id)
+        raw_tx_id = (await self.db.execute(stmt)).scalar_one_or_none()
+        await self.db.commit()
+        duplicate_suppressor.remember(RAW_TRANSACTIONS_SCOPE, self.user_id, fingerprint)
+
+        if raw_tx_id is None:
+            duplicate_suppressor.record_conflict()
+            return await self._find_by_fingerprint(fingerprint), True
+
+        raw_tx = await self.db.get(RawTransaction, raw_tx_id)
+
+        # --- Asynchronous Trigger ---
+        # The raw row is durable at this point, so hand its ID to the in-process
+        # categorization worker pool and return immediately. If the queue is full
+        # (backpressure) the row stays unprocessed and is picked up by the workers'
+        # idle sweep instead.
+        from .categorization_worker import categorization_pool
+        categorization_pool.submit(raw_tx.id)
         # ----------------------------------------
-        
-        return raw_tx
-    
-    # --- Conceptual Asynchronous Categorization (Worker Function) ---
-    def process_categorization_worker(self, raw_transaction_id: int):
+
+        return raw_tx, False
+
+    async def _find_by_fingerprint(self, fingerprint: str) -> Optional[RawTransaction]:
+        result = await self.db.execute(
+            select(RawTransaction).where(
+                RawTransaction.user_id == self.user_id,
+                RawTransaction.sms_fingerprint == fingerprint
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def categorize_raw_text(raw_text: str) -> Dict[str, Any]:
         """
-        Conceptual worker function that runs the heavy ML categorization logic.
-        This must run separately from the main API thread to keep the ingestion API fast.
+        Runs the ML categorization for a raw message (shared with the worker pool).
         """
-        raw_tx = self.db.query(RawTransaction).filter(RawTransaction.id == raw_transaction_id).first()
-        if not raw_tx or raw_tx.is_processed:
-            return
-
-        # Increment attempts and try categorization
-        raw_tx.categorization_attempts += 1
-        self.db.commit()
-        
-        try:
-            # 1. ML Categorization (MOCK)
-            # categorized_data = categorize_text(raw_tx.raw_text)
-            
-            # MOCK result for integration testing
-            categorized_data = {
-                "amount": Decimal("500.00"),
-                "category": "Discretionary: Food & Dining",
-                "type": TransactionType.DEBIT.value,
-                "description": "UPI payment for dinner"
-            }
-
-            # 2. Create the Clean Transaction
-            new_transaction = Transaction(
-                user_id=self.user_id,
-                transaction_date=raw_tx.timestamp.date(),
-                amount=categorized_data["amount"],
-                description=categorized_data["description"],
-                category=categorized_data["category"],
-                transaction_type=categorized_data["type"],
-            )
-            self.db.add(new_transaction)
-            self.db.flush() # Get the new_transaction ID
-
-            # 3. Finalize Raw Transaction and Link
-            raw_tx.is_processed = True
-            raw_tx.transaction_id = new_transaction.id
-            
-            # 4. Commit and Trigger Orchestration
-            self.db.commit()
-
-            # CRITICAL STEP: Trigger the Autopilot Orchestration on new, clean data
-            # from .orchestration_service import OrchestrationService
-            # orch_service = OrchestrationService(self.db, self.user_id)
-            # orch_service.recalculate_current_period_leakage(new_transaction.transaction_date) 
-            
-            return new_transaction.id
-            
-        except Exception as e:
-            # Handle logging and retry logic here
-            self.db.rollback()
-            print(f"Error processing transaction {raw_transaction_id}: {e}")
-
-
-# NOTE: For deployment, ensure the categorization logic is handled via a separate, 
-# non-blocking worker process to maintain high API throughput.
+        # MOCK extraction result for integration testing
+        categorized_data = {
+            "amount": Decimal("500.00"),
+            "type": DEBIT,
+            "description": "UPI payment for dinner"
+        }
+
+        # Known merchant: reuse the memoized category and skip the ML model
+        merchant_key = merchant_key_from_text(raw_text)
+        cached = await merchant_category_cache.get(merchant_key)
+        if cached is not None:
+            categorized_data["category"], categorized_data["sds_class"] = cached
+        else:
+            # categorized_data["category"] = categorize_text(raw_text)
+            # Hard-coded stand-in until the model is wired in: not memoized, only real
+            # model answers may be cached (see categorizer_client.is_fallback_result)
+            categorized_data["category"] = "Discretionary: Food & Dining"
+        return categorized_data
+
+    @staticmethod
+    def build_transaction(user_id: int, raw_tx: RawTransaction, categorized_data: Dict[str, Any]) -> Transaction:
+        """Creates the clean Transaction for a categorized raw message."""
+        return Transaction(
+            user_id=user_id,
+            transaction_date=raw_tx.timestamp.date(),
+            amount=categorized_data["amount"],
+            description=categorized_data["description"],
+            category=categorized_data["category"],
+            sds_class=categorized_data.get("sds_class") or infer_sds_class(categorized_data["category"]) or DEFAULT_INGEST_SDS_CLASS,
+            sms_fingerprint=raw_tx.sms_fingerprint,
+        )
+
+
+# NOTE: The categorization logic runs in the in-process worker pool
+# (services/categorization_worker.py) to keep the ingestion API fast.
@@ -0,0 +1,180 @@
+# services/insight_campaign.py
+
+import json
+from datetime import date
+from itertools import groupby
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import Integer, String, Text, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.enums import SDSWeightClass
+from .insight_rules import InsightRuleEngine
+from .leakage_service import TAX_HEADROOM_CATEGORY, TAX_SAVING_ANNUAL_LIMIT, _period_bounds
+
+# ----------------------------------------------------------------------
+# CHUNK SOURCE (keyset page of users + their buckets, one statement)
+# ----------------------------------------------------------------------
+# The next :chunk_size users after :after_user_id within the stripe, and their MTD
+# leakage buckets by the LEAKAGE_SQL rules, partitioned by user_id and read from the
+# running category_period_totals (no transaction scan, nothing written). Every chunk
+# user gets a row (the tax headroom bucket), so the last row is the keyset cursor.
+# No month-end projection here: the campaign cards use the MTD leak like the hook's.
+CAMPAIGN_BUCKETS_SQL = text(r"""
+    WITH chunk AS (
+        SELECT id AS user_id FROM users
+        WHERE id > :after_user_id AND id < :user_id_end
+        ORDER BY id
+        LIMIT :chunk_size
+    ),
+    month_spend AS (
+        SELECT c.user_id, c.category, c.sds_class, c.spend
+        FROM category_period_totals c
+        JOIN chunk USING (user_id)
+        WHERE c.period = :period_start
+          AND c.txn_count > 0
+          AND c.sds_class IN (:variable_essential, :pure_discretionary)
+          AND c.category NOT LIKE 'Income\_%'
+    ),
+    thresholds AS (
+        SELECT m.user_id, m.category, m.sds_class, m.spend,
+               CASE
+                   WHEN m.sds_class = :variable_essential THEN COALESCE(
+                       ROUND(p.essential_target * m.spend
+                             / NULLIF(SUM(CASE WHEN m.sds_class = :variable_essential THEN m.spend END)
+                                      OVER (PARTITION BY m.user_id), 0), 2),
+                       m.spend)
+                   ELSE 0
+               END AS baseline_threshold
+        FROM month_spend m
+        LEFT JOIN financial_profiles p ON p.user_id = m.user_id
+    )
+    SELECT user_id, category, sds_class, spend, baseline_threshold,
+           GREATEST(spend - baseline_threshold, 0) AS leak_amount
+    FROM thresholds
+    UNION ALL
+    SELECT chunk.user_id, CAST(:tax_category AS VARCHAR), CAST(:tax_optimization AS VARCHAR),
+           COALESCE(SUM(c.spend), 0), CAST(:tax_limit AS NUMERIC),
+           GREATEST(CAST(:tax_limit AS NUMERIC) - COALESCE(SUM(c.spend), 0), 0)
+    FROM chunk
+    LEFT JOIN category_period_totals c
+           ON c.user_id = chunk.user_id
+          AND c.period >= :fiscal_year_start AND c.period <= :period_start
+          AND c.sds_class = :tax_optimization
+    GROUP BY chunk.user_id
+    ORDER BY 1, 6 DESC, 2
+""")
+
+# Bulk outbox write: the whole chunk's cards in one statement; rows already queued by
+# an earlier (crashed or repeated) run are skipped by the unique key
+INSERT_OUTBOX_SQL = text("""
+    INSERT INTO notification_outbox (campaign, campaign_date, user_id, rule_id, card, status, created_at)
+    SELECT CAST(:campaign AS VARCHAR), CAST(:campaign_date AS DATE), u, r, CAST(c AS JSON), 'PENDING', now() AT TIME ZONE 'utc'
+    FROM unnest(:user_ids, :rule_ids, :cards) AS x(u, r, c)
+    ON CONFLICT ON CONSTRAINT uq_notification_outbox_campaign_user_rule DO NOTHING
+""").bindparams(
+    bindparam("user_ids", type_=ARRAY(Integer)),
+    bindparam("rule_ids", type_=ARRAY(String)),
+    bindparam("cards", type_=ARRAY(Text)),
+)
+
+SAVE_CHECKPOINT_SQL = text("""
+    INSERT INTO insight_campaign_checkpoints AS t
+        (campaign, campaign_date, stripe_start, stripe_end, last_user_id, users_scanned, cards_written, completed_at, updated_at)
+    VALUES (:campaign, :campaign_date, :stripe_start, :stripe_end, :last_user_id, :users_scanned, :cards_written,
+            CASE WHEN CAST(:completed AS BOOLEAN) THEN now() AT TIME ZONE 'utc' END, now() AT TIME ZONE 'utc')
+    ON CONFLICT (campaign, campaign_date, stripe_start) DO UPDATE
+    SET last_user_id = COALESCE(EXCLUDED.last_user_id, t.last_user_id),
+        users_scanned = t.users_scanned + EXCLUDED.users_scanned,
+        cards_written = t.cards_written + EXCLUDED.cards_written,
+        completed_at = EXCLUDED.completed_at,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+class CampaignChunkResult(NamedTuple):
+    users: int
+    cards_written: int
+    # Keyset cursor for the next chunk (None: the stripe is exhausted)
+    next_after_user_id: Optional[int]
+
+
+async def run_campaign_chunk(
+    db: AsyncSession,
+    rule_engine: InsightRuleEngine,
+    campaign: str,
+    campaign_date: date,
+    reporting_period: date,
+    stripe_start: int,
+    stripe_end: int,
+    after_user_id: int,
+    chunk_size: int,
+) -> CampaignChunkResult:
+    """
+    One keyset chunk of a campaign: reads the next `chunk_size` users of the stripe with
+    their buckets (one statement), evaluates the campaign's rules per user without
+    cooldowns (the outbox key dedups), and writes the cards and the stripe checkpoint
+    together. Caller commits.
+    """
+    period_start, fiscal_year_start = _period_bounds(reporting_period)
+    rows = (await db.execute(CAMPAIGN_BUCKETS_SQL, {
+        "after_user_id": after_user_id,
+        "user_id_end": stripe_end,
+        "chunk_size": chunk_size,
+        "period_start": period_start,
+        "fiscal_year_start": fiscal_year_start,
+        "variable_essential": SDSWeightClass.VARIABLE_ESSENTIAL.value,
+        "pure_discretionary": SDSWeightClass.PURE_DISCRETIONARY.value,
+        "tax_optimization": SDSWeightClass.TAX_OPTIMIZATION.value,
+        "tax_category": TAX_HEADROOM_CATEGORY,
+        "tax_limit": TAX_SAVING_ANNUAL_LIMIT,
+    })).all()
+
+    # 1. Rules per user (rows arrive grouped by user_id)
+    user_ids: List[int] = []
+    rule_ids: List[str] = []
+    cards: List[str] = []
+    users = 0
+    for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+        users += 1
+        buckets: List[Dict[str, Any]] = [
+            {
+                "category": row.category,
+                "spend": row.spend,
+                "baseline_threshold": row.baseline_threshold,
+                "leak_amount": row.leak_amount,
+                "sds_weight_class": row.sds_class,
+            }
+            for row in user_rows
+        ]
+        for card in await rule_engine.evaluate(user_id, buckets, apply_cooldowns=False):
+            user_ids.append(user_id)
+            rule_ids.append(card["rule_id"])
+            cards.append(json.dumps(card, default=str))
+
+    # 2. Outbox rows + checkpoint in the caller's transaction
+    cards_written = 0
+    if cards:
+        result = await db.execute(INSERT_OUTBOX_SQL, {
+            "campaign": campaign,
+            "campaign_date": campaign_date,
+            "user_ids": user_ids,
+            "rule_ids": rule_ids,
+            "cards": cards,
+        })
+        cards_written = result.rowcount
+
+    last_user_id = rows[-1].user_id if rows else None
+    exhausted = users < chunk_size
+    await db.execute(SAVE_CHECKPOINT_SQL, {
+        "campaign": campaign,
+        "campaign_date": campaign_date,
+        "stripe_start": stripe_start,
+        "stripe_end": stripe_end,
+        "last_user_id": last_user_id,
+        "users_scanned": users,
+        "cards_written": cards_written,
+        "completed": exhausted,
+    })
+    return CampaignChunkResult(users, cards_written, None if exhausted else last_user_id)
@@ -0,0 +1,145 @@
+# services/insight_cards.py
+
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.insight_card_set import InsightCardSet
+
+# Card fields that change on every evaluation and are not content
+VOLATILE_CARD_FIELDS = ("generated_at",)
+
+
+def _digest(value: Any) -> str:
+    """sha256 of the canonical JSON of `value` (Decimals/dates as their str)."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def json_safe_cards(cards: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cards as stored and served (Decimals in context_data become their str)."""
+    return json.loads(json.dumps(list(cards), default=str))
+
+
+def _card_content(card: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in card.items() if key not in VOLATILE_CARD_FIELDS}
+
+
+def input_fingerprint(rules_version: str, projected_reclaimable: Decimal, buckets: Sequence[Dict[str, Any]]) -> str:
+    """Everything the cards are derived from: unchanged fingerprint, unchanged cards."""
+    return _digest({"rules": rules_version, "projected_reclaimable": projected_reclaimable, "buckets": list(buckets)})
+
+
+def content_etag(projected_reclaimable: Decimal, buckets: Sequence[Dict[str, Any]], cards: Sequence[Dict[str, Any]]) -> str:
+    """
+    Entity tag of the recalculation response: the buckets and cards without timestamps,
+    so a rule reload or a re-evaluation that yields the same cards keeps the same tag.
+    """
+    return _digest({
+        "projected_reclaimable": projected_reclaimable,
+        "buckets": list(buckets),
+        "cards": [_card_content(card) for card in cards],
+    })
+
+
+def carry_over_generated_at(cards: List[Dict[str, Any]], previous: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cards whose content did not change keep their original generated_at (no client re-render)."""
+    first_seen = {_digest(_card_content(card)): card.get("generated_at") for card in previous}
+    result = []
+    for card in cards:
+        original = first_seen.get(_digest(_card_content(card)))
+        result.append({**card, "generated_at": original} if original else card)
+    return result
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match header against an (unquoted) etag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+# ----------------------------------------------------------------------
+# PERSISTENCE (one row per user and reporting period)
+# ----------------------------------------------------------------------
+async def load_card_set(db: AsyncSession, user_id: int, reporting_period: date) -> Optional[InsightCardSet]:
+    return (await db.execute(
+        select(InsightCardSet).where(
+            InsightCardSet.user_id == user_id,
+            InsightCardSet.reporting_period == reporting_period,
+        )
+    )).scalar_one_or_none()
+
+
+async def save_card_set(
+    db: AsyncSession,
+    user_id: int,
+    reporting_period: date,
+    fingerprint: str,
+    etag: str,
+    cards: List[Dict[str, Any]],
+    generated_at: datetime,
+):
+    """Upserts the period's card set (last writer wins between concurrent hooks). Caller commits."""
+    now = datetime.utcnow()
+    stmt = pg_insert(InsightCardSet).values(
+        user_id=user_id,
+        reporting_period=reporting_period,
+        input_fingerprint=fingerprint,
+        etag=etag,
+        cards=cards,
+        generated_at=generated_at,
+        updated_at=now,
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[InsightCardSet.user_id, InsightCardSet.reporting_period],
+        set_={
+            "input_fingerprint": stmt.excluded.input_fingerprint,
+            "etag": stmt.excluded.etag,
+            "cards": stmt.excluded.cards,
+            "generated_at": stmt.excluded.generated_at,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+# ----------------------------------------------------------------------
+# METRICS (per worker)
+# ----------------------------------------------------------------------
+class InsightCardMetrics:
+    def __init__(self):
+        self.requests = 0
+        # Fingerprint unchanged: stored cards served without evaluating the rules
+        self.fingerprint_hits = 0
+        # Rules evaluated, but the content (etag) came out unchanged
+        self.content_unchanged = 0
+        self.regenerated = 0
+        # Conditional requests answered with 304
+        self.not_modified = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "fingerprint_hits": self.fingerprint_hits,
+            "fingerprint_hit_rate": round(self.fingerprint_hits / self.requests, 4) if self.requests else 0.0,
+            "content_unchanged": self.content_unchanged,
+            "regenerated": self.regenerated,
+            "not_modified": self.not_modified,
+        }
+
+
+insight_card_metrics = InsightCardMetrics()
@@ -0,0 +1,421 @@
+# services/insight_rules.py
+
+import asyncio
+import hashlib
+import json
+import operator
+import os
+import string
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, localcontext
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .cache_backends import TTLLRUCache, build_shared_tier
+
+# --- RULE SOURCE CONFIGURATION (Environment) ---
+# JSON file with a list of rule specs (same shape as DEFAULT_INSIGHT_RULES); when unset
+# the built-in rules are used. The file is re-read when its mtime changes.
+INSIGHT_RULES_PATH = os.getenv("INSIGHT_RULES_PATH")
+INSIGHT_RULES_RELOAD_SECONDS = float(os.getenv("INSIGHT_RULES_RELOAD_SECONDS", "5"))
+INSIGHT_COOLDOWN_MAX_ENTRIES = int(os.getenv("INSIGHT_COOLDOWN_MAX_ENTRIES", "100000"))
+
+BUCKET_SCOPE = "bucket"
+SUMMARY_SCOPE = "summary"
+
+# Card sort order (TOP_ACTION first)
+PRIORITY_ORDER = {"TOP_ACTION": 0, "CRITICAL": 1, "HIGH": 2, "MEDIUM": 3, "LOW": 4}
+
+# ----------------------------------------------------------------------
+# BUILT-IN RULES (the former InsightService if/elif chain)
+# ----------------------------------------------------------------------
+# Spec fields:
+#   id, scope ("bucket": once per leakage bucket, "summary": once per evaluation)
+#   categories / sds_classes: bucket match keys (omitted = any)
+#   when: [[field, op, value], ...], all must hold
+#   group: within a bucket, only the first matching rule (by order) of a group fires
+#   priority, title, body, call_to_action: card fields ({field} placeholders)
+#   context: card context_data key -> field, context_constants: literal context values
+#   cooldown_seconds: suppresses the rule for the same user + category after it fired
+DEFAULT_INSIGHT_RULES: List[Dict[str, Any]] = [
+    {
+        "id": "discretionary_leak_alert",
+        "categories": ["Pure_Discretionary_DiningOut", "Pure_Discretionary_Subscription"],
+        "when": [["leak_amount", ">", "100.00"]],
+        "group": "category_insight",
+        "priority": "HIGH",
+        "title": "🚨 **{category_label} Leak Alert**",
+        "body": "You've already spent **₹{spend}** in this discretionary area, resulting in a **₹{leak_amount}** leak. This entire amount is immediately available for your goals!",
+        "call_to_action": "REDIRECT TO GOAL",
+        "context": {"source_category": "category", "leak_value": "leak_amount"},
+    },
+    {
+        "id": "variable_essential_dmb_breach",
+        "sds_classes": ["Variable_Essential"],
+        "when": [["leak_amount", ">", "100.00"], ["baseline_threshold", ">", "0.00"], ["leak_ratio", ">=", "0.30"]],
+        "group": "category_insight",
+        "priority": "MEDIUM",
+        "title": "⚠️ **{category} DMB Breach!**",
+        "body": "Your essential variable spend exceeded the EFS-Scaled target by **{leak_percent}%**. This is a potential pattern leak.",
+        "call_to_action": "VIEW ANALYTICS",
+        "context": {"source_category": "category", "baseline_breach": "leak_ratio"},
+    },
+    {
+        "id": "tax_saving_headroom",
+        "categories": ["Tax Optimization Headroom (Annual)"],
+        "when": [["leak_amount", ">", "100.00"]],
+        "group": "category_insight",
+        "priority": "CRITICAL",
+        "title": "💰 **Tax Saving Headroom Available**",
+        "body": "You have **₹{leak_amount}** of tax-saving capacity remaining this fiscal year. This is the #1 priority for your reclaimed salary!",
+        "call_to_action": "VIEW TAX PLAN",
+        "context": {"source_category": "category", "tax_headroom": "leak_amount"},
+    },
+    {
+        "id": "autopilot_fund_ready",
+        "scope": SUMMARY_SCOPE,
+        "when": [["total_reclaimable", ">=", "1000.00"]],
+        "priority": "TOP_ACTION",
+        "title": "✨ **Salary Autopilot Fund Ready**",
+        "body": "Your reclaimable salary so far this month (month-to-date leakage) is **₹{total_reclaimable}**. Tap to execute the tax-optimized goal transfer plan.",
+        "call_to_action": "EXECUTE AUTOPILOT PLAN",
+        "context": {"total_reclaimable": "total_reclaimable"},
+    },
+    {
+        "id": "financial_flow_achieved",
+        "scope": SUMMARY_SCOPE,
+        "when": [["insight_count", "==", "0"]],
+        "priority": "LOW",
+        "title": "✅ **Financial Flow Achieved**",
+        "body": "You are currently within your Dynamic Minimal Baseline (EFS-Scaled targets). Maintain this effortless flow!",
+        "call_to_action": "VIEW DMB STATUS",
+        "context_constants": {"status": "IN_FLOW"},
+    },
+]
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+}
+_FIELDS = {
+    BUCKET_SCOPE: {"category", "category_label", "sds_class", "spend", "baseline_threshold", "leak_amount",
+                   "projected_spend", "projected_leak_amount", "leak_ratio", "leak_percent"},
+    SUMMARY_SCOPE: {"total_reclaimable", "insight_count"},
+}
+_BUCKET_AMOUNTS = ("spend", "baseline_threshold", "leak_amount", "projected_spend", "projected_leak_amount")
+# Fields usable in `when` (compared against Decimal thresholds)
+_NUMERIC_FIELDS = set(_BUCKET_AMOUNTS) | {"leak_ratio", "leak_percent", "total_reclaimable", "insight_count"}
+_CATEGORY_PREFIXES = ("Pure_Discretionary_", "Variable_Essential_", "Fixed_Essential_")
+# SDSWeightClass.TAX_OPTIMIZATION (the engine stays importable without the db package)
+_TAX_OPTIMIZATION = "Tax_Optimization"
+_CENTS = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class InsightRule:
+    """A compiled rule: predicates parsed once, templates validated once."""
+    id: str
+    order: int
+    scope: str
+    group: Optional[str]
+    conditions: Tuple[Tuple[str, Callable[[Any, Any], bool], Decimal], ...]
+    priority: str
+    title: str
+    body: str
+    call_to_action: str
+    context: Tuple[Tuple[str, str], ...]
+    context_constants: Tuple[Tuple[str, Any], ...]
+    cooldown_seconds: float
+
+    def matches(self, values: Dict[str, Any]) -> bool:
+        for field, compare, threshold in self.conditions:
+            value = values.get(field)
+            if value is None or not compare(value, threshold):
+                return False
+        return True
+
+    def card(self, values: Dict[str, Any], generated_at: str) -> Dict[str, Any]:
+        context_data = {key: values.get(field) for key, field in self.context}
+        context_data.update(self.context_constants)
+        return {
+            "priority": self.priority,
+            "title": self.title.format_map(values),
+            "body": self.body.format_map(values),
+            "call_to_action": self.call_to_action,
+            "context_data": context_data,
+            "generated_at": generated_at,
+            "rule_id": self.id,
+        }
+
+
+def _compile_rule(spec: Dict[str, Any], order: int) -> InsightRule:
+    rule_id = str(spec["id"])
+    scope = spec.get("scope", BUCKET_SCOPE)
+    if scope not in _FIELDS:
+        raise ValueError(f"Insight rule {rule_id}: unknown scope {scope!r}")
+    fields = _FIELDS[scope]
+
+    conditions = []
+    for field, op, value in spec.get("when", []):
+        if field not in fields or field not in _NUMERIC_FIELDS or op not in _OPERATORS:
+            raise ValueError(f"Insight rule {rule_id}: invalid condition {field!r} {op!r}")
+        conditions.append((field, _OPERATORS[op], Decimal(str(value))))
+
+    for template in (spec["title"], spec["body"]):
+        for _, placeholder, _, _ in string.Formatter().parse(template):
+            if placeholder is not None and placeholder not in fields:
+                raise ValueError(f"Insight rule {rule_id}: unknown placeholder {{{placeholder}}}")
+    context = tuple((key, field) for key, field in spec.get("context", {}).items())
+    if any(field not in fields for _, field in context):
+        raise ValueError(f"Insight rule {rule_id}: unknown context field")
+
+    return InsightRule(
+        id=rule_id,
+        order=int(spec.get("order", order)),
+        scope=scope,
+        group=spec.get("group"),
+        conditions=tuple(conditions),
+        priority=spec["priority"],
+        title=spec["title"],
+        body=spec["body"],
+        call_to_action=spec["call_to_action"],
+        context=context,
+        context_constants=tuple(spec.get("context_constants", {}).items()),
+        cooldown_seconds=float(spec.get("cooldown_seconds", 0)),
+    )
+
+
+class CompiledRuleSet:
+    """
+    Rules indexed by (category, sds_class) match keys, with None as the wildcard. A
+    bucket's candidate list (the union of its four keys, in rule order) is built on first
+    use and memoized, so per-bucket cost depends on its matching rules, not on the total.
+    """
+
+    MAX_MEMOIZED_KEYS = 10000
+
+    def __init__(self, specs: Sequence[Dict[str, Any]], source: str):
+        compiled = sorted(
+            ((_compile_rule(spec, order), spec) for order, spec in enumerate(specs)),
+            key=lambda pair: pair[0].order,
+        )
+        if len({rule.id for rule, _ in compiled}) != len(compiled):
+            raise ValueError("Insight rule ids must be unique")
+
+        self.source = source
+        self.specs = list(specs)
+        # Content hash of the specs: changes on any rule edit (part of the card fingerprint)
+        self.version = hashlib.sha256(json.dumps(list(specs), sort_keys=True, default=str).encode()).hexdigest()[:16]
+        self.rule_count = len(compiled)
+        self.summary_rules = [rule for rule, _ in compiled if rule.scope == SUMMARY_SCOPE]
+        self._index: Dict[Tuple[Optional[str], Optional[str]], List[InsightRule]] = {}
+        for rule, spec in compiled:
+            if rule.scope != BUCKET_SCOPE:
+                continue
+            for category in spec.get("categories") or [None]:
+                for sds_class in spec.get("sds_classes") or [None]:
+                    self._index.setdefault((category, sds_class), []).append(rule)
+        self._candidates: Dict[Tuple[str, str], List[InsightRule]] = {}
+        self._lock = threading.Lock()
+
+    def subset(self, rule_ids: Sequence[str]) -> "CompiledRuleSet":
+        """A rule set with only the given rules (e.g. the rules of one campaign)."""
+        unknown = set(rule_ids) - {spec["id"] for spec in self.specs}
+        if unknown:
+            raise ValueError(f"Unknown insight rule ids: {sorted(unknown)}")
+        return CompiledRuleSet([spec for spec in self.specs if spec["id"] in set(rule_ids)], f"{self.source} (subset)")
+
+    def candidates(self, category: str, sds_class: str) -> List[InsightRule]:
+        key = (category, sds_class)
+        cached = self._candidates.get(key)
+        if cached is not None:
+            return cached
+
+        merged = {}
+        for index_key in (key, (category, None), (None, sds_class), (None, None)):
+            for rule in self._index.get(index_key, ()):
+                merged[rule.id] = rule
+        result = sorted(merged.values(), key=lambda rule: rule.order)
+        with self._lock:
+            if len(self._candidates) >= self.MAX_MEMOIZED_KEYS:
+                self._candidates.clear()
+            self._candidates[key] = result
+        return result
+
+
+def _bucket_values(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """Predicate/template values of one leakage bucket (run under an exact Decimal context)."""
+    category = bucket.get("category") or ""
+    values: Dict[str, Any] = {"category": category, "sds_class": bucket.get("sds_weight_class")}
+    for field in _BUCKET_AMOUNTS:
+        raw = bucket.get(field)
+        values[field] = Decimal(str(raw)).quantize(_CENTS) if raw is not None else None
+    if values["projected_spend"] is None:
+        values["projected_spend"], values["projected_leak_amount"] = values["spend"], values["leak_amount"]
+
+    label = category
+    for prefix in _CATEGORY_PREFIXES:
+        if label.startswith(prefix):
+            label = label[len(prefix):]
+            break
+    values["category_label"] = label
+
+    baseline, leak = values["baseline_threshold"], values["leak_amount"]
+    values["leak_ratio"] = leak / baseline if baseline and leak is not None else None
+    values["leak_percent"] = int(values["leak_ratio"] * 100) if values["leak_ratio"] is not None else None
+    return values
+
+
+# ----------------------------------------------------------------------
+# ENGINE (process-wide, hot-reloadable)
+# ----------------------------------------------------------------------
+class InsightRuleEngine:
+    """
+    Evaluates leakage buckets against the compiled rule set in one pass. The rule set is
+    swapped atomically on reload (file mtime polled at most every
+    INSIGHT_RULES_RELOAD_SECONDS, or reload() from /ops); a bad file keeps the previous
+    set. The poll runs in a worker thread that evaluate() does not wait for, so no file
+    I/O happens on the request path. Cooldowns live in a bounded local TTL cache plus
+    the optional shared tier.
+    """
+
+    def __init__(self, path: Optional[str] = INSIGHT_RULES_PATH, reload_seconds: float = INSIGHT_RULES_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.rules = CompiledRuleSet(DEFAULT_INSIGHT_RULES, "built-in")
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._reload_check: Optional[asyncio.Task] = None
+        self._reload_lock = threading.Lock()
+        self.cooldowns = TTLLRUCache(INSIGHT_COOLDOWN_MAX_ENTRIES, 24 * 60 * 60)
+        self.shared_cooldowns = build_shared_tier("insight_cooldown")
+
+        # --- Counters (per worker) ---
+        self.evaluations = 0
+        self.buckets_evaluated = 0
+        self.rules_checked = 0
+        self.cards_generated = 0
+        self.cooldown_suppressed = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload_error: Optional[str] = None
+
+        if self.path:
+            self.reload()
+
+    def reload(self) -> bool:
+        """Re-reads and recompiles the rule file; returns False (keeping the old set) on error."""
+        if not self.path:
+            return False
+        with self._reload_lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+                with open(self.path, encoding="utf-8") as f:
+                    rules = CompiledRuleSet(json.load(f), self.path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.reload_errors += 1
+                self.last_reload_error = str(e)
+                print(f"Warning: insight rules not reloaded from {self.path}: {e}")
+                return False
+            self.rules, self._mtime = rules, mtime
+            self.reloads += 1
+            self.last_reload_error = None
+            return True
+
+    def _maybe_reload(self):
+        """Starts the background mtime check when due; the caller evaluates the current set."""
+        now = time.monotonic()
+        if not self.path or now < self._next_check or self._reload_check is not None:
+            return
+        self._next_check = now + self.reload_seconds
+        self._reload_check = asyncio.get_running_loop().create_task(asyncio.to_thread(self._reload_if_changed))
+        self._reload_check.add_done_callback(self._reload_check_done)
+
+    def _reload_if_changed(self) -> bool:
+        """Runs in a worker thread (stat + read + compile), guarded by the reload lock."""
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return False
+        return self.reload() if changed else False
+
+    def _reload_check_done(self, task: asyncio.Task):
+        self._reload_check = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Warning: insight rules reload check failed: {task.exception()!r}")
+
+    async def _cooling_down(self, user_id: int, rule: InsightRule, category: str) -> bool:
+        if rule.cooldown_seconds <= 0:
+            return False
+        key = f"{user_id}:{rule.id}:{category}"
+        if self.cooldowns.get(key) is not None or (self.shared_cooldowns is not None and await self.shared_cooldowns.get(key) is not None):
+            self.cooldown_suppressed += 1
+            return True
+        self.cooldowns.set(key, True, rule.cooldown_seconds)
+        if self.shared_cooldowns is not None:
+            await self.shared_cooldowns.set(key, "1", rule.cooldown_seconds)
+        return False
+
+    async def evaluate(self, user_id: int, buckets: Sequence[Dict[str, Any]], apply_cooldowns: bool = True) -> List[Dict[str, Any]]:
+        """
+        Insight cards for the buckets, sorted by PRIORITY_ORDER. Batch callers with their
+        own dedup (the campaign outbox) pass apply_cooldowns=False.
+        """
+        self._maybe_reload()
+        rules = self.rules
+        generated_at = datetime.utcnow().isoformat()
+        cards: List[Dict[str, Any]] = []
+        self.evaluations += 1
+
+        with localcontext() as ctx:
+            ctx.prec = 28
+            reclaimable = Decimal("0.00")
+            for bucket in buckets:
+                values = _bucket_values(bucket)
+                # The tax headroom is capacity to fill, not reclaimable leakage (as LEAKAGE_SQL totals)
+                if values["sds_class"] != _TAX_OPTIMIZATION:
+                    reclaimable += values["leak_amount"] or Decimal("0.00")
+                self.buckets_evaluated += 1
+
+                fired_groups = set()
+                for rule in rules.candidates(values["category"], values["sds_class"]):
+                    if rule.group is not None and rule.group in fired_groups:
+                        continue
+                    self.rules_checked += 1
+                    if not rule.matches(values):
+                        continue
+                    if rule.group is not None:
+                        fired_groups.add(rule.group)
+                    if not apply_cooldowns or not await self._cooling_down(user_id, rule, values["category"]):
+                        cards.append(rule.card(values, generated_at))
+
+            summary = {"total_reclaimable": reclaimable.quantize(_CENTS)}
+            for rule in rules.summary_rules:
+                summary["insight_count"] = Decimal(len(cards))
+                self.rules_checked += 1
+                if rule.matches(summary) and (not apply_cooldowns or not await self._cooling_down(user_id, rule, "")):
+                    cards.append(rule.card(summary, generated_at))
+
+        self.cards_generated += len(cards)
+        return sorted(cards, key=lambda card: PRIORITY_ORDER.get(card["priority"], 99))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.rules.source,
+            "version": self.rules.version,
+            "rules": self.rules.rule_count,
+            "evaluations": self.evaluations,
+            "buckets_evaluated": self.buckets_evaluated,
+            "rules_checked": self.rules_checked,
+            "cards_generated": self.cards_generated,
+            "cooldown_suppressed": self.cooldown_suppressed,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_reload_error": self.last_reload_error,
+            "cooldowns": self.cooldowns.stats(),
+        }
+
+
+# Process-wide engine used by InsightService
+insight_rule_engine = InsightRuleEngine()
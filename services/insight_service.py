@@ -11,6 +11,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 # NOTE: The User model import path is speculative, replace with your actual path if different
 # from ..db.base import User # Removed, as it's not strictly needed here
 
+# Insight rules (former if/elif chain) and the process-wide engine evaluating them
+from .insight_rules import insight_rule_engine
+# Persisted card sets (fingerprint dedup, etags)
+from .insight_cards import (
+    carry_over_generated_at,
+    content_etag,
+    input_fingerprint,
+    insight_card_metrics,
+    json_safe_cards,
+    load_card_set,
+    save_card_set,
+)
+
 class InsightService:
     """
     Service class responsible for generating actionable, proactive insights 
@@ -21,99 +34,54 @@ class InsightService:
     def __init__(self, db: AsyncSession, user_id: int):
         self.db = db
         self.user_id = user_id
-        # Define categories that trigger high-priority behavioral nudges
-        self.HIGH_PRIORITY_CATEGORIES = ["Pure_Discretionary_DiningOut", "Pure_Discretionary_Subscription"] 
-        self.DMB_BREACH_THRESHOLD = Decimal("0.30") # 30% above DMB triggers a strong warning
-
-    def create_insight_card(self, priority: str, title: str, body: str, call_to_action: str, context_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Helper to structure the insight card consistently."""
-        return {
-            "priority": priority,
-            "title": title,
-            "body": body,
-            "call_to_action": call_to_action,
-            "context_data": context_data,
-            "generated_at": datetime.utcnow().isoformat()
-        }
 
-    # 🌟 FIX: Make the function async for consistency, though it has no await calls
     async def generate_proactive_leak_insights(self, reporting_period: date, category_leaks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Analyzes the detailed leakage buckets and generates specific, actionable insight cards.
-        """
-        insights = []
-        
-        # 1. Calculate the overall projected reclaimable salary
-        reclaimable_salary = Decimal("0.00")
-        for bucket in category_leaks:
-             reclaimable_salary += bucket.get('leak_amount', Decimal("0.00"))
-
 
-        # 2. Iterate through each leakage bucket to generate category-specific insights
-        for bucket in category_leaks:
-            category = bucket.get('category')
-            # Ensure Decimal conversion from possible string/float input from the caller
-            leak_amount = Decimal(str(bucket.get('leak_amount', "0.00"))).quantize(Decimal("0.01"))
-            baseline = Decimal(str(bucket.get('baseline_threshold', "0.00")))
-            sds_class = bucket.get('sds_weight_class')
-            spend = Decimal(str(bucket.get('spend', "0.00")))
-
-            if leak_amount <= Decimal("100.00"): # Ignore trivial leaks
-                continue
+        The insight types are declarative rules (services/insight_rules.py, optionally
+        loaded from INSIGHT_RULES_PATH and hot-reloaded), compiled once into an index by
+        category and SDS class; each bucket is checked against its matching rules only.
+        """
+        return await insight_rule_engine.evaluate(self.user_id, category_leaks or [])
 
-            # --- INSIGHT TYPE A: HIGH-IMPACT DISCRETIONARY LEAK (Highest priority nudge) ---
-            if category in self.HIGH_PRIORITY_CATEGORIES:
-                insights.append(self.create_insight_card(
-                    priority="HIGH",
-                    title=f"🚨 **{category.replace('Pure_Discretionary_', '')} Leak Alert**",
-                    body=f"You've already spent **₹{spend.quantize(Decimal('0.01'))}** in this discretionary area, resulting in a **₹{leak_amount}** leak. This entire amount is immediately available for your goals!",
-                    call_to_action="REDIRECT TO GOAL",
-                    context_data={"source_category": category, "leak_value": leak_amount}
-                ))
+    async def get_insight_cards(
+        self,
+        reporting_period: date,
+        projected_reclaimable: Decimal,
+        category_leaks: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        The period's insight cards, persisted per user and period. While the input
+        fingerprint (rule-set version + leakage buckets) matches the stored one, the
+        stored cards are returned as they are, original generated_at included; otherwise
+        the rules are re-evaluated and the set is upserted. Cards whose content did not
+        change keep their generated_at, and the etag only moves when the content does.
 
-            # --- INSIGHT TYPE B: VARIABLE ESSENTIAL (VE) DMB BREACH WARNING ---
-            elif sds_class in ["Variable_Essential"] and baseline > Decimal("0.00"):
-                percentage_over_baseline = leak_amount / baseline  
-                
-                if percentage_over_baseline >= self.DMB_BREACH_THRESHOLD:
-                    insights.append(self.create_insight_card(
-                        priority="MEDIUM",
-                        title=f"⚠️ **{category} DMB Breach!**",
-                        body=f"Your essential variable spend exceeded the EFS-Scaled target by **{int(percentage_over_baseline * 100)}%**. This is a potential pattern leak.",
-                        call_to_action="VIEW ANALYTICS",
-                        context_data={"source_category": category, "baseline_breach": percentage_over_baseline}
-                    ))
+        Returns {"cards", "etag", "generated_at"}. The caller's session commits.
+        """
+        insight_card_metrics.requests += 1
+        buckets = category_leaks or []
+        fingerprint = input_fingerprint(insight_rule_engine.rules.version, projected_reclaimable, buckets)
 
-            # --- INSIGHT TYPE C: TAX OPTIMIZATION OPPORTUNITY (Salary Maximizer) ---
-            elif category == "Tax Optimization Headroom (Annual)":
-                insights.append(self.create_insight_card(
-                    priority="CRITICAL",
-                    title="💰 **Tax Saving Headroom Available**",
-                    body=f"You have **₹{leak_amount}** of tax-saving capacity remaining this fiscal year. This is the #1 priority for your reclaimed salary!",
-                    call_to_action="VIEW TAX PLAN",
-                    context_data={"source_category": category, "tax_headroom": leak_amount}
-                ))
+        # 1. Unchanged inputs: serve the stored set
+        stored = await load_card_set(self.db, self.user_id, reporting_period)
+        if stored is not None and stored.input_fingerprint == fingerprint:
+            insight_card_metrics.fingerprint_hits += 1
+            return {"cards": stored.cards, "etag": stored.etag, "generated_at": stored.generated_at}
 
-        # 3. Add the overall conversion/goal suggestion (highest visibility card)
-        if reclaimable_salary >= Decimal("1000.00"):
-             insights.append(self.create_insight_card(
-                priority="TOP_ACTION", # Custom high priority to ensure it's first
-                title="✨ **Salary Autopilot Fund Ready**",
-                body=f"Your total projected reclaimable salary this month is **₹{reclaimable_salary.quantize(Decimal('0.01'))}**. Tap to execute the tax-optimized goal transfer plan.",
-                call_to_action="EXECUTE AUTOPILOT PLAN",
-                context_data={"total_reclaimable": reclaimable_salary}
-            ))
-        
-        # 4. Fallback if no specific issues are detected
-        if not insights:
-             insights.append(self.create_insight_card(
-                priority="LOW",
-                title="✅ **Financial Flow Achieved**",
-                body="You are currently within your Dynamic Minimal Baseline (EFS-Scaled targets). Maintain this effortless flow!",
-                call_to_action="VIEW DMB STATUS",
-                context_data={"status": "IN_FLOW"}
-            ))
+        # 2. Re-evaluate; unchanged content keeps the stored cards and timestamp
+        cards = json_safe_cards(await self.generate_proactive_leak_insights(reporting_period, category_leaks=buckets))
+        etag = content_etag(projected_reclaimable, buckets, cards)
+        if stored is not None and stored.etag == etag:
+            insight_card_metrics.content_unchanged += 1
+            cards, generated_at = stored.cards, stored.generated_at
+        else:
+            insight_card_metrics.regenerated += 1
+            if stored is not None:
+                cards = carry_over_generated_at(cards, stored.cards)
+            generated_at = datetime.utcnow()
 
-        # Sort the insights for presentation (e.g., Top Action first, then Critical, High, Medium, Low)
-        priority_map = {"TOP_ACTION": 0, "CRITICAL": 1, "HIGH": 2, "MEDIUM": 3, "LOW": 4}
-        return sorted(insights, key=lambda x: priority_map.get(x['priority'], 99))
+        # 3. Persist (the fingerprint always, so the next identical hook is a hit)
+        await save_card_set(self.db, self.user_id, reporting_period, fingerprint, etag, cards, generated_at)
+        return {"cards": cards, "etag": etag, "generated_at": generated_at}
@@ -0,0 +1,124 @@
+# services/leakage_cache.py
+
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from .cache_backends import TTLLRUCache, build_shared_tier
+
+# --- CACHE CONFIGURATION (Environment) ---
+LEAKAGE_CACHE_MAX_ENTRIES = int(os.getenv("LEAKAGE_CACHE_MAX_ENTRIES", "20000"))
+# Entries can never be stale (see LeakageCache); the TTL only reclaims memory/Redis space
+LEAKAGE_CACHE_TTL_SECONDS = float(os.getenv("LEAKAGE_CACHE_TTL_SECONDS", str(60 * 60)))
+
+# Bump when the leakage computation or result shape changes, so workers running the
+# new code never read entries written by the old one from the shared tier
+LEAKAGE_RESULT_SCHEMA = "2"
+
+_DECIMAL_FIELDS = ("spend", "baseline_threshold", "leak_amount", "projected_spend", "projected_leak_amount")
+_DECIMAL_TOTALS = ("total_leakage_amount", "projected_reclaimable_salary")
+
+
+class LeakageStateVersion:
+    """
+    Everything the leakage result of (user, period) depends on, as versions read from
+    the database: the FinancialProfile version (bumped on every DMB recalculation), the
+    user's CategoryTotalsVersion (bumped in commit order on every transaction insert,
+    override or delete, in any month), the period's SalaryAllocationProfile id,
+    and for the month-end projection the elapsed day of the month and the time the
+    user's spend curves were last rebuilt.
+    """
+
+    __slots__ = ("profile_version", "totals_watermark", "salary_profile_id", "elapsed_days", "curves_computed_at")
+
+    def __init__(
+        self,
+        profile_version: Optional[int],
+        totals_watermark: Optional[int],
+        salary_profile_id: Optional[int],
+        elapsed_days: int = 0,
+        curves_computed_at: Optional[datetime] = None,
+    ):
+        self.profile_version = profile_version
+        self.totals_watermark = totals_watermark
+        self.salary_profile_id = salary_profile_id
+        self.elapsed_days = elapsed_days
+        self.curves_computed_at = curves_computed_at
+
+    def cache_key(self, user_id: int, reporting_period: date) -> str:
+        curves = self.curves_computed_at.isoformat() if self.curves_computed_at else None
+        return (
+            f"{LEAKAGE_RESULT_SCHEMA}:{user_id}:{reporting_period.isoformat()}:"
+            f"{self.profile_version}:{self.totals_watermark}:{self.salary_profile_id}:"
+            f"{self.elapsed_days}:{curves}"
+        )
+
+
+class LeakageCache:
+    """
+    Per-user per-period leakage results, keyed by the versions of their inputs.
+
+    There is no invalidation message to lose: a new transaction, a manual override or a
+    DMB recalculation changes the version key, so the next lookup misses and recomputes,
+    and the superseded entry ages out through LRU eviction / TTL. Two tiers, like the
+    merchant cache: a bounded in-process LRU and an optional shared Redis tier.
+    """
+
+    def __init__(self, max_entries: int = LEAKAGE_CACHE_MAX_ENTRIES, ttl_seconds: float = LEAKAGE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLLRUCache(max_entries, ttl_seconds)
+        self.shared = build_shared_tier("leakage")
+
+        # --- Counters (per worker) ---
+        self.lookups = 0
+        self.hits = 0
+        self.computations = 0
+
+    @staticmethod
+    def _encode(result: Dict[str, Any]) -> str:
+        return json.dumps(result, default=str)
+
+    @staticmethod
+    def _decode(value: str) -> Dict[str, Any]:
+        result = json.loads(value)
+        for field in _DECIMAL_TOTALS:
+            result[field] = Decimal(result[field])
+        for bucket in result["leakage_buckets"]:
+            for field in _DECIMAL_FIELDS:
+                bucket[field] = Decimal(bucket[field])
+        return result
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self.lookups += 1
+        cached = self.local.get(key)
+        if cached is None and self.shared is not None:
+            shared_value = await self.shared.get(key)
+            if shared_value is not None:
+                cached = self._decode(shared_value)
+                # Promote into the local tier for the next lookup
+                self.local.set(key, cached)
+        if cached is not None:
+            self.hits += 1
+        return cached
+
+    async def put(self, key: str, result: Dict[str, Any]):
+        self.computations += 1
+        self.local.set(key, result)
+        if self.shared is not None:
+            await self.shared.set(key, self._encode(result), self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "computations": self.computations,
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+# Process-wide cache used by LeakageService.get_leakage
+leakage_cache = LeakageCache()
@@ -1,17 +1,375 @@
-# services/leakage_service.py (ASYNC STUB VERSION)
+# services/leakage_service.py (ASYNC SET-BASED VERSION)
 
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Any, List
-from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 
 # 🌟 FIX: Import AsyncSession
-from sqlalchemy.ext.asyncio import AsyncSession 
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+# --- ENUM IMPORTS ---
+# LEAKAGE_SQL reads category_period_totals + spend_projection_curves + financial_profiles and writes salary_allocation_profiles
+from ..db.enums import SDSWeightClass
+from .leakage_cache import leakage_cache, LeakageStateVersion
+from .spend_projection import projection_day, PROJECTION_MIN_SHARE, PROJECTION_FULL_WEIGHT_MONTHS
+
+# --- LEAKAGE CONSTANTS ---
+TAX_HEADROOM_CATEGORY = "Tax Optimization Headroom (Annual)"
+# Section 80C annual deduction limit (the tax-optimization 'baseline')
+TAX_SAVING_ANNUAL_LIMIT = Decimal("150000.00")
+# Indian fiscal year starts in April
+FISCAL_YEAR_START_MONTH = 4
+
+# ----------------------------------------------------------------------
+# THE LEAKAGE ENGINE (one statement, one round trip)
+# ----------------------------------------------------------------------
+# 1. month_spend:  MTD spend per (category, sds_class), read from the running totals in
+#                  category_period_totals (O(categories), no month rescan). Fixed essentials
+#                  are non-leakage and income credits are not spend, so both are excluded.
+# 2. projected:    month-end spend per category: the run rate (MTD * days / elapsed days)
+#                  blended with the seasonal estimate MTD / (typical share of the month
+#                  spent by this day, from the nightly spend_projection_curves), weighted
+#                  by how many months back the curve. Never below MTD; a fully elapsed
+#                  month projects to its actual spend.
+# 3. thresholds:   joins the per-category DMB thresholds. The DMB (essential_target) is a
+#                  pooled target for ALL variable essentials, so each VE category gets its
+#                  pro-rata share of it; discretionary categories have a zero baseline
+#                  (all of it is reclaimable). Without a FinancialProfile a VE category's
+#                  baseline is its own spend (no leak can be claimed). Computed for both
+#                  the MTD and the projected spend.
+# 4. buckets:      spend / baseline / leak per bucket, plus the remaining annual 80C
+#                  headroom (fiscal YTD tax-optimization spend, summed over the monthly
+#                  totals) as its own bucket.
+# 5. saved:        writes the (MTD) buckets + totals into the period's SalaryAllocationProfile
+#                  and bumps its version; a profile that already holds them is left untouched.
+# Totals are summed in SQL too: ml/scaling_logic lowers the process-wide Decimal precision.
+LEAKAGE_SQL = text(r"""
+    WITH profile AS (
+        SELECT essential_target FROM financial_profiles WHERE user_id = :user_id
+    ),
+    month_spend AS (
+        SELECT category, sds_class, spend
+        FROM category_period_totals
+        WHERE user_id = :user_id
+          AND period = :period_start
+          AND txn_count > 0
+          AND sds_class IN (:variable_essential, :pure_discretionary)
+          AND category NOT LIKE 'Income\_%'
+    ),
+    projected AS (
+        SELECT category, sds_class, spend,
+               CASE
+                   WHEN CAST(:elapsed_days AS INTEGER) = 0 OR CAST(:elapsed_days AS INTEGER) >= CAST(:days_in_month AS INTEGER)
+                       THEN spend
+                   ELSE GREATEST(spend, ROUND((1 - weight) * run_rate + weight * COALESCE(seasonal, run_rate), 2))
+               END AS projected_spend
+        FROM (
+            SELECT m.category, m.sds_class, m.spend,
+                   m.spend * CAST(:days_in_month AS NUMERIC) / NULLIF(CAST(:elapsed_days AS NUMERIC), 0) AS run_rate,
+                   m.spend / CASE WHEN share.value >= CAST(:min_share AS NUMERIC) THEN share.value END AS seasonal,
+                   LEAST(COALESCE(c.history_months, 0) / CAST(:full_weight_months AS NUMERIC), 1) AS weight
+            FROM month_spend m
+            LEFT JOIN spend_projection_curves c
+                   ON c.user_id = :user_id AND c.category = m.category AND c.sds_class = m.sds_class
+            CROSS JOIN LATERAL (
+                SELECT CAST(c.cumulative_share ->> (CAST(:elapsed_days AS INTEGER) - 1) AS NUMERIC) AS value
+            ) share
+        ) p
+    ),
+    thresholds AS (
+        SELECT m.category, m.sds_class, m.spend, m.projected_spend,
+               CASE
+                   WHEN m.sds_class = :variable_essential THEN COALESCE(
+                       ROUND(p.essential_target * m.spend
+                             / NULLIF(SUM(CASE WHEN m.sds_class = :variable_essential THEN m.spend END) OVER (), 0), 2),
+                       m.spend)
+                   ELSE 0
+               END AS baseline_threshold,
+               CASE
+                   WHEN m.sds_class = :variable_essential THEN COALESCE(
+                       ROUND(p.essential_target * m.projected_spend
+                             / NULLIF(SUM(CASE WHEN m.sds_class = :variable_essential THEN m.projected_spend END) OVER (), 0), 2),
+                       m.projected_spend)
+                   ELSE 0
+               END AS projected_baseline
+        FROM projected m
+        LEFT JOIN profile p ON TRUE
+    ),
+    buckets AS (
+        SELECT category, sds_class, spend, baseline_threshold,
+               GREATEST(spend - baseline_threshold, 0) AS leak_amount,
+               projected_spend,
+               GREATEST(projected_spend - projected_baseline, 0) AS projected_leak_amount
+        FROM thresholds
+        UNION ALL
+        SELECT CAST(:tax_category AS VARCHAR), CAST(:tax_optimization AS VARCHAR), ytd.spend, CAST(:tax_limit AS NUMERIC),
+               GREATEST(CAST(:tax_limit AS NUMERIC) - ytd.spend, 0),
+               ytd.spend, GREATEST(CAST(:tax_limit AS NUMERIC) - ytd.spend, 0)
+        FROM (
+            SELECT COALESCE(SUM(spend), 0) AS spend
+            FROM category_period_totals
+            WHERE user_id = :user_id
+              AND period >= :fiscal_year_start AND period <= :period_start
+              AND sds_class = :tax_optimization
+        ) ytd
+    ),
+    totals AS (
+        -- The tax headroom is capacity to fill, not reclaimable leakage
+        SELECT COALESCE(SUM(leak_amount), 0) AS total,
+               COALESCE(SUM(projected_leak_amount), 0) AS projected_total
+        FROM buckets WHERE sds_class <> :tax_optimization
+    ),
+    new_profile AS (
+        SELECT (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'category', category,
+                    'spend', CAST(spend AS TEXT),
+                    'baseline_threshold', CAST(baseline_threshold AS TEXT),
+                    'leak_amount', CAST(leak_amount AS TEXT),
+                    'sds_weight_class', sds_class
+                ) ORDER BY leak_amount DESC, category), '[]'::json)
+                FROM buckets
+               ) AS leakage_buckets,
+               (SELECT total FROM totals) AS total_leakage_amount,
+               (SELECT COALESCE(SUM(spend), 0) FROM buckets WHERE sds_class = :variable_essential) AS variable_spend_total
+    ),
+    saved AS (
+        UPDATE salary_allocation_profiles s
+        SET leakage_buckets = n.leakage_buckets,
+            total_leakage_amount = n.total_leakage_amount,
+            variable_spend_total = n.variable_spend_total,
+            version = s.version + 1
+        FROM new_profile n
+        WHERE s.user_id = :user_id AND s.reporting_period = :reporting_period
+          -- Unchanged results are not rewritten: no row lock, no version bump for the CAS writers
+          AND (CAST(s.leakage_buckets AS JSONB), s.total_leakage_amount, s.variable_spend_total)
+              IS DISTINCT FROM (CAST(n.leakage_buckets AS JSONB), n.total_leakage_amount, n.variable_spend_total)
+        RETURNING s.id
+    )
+    SELECT category, sds_class, spend, baseline_threshold, leak_amount, projected_spend, projected_leak_amount,
+           (SELECT total FROM totals) AS total_leakage_amount,
+           (SELECT projected_total FROM totals) AS projected_reclaimable_salary,
+           (SELECT COUNT(*) FROM saved) AS profiles_updated
+    FROM buckets
+    ORDER BY leak_amount DESC, category
+""")
+
+
+# Versions of every input of LEAKAGE_SQL for (user, period): one indexed round trip
+# (PK prefix scans), much cheaper than the computation it guards.
+LEAKAGE_VERSION_SQL = text("""
+    SELECT
+        (SELECT version FROM financial_profiles WHERE user_id = :user_id) AS profile_version,
+        (SELECT version FROM category_totals_versions WHERE user_id = :user_id) AS totals_watermark,
+        (SELECT MIN(id) FROM salary_allocation_profiles
+         WHERE user_id = :user_id AND reporting_period = :reporting_period) AS salary_profile_id,
+        (SELECT MAX(computed_at) FROM spend_projection_curves WHERE user_id = :user_id) AS curves_computed_at
+""")
+
+
+# ----------------------------------------------------------------------
+# LEAKAGE HISTORY (a month range in one windowed statement)
+# ----------------------------------------------------------------------
+# The LEAKAGE_SQL rules per month of [:from_period, :to_period], read from the monthly
+# category_period_totals (O(months x categories) PK-prefix rows, however many transactions):
+# 1. grid:          every month x every category seen in the range (a missing month is a
+#                   zero, so LAG compares calendar-adjacent months). The month before
+#                   :from_period is included only to give the first month its deltas.
+# 2. deltas:        spend / baseline / leak per bucket and month-over-month deltas.
+# 3. month_totals:  per-month totals and their delta, plus the total frozen on the month's
+#                   SalaryAllocationProfile by the month-end job (null when not finalized).
+# Baselines use the current DMB (essential_target keeps no history); the annual tax
+# headroom bucket is not repeated per month. One JSON line per month, built in SQL.
+LEAKAGE_HISTORY_SQL = text(r"""
+    WITH months AS (
+        SELECT CAST(m AS DATE) AS period
+        FROM generate_series(CAST(:lag_period AS DATE), CAST(:to_period AS DATE), interval '1 month') AS m
+    ),
+    profile AS (
+        SELECT essential_target FROM financial_profiles WHERE user_id = :user_id
+    ),
+    month_spend AS (
+        SELECT period, category, sds_class, spend
+        FROM category_period_totals
+        WHERE user_id = :user_id
+          AND period >= :lag_period AND period <= :to_period
+          AND txn_count > 0
+          AND sds_class IN (:variable_essential, :pure_discretionary)
+          AND category NOT LIKE 'Income\_%'
+    ),
+    thresholds AS (
+        SELECT m.period, m.category, m.sds_class, m.spend,
+               CASE
+                   WHEN m.sds_class = :variable_essential THEN COALESCE(
+                       ROUND(p.essential_target * m.spend
+                             / NULLIF(SUM(CASE WHEN m.sds_class = :variable_essential THEN m.spend END)
+                                      OVER (PARTITION BY m.period), 0), 2),
+                       m.spend)
+                   ELSE 0
+               END AS baseline_threshold
+        FROM month_spend m
+        LEFT JOIN profile p ON TRUE
+    ),
+    grid AS (
+        SELECT months.period, c.category, c.sds_class,
+               COALESCE(t.spend, 0) AS spend, COALESCE(t.baseline_threshold, 0) AS baseline_threshold
+        FROM months
+        CROSS JOIN (SELECT DISTINCT category, sds_class FROM month_spend) c
+        LEFT JOIN thresholds t
+               ON t.period = months.period AND t.category = c.category AND t.sds_class = c.sds_class
+    ),
+    deltas AS (
+        SELECT period, category, sds_class, spend, baseline_threshold, leak_amount,
+               spend - LAG(spend) OVER w AS spend_delta,
+               leak_amount - LAG(leak_amount) OVER w AS leak_delta
+        FROM (SELECT *, GREATEST(spend - baseline_threshold, 0) AS leak_amount FROM grid) g
+        WINDOW w AS (PARTITION BY category, sds_class ORDER BY period)
+    ),
+    month_buckets AS (
+        SELECT period,
+               COALESCE(SUM(spend), 0) AS total_spend,
+               COALESCE(SUM(leak_amount), 0) AS total_leakage_amount,
+               json_agg(json_build_object(
+                   'category', category,
+                   'spend', CAST(spend AS TEXT),
+                   'baseline_threshold', CAST(baseline_threshold AS TEXT),
+                   'leak_amount', CAST(leak_amount AS TEXT),
+                   'spend_delta', CAST(spend_delta AS TEXT),
+                   'leak_delta', CAST(leak_delta AS TEXT),
+                   'sds_weight_class', sds_class
+               ) ORDER BY leak_amount DESC, category) FILTER (WHERE spend <> 0 OR spend_delta <> 0) AS buckets
+        FROM deltas
+        GROUP BY period
+    ),
+    month_totals AS (
+        SELECT months.period,
+               COALESCE(b.total_spend, 0) AS total_spend,
+               COALESCE(b.total_leakage_amount, 0) AS total_leakage_amount,
+               COALESCE(b.total_leakage_amount, 0) - LAG(COALESCE(b.total_leakage_amount, 0)) OVER (ORDER BY months.period)
+                   AS total_leakage_delta,
+               COALESCE(b.buckets, '[]'::json) AS buckets
+        FROM months
+        LEFT JOIN month_buckets b USING (period)
+    )
+    SELECT CAST(json_build_object(
+               'period', t.period,
+               'total_spend', CAST(t.total_spend AS TEXT),
+               'total_leakage_amount', CAST(t.total_leakage_amount AS TEXT),
+               'total_leakage_delta', CAST(t.total_leakage_delta AS TEXT),
+               'finalized_total_leakage_amount', (
+                   SELECT CAST(s.total_leakage_amount AS TEXT) FROM salary_allocation_profiles s
+                   WHERE s.user_id = :user_id
+                     AND s.reporting_period >= t.period AND s.reporting_period < t.period + interval '1 month'
+                   ORDER BY s.id LIMIT 1
+               ),
+               'leakage_buckets', t.buckets
+           ) AS TEXT) AS line
+    FROM month_totals t
+    WHERE t.period >= :from_period
+    ORDER BY t.period
+""")
+
+
+def _period_bounds(reporting_period: date) -> Tuple[date, date]:
+    """(month start, fiscal year start) for the reporting period."""
+    fiscal_year = reporting_period.year if reporting_period.month >= FISCAL_YEAR_START_MONTH else reporting_period.year - 1
+    return reporting_period.replace(day=1), date(fiscal_year, FISCAL_YEAR_START_MONTH, 1)
+
+
+# ----------------------------------------------------------------------
+# MONTH-END FINALIZATION (same engine, a whole user-id range per statement)
+# ----------------------------------------------------------------------
+# LEAKAGE_SQL with every CTE partitioned by user_id: finalizes the period's
+# SalaryAllocationProfile of every user in [:user_id_start, :user_id_end) with ONE
+# bulk UPDATE ... FROM. Users without a profile row for the period are skipped.
+PARTITION_LEAKAGE_SQL = text(r"""
+    WITH targets AS (
+        SELECT DISTINCT user_id FROM salary_allocation_profiles
+        WHERE reporting_period = :reporting_period
+          AND user_id >= :user_id_start AND user_id < :user_id_end
+    ),
+    month_spend AS (
+        SELECT c.user_id, c.category, c.sds_class, c.spend
+        FROM category_period_totals c
+        JOIN targets USING (user_id)
+        WHERE c.period = :period_start
+          AND c.txn_count > 0
+          AND c.sds_class IN (:variable_essential, :pure_discretionary)
+          AND c.category NOT LIKE 'Income\_%'
+    ),
+    thresholds AS (
+        SELECT m.user_id, m.category, m.sds_class, m.spend,
+               CASE
+                   WHEN m.sds_class = :variable_essential THEN COALESCE(
+                       ROUND(p.essential_target * m.spend
+                             / NULLIF(SUM(CASE WHEN m.sds_class = :variable_essential THEN m.spend END)
+                                      OVER (PARTITION BY m.user_id), 0), 2),
+                       m.spend)
+                   ELSE 0
+               END AS baseline_threshold
+        FROM month_spend m
+        LEFT JOIN financial_profiles p ON p.user_id = m.user_id
+    ),
+    buckets AS (
+        SELECT user_id, category, sds_class, spend, baseline_threshold,
+               GREATEST(spend - baseline_threshold, 0) AS leak_amount
+        FROM thresholds
+        UNION ALL
+        SELECT t.user_id, CAST(:tax_category AS VARCHAR), CAST(:tax_optimization AS VARCHAR),
+               COALESCE(SUM(c.spend), 0), CAST(:tax_limit AS NUMERIC),
+               GREATEST(CAST(:tax_limit AS NUMERIC) - COALESCE(SUM(c.spend), 0), 0)
+        FROM targets t
+        LEFT JOIN category_period_totals c
+               ON c.user_id = t.user_id
+              AND c.period >= :fiscal_year_start AND c.period <= :period_start
+              AND c.sds_class = :tax_optimization
+        GROUP BY t.user_id
+    ),
+    per_user AS (
+        SELECT user_id,
+               json_agg(json_build_object(
+                   'category', category,
+                   'spend', CAST(spend AS TEXT),
+                   'baseline_threshold', CAST(baseline_threshold AS TEXT),
+                   'leak_amount', CAST(leak_amount AS TEXT),
+                   'sds_weight_class', sds_class
+               ) ORDER BY leak_amount DESC, category) AS leakage_buckets,
+               COALESCE(SUM(leak_amount) FILTER (WHERE sds_class <> :tax_optimization), 0) AS total_leakage_amount,
+               COALESCE(SUM(spend) FILTER (WHERE sds_class = :variable_essential), 0) AS variable_spend_total
+        FROM buckets
+        GROUP BY user_id
+    )
+    UPDATE salary_allocation_profiles s
+    SET leakage_buckets = per_user.leakage_buckets,
+        total_leakage_amount = per_user.total_leakage_amount,
+        variable_spend_total = per_user.variable_spend_total,
+        version = s.version + 1
+    FROM per_user
+    WHERE s.user_id = per_user.user_id AND s.reporting_period = :reporting_period
+""")
+
+
+async def finalize_leakage_partition(db: AsyncSession, reporting_period: date, user_id_start: int, user_id_end: int) -> int:
+    """
+    Month-end: recomputes and persists leakage for every user in [user_id_start,
+    user_id_end) in one statement. Returns the number of profiles updated. Caller commits.
+    """
+    period_start, fiscal_year_start = _period_bounds(reporting_period)
+    result = await db.execute(PARTITION_LEAKAGE_SQL, {
+        "reporting_period": reporting_period,
+        "user_id_start": user_id_start,
+        "user_id_end": user_id_end,
+        "period_start": period_start,
+        "fiscal_year_start": fiscal_year_start,
+        "variable_essential": SDSWeightClass.VARIABLE_ESSENTIAL.value,
+        "pure_discretionary": SDSWeightClass.PURE_DISCRETIONARY.value,
+        "tax_optimization": SDSWeightClass.TAX_OPTIMIZATION.value,
+        "tax_category": TAX_HEADROOM_CATEGORY,
+        "tax_limit": TAX_SAVING_ANNUAL_LIMIT,
+    })
+    return result.rowcount
 
-# --- NEW MODEL IMPORTS (for actual implementation) ---
-# Assuming these models exist in your structure
-from ..models.salary_profile import SalaryAllocationProfile 
-from ..models.transaction import Transaction
-from ..models.financial_profile import FinancialProfile
 
 class LeakageService:
     """
@@ -24,63 +382,103 @@ class LeakageService:
     def __init__(self, db: AsyncSession, user_id: int):
         self.db = db
         self.user_id = user_id
-    
+
     # 🌟 FIX: Make the function async
-    async def calculate_leakage(self, reporting_period: date) -> Dict[str, Any]:
+    async def calculate_leakage(self, reporting_period: date, as_of: Optional[date] = None) -> Dict[str, Any]:
         """
-        CORE LOGIC: Calculates the MTD leakage per category and the overall 
+        CORE LOGIC: Calculates the MTD leakage per category and the overall
         projected reclaimable salary.
-        
-        NOTE: The actual logic involving fetching transactions, DMB, and
-        performing comparison/calculation must be implemented here.
+
+        Spend, baseline and leak are computed in the database by LEAKAGE_SQL (one row
+        per bucket) from the running category_period_totals, so the cost no longer grows
+        with the month's transaction count. The projected reclaimable salary is the leak
+        of the month-end spend projected from the precomputed spend curves (as of
+        `as_of`, default today), so it needs no transactions scan either. The same
+        statement persists the MTD buckets and totals on the period's
+        SalaryAllocationProfile. The caller's session commits.
         """
-        
-        # --- STUB IMPLEMENTATION (Replace with actual SQL queries and logic) ---
-        
-        # 1. Fetch DMB and EFS targets from FinancialProfile
-        # ... (SQLAlchemy select FinancialProfile, execute, await)
-        # e.g., dmb_target = profile.essential_target
-
-        # 2. Fetch MTD spend for all relevant categories (Group by Category)
-        # ... (SQLAlchemy select func.sum(Transaction.amount), group_by, await)
-        
-        # 3. Calculate leakage amount (Spend - Target) for each category
-        
-        # Example output structure for Leakage Buckets (Required by Orchestration and Insight Services)
+        period_start, fiscal_year_start = _period_bounds(reporting_period)
+        elapsed_days, days_in_month = projection_day(reporting_period, as_of or datetime.utcnow().date())
+
+        result = await self.db.execute(LEAKAGE_SQL, {
+            "user_id": self.user_id,
+            "reporting_period": reporting_period,
+            "period_start": period_start,
+            "fiscal_year_start": fiscal_year_start,
+            "variable_essential": SDSWeightClass.VARIABLE_ESSENTIAL.value,
+            "pure_discretionary": SDSWeightClass.PURE_DISCRETIONARY.value,
+            "tax_optimization": SDSWeightClass.TAX_OPTIMIZATION.value,
+            "tax_category": TAX_HEADROOM_CATEGORY,
+            "tax_limit": TAX_SAVING_ANNUAL_LIMIT,
+            "elapsed_days": elapsed_days,
+            "days_in_month": days_in_month,
+            "min_share": PROJECTION_MIN_SHARE,
+            "full_weight_months": PROJECTION_FULL_WEIGHT_MONTHS,
+        })
+
+        rows = result.all()
         leakage_buckets: List[Dict[str, Any]] = [
             {
-                "category": "Pure_Discretionary_DiningOut",
-                "spend": Decimal("3500.00"),
-                "baseline_threshold": Decimal("1000.00"),
-                "leak_amount": Decimal("2500.00"),
-                "sds_weight_class": "Pure_Discretionary"
-            },
-            {
-                "category": "Variable_Essential_Groceries",
-                "spend": Decimal("8500.00"),
-                "baseline_threshold": Decimal("7000.00"),
-                "leak_amount": Decimal("1500.00"),
-                "sds_weight_class": "Variable_Essential"
-            },
-            {
-                "category": "Tax Optimization Headroom (Annual)",
-                "spend": Decimal("0.00"),
-                "baseline_threshold": Decimal("150000.00"), # Full annual headroom
-                "leak_amount": Decimal("50000.00"), # Remaining headroom to fill
-                "sds_weight_class": "Tax_Optimization"
+                "category": row.category,
+                "spend": row.spend,
+                "baseline_threshold": row.baseline_threshold,
+                "leak_amount": row.leak_amount,
+                "projected_spend": row.projected_spend,
+                "projected_leak_amount": row.projected_leak_amount,
+                "sds_weight_class": row.sds_class,
             }
+            for row in rows
         ]
-        
-        total_projected_reclaimable = sum(
-            [b['leak_amount'] for b in leakage_buckets if b['category'] != "Tax Optimization Headroom (Annual)"]
-        )
-        
-        # Update the Salary Profile with the new total_leakage_amount and reclaimable funds
-        # ... (SQLAlchemy update SalaryAllocationProfile, execute, await)
-        
-        # --- END STUB IMPLEMENTATION ---
+        # Every row carries the same totals (the tax headroom row is always present)
+        total_leakage = rows[0].total_leakage_amount if rows else Decimal("0.00")
+        total_projected_reclaimable = rows[0].projected_reclaimable_salary if rows else Decimal("0.00")
 
         return {
+            "total_leakage_amount": total_leakage,
             "projected_reclaimable_salary": total_projected_reclaimable,
             "leakage_buckets": leakage_buckets
         }
+
+    async def get_leakage(self, reporting_period: date) -> Dict[str, Any]:
+        """
+        Cached calculate_leakage(): looks up the input versions and returns the cached
+        result for exactly those versions, computing (and persisting) it on a miss.
+        The returned dict is shared with other callers and must not be mutated.
+        """
+        as_of = datetime.utcnow().date()
+        row = (await self.db.execute(LEAKAGE_VERSION_SQL, {
+            "user_id": self.user_id,
+            "reporting_period": reporting_period,
+        })).one()
+        key = LeakageStateVersion(
+            row.profile_version, row.totals_watermark, row.salary_profile_id,
+            projection_day(reporting_period, as_of)[0], row.curves_computed_at,
+        ).cache_key(self.user_id, reporting_period)
+
+        cached = await leakage_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Versions were read first, so this result is at least as new as the key it is stored under
+        result = await self.calculate_leakage(reporting_period, as_of)
+        await leakage_cache.put(key, result)
+        return result
+
+    async def stream_leakage_history(self, from_period: date, to_period: date) -> AsyncIterator[str]:
+        """
+        Per-month, per-category spend vs. baseline with month-over-month deltas for every
+        month of [from_period, to_period], as NDJSON lines (one per month, oldest first)
+        from ONE statement (LEAKAGE_HISTORY_SQL) read through a server-side cursor.
+        Read-only: unlike calculate_leakage nothing is persisted.
+        """
+        from_period, to_period = from_period.replace(day=1), to_period.replace(day=1)
+        result = await self.db.stream(LEAKAGE_HISTORY_SQL, {
+            "user_id": self.user_id,
+            "from_period": from_period,
+            "to_period": to_period,
+            "lag_period": (from_period - timedelta(days=1)).replace(day=1),
+            "variable_essential": SDSWeightClass.VARIABLE_ESSENTIAL.value,
+            "pure_discretionary": SDSWeightClass.PURE_DISCRETIONARY.value,
+        })
+        async for row in result:
+            yield row.line + "\n"
@@ -1,25 +1,30 @@
 # services/orchestration_service.py (ASYNC INTEGRATED VERSION)
 
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Any, List
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from datetime import date, datetime
 from fastapi import HTTPException, status
 
 # --- ASYNC SQL IMPORTS ---
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, insert, update, values, column, Integer, DECIMAL
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import NoResultFound
 
 # --- V2 Service Imports (All must be Async-compatible) ---
-from .leakage_service import LeakageService
+from .leakage_service import LeakageService, TAX_HEADROOM_CATEGORY
 from .insight_service import InsightService
 from .financial_profile_service import FinancialProfileService
 from .benchmarking_service import BenchmarkingService # Used to fetch the fallback factor
+from .transfer_executor import transfer_executor, TransferRequest
+from .salary_profile_cas import ProfileVersionConflict, with_profile_cas
+from .suggestion_plan import (
+    allocate_suggestion_plan, is_current, load_suggestion_plan, plan_from_row, rules_version_subquery, save_suggestion_plan,
+    suggestion_plan_metrics,
+)
 
 # --- V2 Model Imports ---
 from ..models.salary_profile import SalaryAllocationProfile
-from ..models.user_profile import User
 from ..models.smart_transfer import SmartTransferRule, SmartTransferLog
 # NOTE: Assuming you have an Enum definition imported (e.g., RuleType)
 from ..db.enums import TransactionStatus 
@@ -27,6 +32,118 @@ from ..db.enums import TransactionStatus
 UserIdType = int # Revert to integer ID for SQL primary key
 
 
+class ConsentRejected(Exception):
+    """The consented plan cannot be applied (profile missing, fund exceeded, unknown rule)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# ----------------------------------------------------------------------
+# BULK CONSENT WRITE (four statements, whatever the plan size)
+# ----------------------------------------------------------------------
+async def apply_consented_transfers(
+    db: AsyncSession,
+    user_id: int,
+    reporting_period: date,
+    transfers: List[Tuple[int, Decimal]],
+    reclaimable_cap: Decimal,
+    execution_status: str = TransactionStatus.COMPLETED.value,
+) -> List[Tuple[int, int, Decimal, str]]:
+    """
+    Applies a consented plan of (rule_id, amount) transfers in the caller's transaction:
+    1. one compare-and-swap UPDATE of the period's SalaryAllocationProfile.total_autotransferred
+       (only if the plan still fits under `reclaimable_cap` and the profile version is the
+       one read; retried by with_profile_cas when another writer got there first),
+    2. one UPDATE ... FROM (VALUES ...) of every rule's total_transferred/last_executed_at
+       (only the user's active rules),
+    3. one multi-row INSERT of the SmartTransferLogs with RETURNING.
+    The logs are written as `execution_status`: PENDING when the transfer executor moves
+    the money afterwards (a FAILED transfer releases its reservation again).
+    Returns (log_id, rule_id, amount, destination) per log. Raises ConsentRejected (or
+    ProfileVersionConflict once the retries are exhausted), leaving the rollback to the caller.
+    """
+    now = datetime.utcnow()
+    per_rule: Dict[int, Decimal] = {}
+    with localcontext() as ctx:
+        ctx.prec = 28
+        total = sum((amount for _, amount in transfers), Decimal("0.00"))
+        for rule_id, amount in transfers:
+            per_rule[rule_id] = per_rule.get(rule_id, Decimal("0.00")) + amount
+
+    # 1. Reserve the total on the period's profile (the first profile row of the period,
+    #    as everywhere else) by compare-and-swap: read total and version, check the cap,
+    #    write back only if the version is unchanged; retried on a concurrent write
+    async def reserve():
+        current = (await db.execute(
+            select(SalaryAllocationProfile.id, SalaryAllocationProfile.version, SalaryAllocationProfile.total_autotransferred)
+            .where(SalaryAllocationProfile.user_id == user_id, SalaryAllocationProfile.reporting_period == reporting_period)
+            .order_by(SalaryAllocationProfile.id)
+            .limit(1)
+        )).first()
+        if current is None:
+            raise ConsentRejected(status.HTTP_404_NOT_FOUND, "Salary Allocation Profile not calculated for this period.")
+        with localcontext() as ctx:
+            ctx.prec = 28
+            new_total = (current.total_autotransferred or Decimal("0.00")) + total
+        if new_total > reclaimable_cap:
+            raise ConsentRejected(status.HTTP_409_CONFLICT, "Consented transfers exceed the remaining reclaimable fund.")
+        swapped = await db.execute(
+            update(SalaryAllocationProfile)
+            .where(SalaryAllocationProfile.id == current.id, SalaryAllocationProfile.version == current.version)
+            .values(total_autotransferred=new_total, version=SalaryAllocationProfile.version + 1)
+            .returning(SalaryAllocationProfile.id)
+            .execution_options(synchronize_session=False)
+        )
+        if swapped.first() is None:
+            raise ProfileVersionConflict(f"SalaryAllocationProfile {current.id} changed since version {current.version}.")
+
+    await with_profile_cas(db, "consent", reserve)
+
+    # 2. Every rule's running total in one statement
+    consented = values(
+        column("rule_id", Integer), column("amount", DECIMAL(10, 2)), name="consented"
+    ).data(list(per_rule.items()))
+    updated_rules = dict((await db.execute(
+        update(SmartTransferRule)
+        .where(
+            SmartTransferRule.id == consented.c.rule_id,
+            SmartTransferRule.user_id == user_id,
+            SmartTransferRule.is_active == True,
+        )
+        .values(
+            total_transferred=func.coalesce(SmartTransferRule.total_transferred, 0) + consented.c.amount,
+            last_executed_at=now,
+        )
+        .returning(SmartTransferRule.id, SmartTransferRule.destination_goal)
+        .execution_options(synchronize_session=False)
+    )).all())
+    if len(updated_rules) != len(per_rule):
+        missing = sorted(set(per_rule) - set(updated_rules))
+        raise ConsentRejected(status.HTTP_409_CONFLICT, f"Smart rules not found or inactive: {missing}")
+
+    # 3. All transfer logs in one multi-row insert
+    logs = (await db.execute(
+        insert(SmartTransferLog)
+        .values([
+            {
+                "rule_id": rule_id,
+                "user_id": user_id,
+                "amount_transferred": amount,
+                "executed_at": now,
+                "execution_status": execution_status,
+                "reporting_period": reporting_period,
+                "attempts": 0,
+            }
+            for rule_id, amount in transfers
+        ])
+        .returning(SmartTransferLog.id, SmartTransferLog.rule_id, SmartTransferLog.amount_transferred)
+    )).all()
+    return [(log.id, log.rule_id, log.amount_transferred, updated_rules[log.rule_id]) for log in logs]
+
+
 class OrchestrationService:
     """
     Core service for Fin-Traq's Salary Autopilot (Guided Execution).
@@ -62,205 +179,208 @@ class OrchestrationService:
         
         # 1. Calculate Leakage and persist reclaimable fund
         # LeakageService handles the MTD analysis and persists the SalaryAllocationProfile
-        leakage_data = await self.leakage_service.calculate_leakage(reporting_period)
+        # (cached per input versions: repeated hooks without new data are a cache hit)
+        leakage_data = await self.leakage_service.get_leakage(reporting_period)
         
-        projected_reclaimable = leakage_data.get('projected_reclaimable_salary', Decimal("0.00"))
+        projected_reclaimable = leakage_data.get('projected_reclaimable_salary', Decimal("0.00")).quantize(Decimal("0.01"))
         leakage_buckets = leakage_data.get('leakage_buckets')
         
         # 2. --- GENERATE PROACTIVE INSIGHTS (BEHAVIORAL ML) ---
-        proactive_insights = await self.insight_service.generate_proactive_leak_insights(
+        # Persisted per period: skipped while the buckets are unchanged (see InsightService)
+        card_set = await self.insight_service.get_insight_cards(
             reporting_period,
+            projected_reclaimable,
             category_leaks=leakage_buckets 
         )
         
+        # 3. Keep the materialized suggestion plan current (rebuilt only if an input moved)
+        await self._refresh_suggestion_plan(reporting_period, leakage_data, projected_reclaimable)
+
         # Phase 3 stub
         # self.convert_leak_to_goal_if_possible(projected_reclaimable, reporting_period) 
 
         return {
-            "projected_reclaimable": projected_reclaimable.quantize(Decimal("0.01")),
-            "insights": proactive_insights,
-            "leakage_buckets": leakage_buckets 
+            "projected_reclaimable": projected_reclaimable,
+            "insights": card_set["cards"],
+            "leakage_buckets": leakage_buckets,
+            # Content tag of this response (the router's ETag / If-None-Match)
+            "etag": card_set["etag"],
         }
 
     # ----------------------------------------------------------------------
     # CORE ORCHESTRATION LOGIC (GUIDED EXECUTION)
     # ----------------------------------------------------------------------
 
-    async def _fetch_available_reclaimable_salary(self, reporting_period: date) -> SalaryAllocationProfile:
+    async def generate_consent_suggestion_plan(self, reporting_period: date) -> Dict[str, Any]:
         """
-        🌟 FIX 3: Rewritten for SQLAlchemy Async. Fetches the latest calculated salary profile.
+        Returns how the reclaimable fund SHOULD be allocated across active Smart Rules.
+
+        Served from the materialized plan (one statement: the plan row, the version of its
+        profile and the rules version); rebuilt only when it is missing or stale (rules edited,
+        a consent or leakage write since it was computed, or a new day).
         """
-        stmt = select(SalaryAllocationProfile).where(
-            and_(
-                SalaryAllocationProfile.user_id == self.user_id,
-                SalaryAllocationProfile.reporting_period == reporting_period
-            )
-        ).order_by(SalaryAllocationProfile.reporting_period.desc()).limit(1)
+        suggestion_plan_metrics.requests += 1
+        plan, profile_version, rules_version = await load_suggestion_plan(self.db, self.user_id, reporting_period)
+        if plan is not None and is_current(plan, profile_version, rules_version):
+            suggestion_plan_metrics.served_materialized += 1
+            return plan_from_row(plan)
 
-        result = await self.db.execute(stmt)
-        # Use .scalar_one_or_none() for a single result or None
-        profile = result.scalar_one_or_none()
+        suggestion_plan_metrics.rebuilt_on_read += 1
+        return await self.materialize_suggestion_plan(reporting_period)
 
-        if profile is None:
-            # For robustness, we return an empty profile object with defaults, not raise an error
-            # If a proper SalaryAllocationProfile isn't found, the orchestration can't run.
+    async def materialize_suggestion_plan(self, reporting_period: date, leakage_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Computes the suggestion plan from its inputs and stores it for the period. Caller commits."""
+        # 1. Shared (cached) leakage state for the period: the reclaimable fund and tax headroom.
+        #    Read first: a recomputation writes the profile (and bumps its version).
+        if leakage_data is None:
+            leakage_data = await self.leakage_service.get_leakage(reporting_period)
+
+        # 2. The profile's transferred total and the profile and rules versions the plan is
+        #    valid for (the rules version is read before the rules: an edit committing in
+        #    between moves it past the stored one)
+        salary_profile = (await self.db.execute(
+            select(
+                SalaryAllocationProfile.id, SalaryAllocationProfile.version, SalaryAllocationProfile.total_autotransferred,
+                rules_version_subquery(self.user_id).label("rules_version"),
+            )
+            .where(SalaryAllocationProfile.user_id == self.user_id, SalaryAllocationProfile.reporting_period == reporting_period)
+            .order_by(SalaryAllocationProfile.id)
+            .limit(1)
+        )).first()
+        if salary_profile is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Salary Allocation Profile not calculated for this period."
             )
-        return profile
 
+        # 3. Active Smart Rules, ordered by priority (higher number is higher priority)
+        rules = (await self.db.execute(
+            select(SmartTransferRule.id, SmartTransferRule.destination_goal, SmartTransferRule.max_transfer_limit)
+            .where(SmartTransferRule.user_id == self.user_id, SmartTransferRule.is_active == True)
+            .order_by(SmartTransferRule.priority.desc())
+        )).all()
 
-    async def generate_consent_suggestion_plan(self, reporting_period: date) -> Dict[str, Any]:
-        """Calculates how the reclaimable fund SHOULD be allocated across active Smart Rules."""
-        
-        # 🌟 FIX 4: Use the async SQLAlchemy fetch function
-        salary_profile = await self._fetch_available_reclaimable_salary(reporting_period)
-        
-        # Use the money that is NOT yet auto-transferred for the batch suggestion plan
-        available_fund = salary_profile.projected_reclaimable_salary - salary_profile.total_autotransferred
-        remaining_fund = available_fund
-        suggestion_plan: List[Dict[str, Any]] = []
-        total_suggested = Decimal("0.00")
-        
-        # User check (optional, but good for validation)
-        user_exists_stmt = select(User).where(User.id == self.user_id)
-        user_exists = await self.db.execute(user_exists_stmt)
-        if user_exists.scalar_one_or_none() is None:
-             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User ID {self.user_id} not found.")
-
-        if available_fund <= Decimal("500.00"):
-             return {
-                "available_fund": available_fund.quantize(Decimal("0.01")),
-                "total_suggested": Decimal("0.00"),
-                "suggestion_plan": [],
-                "remaining_unallocated": available_fund.quantize(Decimal("0.01")),
-                "message": "Reclaimable salary below action threshold. Autopilot on standby."
-             }
-
-        # 1. Fetch all active Smart Rules, ordered by priority
-        # 🌟 FIX 5: Rewritten for SQLAlchemy Async query
-        rules_stmt = select(SmartTransferRule).where(
-            and_(
-                SmartTransferRule.user_id == self.user_id,
-                SmartTransferRule.is_active == True
-            )
-        ).order_by(SmartTransferRule.priority.desc()) # Assuming higher number is higher priority
-        
-        rules_result = await self.db.execute(rules_stmt)
-        active_rules: List[SmartTransferRule] = rules_result.scalars().all()
-        
-        # Separate rules based on destination (Tax optimization is highest priority)
-        # NOTE: You'll need to define how to identify a Tax Rule (e.g., 'destination_goal' starts with 'Tax_')
-        TAX_GOAL_PREFIX = 'Tax_' 
-        tax_rules = [r for r in active_rules if r.destination_goal.startswith(TAX_GOAL_PREFIX)]
-        other_rules = [r for r in active_rules if not r.destination_goal.startswith(TAX_GOAL_PREFIX)]
-        
-        # Get the user's current remaining tax headroom (Assuming this field exists on SalaryAllocationProfile)
-        remaining_tax_headroom = salary_profile.tax_headroom_remaining
-        
-        # 2. --- PRIORITY ALLOCATION: TAX SAVING ---
-        for rule in tax_rules:
-            if remaining_fund <= Decimal("0.00"): break
-                
-            # Rule target is defined by the transfer limit or a specific goal target (adjust as needed)
-            transfer_target = min(rule.max_transfer_limit, remaining_fund, remaining_tax_headroom)
-            
-            if transfer_target > Decimal("0.00"):
-                suggestion_plan.append({
-                    "rule_id": rule.id,
-                    "rule_name": rule.destination_goal,
-                    "transfer_amount": transfer_target.quantize(Decimal("0.01")),
-                    "destination": rule.destination_goal,
-                    "type": "TAX_SAVING"
-                })
-                
-                remaining_fund -= transfer_target
-                remaining_tax_headroom -= transfer_target
-                total_suggested += transfer_target
-
-        # 3. --- SECONDARY ALLOCATION: OTHER GOALS/STASHES ---
-        for rule in other_rules:
-            if remaining_fund <= Decimal("0.00"): break
-                
-            transfer_amount = min(rule.max_transfer_limit, remaining_fund)
-            
-            if transfer_amount > Decimal("0.00"):
-                suggestion_plan.append({
-                    "rule_id": rule.id,
-                    "rule_name": rule.destination_goal,
-                    "transfer_amount": transfer_amount.quantize(Decimal("0.01")),
-                    "destination": rule.destination_goal,
-                    "type": "GOAL_STASH"
-                })
-                
-                remaining_fund -= transfer_amount
-                total_suggested += transfer_amount
-
-        # 4. Finalize and return the plan
-        return {
-            "available_fund": available_fund.quantize(Decimal("0.01")),
-            "remaining_unallocated": remaining_fund.quantize(Decimal("0.01")),
-            "total_suggested": total_suggested.quantize(Decimal("0.01")),
-            "suggestion_plan": suggestion_plan,
-            "message": f"Autopilot suggests reallocating {total_suggested.quantize(Decimal('0.01'))} across goals, prioritizing tax optimization."
-        }
+        # 4. Allocate the money that is NOT yet auto-transferred (tax optimization first)
+        projected_reclaimable = leakage_data['projected_reclaimable_salary']
+        with localcontext() as ctx:
+            ctx.prec = 28
+            available_fund = projected_reclaimable - (salary_profile.total_autotransferred or Decimal("0.00"))
+            projected_reclaimable = projected_reclaimable.quantize(Decimal("0.01"))
+        remaining_tax_headroom = next(
+            (b['leak_amount'] for b in leakage_data['leakage_buckets'] if b['category'] == TAX_HEADROOM_CATEGORY),
+            Decimal("0.00")
+        )
+        plan = allocate_suggestion_plan(available_fund, remaining_tax_headroom, [tuple(rule) for rule in rules])
+
+        # 5. Materialize for the next reads
+        await save_suggestion_plan(
+            self.db, self.user_id, reporting_period, salary_profile.id, salary_profile.version,
+            salary_profile.rules_version, projected_reclaimable, plan,
+        )
+        return plan
+
+    async def _refresh_suggestion_plan(self, reporting_period: date, leakage_data: Dict[str, Any], projected_reclaimable: Decimal):
+        """Rebuilds the materialized plan if the recalculation moved one of its inputs."""
+        plan, profile_version, rules_version = await load_suggestion_plan(self.db, self.user_id, reporting_period)
+        if (plan is not None and is_current(plan, profile_version, rules_version)
+                and plan.projected_reclaimable == projected_reclaimable):
+            suggestion_plan_metrics.unchanged_on_recalculation += 1
+            return
+        try:
+            await self.materialize_suggestion_plan(reporting_period, leakage_data)
+        except HTTPException:
+            # No profile for the period yet: nothing to suggest from
+            return
+        suggestion_plan_metrics.rebuilt_on_recalculation += 1
         
     # ----------------------------------------------------------------------
     # AUTOPILOT EXECUTION METHOD (CLOSES THE LOOP & HANDLES CONSENT)
     # ----------------------------------------------------------------------
-    async def record_consent_and_update_balance(self, transfer_plan: List[Dict[str, Any]], reporting_period: date) -> Dict[str, Any]:
-        """
-        🌟 FIX 7: Rewritten for SQLAlchemy Async. Records consent, logs transfer transactions, 
-        and updates the Salary Allocation Profile atomically using the session's transaction.
+    async def record_consent_and_update_balance(
+        self,
+        transfer_plan: List[Dict[str, Any]],
+        reporting_period: date,
+        before_commit: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+    ) -> Dict[str, Any]:
         """
-        if not transfer_plan:
-             return {"status": "success", "message": "No transfers to execute.", "total_transferred": Decimal("0.00"), "transfers_executed": []}
+        Records consent, logs the transfers, updates every rule's running total and the
+        Salary Allocation Profile as one bulk write (apply_consented_transfers: four
+        statements in one transaction, however many rules the plan touches).
 
-        # 1. Fetch the Salary Profile (within the transaction context)
-        salary_profile = await self._fetch_available_reclaimable_salary(reporting_period)
-        
-        current_total_autotransferred = salary_profile.total_autotransferred
-        total_transferred = Decimal("0.00")
+        With a UPI gateway configured, the logs are committed as PENDING and handed to the
+        transfer executor; the call returns without waiting for the money to move, and the
+        returned transfer_ids can be polled (GET /autopilot/transfers).
+
+        before_commit(result) runs inside the transaction right before the commit (the
+        Idempotency-Key response is stored atomically with the transfers).
+        """
+        # 1. Normalize the plan (exact context: ml/scaling_logic lowers the process precision)
         executed_transfers = []
-        
-        # 2. Iterate through the consented plan and execute/record
-        for item in transfer_plan:
-            transfer_amount = item.get("transfer_amount", Decimal("0.00"))
-            
-            # Ensure Decimal type (it should be from the plan generation, but safety check)
-            if isinstance(transfer_amount, (float, str)):
-                transfer_amount = Decimal(str(transfer_amount)).quantize(Decimal("0.01"))
-                
-            if transfer_amount <= Decimal("0.00"): continue
-                
-            # --- A. (External System Mock) Execute UPI Transfer (This is the external call) ---
-            transfer_successful = True # Mock success for backend logic testing
-            
-            if transfer_successful:
-                # --- B. Record the Internal Financial Transaction/Log ---
-                # Record the Smart Transfer Log
-                log = SmartTransferLog(
-                    rule_id=item.get('rule_id'),
-                    user_id=self.user_id,
-                    amount_transferred=transfer_amount,
-                    execution_status="COMPLETED"
-                )
-                self.db.add(log)
-
-                total_transferred += transfer_amount
-                executed_transfers.append(item)
-
-        # 3. Update the Salary Profile (Closing the Loop)
-        salary_profile.total_autotransferred = current_total_autotransferred + total_transferred
-        
-        # 4. Commit all changes (Salary Profile update and Transfer Logs) atomically
+        transfers: List[Tuple[int, Decimal]] = []
+        with localcontext() as ctx:
+            ctx.prec = 28
+            for item in transfer_plan or []:
+                transfer_amount = Decimal(str(item.get("transfer_amount", "0.00"))).quantize(Decimal("0.01"))
+                if transfer_amount <= Decimal("0.00"): continue
+                transfers.append((item.get('rule_id'), transfer_amount))
+                executed_transfers.append({**item, "transfer_amount": transfer_amount})
+            total_transferred = sum((amount for _, amount in transfers), Decimal("0.00"))
+
+        if not transfers:
+            result = {"status": "success", "message": "No transfers to execute.", "total_transferred": Decimal("0.00"), "transfers_executed": []}
+            if before_commit is not None:
+                await before_commit(result)
+                await self.db.commit()
+            return result
+
+        # 2. The plan may not exceed the period's reclaimable fund (cached leakage state)
+        leakage_data = await self.leakage_service.get_leakage(reporting_period)
+
+        # 3. Bulk write; any rejection rolls back every statement of it
+        use_executor = transfer_executor.is_enabled
+        try:
+            logs = await apply_consented_transfers(
+                self.db, self.user_id, reporting_period, transfers, leakage_data['projected_reclaimable_salary'],
+                execution_status=TransactionStatus.PENDING.value if use_executor else TransactionStatus.COMPLETED.value,
+            )
+        except ConsentRejected as e:
+            await self.db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except ProfileVersionConflict:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The Salary Allocation Profile is being updated concurrently; retry the consent.",
+            )
+
+        transfer_ids = [log_id for log_id, _, _, _ in logs]
+        if use_executor:
+            result = {
+                "status": "accepted",
+                "message": "Autopilot transfers submitted. Each transfer completes (or is released) in the background.",
+                "total_transferred": total_transferred,
+                "transfers_executed": executed_transfers,
+                "transfer_ids": transfer_ids,
+            }
+        else:
+            # No gateway configured: recorded as executed (mock transfers)
+            result = {
+                "status": "success",
+                "message": "Autopilot execution complete. Your funds have been efficiently allocated.",
+                "total_transferred": total_transferred,
+                "transfers_executed": executed_transfers,
+                "transfer_ids": transfer_ids,
+            }
+
+        # 4. Commit all changes (Salary Profile, rule totals and Transfer Logs) atomically
+        if before_commit is not None:
+            await before_commit(result)
         await self.db.commit()
-        
-        # 5. Return Success Message
-        return {
-            "status": "success",
-            "message": "Autopilot execution complete. Your funds have been efficiently allocated.",
-            "total_transferred": total_transferred.quantize(Decimal("0.01")),
-            "transfers_executed": executed_transfers
-        }
+
+        # 5. Hand the committed PENDING transfers to the executor (only after the commit)
+        if use_executor:
+            transfer_executor.submit([
+                TransferRequest(log_id, self.user_id, rule_id, amount, destination)
+                for log_id, rule_id, amount, destination in logs
+            ])
+        return result
@@ -0,0 +1,83 @@
+# services/salary_profile_cas.py
+
+import asyncio
+import os
+import random
+import threading
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+# --- OPTIMISTIC CONCURRENCY CONFIGURATION (Environment) ---
+# Attempts per write before giving up with ProfileVersionConflict (answered as 409)
+SALARY_PROFILE_CAS_MAX_ATTEMPTS = int(os.getenv("SALARY_PROFILE_CAS_MAX_ATTEMPTS", "5"))
+# Base of the jittered exponential backoff between attempts
+SALARY_PROFILE_CAS_BACKOFF_SECONDS = float(os.getenv("SALARY_PROFILE_CAS_BACKOFF_SECONDS", "0.005"))
+
+T = TypeVar("T")
+
+
+class ProfileVersionConflict(Exception):
+    """A compare-and-swap on SalaryAllocationProfile.version matched no row: the profile changed since it was read."""
+
+
+class ProfileCasMetrics:
+    """Per-writer counters of the SalaryAllocationProfile compare-and-swap loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writers: Dict[str, Dict[str, int]] = {}
+
+    def record(self, writer: str, counter: str):
+        with self._lock:
+            counters = self._writers.setdefault(writer, {"attempts": 0, "conflicts": 0, "retries": 0, "exhausted": 0})
+            counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            writers = {writer: dict(counters) for writer, counters in self._writers.items()}
+        return {
+            "max_attempts": SALARY_PROFILE_CAS_MAX_ATTEMPTS,
+            "conflicts_total": sum(c["conflicts"] for c in writers.values()),
+            "retries_total": sum(c["retries"] for c in writers.values()),
+            "exhausted_total": sum(c["exhausted"] for c in writers.values()),
+            "writers": writers,
+        }
+
+
+salary_profile_cas_metrics = ProfileCasMetrics()
+
+
+async def with_profile_cas(
+    db: AsyncSession,
+    writer: str,
+    attempt: Callable[[], Awaitable[T]],
+    max_attempts: int = SALARY_PROFILE_CAS_MAX_ATTEMPTS,
+    backoff_seconds: float = SALARY_PROFILE_CAS_BACKOFF_SECONDS,
+) -> T:
+    """
+    Runs `attempt` (read the profile and its version, then write it back with
+    `... WHERE version = :read_version`, bumping the version) until it does not conflict.
+
+    Each attempt runs in a SAVEPOINT of the caller's transaction, so a conflict undoes
+    only that attempt's statements. `attempt` signals a lost race by raising
+    ProfileVersionConflict (explicit CAS statements) or the ORM's StaleDataError (flushes
+    of a SalaryAllocationProfile, versioned through version_id_col). Nothing is locked
+    between the read and the write; the caller commits. After max_attempts conflicts the
+    last ProfileVersionConflict is raised.
+    """
+    for attempt_number in range(1, max_attempts + 1):
+        salary_profile_cas_metrics.record(writer, "attempts")
+        try:
+            async with db.begin_nested():
+                return await attempt()
+        except (ProfileVersionConflict, StaleDataError) as e:
+            salary_profile_cas_metrics.record(writer, "conflicts")
+            if attempt_number == max_attempts:
+                salary_profile_cas_metrics.record(writer, "exhausted")
+                raise ProfileVersionConflict(
+                    f"SalaryAllocationProfile changed concurrently {max_attempts} times ({writer})."
+                ) from e
+        salary_profile_cas_metrics.record(writer, "retries")
+        await asyncio.sleep(backoff_seconds * 2 ** (attempt_number - 1) * (0.5 + random.random()))
@@ -0,0 +1,263 @@
+# services/sms_parsers.py
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, localcontext
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# --- TRANSACTION DIRECTIONS (match TransactionType values) ---
+DEBIT = "DEBIT"
+CREDIT = "CREDIT"
+
+# --- MERCHANT -> CATEGORY KEYWORDS ---
+# Checked in order against the upper-cased merchant/VPA extracted by a template.
+# A template hit with no keyword match still needs the ML categorizer for the category.
+MERCHANT_CATEGORY_KEYWORDS: List[Tuple[str, str]] = [
+    ("SWIGGY", "Discretionary_Food_Delivery"),
+    ("ZOMATO", "Discretionary_Food_Delivery"),
+    ("EATCLUB", "Discretionary_Food_Delivery"),
+    ("STARBUCKS", "Pure_Discretionary_DiningOut"),
+    ("DOMINOS", "Pure_Discretionary_DiningOut"),
+    ("NETFLIX", "Pure_Discretionary_Subscription"),
+    ("SPOTIFY", "Pure_Discretionary_Subscription"),
+    ("HOTSTAR", "Pure_Discretionary_Subscription"),
+    ("BIGBASKET", "Variable_Essential_Groceries"),
+    ("BLINKIT", "Variable_Essential_Groceries"),
+    ("ZEPTO", "Variable_Essential_Groceries"),
+    ("DMART", "Variable_Essential_Groceries"),
+    ("UBER", "Variable_Essential_Transport"),
+    ("OLACABS", "Variable_Essential_Transport"),
+    ("RAPIDO", "Variable_Essential_Transport"),
+    ("IRCTC", "Variable_Essential_Transport"),
+    ("BESCOM", "Fixed_Essential_Utilities"),
+    ("AIRTEL", "Fixed_Essential_Utilities"),
+    ("JIO", "Fixed_Essential_Utilities"),
+    ("APOLLO", "Variable_Essential_Healthcare"),
+    ("PHARMEASY", "Variable_Essential_Healthcare"),
+    ("AMAZON", "Pure_Discretionary_Shopping"),
+    ("FLIPKART", "Pure_Discretionary_Shopping"),
+    ("MYNTRA", "Pure_Discretionary_Shopping"),
+]
+
+# Credits are income/transfers in; they never need the ML categorizer
+CREDIT_CATEGORY = "Income_Credit"
+
+
+@dataclass(frozen=True)
+class SmsTemplate:
+    """A precompiled bank SMS format with named groups: amount, merchant, date."""
+    name: str
+    pattern: Pattern[str]
+    direction: str
+    date_formats: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ParsedSms:
+    """Fields extracted from a bank SMS by a template."""
+    bank: str
+    template: str
+    amount: Decimal
+    merchant: str
+    direction: str
+    timestamp: Optional[datetime]
+    category: Optional[str]
+
+    def as_categorizer_result(self) -> Dict[str, object]:
+        """Same shape as the ML categorizer response, so callers can use either."""
+        return {
+            "merchant": self.merchant,
+            "category": self.category,
+            "amount": self.amount,
+            "type": self.direction,
+            "transaction_date": self.timestamp,
+        }
+
+
+def _template(name: str, regex: str, direction: str, *date_formats: str) -> SmsTemplate:
+    return SmsTemplate(name, re.compile(regex, re.IGNORECASE), direction, date_formats)
+
+
+_AMT = r"(?:Rs\.?|INR)\s?(?P<amount>[\d,]+(?:\.\d{1,2})?)"
+
+# --- BANK TEMPLATES (compiled once at import) ---
+DEFAULT_TEMPLATES: Dict[str, List[SmsTemplate]] = {
+    "HDFC": [
+        _template(
+            "hdfc_upi_debit",
+            _AMT + r" debited from a/c \*\*\d+ on (?P<date>\d{2}-\d{2}-\d{2}) to VPA (?P<merchant>[\w.\-]+@[\w.\-]+)",
+            DEBIT, "%d-%m-%y",
+        ),
+        _template(
+            "hdfc_upi_credit",
+            _AMT + r" credited to a/c \*\*\d+ on (?P<date>\d{2}-\d{2}-\d{2}) by a/c linked to VPA (?P<merchant>[\w.\-]+@[\w.\-]+)",
+            CREDIT, "%d-%m-%y",
+        ),
+        _template(
+            "hdfc_card_debit",
+            r"Update! " + _AMT + r" debited from HDFC Bank XX\d+ on (?P<date>\d{2}-[A-Z]{3}-\d{2})\. Info: (?:POS\*|ACH\*|IMPS\*)?(?P<merchant>[^.]+)\.",
+            DEBIT, "%d-%b-%y",
+        ),
+    ],
+    "ICICI": [
+        _template(
+            "icici_upi_debit",
+            r"ICICI Bank Acct XX\d+ debited for " + _AMT + r" on (?P<date>\d{2}-[A-Z]{3}-\d{2}); (?P<merchant>.+?) credited",
+            DEBIT, "%d-%b-%y",
+        ),
+        _template(
+            "icici_credit",
+            r"Acct XX\d+ is credited with " + _AMT + r" on (?P<date>\d{2}-[A-Z]{3}-\d{2}) from (?P<merchant>.+?)\.",
+            CREDIT, "%d-%b-%y",
+        ),
+        _template(
+            "icici_card_spend",
+            _AMT + r" spent using ICICI Bank Card XX\d+ on (?P<date>\d{2}-[A-Z]{3}-\d{2}) on (?P<merchant>.+?)\.",
+            DEBIT, "%d-%b-%y",
+        ),
+    ],
+    "SBI": [
+        _template(
+            "sbi_upi_debit",
+            r"A/C X\d+ debited by (?P<amount>[\d,]+(?:\.\d{1,2})?) on date (?P<date>\d{2}[A-Z]{3}\d{2}) trf to (?P<merchant>.+?) Refno",
+            DEBIT, "%d%b%y",
+        ),
+        _template(
+            "sbi_upi_credit",
+            r"A/cX\d+ credited by " + _AMT + r" on (?P<date>\d{2}[A-Z]{3}\d{2}) by (?P<merchant>.+?) \(Ref",
+            CREDIT, "%d%b%y",
+        ),
+    ],
+    # Generic UPI app notifications; also tried as a fallback for every bank
+    "UPI": [
+        _template(
+            "upi_paid",
+            r"Paid " + _AMT + r" to (?P<merchant>.+?) via UPI on (?P<date>\d{2}-\d{2}-\d{4} \d{2}:\d{2})",
+            DEBIT, "%d-%m-%Y %H:%M",
+        ),
+        _template(
+            "upi_received",
+            r"Received " + _AMT + r" from (?P<merchant>.+?) via UPI on (?P<date>\d{2}-\d{2}-\d{4} \d{2}:\d{2})",
+            CREDIT, "%d-%m-%Y %H:%M",
+        ),
+    ],
+}
+
+FALLBACK_BANK = "UPI"
+# Stats bucket of every bank identifier without templates of its own
+UNKNOWN_BANK = "UNKNOWN"
+
+
+def resolve_category(merchant: str, direction: str) -> Optional[str]:
+    """Maps an extracted merchant/VPA to a category, or None if the ML model must decide."""
+    if direction == CREDIT:
+        return CREDIT_CATEGORY
+    merchant_key = merchant.upper()
+    for keyword, category in MERCHANT_CATEGORY_KEYWORDS:
+        if keyword in merchant_key:
+            return category
+    return None
+
+
+class SmsParserRegistry:
+    """
+    Registry of precompiled SMS templates keyed by bank identifier.
+
+    parse() tries the bank's own templates first, then the generic UPI ones.
+    Only messages that no template matches (or whose merchant has no known
+    category) need to go to the ML categorizer.
+    """
+
+    def __init__(self, templates: Dict[str, List[SmsTemplate]] = DEFAULT_TEMPLATES):
+        self._templates = {bank.upper(): list(bank_templates) for bank, bank_templates in templates.items()}
+        # --- Hit-rate counters: {bank: {"messages": n, "misses": n, "templates": {name: hits}}} ---
+        # Keyed by registered bank only: the identifier is client-supplied, so any other
+        # value is counted under UNKNOWN_BANK (bounded by the template registry)
+        self._stats: Dict[str, Dict[str, object]] = {}
+
+    def _bank_stats(self, bank: str) -> Dict[str, object]:
+        if bank not in self._templates:
+            bank = UNKNOWN_BANK
+        stats = self._stats.get(bank)
+        if stats is None:
+            stats = {"messages": 0, "misses": 0, "uncategorized": 0, "templates": {}}
+            self._stats[bank] = stats
+        return stats
+
+    def _candidates(self, bank: str) -> List[SmsTemplate]:
+        bank_templates = self._templates.get(bank, [])
+        if bank == FALLBACK_BANK:
+            return bank_templates
+        return bank_templates + self._templates.get(FALLBACK_BANK, [])
+
+    def parse(self, bank_identifier: str, text: str) -> Optional[ParsedSms]:
+        """Returns the parsed SMS, or None when no template matches."""
+        bank = (bank_identifier or "").strip().upper()
+        stats = self._bank_stats(bank)
+        stats["messages"] += 1
+
+        for template in self._candidates(bank):
+            match = template.pattern.search(text)
+            if match is None:
+                continue
+            # Exact context: ml/scaling_logic lowers the process-wide precision, under
+            # which quantizing any amount of 100.00 or more raises InvalidOperation
+            with localcontext() as ctx:
+                ctx.prec = 28
+                try:
+                    amount = Decimal(match.group("amount").replace(",", "")).quantize(Decimal("0.01"))
+                except InvalidOperation:
+                    continue
+
+            merchant = match.group("merchant").strip()
+            timestamp = None
+            raw_date = match.group("date")
+            for date_format in template.date_formats:
+                try:
+                    timestamp = datetime.strptime(raw_date, date_format)
+                    break
+                except ValueError:
+                    continue
+
+            category = resolve_category(merchant, template.direction)
+            template_hits = stats["templates"]
+            template_hits[template.name] = template_hits.get(template.name, 0) + 1
+            if category is None:
+                stats["uncategorized"] += 1
+
+            return ParsedSms(
+                bank=bank,
+                template=template.name,
+                amount=amount,
+                merchant=merchant,
+                direction=template.direction,
+                timestamp=timestamp,
+                category=category,
+            )
+
+        stats["misses"] += 1
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Per-bank and per-template hit rates since process start."""
+        report = {}
+        for bank, stats in self._stats.items():
+            messages = stats["messages"]
+            hits = messages - stats["misses"]
+            report[bank] = {
+                "messages": messages,
+                "template_hits": hits,
+                "misses": stats["misses"],
+                "hit_rate": round(hits / messages, 4) if messages else 0.0,
+                "uncategorized_hits": stats["uncategorized"],
+                "templates": {
+                    name: {"hits": count, "share": round(count / messages, 4)}
+                    for name, count in stats["templates"].items()
+                },
+            }
+        return report
+
+
+# Process-wide registry used by TransactionService
+sms_parser_registry = SmsParserRegistry()
@@ -0,0 +1,170 @@
+# services/spend_projection.py
+
+import calendar
+import json
+import os
+from datetime import date
+from itertools import chain
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy import Integer, String, Text, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..db.enums import SDSWeightClass, TransactionStatus
+from ..models.category_daily_spend import CATEGORY_DAILY_SPEND_TRIGGER_DDL
+from ..ml.vectorized_engine import DAYS_PER_CURVE, compute_cumulative_share_curves
+
+# --- PROJECTION CONFIGURATION (Environment) ---
+# Full months of daily spend behind each curve
+PROJECTION_HISTORY_MONTHS = int(os.getenv("PROJECTION_HISTORY_MONTHS", "6"))
+# A curve built from this many months fully replaces the plain run rate (fewer: blended)
+PROJECTION_FULL_WEIGHT_MONTHS = int(os.getenv("PROJECTION_FULL_WEIGHT_MONTHS", "3"))
+# Below this expected share of the month the curve is too flat to divide by; use the run rate
+PROJECTION_MIN_SHARE = float(os.getenv("PROJECTION_MIN_SHARE", "0.05"))
+
+# Only the classes the leakage engine reports on are projected
+PROJECTED_CLASSES = (SDSWeightClass.VARIABLE_ESSENTIAL.value, SDSWeightClass.PURE_DISCRETIONARY.value)
+
+
+def _month_index(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def _month_from_index(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def projection_day(reporting_period: date, today: date) -> Tuple[int, int]:
+    """
+    (elapsed days, days in month) of the reporting period as of `today`: a past month is
+    fully elapsed (projection = actual spend), a future one has not started.
+    """
+    days_in_month = calendar.monthrange(reporting_period.year, reporting_period.month)[1]
+    month_start = reporting_period.replace(day=1)
+    if today < month_start:
+        return 0, days_in_month
+    if _month_index(today) > _month_index(month_start):
+        return days_in_month, days_in_month
+    return today.day, days_in_month
+
+
+# ----------------------------------------------------------------------
+# NIGHTLY PASS (one user-id range per call, vectorized over every series in it)
+# ----------------------------------------------------------------------
+# One row per (user, category, sds_class) with its daily spend of the history window as
+# parallel arrays, so the rows -> (series, months, 31) scatter is a single numpy call.
+CURVE_SOURCE_SQL = text("""
+    SELECT user_id, category, sds_class,
+           array_agg(CAST((EXTRACT(YEAR FROM day) * 12 + EXTRACT(MONTH FROM day) - 1) AS INTEGER)
+                     - CAST(:first_month_index AS INTEGER)) AS month_offsets,
+           array_agg(CAST(EXTRACT(DAY FROM day) AS INTEGER)) AS days,
+           array_agg(CAST(spend AS DOUBLE PRECISION)) AS amounts
+    FROM category_daily_spend
+    WHERE user_id >= :user_id_start AND user_id < :user_id_end
+      AND day >= :history_start AND day < :current_month
+      AND sds_class IN (:variable_essential, :pure_discretionary)
+    GROUP BY user_id, category, sds_class
+""")
+
+DELETE_CURVES_SQL = text("""
+    DELETE FROM spend_projection_curves WHERE user_id >= :user_id_start AND user_id < :user_id_end
+""")
+
+INSERT_CURVES_SQL = text("""
+    INSERT INTO spend_projection_curves (user_id, category, sds_class, cumulative_share, history_months, computed_at)
+    SELECT u, c, s, CAST(j AS JSON), h, now() AT TIME ZONE 'utc'
+    FROM unnest(:user_ids, :categories, :sds_classes, :curves, :history_months) AS x(u, c, s, j, h)
+    ON CONFLICT (user_id, category, sds_class) DO UPDATE
+    SET cumulative_share = EXCLUDED.cumulative_share,
+        history_months = EXCLUDED.history_months,
+        computed_at = EXCLUDED.computed_at
+""").bindparams(
+    bindparam("user_ids", type_=ARRAY(Integer)),
+    bindparam("categories", type_=ARRAY(String)),
+    bindparam("sds_classes", type_=ARRAY(String)),
+    bindparam("curves", type_=ARRAY(Text)),
+    bindparam("history_months", type_=ARRAY(Integer)),
+)
+
+
+async def recompute_projection_curves(db: AsyncSession, as_of: date, user_id_start: int, user_id_end: int) -> int:
+    """
+    Rebuilds the SpendProjectionCurve rows of every user in [user_id_start, user_id_end)
+    from the last PROJECTION_HISTORY_MONTHS full months of category_daily_spend before
+    `as_of`. Returns the number of curves written. Caller commits.
+    """
+    current_month_index = _month_index(as_of)
+    first_month_index = current_month_index - PROJECTION_HISTORY_MONTHS
+
+    rows = (await db.execute(CURVE_SOURCE_SQL, {
+        "first_month_index": first_month_index,
+        "user_id_start": user_id_start,
+        "user_id_end": user_id_end,
+        "history_start": _month_from_index(first_month_index),
+        "current_month": _month_from_index(current_month_index),
+        "variable_essential": PROJECTED_CLASSES[0],
+        "pure_discretionary": PROJECTED_CLASSES[1],
+    })).all()
+
+    # 1. Scatter every (series, month, day) amount into one dense array
+    daily = np.zeros((len(rows), PROJECTION_HISTORY_MONTHS, DAYS_PER_CURVE), dtype=np.float64)
+    if rows:
+        series = np.repeat(np.arange(len(rows)), [len(row.days) for row in rows])
+        months = np.fromiter(chain.from_iterable(row.month_offsets for row in rows), dtype=np.int64, count=len(series))
+        days = np.fromiter(chain.from_iterable(row.days for row in rows), dtype=np.int64, count=len(series))
+        amounts = np.fromiter(chain.from_iterable(row.amounts for row in rows), dtype=np.float64, count=len(series))
+        np.add.at(daily, (series, months, days - 1), amounts)
+
+    # 2. All curves of the range at once
+    curves, history_months = compute_cumulative_share_curves(daily)
+
+    # 3. Replace the range's curves (series without history in the window are dropped)
+    await db.execute(DELETE_CURVES_SQL, {"user_id_start": user_id_start, "user_id_end": user_id_end})
+    if rows:
+        await db.execute(INSERT_CURVES_SQL, {
+            "user_ids": [row.user_id for row in rows],
+            "categories": [row.category for row in rows],
+            "sds_classes": [row.sds_class for row in rows],
+            "curves": [json.dumps(curve) for curve in np.round(curves, 4).tolist()],
+            "history_months": history_months.tolist(),
+        })
+    return len(rows)
+
+
+async def prune_daily_spend(db: AsyncSession, as_of: date) -> int:
+    """Drops category_daily_spend days older than any curve will read again. Caller commits."""
+    history_start = _month_from_index(_month_index(as_of) - PROJECTION_HISTORY_MONTHS)
+    result = await db.execute(text("DELETE FROM category_daily_spend WHERE day < :history_start"), {"history_start": history_start})
+    return result.rowcount
+
+
+# ----------------------------------------------------------------------
+# SETUP ON AN EXISTING DATABASE
+# ----------------------------------------------------------------------
+REBUILD_DAILY_SPEND_SQL = text("""
+    INSERT INTO category_daily_spend (user_id, day, category, sds_class, spend, txn_count, updated_at)
+    SELECT user_id, CAST(transaction_date AS DATE), category, sds_class, SUM(amount), COUNT(*), now() AT TIME ZONE 'utc'
+    FROM transactions
+    WHERE status = :completed AND transaction_date >= :since
+    GROUP BY 1, 2, 3, 4
+""")
+
+
+async def rebuild_daily_spend(db: AsyncSession, since: date) -> int:
+    """
+    Re-aggregates category_daily_spend from the raw transactions from `since` on (for a
+    fresh install or after drift). The table is locked against the delta triggers until
+    the caller commits, so no concurrent transaction is counted twice or lost.
+    """
+    await db.execute(text("LOCK TABLE category_daily_spend IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(text("DELETE FROM category_daily_spend WHERE day >= :since"), {"since": since})
+    result = await db.execute(REBUILD_DAILY_SPEND_SQL, {"completed": TransactionStatus.COMPLETED.value, "since": since})
+    return result.rowcount
+
+
+async def install_daily_spend_triggers(db: AsyncSession):
+    """(Re)creates the daily spend delta trigger function and triggers on an existing database."""
+    for statement in CATEGORY_DAILY_SPEND_TRIGGER_DDL:
+        await db.execute(text(statement))
@@ -0,0 +1,189 @@
+# services/statement_import_service.py
+
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.enums import ImportJobStatus, SDSWeightClass, TransactionStatus
+from ..models.statement_import_job import StatementImportJob
+from ..models.transaction import Transaction
+from .categorization_cache import merchant_category_cache, merchant_key_from_text, infer_sds_class
+from .categorizer_client import categorizer_client, is_fallback_result
+from .dedup import statement_row_fingerprint, statement_row_identity
+from .sms_parsers import CREDIT, DEBIT, resolve_category
+from .statement_parsers import STATEMENT_PARSERS, StatementRow, StatementRowError
+
+# --- IMPORT CONFIGURATION (Environment) ---
+# Rows normalized, categorized and bulk-inserted per chunk (one commit + progress update each)
+STATEMENT_IMPORT_CHUNK_SIZE = int(os.getenv("STATEMENT_IMPORT_CHUNK_SIZE", "500"))
+# Spend the categorizer could not place in an SDS class is treated as variable essential
+DEFAULT_IMPORT_SDS_CLASS = SDSWeightClass.VARIABLE_ESSENTIAL
+
+
+class StatementImportService:
+    """
+    Streams a CSV/OFX bank statement into the transactions table for historical
+    backfill (so the 4-month lookback in FixedCommitmentService and the cohort
+    benchmarks have data on day one).
+
+    The upload is consumed as an async byte stream and parsed row by row; rows are
+    categorized and written in chunks, so memory stays flat regardless of file size.
+    Progress is committed on the StatementImportJob after every chunk.
+
+    Every row carries a statement fingerprint in the (user_id, sms_fingerprint) unique
+    index, so re-uploading a statement or retrying a FAILED job skips the rows already
+    imported (counted in rows_skipped) instead of duplicating them.
+    """
+
+    def __init__(self, db: AsyncSession, user_id: int):
+        self.db = db
+        self.user_id = user_id
+
+    # ----------------------------------------------------------------------
+    # JOB STATUS
+    # ----------------------------------------------------------------------
+    async def create_job(self, statement_format: str, filename: Optional[str] = None) -> StatementImportJob:
+        job = StatementImportJob(
+            user_id=self.user_id,
+            statement_format=statement_format,
+            filename=filename,
+            status=ImportJobStatus.PENDING,
+        )
+        self.db.add(job)
+        await self.db.commit() # Visible to GET /statements/jobs/{id} immediately
+        return job
+
+    async def get_job(self, job_id: int) -> Optional[StatementImportJob]:
+        stmt = select(StatementImportJob).where(
+            StatementImportJob.id == job_id,
+            StatementImportJob.user_id == self.user_id
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    # ----------------------------------------------------------------------
+    # IMPORT
+    # ----------------------------------------------------------------------
+    async def run_import(self, job: StatementImportJob, byte_stream: AsyncIterator[bytes]) -> StatementImportJob:
+        """Consumes the upload stream to the end and returns the finished job."""
+        parser = STATEMENT_PARSERS[job.statement_format]
+
+        async def counted(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+            async for chunk in stream:
+                job.bytes_read += len(chunk)
+                yield chunk
+
+        job.status = ImportJobStatus.RUNNING
+        chunk: List[StatementRow] = []
+        fingerprints: List[str] = []
+        # Identical rows on the same day are numbered in file order. Keyed by date for the
+        # whole file: statements are not always date-sorted, and a day's rows may be split
+        occurrences: Dict[Tuple[Any, Any, str], int] = {}
+        try:
+            # 1. Parse row by row; only the current chunk of rows is held in memory
+            async for item in parser(counted(byte_stream)):
+                job.rows_read += 1
+                if isinstance(item, StatementRowError):
+                    job.rows_failed += 1
+                    job.last_error = f"Line {item.line_no}: {item.message}"
+                    continue
+                if item.direction == CREDIT:
+                    # Salary/refund credits are not spend; the transactions table holds outflows
+                    job.rows_skipped += 1
+                    continue
+
+                identity = statement_row_identity(item.reference, item.description)
+                occurrence_key = (item.transaction_date.date(), item.amount, identity)
+                occurrence = occurrences.get(occurrence_key, 0)
+                occurrences[occurrence_key] = occurrence + 1
+
+                chunk.append(item)
+                fingerprints.append(statement_row_fingerprint(item.transaction_date, item.amount, identity, occurrence))
+                if len(chunk) >= STATEMENT_IMPORT_CHUNK_SIZE:
+                    await self._write_chunk(job, chunk, fingerprints)
+                    chunk, fingerprints = [], []
+
+            # 2. Flush the final partial chunk
+            if chunk:
+                await self._write_chunk(job, chunk, fingerprints)
+
+            job.status = ImportJobStatus.COMPLETED
+        except Exception as e:
+            # Chunks committed so far stay imported; reload the job's committed progress
+            await self.db.rollback()
+            await self.db.refresh(job)
+            print(f"Statement import {job.id} failed: {e}")
+            job.status = ImportJobStatus.FAILED
+            job.last_error = str(e)
+
+        job.finished_at = datetime.utcnow()
+        job.updated_at = job.finished_at
+        await self.db.commit()
+        return job
+
+    async def _categorize_chunk(self, rows: List[StatementRow]) -> List[Tuple[str, Optional[SDSWeightClass]]]:
+        """
+        Categorizes a chunk: merchant keywords first, then the merchant cache, and one
+        batched categorizer call for whatever is left.
+        """
+        results: List[Optional[Tuple[str, Optional[SDSWeightClass]]]] = [None] * len(rows)
+        ml_indexes: List[int] = []
+        ml_keys: List[Optional[str]] = []
+
+        for index, row in enumerate(rows):
+            category = resolve_category(row.description, DEBIT)
+            if category is not None:
+                results[index] = (category, infer_sds_class(category))
+                continue
+            merchant_key = merchant_key_from_text(row.description)
+            cached = await merchant_category_cache.get(merchant_key)
+            if cached is not None:
+                results[index] = cached
+                continue
+            ml_indexes.append(index)
+            ml_keys.append(merchant_key)
+
+        if ml_indexes:
+            ml_results = await categorizer_client.categorize_many([rows[i].description for i in ml_indexes])
+            for index, merchant_key, ml_result in zip(ml_indexes, ml_keys, ml_results):
+                category = ml_result["category"]
+                if not is_fallback_result(ml_result):
+                    await merchant_category_cache.put(merchant_key, category)
+                results[index] = (category, infer_sds_class(category))
+
+        return results
+
+    async def _write_chunk(self, job: StatementImportJob, rows: List[StatementRow], fingerprints: List[str]):
+        """
+        Categorizes one chunk, bulk-inserts it and commits it together with the job progress.
+        Rows whose fingerprint is already stored (an earlier upload) are skipped.
+        """
+        categories = await self._categorize_chunk(rows)
+
+        values: List[Dict[str, Any]] = [
+            {
+                "user_id": self.user_id,
+                "amount": row.amount,
+                "transaction_date": row.transaction_date,
+                "description": row.description,
+                "category": category,
+                "sds_class": sds_class or DEFAULT_IMPORT_SDS_CLASS,
+                "sms_fingerprint": fingerprint,
+                "is_manual_override": False,
+                "status": TransactionStatus.COMPLETED,
+            }
+            for row, fingerprint, (category, sds_class) in zip(rows, fingerprints, categories)
+        ]
+        # One multi-row INSERT; rows already imported conflict on the fingerprint index
+        stmt = pg_insert(Transaction).values(values).on_conflict_do_nothing(
+            index_elements=[Transaction.user_id, Transaction.sms_fingerprint]
+        ).returning(Transaction.id)
+        inserted = len((await self.db.execute(stmt)).all())
+
+        job.rows_imported += inserted
+        job.rows_skipped += len(values) - inserted
+        job.updated_at = datetime.utcnow()
+        await self.db.commit()
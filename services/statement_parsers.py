@@ -0,0 +1,318 @@
+# services/statement_parsers.py
+
+import codecs
+import csv
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, localcontext
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from .sms_parsers import DEBIT, CREDIT
+
+# --- CSV HEADER ALIASES (lower-cased, as exported by common Indian banks) ---
+CSV_DATE_COLUMNS = ("date", "txn date", "transaction date", "value date", "value dt", "posting date", "tran date")
+CSV_DESCRIPTION_COLUMNS = ("description", "narration", "particulars", "remarks", "transaction remarks", "details")
+CSV_DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawal amt", "withdrawal amt.", "withdrawal amount", "withdrawal amount (inr)", "debit amount", "dr")
+CSV_CREDIT_COLUMNS = ("credit", "deposit", "deposit amt", "deposit amt.", "deposit amount", "deposit amount (inr)", "credit amount", "cr")
+CSV_AMOUNT_COLUMNS = ("amount", "transaction amount", "amount (inr)")
+CSV_DIRECTION_COLUMNS = ("type", "dr/cr", "cr/dr", "transaction type")
+CSV_REFERENCE_COLUMNS = ("chq/ref number", "chq./ref.no.", "ref no./cheque no.", "reference", "ref no", "utr")
+
+# Bank exports often carry an account-summary preamble before the header row
+CSV_MAX_PREAMBLE_LINES = 50
+# A quoted field may span lines, but a record never grows past these limits (an
+# unclosed quote is reported instead of buffering the rest of the upload)
+CSV_MAX_RECORD_LINES = 20
+CSV_MAX_RECORD_CHARS = 64 * 1024
+
+STATEMENT_DATE_FORMATS = (
+    "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d-%m-%y", "%Y-%m-%d",
+    "%d-%b-%Y", "%d-%b-%y", "%d %b %Y", "%d %b %y", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S",
+)
+
+_AMOUNT_NOISE = re.compile(r"(?:INR|Rs\.?|₹|,|\s)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class StatementRow:
+    """One normalized statement line (amount is always positive; direction carries the sign)."""
+    line_no: int
+    transaction_date: datetime
+    amount: Decimal
+    direction: str
+    description: str
+    reference: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StatementRowError:
+    """A statement line that could not be parsed (reported, never fatal for the import)."""
+    line_no: int
+    message: str
+
+
+StatementItem = Union[StatementRow, StatementRowError]
+
+
+# ----------------------------------------------------------------------
+# STREAM HELPERS (constant memory: only the current chunk/record is held)
+# ----------------------------------------------------------------------
+async def iter_decoded(byte_chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Incrementally decodes a byte stream (multi-byte characters may straddle chunks)."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    async for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_split(text_chunks: AsyncIterator[str], separator: str) -> AsyncIterator[str]:
+    """Re-splits a stream of text chunks on a separator, yielding one piece at a time."""
+    buffer = ""
+    async for chunk in text_chunks:
+        buffer += chunk
+        pieces = buffer.split(separator)
+        buffer = pieces.pop()
+        for piece in pieces:
+            yield piece
+    if buffer:
+        yield buffer
+
+
+def parse_statement_amount(value: Optional[str]) -> Optional[Decimal]:
+    """Parses '1,234.50', 'INR 99', '(250.00)' or '-250' into a Decimal; blanks become None."""
+    if value is None:
+        return None
+    cleaned = _AMOUNT_NOISE.sub("", value)
+    if not cleaned or cleaned == "-":
+        return None
+    negative = cleaned.startswith("(") and cleaned.endswith(")")
+    if negative:
+        cleaned = cleaned[1:-1]
+    # Exact context: ml/scaling_logic lowers the process-wide precision, under which
+    # quantizing any amount of 100.00 or more raises InvalidOperation
+    with localcontext() as ctx:
+        ctx.prec = 28
+        try:
+            amount = Decimal(cleaned).quantize(Decimal("0.01"))
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount '{value}'")
+        return amount.copy_negate() if negative else amount
+
+
+def parse_statement_date(value: str) -> datetime:
+    value = value.strip()
+    for date_format in STATEMENT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+
+# ----------------------------------------------------------------------
+# CSV
+# ----------------------------------------------------------------------
+def _find_column(header: List[str], aliases) -> Optional[int]:
+    for index, name in enumerate(header):
+        if name in aliases:
+            return index
+    return None
+
+
+class _CsvLayout:
+    """Column positions resolved from the header row."""
+
+    def __init__(self, header: List[str]):
+        normalized = [name.strip().lower() for name in header]
+        self.date = _find_column(normalized, CSV_DATE_COLUMNS)
+        self.description = _find_column(normalized, CSV_DESCRIPTION_COLUMNS)
+        self.debit = _find_column(normalized, CSV_DEBIT_COLUMNS)
+        self.credit = _find_column(normalized, CSV_CREDIT_COLUMNS)
+        self.amount = _find_column(normalized, CSV_AMOUNT_COLUMNS)
+        self.direction = _find_column(normalized, CSV_DIRECTION_COLUMNS)
+        self.reference = _find_column(normalized, CSV_REFERENCE_COLUMNS)
+
+    @property
+    def is_valid(self) -> bool:
+        has_amount = self.amount is not None or self.debit is not None or self.credit is not None
+        return self.date is not None and self.description is not None and has_amount
+
+    @staticmethod
+    def _cell(record: List[str], index: Optional[int]) -> Optional[str]:
+        if index is None or index >= len(record):
+            return None
+        return record[index].strip()
+
+    def to_row(self, line_no: int, record: List[str]) -> StatementRow:
+        transaction_date = parse_statement_date(self._cell(record, self.date) or "")
+        description = self._cell(record, self.description) or ""
+
+        debit = parse_statement_amount(self._cell(record, self.debit))
+        credit = parse_statement_amount(self._cell(record, self.credit))
+        if debit:
+            amount, direction = debit.copy_abs(), DEBIT
+        elif credit:
+            amount, direction = credit.copy_abs(), CREDIT
+        else:
+            signed = parse_statement_amount(self._cell(record, self.amount))
+            if not signed:
+                raise ValueError("Row has no amount")
+            marker = (self._cell(record, self.direction) or "").upper()
+            if marker.startswith("CR"):
+                direction = CREDIT
+            elif marker.startswith("DR") or marker.startswith("DEBIT"):
+                direction = DEBIT
+            else:
+                direction = DEBIT if signed < 0 else CREDIT
+            amount = signed.copy_abs()
+
+        return StatementRow(
+            line_no=line_no,
+            transaction_date=transaction_date,
+            amount=amount,
+            direction=direction,
+            description=description,
+            reference=self._cell(record, self.reference) or None,
+        )
+
+
+def _csv_quote_state(line: str, in_quotes: bool) -> bool:
+    """
+    Returns whether a record is still inside a quoted field after this line. As in
+    csv.reader, a quote only opens a field at its start, so a stray quote inside an
+    unquoted field (e.g. 'Bought 5" TV') is literal; '""' inside quotes is an escape.
+    """
+    if '"' not in line:
+        return in_quotes
+    at_field_start = not in_quotes
+    index, length = 0, len(line)
+    while index < length:
+        char = line[index]
+        if in_quotes:
+            if char == '"':
+                if index + 1 < length and line[index + 1] == '"':
+                    index += 1
+                else:
+                    in_quotes = False
+        elif char == '"' and at_field_start:
+            in_quotes = True
+        at_field_start = char == ","
+        index += 1
+    return in_quotes
+
+
+async def parse_csv_statement(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[StatementItem]:
+    """
+    Streams a CSV bank statement row by row. The header row is detected after any
+    preamble; quoted fields spanning several lines are re-assembled before parsing
+    (up to CSV_MAX_RECORD_LINES / CSV_MAX_RECORD_CHARS, then reported as an error).
+    """
+    layout: Optional[_CsvLayout] = None
+    pending: List[str] = []
+    pending_chars = 0
+    in_quotes = False
+    record_line_no = 0
+    line_no = 0
+
+    async for line in iter_split(iter_decoded(byte_chunks, "utf-8-sig"), "\n"):
+        line_no += 1
+        if not pending:
+            record_line_no = line_no
+        pending.append(line)
+        pending_chars += len(line)
+
+        # Quote state is carried across lines, so each line is scanned once
+        in_quotes = _csv_quote_state(line, in_quotes)
+        if in_quotes:
+            if len(pending) >= CSV_MAX_RECORD_LINES or pending_chars >= CSV_MAX_RECORD_CHARS:
+                yield StatementRowError(record_line_no, f"Quoted field not closed within {len(pending)} lines; record skipped.")
+                pending, pending_chars, in_quotes = [], 0, False
+            continue # Quoted field continues on the next line
+
+        record_text = "\n".join(pending).rstrip("\r")
+        pending, pending_chars = [], 0
+        if not record_text.strip():
+            continue
+
+        record = next(csv.reader([record_text]))
+
+        if layout is None:
+            candidate = _CsvLayout(record)
+            if candidate.is_valid:
+                layout = candidate
+            elif line_no > CSV_MAX_PREAMBLE_LINES:
+                yield StatementRowError(line_no, "No recognizable header row (date, description, amount columns).")
+                return
+            continue
+
+        try:
+            yield layout.to_row(record_line_no, record)
+        except ValueError as e:
+            yield StatementRowError(record_line_no, str(e))
+
+    if pending:
+        yield StatementRowError(record_line_no, "Quoted field not closed at end of file; record skipped.")
+
+
+# ----------------------------------------------------------------------
+# OFX (SGML 1.x and XML 2.x)
+# ----------------------------------------------------------------------
+def _parse_ofx_date(value: str) -> datetime:
+    digits = re.match(r"\d{8}(\d{6})?", value.strip())
+    if digits is None:
+        raise ValueError(f"Invalid DTPOSTED '{value}'")
+    stamp = digits.group(0)
+    return datetime.strptime(stamp, "%Y%m%d%H%M%S" if len(stamp) == 14 else "%Y%m%d")
+
+
+def _ofx_record_to_row(index: int, fields: Dict[str, str]) -> StatementRow:
+    signed = parse_statement_amount(fields.get("TRNAMT"))
+    if not signed:
+        raise ValueError("STMTTRN has no TRNAMT")
+    trn_type = fields.get("TRNTYPE", "").upper()
+    direction = CREDIT if trn_type == "CREDIT" or (trn_type != "DEBIT" and signed > 0) else DEBIT
+    description = " ".join(part for part in (fields.get("NAME"), fields.get("MEMO")) if part)
+    return StatementRow(
+        line_no=index,
+        transaction_date=_parse_ofx_date(fields.get("DTPOSTED", "")),
+        amount=signed.copy_abs(),
+        direction=direction,
+        description=description,
+        reference=fields.get("FITID"),
+    )
+
+
+async def parse_ofx_statement(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[StatementItem]:
+    """
+    Streams the <STMTTRN> records of an OFX statement. Tokenizes on '<' rather than
+    on newlines, so single-line OFX files are streamed just as well.
+    """
+    fields: Optional[Dict[str, str]] = None
+    record_no = 0
+
+    async for token in iter_split(iter_decoded(byte_chunks, "latin-1"), "<"):
+        tag, _, value = token.partition(">")
+        tag = tag.strip().upper()
+
+        if tag == "STMTTRN":
+            fields = {}
+        elif tag == "/STMTTRN" and fields is not None:
+            record_no += 1
+            try:
+                yield _ofx_record_to_row(record_no, fields)
+            except ValueError as e:
+                yield StatementRowError(record_no, str(e))
+            fields = None
+        elif fields is not None and tag and not tag.startswith("/"):
+            fields[tag] = value.strip()
+
+
+STATEMENT_PARSERS = {
+    "CSV": parse_csv_statement,
+    "OFX": parse_ofx_statement,
+}
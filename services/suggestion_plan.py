@@ -0,0 +1,240 @@
+# services/suggestion_plan.py
+
+from datetime import date, datetime
+from decimal import Decimal, localcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.salary_profile import SalaryAllocationProfile
+from ..models.smart_rule_version import SmartRuleVersion
+from ..models.suggestion_plan import SuggestionPlan
+
+# Below this available fund the Autopilot stays on standby (no plan)
+ACTION_THRESHOLD = Decimal("500.00")
+# Rules whose destination starts with this are tax-saving rules (allocated first)
+TAX_GOAL_PREFIX = "Tax_"
+STANDBY_MESSAGE = "Reclaimable salary below action threshold. Autopilot on standby."
+
+PLAN_TYPE_CODES = {"TAX_SAVING": "T", "GOAL_STASH": "G"}
+PLAN_TYPES = {code: plan_type for plan_type, code in PLAN_TYPE_CODES.items()}
+CENT = Decimal("0.01")
+
+
+def allocate_suggestion_plan(
+    available_fund: Decimal,
+    remaining_tax_headroom: Decimal,
+    rules: Sequence[Tuple[int, str, Decimal]],
+) -> Dict[str, Any]:
+    """
+    Allocates the available fund across the active rules, given as (rule_id,
+    destination_goal, max_transfer_limit) in priority order: tax-saving rules first (up
+    to the remaining annual headroom), then every other goal/stash.
+    """
+    with localcontext() as ctx:
+        # Exact context: ml/scaling_logic lowers the process precision
+        ctx.prec = 28
+        if available_fund <= ACTION_THRESHOLD:
+            return {
+                "available_fund": available_fund.quantize(CENT),
+                "total_suggested": Decimal("0.00"),
+                "suggestion_plan": [],
+                "remaining_unallocated": available_fund.quantize(CENT),
+                "message": STANDBY_MESSAGE,
+            }
+
+        remaining_fund = available_fund
+        total_suggested = Decimal("0.00")
+        suggestion_plan: List[Dict[str, Any]] = []
+        tax_rules = [rule for rule in rules if rule[1].startswith(TAX_GOAL_PREFIX)]
+        other_rules = [rule for rule in rules if not rule[1].startswith(TAX_GOAL_PREFIX)]
+
+        # 1. --- PRIORITY ALLOCATION: TAX SAVING ---
+        for rule_id, destination, max_transfer_limit in tax_rules:
+            if remaining_fund <= Decimal("0.00"): break
+            transfer_target = min(max_transfer_limit, remaining_fund, remaining_tax_headroom)
+            if transfer_target > Decimal("0.00"):
+                suggestion_plan.append(_item(rule_id, destination, transfer_target, "TAX_SAVING"))
+                remaining_fund -= transfer_target
+                remaining_tax_headroom -= transfer_target
+                total_suggested += transfer_target
+
+        # 2. --- SECONDARY ALLOCATION: OTHER GOALS/STASHES ---
+        for rule_id, destination, max_transfer_limit in other_rules:
+            if remaining_fund <= Decimal("0.00"): break
+            transfer_amount = min(max_transfer_limit, remaining_fund)
+            if transfer_amount > Decimal("0.00"):
+                suggestion_plan.append(_item(rule_id, destination, transfer_amount, "GOAL_STASH"))
+                remaining_fund -= transfer_amount
+                total_suggested += transfer_amount
+
+        return {
+            "available_fund": available_fund.quantize(CENT),
+            "remaining_unallocated": remaining_fund.quantize(CENT),
+            "total_suggested": total_suggested.quantize(CENT),
+            "suggestion_plan": suggestion_plan,
+            "message": _plan_message(available_fund.quantize(CENT), total_suggested.quantize(CENT)),
+        }
+
+
+def _item(rule_id: int, destination: str, amount: Decimal, plan_type: str) -> Dict[str, Any]:
+    return {
+        "rule_id": rule_id,
+        "rule_name": destination,
+        "transfer_amount": amount.quantize(CENT),
+        "destination": destination,
+        "type": plan_type,
+    }
+
+
+def _plan_message(available_fund: Decimal, total_suggested: Decimal) -> str:
+    if available_fund <= ACTION_THRESHOLD:
+        return STANDBY_MESSAGE
+    return f"Autopilot suggests reallocating {total_suggested} across goals, prioritizing tax optimization."
+
+
+# ----------------------------------------------------------------------
+# MATERIALIZED PLAN (one row per user and reporting period)
+# ----------------------------------------------------------------------
+def plan_from_row(row: SuggestionPlan) -> Dict[str, Any]:
+    """The stored row as the SuggestionPlanResponse dict (message and rule names are derived)."""
+    with localcontext() as ctx:
+        ctx.prec = 28
+        items = [
+            _item(rule_id, destination, Decimal(amount), PLAN_TYPES[code])
+            for rule_id, destination, amount, code in row.items
+        ]
+    return {
+        "available_fund": row.available_fund,
+        "remaining_unallocated": row.remaining_unallocated,
+        "total_suggested": row.total_suggested,
+        "suggestion_plan": items,
+        "message": _plan_message(row.available_fund, row.total_suggested),
+    }
+
+
+async def load_suggestion_plan(db: AsyncSession, user_id: int, reporting_period: date) -> Tuple[Optional[SuggestionPlan], Optional[int], int]:
+    """
+    One statement, three primary-key lookups: the stored plan, the current version of
+    the profile it was computed from (None if the plan or the profile is gone) and the
+    user's current rules version.
+    """
+    row = (await db.execute(
+        select(SuggestionPlan, SalaryAllocationProfile.version, func.coalesce(SmartRuleVersion.version, 0))
+        .outerjoin(SalaryAllocationProfile, SalaryAllocationProfile.id == SuggestionPlan.salary_profile_id)
+        .outerjoin(SmartRuleVersion, SmartRuleVersion.user_id == SuggestionPlan.user_id)
+        .where(SuggestionPlan.user_id == user_id, SuggestionPlan.reporting_period == reporting_period)
+    )).first()
+    if row is None:
+        return None, None, 0
+    return row[0], row[1], row[2]
+
+
+def is_current(plan: SuggestionPlan, profile_version: Optional[int], rules_version: int, today: Optional[date] = None) -> bool:
+    """
+    Current while no profile write (leakage, consent, settlement) and no rule edit
+    happened since, and on the same day.
+    """
+    return (
+        profile_version is not None
+        and plan.profile_version == profile_version
+        and plan.rules_version == rules_version
+        and plan.valid_on == (today or datetime.utcnow().date())
+    )
+
+
+async def save_suggestion_plan(
+    db: AsyncSession,
+    user_id: int,
+    reporting_period: date,
+    salary_profile_id: int,
+    profile_version: int,
+    rules_version: int,
+    projected_reclaimable: Decimal,
+    plan: Dict[str, Any],
+):
+    """Upserts the period's plan (last writer wins between concurrent rebuilds). Caller commits."""
+    now = datetime.utcnow()
+    stmt = pg_insert(SuggestionPlan).values(
+        user_id=user_id,
+        reporting_period=reporting_period,
+        salary_profile_id=salary_profile_id,
+        profile_version=profile_version,
+        rules_version=rules_version,
+        projected_reclaimable=projected_reclaimable,
+        valid_on=now.date(),
+        available_fund=plan["available_fund"],
+        remaining_unallocated=plan["remaining_unallocated"],
+        total_suggested=plan["total_suggested"],
+        items=[
+            [item["rule_id"], item["destination"], str(item["transfer_amount"]), PLAN_TYPE_CODES[item["type"]]]
+            for item in plan["suggestion_plan"]
+        ],
+        computed_at=now,
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SuggestionPlan.user_id, SuggestionPlan.reporting_period],
+        set_={
+            column: stmt.excluded[column]
+            for column in (
+                "salary_profile_id", "profile_version", "rules_version", "projected_reclaimable", "valid_on", "available_fund",
+                "remaining_unallocated", "total_suggested", "items", "computed_at",
+            )
+        },
+    ))
+
+
+def rules_version_subquery(user_id: Any):
+    """The user's current rules version (0 before the first rule edit), as a scalar subquery."""
+    return func.coalesce(
+        select(SmartRuleVersion.version).where(SmartRuleVersion.user_id == user_id).scalar_subquery(), 0
+    )
+
+
+async def bump_rules_version(db: AsyncSession, user_id: int):
+    """
+    Rule CRUD: moves the user's rules version in the rule edit's transaction. The counter
+    row lock orders concurrent edits, and any plan computed from the old rules (even one
+    upserted after this commits) carries the old version and is rebuilt on the next read.
+    Caller commits.
+    """
+    stmt = pg_insert(SmartRuleVersion).values(user_id=user_id, version=1, updated_at=datetime.utcnow())
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SmartRuleVersion.user_id],
+        set_={"version": SmartRuleVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+    suggestion_plan_metrics.rule_edits += 1
+
+
+# ----------------------------------------------------------------------
+# METRICS (per worker)
+# ----------------------------------------------------------------------
+class SuggestionPlanMetrics:
+    def __init__(self):
+        self.requests = 0
+        # Served straight from the materialized row
+        self.served_materialized = 0
+        # Missing or stale at read time (rules edited, consent since, new day): rebuilt
+        self.rebuilt_on_read = 0
+        # Rebuilt by the recalculation hook because an input changed
+        self.rebuilt_on_recalculation = 0
+        # Recalculation hook found the stored plan still current
+        self.unchanged_on_recalculation = 0
+        # Rule edits that moved a rules version
+        self.rule_edits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "served_materialized": self.served_materialized,
+            "materialized_hit_rate": round(self.served_materialized / self.requests, 4) if self.requests else 0.0,
+            "rebuilt_on_read": self.rebuilt_on_read,
+            "rebuilt_on_recalculation": self.rebuilt_on_recalculation,
+            "unchanged_on_recalculation": self.unchanged_on_recalculation,
+            "rule_edits": self.rule_edits,
+        }
+
+
+suggestion_plan_metrics = SuggestionPlanMetrics()
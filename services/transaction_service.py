@@ -1,37 +1,134 @@
 # services/transaction_service.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime
-from decimal import Decimal
-import uuid
+from decimal import Decimal, localcontext
+from typing import Any, Dict, List, Optional, Tuple
 
 # Import schemas and models
 from ..api.v1.schemas.transaction import RawTransactionIn, CategorizedTransactionOut
-from ..db.models import Transaction, LeakBucket, SalaryAllocationProfile
-from ..db.enums import TransactionType
+from ..models.transaction import Transaction
+from ..db.enums import SDSWeightClass, TransactionStatus
+from .sms_parsers import sms_parser_registry, CREDIT
+from .categorizer_client import categorizer_client, is_fallback_result
+from .dedup import duplicate_suppressor, sms_fingerprint, TRANSACTIONS_SCOPE
+from .categorization_cache import merchant_category_cache, normalize_merchant_key, merchant_key_from_text, infer_sds_class, SDS_CLASS_BY_PREFIX
+
+# Spend the categorizer could not place in an SDS class is treated as variable essential
+DEFAULT_INGEST_SDS_CLASS = SDSWeightClass.VARIABLE_ESSENTIAL
+
+
+class InvalidCategoryOverride(Exception):
+    """The override category does not map to an SDS weight class (e.g. 'Income_*' or a typo)."""
+
+
+class CreditMessageSkipped(Exception):
+    """The SMS reports a credit (salary, refund, transfer in): not spend, so nothing is stored."""
+
 
 class TransactionService:
     """
-    Handles the ingestion, ML categorization, and initial leakage assessment 
+    Handles the ingestion, ML categorization, and initial leakage assessment
     of raw SMS transaction data.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def _call_ml_categorizer(self, transaction_text: str) -> dict:
+    async def _call_ml_categorizer(self, transaction_text: str) -> dict:
         """
-        [MOCK] Placeholder for calling the external ML categorization service.
-        In production, this would be an HTTP call to the 'categorizer_api.py'.
+        Calls the external ML categorization service ('categorizer_api.py') through the
+        micro-batching client, so concurrent ingests share one HTTP round trip.
+        Falls back to the mock categorizer when the service is unavailable.
         """
-        # Mocking the ML model response for a typical expense SMS
-        return {
-            "merchant": "Zomato/Swiggy/CloudKitchen",
-            "category": "Discretionary_Food_Delivery",
-            "amount": 450.00,  # Extracted by ML or parser
-            "type": TransactionType.DEBIT.value
-        }
-        
+        return await categorizer_client.categorize(transaction_text)
+
+    async def _call_ml_categorizer_batch(self, transaction_texts: List[str]) -> List[dict]:
+        """
+        Categorizes a whole batch of messages together. Results are returned in the
+        same order as the input texts.
+        """
+        return await categorizer_client.categorize_many(transaction_texts)
+
+    async def _resolve_without_ml(self, raw_data: RawTransactionIn) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        Tries to categorize a message without the ML service: first the bank's precompiled
+        SMS templates, then the merchant -> category cache for the extracted merchant.
+        Returns (result or None, merchant cache key). A template hit whose merchant is
+        unknown is still returned, with category None: only the category is left to ML.
+        """
+        parsed = sms_parser_registry.parse(raw_data.bank_identifier, raw_data.transaction_text)
+        if parsed is None:
+            return None, merchant_key_from_text(raw_data.transaction_text)
+
+        result = parsed.as_categorizer_result()
+        if parsed.category is not None:
+            return result, None
+
+        merchant_key = normalize_merchant_key(parsed.merchant)
+        cached = await merchant_category_cache.get(merchant_key)
+        if cached is not None:
+            result["category"], result["sds_class"] = cached
+        return result, merchant_key
+
+    async def _remember_ml_result(self, merchant_key: Optional[str], ml_result: dict):
+        """
+        Memoizes an ML categorization so the next message from this merchant skips the call.
+        Fallback (mock) answers are not memoized, so a categorizer outage does not pin merchants.
+        """
+        if is_fallback_result(ml_result):
+            return
+        await merchant_category_cache.put(merchant_key or normalize_merchant_key(ml_result.get('merchant')), ml_result['category'])
+
+    @staticmethod
+    def _with_ml_category(parsed: Optional[dict], ml_result: dict) -> dict:
+        """
+        The template's amount, merchant, direction and date are kept when it parsed the
+        message; only category and sds_class come from the ML categorizer.
+        """
+        if parsed is None:
+            return ml_result
+        parsed["category"] = ml_result['category']
+        parsed["sds_class"] = ml_result.get('sds_class') or infer_sds_class(ml_result['category'])
+        return parsed
+
+    async def _categorize(self, raw_data: RawTransactionIn) -> dict:
+        """
+        Categorizes a message with the bank's precompiled SMS templates or the merchant
+        cache when possible, falling back to the ML categorizer for the rest.
+        """
+        result, merchant_key = await self._resolve_without_ml(raw_data)
+        if result is not None and result["category"] is not None:
+            return result
+
+        ml_result = await self._call_ml_categorizer(raw_data.transaction_text)
+        await self._remember_ml_result(merchant_key, ml_result)
+        return self._with_ml_category(result, ml_result)
+
+    async def _categorize_batch(self, raw_items: List[RawTransactionIn]) -> List[dict]:
+        """
+        Batch variant of _categorize: only the messages neither the templates nor the
+        cache categorize are sent to the ML categorizer, in a single batched call.
+        """
+        results: List[dict] = [None] * len(raw_items)
+        ml_indexes: List[int] = []
+        ml_merchant_keys: List[Optional[str]] = []
+        for index, raw_data in enumerate(raw_items):
+            result, merchant_key = await self._resolve_without_ml(raw_data)
+            results[index] = result
+            if result is None or result["category"] is None:
+                ml_indexes.append(index)
+                ml_merchant_keys.append(merchant_key)
+
+        if ml_indexes:
+            ml_results = await self._call_ml_categorizer_batch([raw_items[i].transaction_text for i in ml_indexes])
+            for index, merchant_key, ml_result in zip(ml_indexes, ml_merchant_keys, ml_results):
+                await self._remember_ml_result(merchant_key, ml_result)
+                results[index] = self._with_ml_category(results[index], ml_result)
+        return results
+
     def _assess_leak_potential(self, amount: Decimal, category: str) -> Decimal:
         """
         [MOCK] Performs an initial, coarse leak assessment based on category rules.
@@ -42,53 +139,238 @@ class TransactionService:
             return amount
         return Decimal("0.00")
 
-    def process_raw_transaction(self, raw_data: RawTransactionIn, user_id: str) -> CategorizedTransactionOut:
-        """
-        Orchestrates the categorization, storage, and initial leak assessment.
-        """
-        
-        # 1. ML Categorization and Extraction
-        ml_result = self._call_ml_categorizer(raw_data.transaction_text)
-        
-        # Use Decimal for accurate financial calculations
-        amount = Decimal(ml_result['amount']).quantize(Decimal('0.01'))
-        
-        # 2. Initial Leak Assessment
-        leak_potential = self._assess_leak_potential(amount, ml_result['category'])
-        
-        # 3. Create the Database Transaction Record
-        transaction_id = str(uuid.uuid4())
-        
-        # Convert string date to datetime object
+    def _parse_sms_datetime(self, sms_date_time: str, parsed_date: Optional[datetime] = None) -> datetime:
+        """Converts the SMS timestamp string into a datetime object."""
         try:
             # Assuming ISO format like "YYYY-MM-DD HH:MM:SS"
-            transaction_date = datetime.fromisoformat(raw_data.sms_date_time)
+            return datetime.fromisoformat(sms_date_time)
         except ValueError:
-            # Fallback for date parsing errors
-            transaction_date = datetime.now()
-
-        new_transaction = Transaction(
-            transaction_id=transaction_id,
-            user_id=user_id,
-            transaction_type=ml_result['type'],
-            amount=amount,
-            merchant=ml_result['merchant'],
-            category=ml_result['category'],
-            leak_potential=leak_potential,
-            transaction_date=transaction_date,
-            raw_sms_text=raw_data.transaction_text
+            # Fallback for date parsing errors: the date printed in the SMS body (if a template
+            # extracted one), otherwise the ingestion time
+            return parsed_date or datetime.now()
+
+    def _build_transaction_row(self, raw_data: RawTransactionIn, ml_result: dict, user_id: int) -> Dict[str, Any]:
+        """
+        Turns a raw message and its categorization result into the column values
+        of a Transaction row (shared by the single and batch ingestion paths).
+        The caller adds sms_fingerprint; id and created_at are assigned on insert.
+        """
+        # Use Decimal for accurate financial calculations, under an exact context:
+        # ml/scaling_logic lowers the process-wide precision, and quantizing an amount
+        # of 100.00 or more would raise InvalidOperation
+        with localcontext() as ctx:
+            ctx.prec = 28
+            amount = Decimal(ml_result['amount']).quantize(Decimal('0.01'))
+
+        return {
+            "user_id": user_id,
+            "amount": amount,
+            "transaction_date": self._parse_sms_datetime(raw_data.sms_date_time, ml_result.get('transaction_date')),
+            # The SMS body is the transaction's description (NOT NULL)
+            "description": raw_data.transaction_text,
+            "category": ml_result['category'],
+            # Resolved by the template, the merchant cache or the ML categorizer
+            "sds_class": ml_result.get('sds_class') or infer_sds_class(ml_result['category']) or DEFAULT_INGEST_SDS_CLASS,
+            "status": TransactionStatus.COMPLETED,
+        }
+
+    # Columns returned for every stored/duplicate transaction (API response fields)
+    def _response_columns(self):
+        return (
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.category,
+            Transaction.sms_fingerprint,
         )
 
-        self.db.add(new_transaction)
-        self.db.commit()
-        self.db.refresh(new_transaction)
-        
-        # 4. Return the categorized schema (for the API response)
+    def _to_out(self, saved, ingest_status: str = "ingested") -> CategorizedTransactionOut:
         return CategorizedTransactionOut(
-            transaction_id=new_transaction.transaction_id,
-            user_id=new_transaction.user_id,
-            amount=float(new_transaction.amount), # Convert back to float for JSON response model
-            merchant=new_transaction.merchant,
-            category=new_transaction.category,
-            leak_potential=float(new_transaction.leak_potential)
+            transaction_id=saved.id,
+            user_id=saved.user_id,
+            amount=float(saved.amount), # Convert back to float for JSON response model
+            description=saved.description,
+            category=saved.category,
+            # Initial leak assessment (not stored; LeakageService computes the real leak against the DMB)
+            leak_potential=float(self._assess_leak_potential(saved.amount, saved.category)),
+            ingest_status=ingest_status
         )
+
+    async def _find_duplicates(self, user_id: int, fingerprints: List[str], probe_all: bool = False) -> Dict[str, Any]:
+        """
+        Returns {fingerprint: stored row} for the fingerprints already ingested.
+        Only the ones the per-worker Bloom filter flags are probed (one indexed query),
+        unless probe_all is set (used after an ON CONFLICT skip).
+        """
+        candidates = set(fingerprints) if probe_all else {
+            fingerprint for fingerprint in fingerprints
+            if duplicate_suppressor.might_contain(TRANSACTIONS_SCOPE, user_id, fingerprint)
+        }
+        if not candidates:
+            return {}
+
+        stored = (await self.db.execute(
+            select(*self._response_columns()).where(
+                Transaction.user_id == user_id,
+                Transaction.sms_fingerprint.in_(candidates)
+            )
+        )).all()
+        existing = {row.sms_fingerprint: row for row in stored}
+        if not probe_all:
+            for fingerprint in candidates:
+                duplicate_suppressor.record_probe(fingerprint in existing)
+        return existing
+
+    def _fingerprint(self, raw_data: RawTransactionIn) -> str:
+        return sms_fingerprint(raw_data.bank_identifier, raw_data.transaction_text, raw_data.sms_date_time)
+
+    async def process_raw_transaction(self, raw_data: RawTransactionIn, user_id: int) -> CategorizedTransactionOut:
+        """
+        Orchestrates the categorization, storage, and initial leak assessment.
+        A resent SMS is answered with the stored transaction (ingest_status='already_ingested').
+        """
+
+        # 0. Duplicate suppression: a resend is reported back, never re-categorized
+        fingerprint = self._fingerprint(raw_data)
+        existing = (await self._find_duplicates(user_id, [fingerprint])).get(fingerprint)
+        if existing is not None:
+            return self._to_out(existing, "already_ingested")
+
+        # 1. Categorization and Extraction (SMS templates first, ML for the rest)
+        ml_result = await self._categorize(raw_data)
+        # Credits are not spend; the transactions table holds outflows (as in the statement import)
+        if ml_result.get('type') == CREDIT:
+            raise CreditMessageSkipped("Credit messages are not spend and are not stored.")
+
+        # 2. Initial Leak Assessment and 3. Create the Database Transaction Record
+        # (the unique (user_id, sms_fingerprint) index settles concurrent resends)
+        row = self._build_transaction_row(raw_data, ml_result, user_id)
+        row["sms_fingerprint"] = fingerprint
+        stmt = pg_insert(Transaction).values(row).on_conflict_do_nothing(
+            index_elements=[Transaction.user_id, Transaction.sms_fingerprint]
+        ).returning(*self._response_columns())
+        saved = (await self.db.execute(stmt)).first()
+        await self.db.commit()
+        duplicate_suppressor.remember(TRANSACTIONS_SCOPE, user_id, fingerprint)
+
+        if saved is None:
+            duplicate_suppressor.record_conflict()
+            existing = (await self._find_duplicates(user_id, [fingerprint], probe_all=True))[fingerprint]
+            return self._to_out(existing, "already_ingested")
+
+        # 4. Return the categorized schema (for the API response)
+        return self._to_out(saved)
+
+    async def process_raw_transactions_batch(self, raw_items: List[RawTransactionIn], user_id: int) -> List[Dict[str, Any]]:
+        """
+        Batch variant of process_raw_transaction for backlogged SMS uploads.
+
+        All messages are categorized together and the successful ones are written with a
+        single multi-row INSERT ... RETURNING and one commit. Returns one result dict per
+        input item (same order) with either the categorized transaction or the error.
+        Resent messages (already stored, or repeated within the batch) are reported as
+        'already_ingested' and skip categorization. Credit messages are reported as
+        'skipped' and not stored.
+        """
+        results: List[Dict[str, Any]] = [None] * len(raw_items)
+
+        # 1. Duplicate suppression (Bloom pre-filter, one indexed probe for the flagged ones)
+        fingerprints = [self._fingerprint(raw_data) for raw_data in raw_items]
+        existing = await self._find_duplicates(user_id, fingerprints)
+
+        new_indexes: List[int] = []
+        first_index_by_fingerprint: Dict[str, int] = {}
+        repeated_in_batch: List[int] = []
+        for index, fingerprint in enumerate(fingerprints):
+            if fingerprint in existing:
+                results[index] = {"index": index, "status": "already_ingested", "transaction": self._to_out(existing[fingerprint], "already_ingested")}
+            elif fingerprint in first_index_by_fingerprint:
+                repeated_in_batch.append(index)
+            else:
+                first_index_by_fingerprint[fingerprint] = index
+                new_indexes.append(index)
+
+        # 2. Categorization and Extraction (templates first, one ML call for the misses)
+        ml_results = await self._categorize_batch([raw_items[i] for i in new_indexes])
+
+        # 3. Build the rows; a bad message only fails itself, not the batch
+        rows: List[Dict[str, Any]] = []
+        row_index_by_fingerprint: Dict[str, int] = {}
+        for index, ml_result in zip(new_indexes, ml_results):
+            if ml_result.get('type') == CREDIT:
+                results[index] = {"index": index, "status": "skipped", "error": "Credit message: not spend, not stored."}
+                continue
+            try:
+                row = self._build_transaction_row(raw_items[index], ml_result, user_id)
+            except Exception as e:
+                results[index] = {"index": index, "status": "failed", "error": f"Categorization failed: {e}"}
+                continue
+            row["sms_fingerprint"] = fingerprints[index]
+            rows.append(row)
+            row_index_by_fingerprint[fingerprints[index]] = index
+
+        if rows:
+            # 4. Single round trip: multi-row INSERT with RETURNING (conflicting resends are skipped)
+            stmt = pg_insert(Transaction).values(rows).on_conflict_do_nothing(
+                index_elements=[Transaction.user_id, Transaction.sms_fingerprint]
+            ).returning(*self._response_columns())
+            inserted = (await self.db.execute(stmt)).all()
+            await self.db.commit()
+
+            # RETURNING order is not guaranteed, so map rows back by their fingerprint
+            # (unique per user, and repeats within the batch were set aside above)
+            for saved in inserted:
+                index = row_index_by_fingerprint.pop(saved.sms_fingerprint)
+                results[index] = {"index": index, "status": "ingested", "transaction": self._to_out(saved)}
+            for row in rows:
+                duplicate_suppressor.remember(TRANSACTIONS_SCOPE, user_id, row["sms_fingerprint"])
+
+            # Rows skipped by ON CONFLICT were stored concurrently (e.g. by another worker)
+            if row_index_by_fingerprint:
+                duplicate_suppressor.record_conflict(len(row_index_by_fingerprint))
+                conflicts = await self._find_duplicates(user_id, list(row_index_by_fingerprint), probe_all=True)
+                for index in row_index_by_fingerprint.values():
+                    results[index] = {"index": index, "status": "already_ingested", "transaction": self._to_out(conflicts[fingerprints[index]], "already_ingested")}
+
+        # 5. Repeats within the batch share the outcome of their first occurrence
+        for index in repeated_in_batch:
+            first = results[first_index_by_fingerprint[fingerprints[index]]]
+            if first["status"] in ("failed", "skipped"):
+                results[index] = {"index": index, "status": first["status"], "error": first["error"]}
+            else:
+                transaction = first["transaction"].model_copy(update={"ingest_status": "already_ingested"})
+                results[index] = {"index": index, "status": "already_ingested", "transaction": transaction}
+
+        return results
+
+    async def apply_manual_override(self, transaction_id: int, user_id: int, category: str) -> CategorizedTransactionOut:
+        """
+        Applies a user's category correction to a transaction and invalidates the
+        cached merchant -> category mapping that may have produced the wrong category.
+        The category must carry an SDS class prefix (sds_class is NOT NULL and keys the
+        per-category totals), otherwise InvalidCategoryOverride is raised before any write.
+        """
+        sds_class = infer_sds_class(category)
+        if sds_class is None:
+            allowed = ", ".join(prefix for prefix, _ in SDS_CLASS_BY_PREFIX)
+            raise InvalidCategoryOverride(f"Category '{category}' must start with one of: {allowed}.")
+
+        transaction = (await self.db.execute(
+            select(Transaction).where(
+                Transaction.id == transaction_id,
+                Transaction.user_id == user_id
+            )
+        )).scalar_one_or_none()
+        if transaction is None:
+            raise ValueError("Transaction not found.")
+
+        transaction.category = category
+        transaction.sds_class = sds_class
+        transaction.is_manual_override = True
+        await self.db.commit()
+
+        # Same key the worker path caches under: the merchant extracted from the stored text
+        await merchant_category_cache.invalidate(merchant_key_from_text(transaction.description))
+
+        return self._to_out(transaction)
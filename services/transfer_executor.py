@@ -0,0 +1,443 @@
+# services/transfer_executor.py
+
+import asyncio
+import os
+import random
+import time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+from ..api.database_setup import AsyncSessionLocal
+from ..db.enums import TransactionStatus
+
+# --- UPI GATEWAY CONFIGURATION (Environment) ---
+# Base URL of the UPI/bank transfer gateway. When unset there is no executor: consented
+# transfers are recorded as COMPLETED on the spot (the former mock behaviour).
+UPI_GATEWAY_URL = os.getenv("UPI_GATEWAY_URL")
+TRANSFER_GLOBAL_CONCURRENCY = int(os.getenv("TRANSFER_GLOBAL_CONCURRENCY", "64"))
+# In-flight transfers per user (one user's big plan cannot hold every gateway slot)
+TRANSFER_PER_USER_CONCURRENCY = int(os.getenv("TRANSFER_PER_USER_CONCURRENCY", "4"))
+TRANSFER_TIMEOUT_SECONDS = float(os.getenv("TRANSFER_TIMEOUT_SECONDS", "5.0"))
+TRANSFER_SUBMIT_ATTEMPTS = int(os.getenv("TRANSFER_SUBMIT_ATTEMPTS", "3"))
+TRANSFER_POLL_INTERVAL_SECONDS = float(os.getenv("TRANSFER_POLL_INTERVAL_SECONDS", "0.5"))
+# Polls before a transfer is left PENDING for the next resume (its outcome is unknown)
+TRANSFER_MAX_POLLS = int(os.getenv("TRANSFER_MAX_POLLS", "40"))
+# Cap of the backoff between submit attempts (jittered up to 1.5x)
+TRANSFER_BACKOFF_CAP_SECONDS = 2.0
+# Added to the longest time in flight for the resume threshold and the resume lease
+TRANSFER_RESUME_MARGIN_SECONDS = float(os.getenv("TRANSFER_RESUME_MARGIN_SECONDS", "30"))
+TRANSFER_RESUME_BATCH_SIZE = int(os.getenv("TRANSFER_RESUME_BATCH_SIZE", "1000"))
+
+
+def _max_in_flight_seconds(timeout_seconds: float, poll_interval_seconds: float, max_polls: int) -> float:
+    """
+    Longest submit + poll cycle: every attempt and every poll times out and every backoff
+    is at its cap. The executor enforces it as a deadline from submission (queueing for
+    user and gateway slots included), so no transfer is in flight for longer.
+    """
+    submit = TRANSFER_SUBMIT_ATTEMPTS * timeout_seconds + (TRANSFER_SUBMIT_ATTEMPTS - 1) * TRANSFER_BACKOFF_CAP_SECONDS * 1.5
+    return submit + max_polls * (poll_interval_seconds + timeout_seconds)
+
+GATEWAY_TRANSFERS_PATH = "/transfers"
+# Gateway statuses worth repeating the request for (besides 5xx and transport errors)
+RETRYABLE_STATUS_CODES = (408, 429)
+
+PENDING = TransactionStatus.PENDING.value
+COMPLETED = TransactionStatus.COMPLETED.value
+FAILED = TransactionStatus.FAILED.value
+
+
+class TransferRequest(NamedTuple):
+    """One consented transfer, identified by its SmartTransferLog id."""
+    log_id: int
+    user_id: int
+    rule_id: int
+    amount: Decimal
+    destination: str
+
+    @property
+    def reference(self) -> str:
+        # Stable per log row: resubmitting the same transfer is a no-op at the gateway
+        return f"fintraq-{self.log_id}"
+
+
+class TransferOutcome(NamedTuple):
+    status: str
+    gateway_reference: Optional[str]
+    failure_reason: Optional[str]
+    attempts: int
+
+
+# ----------------------------------------------------------------------
+# OUTCOME PERSISTENCE (one statement per settled transfer)
+# ----------------------------------------------------------------------
+# Settles a PENDING log; a FAILED transfer also releases its reservation from the
+# rule's total_transferred and the period's SalaryAllocationProfile.total_autotransferred.
+# Guarded by the PENDING status, so a duplicate settlement (two workers resuming the
+# same transfer) changes nothing. The release is a single-statement decrement (no
+# read-modify-write), so it only bumps the profile version for the CAS writers.
+SETTLE_TRANSFER_SQL = text("""
+    WITH settled AS (
+        UPDATE smart_transfer_logs
+        SET execution_status = :status,
+            gateway_reference = :gateway_reference,
+            failure_reason = :failure_reason,
+            attempts = COALESCE(attempts, 0) + :attempts,
+            completed_at = now() AT TIME ZONE 'utc'
+        WHERE id = :log_id AND execution_status = :pending
+        RETURNING rule_id, user_id, amount_transferred, reporting_period, execution_status
+    ),
+    released_rule AS (
+        UPDATE smart_transfer_rules r
+        SET total_transferred = r.total_transferred - s.amount_transferred
+        FROM settled s
+        WHERE r.id = s.rule_id AND s.execution_status = :failed
+        RETURNING r.id
+    ),
+    released_profile AS (
+        UPDATE salary_allocation_profiles p
+        SET total_autotransferred = p.total_autotransferred - s.amount_transferred,
+            version = p.version + 1
+        FROM settled s
+        WHERE s.execution_status = :failed
+          AND p.id = (SELECT MIN(id) FROM salary_allocation_profiles
+                      WHERE user_id = s.user_id AND reporting_period = s.reporting_period)
+        RETURNING p.id
+    )
+    SELECT (SELECT COUNT(*) FROM settled) AS settled,
+           (SELECT COUNT(*) FROM released_rule) + (SELECT COUNT(*) FROM released_profile) AS released
+""")
+
+# Claims resumable transfers: PENDING, old enough and not leased by another worker.
+# FOR UPDATE SKIP LOCKED lets concurrent claimers take disjoint batches, and the lease
+# (committed with the claim) keeps the rows away from other workers while this one
+# resubmits and polls them. An unknown outcome is reclaimed once the lease expires.
+CLAIM_RESUMABLE_TRANSFERS_SQL = text("""
+    WITH claimed AS (
+        UPDATE smart_transfer_logs l
+        SET resume_lease_expires_at = (now() AT TIME ZONE 'utc') + make_interval(secs => CAST(:lease_seconds AS DOUBLE PRECISION))
+        WHERE l.id IN (
+            SELECT id FROM smart_transfer_logs
+            WHERE execution_status = :pending
+              AND executed_at < (now() AT TIME ZONE 'utc') - make_interval(secs => CAST(:older_than_seconds AS DOUBLE PRECISION))
+              AND (resume_lease_expires_at IS NULL OR resume_lease_expires_at < now() AT TIME ZONE 'utc')
+            ORDER BY executed_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING l.id, l.user_id, l.rule_id, l.amount_transferred
+    )
+    SELECT c.id AS log_id, c.user_id, c.rule_id, c.amount_transferred, r.destination_goal
+    FROM claimed c
+    JOIN smart_transfer_rules r ON r.id = c.rule_id
+""")
+
+
+async def record_transfer_outcome(transfer: TransferRequest, outcome: TransferOutcome, session_factory=AsyncSessionLocal) -> bool:
+    """Persists a terminal outcome; returns False if the log was already settled."""
+    async with session_factory() as db:
+        row = (await db.execute(SETTLE_TRANSFER_SQL, {
+            "log_id": transfer.log_id,
+            "status": outcome.status,
+            "gateway_reference": outcome.gateway_reference,
+            "failure_reason": (outcome.failure_reason or "")[:255] or None,
+            "attempts": outcome.attempts,
+            "pending": PENDING,
+            "failed": FAILED,
+        })).one()
+        await db.commit()
+    return row.settled > 0
+
+
+class _RetryableGatewayError(Exception):
+    """Timeout, connection error, 408, 429 or 5xx: the request may be repeated (same reference)."""
+
+
+class _GatewayRejection(Exception):
+    """Any other 4xx. Definitive for a submission; for a status poll the outcome is unknown."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+
+
+class TransferExecutor:
+    """
+    Executes consented transfers against the UPI gateway off the request path.
+
+    submit() schedules one task per transfer and returns at once. Every task holds one
+    of TRANSFER_PER_USER_CONCURRENCY slots of its user for its whole life and one of
+    TRANSFER_GLOBAL_CONCURRENCY gateway slots per HTTP call, so polling transfers do not
+    block new submissions. A transfer is POSTed with its stable reference (retried with
+    backoff on timeouts/408/429/5xx), polled until COMPLETED or FAILED, and settled in the
+    database (PENDING -> COMPLETED / FAILED). Only a 4xx rejection of the POST fails a
+    transfer; one whose outcome stays unknown remains PENDING and is claimed again by
+    the resume sweeper (services/transfer_resume_sweeper.py) through resume_pending().
+    A transfer is given up max_in_flight_seconds after submission; the resume threshold
+    and lease are derived from that deadline, so a sweep never claims one in flight.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = UPI_GATEWAY_URL,
+        global_concurrency: int = TRANSFER_GLOBAL_CONCURRENCY,
+        per_user_concurrency: int = TRANSFER_PER_USER_CONCURRENCY,
+        timeout_seconds: float = TRANSFER_TIMEOUT_SECONDS,
+        poll_interval_seconds: float = TRANSFER_POLL_INTERVAL_SECONDS,
+        max_polls: int = TRANSFER_MAX_POLLS,
+        recorder: Optional[Callable[[TransferRequest, TransferOutcome], Awaitable[Any]]] = None,
+        transport=None,
+    ):
+        self.base_url = base_url
+        self.global_concurrency = global_concurrency
+        self.per_user_concurrency = per_user_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_polls = max_polls
+        # 241 s with the defaults
+        self.max_in_flight_seconds = _max_in_flight_seconds(timeout_seconds, poll_interval_seconds, max_polls)
+        # PENDING transfers older than this are resubmitted by the resume sweeper (the
+        # gateway dedups by reference): past the deadline, so none a worker has in flight
+        self.resume_after_seconds = self.max_in_flight_seconds + TRANSFER_RESUME_MARGIN_SECONDS
+        # A resumed transfer is leased to the claiming worker for its whole deadline;
+        # other workers skip it until the lease expires
+        self.resume_lease_seconds = self.max_in_flight_seconds + TRANSFER_RESUME_MARGIN_SECONDS
+        self._recorder = recorder or record_transfer_outcome
+        self._transport = transport # e.g. httpx.ASGITransport for the local stub gateway
+
+        self._http = None
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        # user_id -> [semaphore, tasks holding or waiting for it]
+        self._user_slots: Dict[int, List[Any]] = {}
+        self._tasks: set = set()
+
+        # --- Metrics ---
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._unknown = 0
+        self._already_settled = 0
+        self._resumed = 0
+        self._rejected_polls = 0
+        self._deadline_exceeded = 0
+        self._http_requests = 0
+        self._retries = 0
+        self._polls = 0
+        self._errors = 0
+        self._settle_seconds_total = 0.0
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        """Opens the pooled HTTP client (sized to the global concurrency)."""
+        if self.base_url and self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=self.global_concurrency, max_keepalive_connections=self.global_concurrency),
+                transport=self._transport,
+            )
+            self._global_slots = asyncio.Semaphore(self.global_concurrency)
+
+    async def stop(self, grace_seconds: float = 10.0):
+        """Lets in-flight transfers finish for up to grace_seconds; the rest stay PENDING for resume."""
+        if self._tasks:
+            _, still_running = await asyncio.wait(set(self._tasks), timeout=grace_seconds)
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._http is not None
+
+    # ----------------------------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------------------------
+    def submit(self, transfers: List[TransferRequest]) -> int:
+        """Schedules the transfers (their logs must be committed as PENDING). Returns at once."""
+        for transfer in transfers:
+            task = asyncio.create_task(self._run(transfer), name=f"transfer-{transfer.log_id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._submitted += len(transfers)
+        return len(transfers)
+
+    async def wait_idle(self):
+        """Waits until every submitted transfer has settled or given up (benchmarks, shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*set(self._tasks), return_exceptions=True)
+
+    async def resume_pending(self, session_factory=AsyncSessionLocal, limit: int = TRANSFER_RESUME_BATCH_SIZE) -> int:
+        """
+        Claims (leases) up to `limit` PENDING transfers whose outcome is unknown (left by a
+        previous process, or given up on) and resubmits them. Returns the number resubmitted.
+        """
+        if not self.is_enabled or limit <= 0:
+            return 0
+        async with session_factory() as db:
+            rows = (await db.execute(CLAIM_RESUMABLE_TRANSFERS_SQL, {
+                "pending": PENDING,
+                "older_than_seconds": self.resume_after_seconds,
+                "lease_seconds": self.resume_lease_seconds,
+                "limit": limit,
+            })).all()
+            await db.commit()
+        self._resumed += len(rows)
+        return self.submit([
+            TransferRequest(row.log_id, row.user_id, row.rule_id, row.amount_transferred, row.destination_goal)
+            for row in rows
+        ])
+
+    # ----------------------------------------------------------------------
+    # EXECUTION
+    # ----------------------------------------------------------------------
+    async def _run(self, transfer: TransferRequest):
+        slot = self._user_slots.get(transfer.user_id)
+        if slot is None:
+            slot = self._user_slots[transfer.user_id] = [asyncio.Semaphore(self.per_user_concurrency), 0]
+        slot[1] += 1
+        started_at = time.monotonic()
+        try:
+            outcome = await asyncio.wait_for(self._execute_in_slot(slot[0], transfer), timeout=self.max_in_flight_seconds)
+        except asyncio.TimeoutError:
+            # Queued too long behind the user's other transfers or the gateway slots:
+            # outcome unknown, left PENDING before the resume threshold can reach it
+            self._deadline_exceeded += 1
+            outcome = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._errors += 1
+            print(f"Warning: transfer {transfer.reference} left PENDING ({e!r}).")
+            return
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._user_slots.pop(transfer.user_id, None)
+
+        if outcome is None:
+            self._unknown += 1
+            return
+        if outcome.status == COMPLETED:
+            self._completed += 1
+        else:
+            self._failed += 1
+        self._settle_seconds_total += time.monotonic() - started_at
+
+        try:
+            settled = await self._recorder(transfer, outcome)
+        except Exception as e:
+            # Still PENDING in the database: the next resume re-polls the gateway
+            self._errors += 1
+            print(f"Warning: outcome of transfer {transfer.reference} not recorded ({e!r}).")
+            return
+        if settled is False:
+            self._already_settled += 1
+
+    async def _execute_in_slot(self, user_slot: asyncio.Semaphore, transfer: TransferRequest) -> Optional[TransferOutcome]:
+        async with user_slot:
+            return await self._execute(transfer)
+
+    async def _execute(self, transfer: TransferRequest) -> Optional[TransferOutcome]:
+        """POST (with retries), then poll until terminal. None: outcome unknown."""
+        attempts = 0
+        payload = {
+            "reference": transfer.reference,
+            "amount": str(transfer.amount),
+            "destination": transfer.destination,
+            "user_id": transfer.user_id,
+        }
+
+        # 1. Submit; the stable reference makes a repeated POST idempotent
+        state = None
+        for attempt in range(TRANSFER_SUBMIT_ATTEMPTS):
+            attempts += 1
+            try:
+                state = await self._request("POST", GATEWAY_TRANSFERS_PATH, payload)
+                break
+            except _RetryableGatewayError:
+                if attempt + 1 == TRANSFER_SUBMIT_ATTEMPTS:
+                    return None
+                self._retries += 1
+                await asyncio.sleep(min(TRANSFER_BACKOFF_CAP_SECONDS, 0.1 * 2 ** attempt) * (0.5 + random.random()))
+            except _GatewayRejection as e:
+                if e.status_code == 409:
+                    # Reference already known (an earlier attempt went through): poll it
+                    state = {"status": PENDING}
+                    break
+                # Rejected outright (invalid account, limits, ...): a definitive failure
+                return TransferOutcome(FAILED, None, str(e), attempts)
+
+        # 2. Poll while the gateway reports PENDING
+        polls = 0
+        while state.get("status") not in (COMPLETED, FAILED):
+            if polls >= self.max_polls:
+                return None
+            await asyncio.sleep(self.poll_interval_seconds)
+            polls += 1
+            self._polls += 1
+            try:
+                state = await self._request("GET", f"{GATEWAY_TRANSFERS_PATH}/{transfer.reference}")
+            except _RetryableGatewayError:
+                continue
+            except _GatewayRejection:
+                # A failed status lookup says nothing about the transfer: stays PENDING
+                self._rejected_polls += 1
+                return None
+
+        return TransferOutcome(state["status"], state.get("gateway_reference"), state.get("failure_reason"), attempts + polls)
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        async with self._global_slots:
+            self._http_requests += 1
+            try:
+                response = await asyncio.wait_for(self._http.request(method, path, json=payload), timeout=self.timeout_seconds)
+            except Exception as e:
+                raise _RetryableGatewayError(repr(e)) from e
+        if response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES:
+            raise _RetryableGatewayError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise _GatewayRejection(response.status_code, response.text[:200])
+        return response.json()
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        settled = self._completed + self._failed
+        return {
+            "enabled": self.is_enabled,
+            "global_concurrency": self.global_concurrency,
+            "per_user_concurrency": self.per_user_concurrency,
+            "in_flight": len(self._tasks),
+            "users_in_flight": len(self._user_slots),
+            "submitted_total": self._submitted,
+            "completed_total": self._completed,
+            "failed_total": self._failed,
+            # Gave up polling/submitting: left PENDING for resume_pending()
+            "unknown_total": self._unknown,
+            "already_settled_total": self._already_settled,
+            "resumed_total": self._resumed,
+            # 4xx on a status poll: outcome unknown, left PENDING
+            "rejected_polls_total": self._rejected_polls,
+            # Given up at max_in_flight_seconds after submission: left PENDING
+            "deadline_exceeded_total": self._deadline_exceeded,
+            "http_requests_total": self._http_requests,
+            "retries_total": self._retries,
+            "polls_total": self._polls,
+            "errors_total": self._errors,
+            "settle_seconds_avg": round(self._settle_seconds_total / settled, 4) if settled else 0.0,
+        }
+
+
+# Process-wide executor (one per gunicorn worker), started/stopped by the app lifespan
+transfer_executor = TransferExecutor()
@@ -0,0 +1,121 @@
+# services/transfer_resume_sweeper.py
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from ..api.database_setup import AsyncSessionLocal
+from .transfer_executor import transfer_executor, TransferExecutor
+
+# --- SWEEPER CONFIGURATION (Environment) ---
+# Every TRANSFER_RESUME_INTERVAL_SECONDS each gunicorn worker claims (leases) at most
+# TRANSFER_RESUME_SWEEP_BATCH_SIZE PENDING transfers of unknown outcome and resubmits them.
+TRANSFER_RESUME_INTERVAL_SECONDS = float(os.getenv("TRANSFER_RESUME_INTERVAL_SECONDS", "30"))
+TRANSFER_RESUME_SWEEP_BATCH_SIZE = int(os.getenv("TRANSFER_RESUME_SWEEP_BATCH_SIZE", "200"))
+# No claims while this many transfers are in flight in the worker (claimed rows would
+# sit in the per-user queues until their deadline gives them up)
+TRANSFER_RESUME_MAX_IN_FLIGHT = int(os.getenv("TRANSFER_RESUME_MAX_IN_FLIGHT", "1000"))
+
+
+class TransferResumeSweeper:
+    """
+    Periodic sweeper for transfers left PENDING: after a restart, after the executor
+    gave up polling, or after an outcome could not be recorded.
+
+    Each tick claims one bounded batch through TransferExecutor.resume_pending() (FOR
+    UPDATE SKIP LOCKED plus a lease column, so every worker resubmits a disjoint set and
+    a transfer is not resubmitted again while its lease runs) and hands it to the
+    executor. The first tick runs at startup.
+    """
+
+    def __init__(
+        self,
+        executor: TransferExecutor = transfer_executor,
+        session_factory=AsyncSessionLocal,
+        interval_seconds: float = TRANSFER_RESUME_INTERVAL_SECONDS,
+        batch_size: int = TRANSFER_RESUME_SWEEP_BATCH_SIZE,
+        max_in_flight: int = TRANSFER_RESUME_MAX_IN_FLIGHT,
+    ):
+        self.executor = executor
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # --- Metrics ---
+        self._ticks = 0
+        self._claimed = 0
+        self._throttled_ticks = 0
+        self._last_tick_seconds = 0.0
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE (called from the application lifespan, after the executor starts)
+    # ----------------------------------------------------------------------
+    async def start(self):
+        if self._running or not self.executor.is_enabled:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._run(), name="transfer-resume-sweeper")
+
+    async def stop(self):
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while self._running:
+            try:
+                resumed = await self.sweep_once()
+                if resumed:
+                    print(f"Transfer resume sweeper: resumed {resumed} pending transfer(s).")
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                print(f"Transfer resume sweeper error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    # ----------------------------------------------------------------------
+    # SWEEP
+    # ----------------------------------------------------------------------
+    async def sweep_once(self) -> int:
+        """Claims and resubmits one capped batch. Returns the transfers resubmitted."""
+        started_at = time.monotonic()
+        limit = min(self.batch_size, self.max_in_flight - self.executor.metrics()["in_flight"])
+        if limit <= 0:
+            self._throttled_ticks += 1
+            resumed = 0
+        else:
+            resumed = await self.executor.resume_pending(self.session_factory, limit)
+
+        self._ticks += 1
+        self._claimed += resumed
+        self._last_tick_seconds = time.monotonic() - started_at
+        return resumed
+
+    # ----------------------------------------------------------------------
+    # METRICS
+    # ----------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "interval_seconds": self.interval_seconds,
+            "batch_size": self.batch_size,
+            "max_in_flight": self.max_in_flight,
+            "resume_after_seconds": self.executor.resume_after_seconds,
+            "lease_seconds": self.executor.resume_lease_seconds,
+            "ticks_total": self._ticks,
+            "claimed_total": self._claimed,
+            # Ticks that claimed nothing because the executor was saturated
+            "throttled_ticks_total": self._throttled_ticks,
+            "last_tick_seconds": round(self._last_tick_seconds, 4),
+        }
+
+
+# Process-wide sweeper (one per gunicorn worker), started/stopped by the app lifespan
+transfer_resume_sweeper = TransferResumeSweeper()
@@ -0,0 +1,13 @@
+# tests/conftest.py
+#
+# Tests import the application modules by their top-level names (services.x, ml.x);
+# resolve them as one package first (see app_package.py).
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_package
+
+app_package.install()
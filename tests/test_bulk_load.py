@@ -0,0 +1,76 @@
+# tests/test_bulk_load.py
+#
+# tools/bulk_load --dry-run (parse + validate only, no database) run the way operators
+# invoke it, as `python -m tools.bulk_load` from the repository root, plus the chunk
+# validation it relies on: category/sds_class agreement and repeated fingerprints.
+#
+# Run from the repository root: python -m pytest -q tests
+
+import json
+import os
+import subprocess
+import sys
+
+from tools.bulk_load import TABLE_SPECS, convert_chunk
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CSV_ROWS = [
+    "user_id,amount,transaction_date,description,category,sds_class,sms_fingerprint",
+    "1,10.00,2024-01-01,rent,Fixed_Essential_Rent,Fixed_Essential,f1",
+    "1,20.00,2024-01-02,salary,Income_Credit,Fixed_Essential,",
+    "1,30.00,2024-01-03,dinner,Pure_Discretionary_Dining,Variable_Essential,",
+    "1,40.00,2024-01-04,resend,Discretionary_Food,Pure_Discretionary,f1",
+    "1,50.00,2024-01-05,swiggy,Discretionary_Food,Pure_Discretionary,f2",
+]
+
+
+def _record(**overrides):
+    record = {
+        "user_id": "1", "amount": "10.00", "transaction_date": "2024-01-01", "description": "x",
+        "category": "Variable_Essential_Groceries", "sds_class": "Variable_Essential",
+    }
+    record.update(overrides)
+    return record
+
+
+def test_dry_run_from_the_command_line(tmp_path):
+    source = tmp_path / "transactions.csv"
+    source.write_text("\n".join(CSV_ROWS) + "\n", encoding="utf-8")
+    rejects = tmp_path / "rejects.ndjson"
+
+    completed = subprocess.run(
+        [sys.executable, "-m", "tools.bulk_load", "transactions", str(source), "--dry-run", "--rejects", str(rejects)],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=60,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    assert "Done: 2 rows validated" in completed.stdout
+    reasons = [json.loads(line)["reason"] for line in rejects.read_text(encoding="utf-8").splitlines()]
+    assert reasons == [
+        "invalid category: 'Income_Credit'",
+        "sds_class 'Variable_Essential' does not match category 'Pure_Discretionary_Dining' (expected 'Pure_Discretionary')",
+        "duplicate sms_fingerprint earlier in the same chunk",
+    ]
+
+
+def test_category_must_agree_with_sds_class():
+    records, rejects = convert_chunk(TABLE_SPECS["transactions"], [
+        _record(),
+        _record(category="Fixed_Essential_Rent", sds_class="Variable_Essential"),
+        _record(category="Discretionary_Food", sds_class="Pure_Discretionary"),
+    ])
+    assert len(records) == 2
+    assert [reject["row"]["category"] for reject in rejects] == ["Fixed_Essential_Rent"]
+
+
+def test_repeated_fingerprint_is_per_user():
+    records, rejects = convert_chunk(TABLE_SPECS["transactions"], [
+        _record(sms_fingerprint="a"),
+        _record(user_id="2", sms_fingerprint="a"),
+        _record(sms_fingerprint="a"),
+        _record(),
+        _record(),
+    ])
+    assert len(records) == 4
+    assert [reject["reason"] for reject in rejects] == ["duplicate sms_fingerprint earlier in the same chunk"]
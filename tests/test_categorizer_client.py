@@ -0,0 +1,76 @@
+# tests/test_categorizer_client.py
+#
+# services/categorizer_client coalesces concurrent categorize() calls: N callers make
+# ceil(N / max_batch_size) POSTs to /categorize/batch, each answered in input order. A
+# result the service could not produce (null or {"error": ...}) falls back to the mock
+# categorizer for that message only; the rest of the batch keeps the model's answers.
+# The service is an httpx.MockTransport (no network).
+#
+# Run from the repository root: python -m pytest -q tests
+
+import asyncio
+import json
+import math
+
+import httpx
+import pytest
+
+from services.categorizer_client import CATEGORIZER_BATCH_PATH, MicroBatchingCategorizerClient, is_fallback_result
+
+
+class _Categorizer:
+    """Answers every text with its own category; texts named in failures get that result instead."""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.batches = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == CATEGORIZER_BATCH_PATH
+        texts = json.loads(request.content)["texts"]
+        self.batches.append(texts)
+        results = [
+            self.failures[text] if text in self.failures else {"category": f"Variable_Essential_{text}", "amount": 10.0, "type": "DEBIT"}
+            for text in texts
+        ]
+        return httpx.Response(200, json={"results": results})
+
+
+async def _categorize_concurrently(service: _Categorizer, texts, max_batch_size: int):
+    client = MicroBatchingCategorizerClient(
+        base_url="http://categorizer.test", max_batch_size=max_batch_size, max_wait_ms=5,
+        transport=httpx.MockTransport(service),
+    )
+    await client.start()
+    try:
+        results = await asyncio.gather(*(client.categorize(text) for text in texts))
+        return results, client.metrics()
+    finally:
+        await client.stop()
+
+
+@pytest.mark.parametrize("calls, max_batch_size", [(10, 4), (64, 16), (3, 8)])
+def test_concurrent_calls_share_batched_requests(calls, max_batch_size):
+    service = _Categorizer()
+    texts = [f"msg{i}" for i in range(calls)]
+
+    results, metrics = asyncio.run(_categorize_concurrently(service, texts, max_batch_size))
+
+    assert len(service.batches) == math.ceil(calls / max_batch_size)
+    assert [text for batch in service.batches for text in batch] == texts
+    assert [result["category"] for result in results] == [f"Variable_Essential_{text}" for text in texts]
+    assert metrics["fallback_messages_total"] == 0
+
+
+def test_partial_failure_falls_back_per_item():
+    service = _Categorizer(failures={"msg1": None, "msg3": {"error": "model timeout"}})
+    texts = [f"msg{i}" for i in range(5)]
+
+    results, metrics = asyncio.run(_categorize_concurrently(service, texts, max_batch_size=5))
+
+    assert len(service.batches) == 1
+    assert [is_fallback_result(result) for result in results] == [False, True, False, True, False]
+    assert results[2]["category"] == "Variable_Essential_msg2"
+    assert metrics["item_errors_total"] == 2
+    assert metrics["fallback_messages_total"] == 2
+    assert metrics["errors_total"] == 0
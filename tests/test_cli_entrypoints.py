@@ -0,0 +1,48 @@
+# tests/test_cli_entrypoints.py
+#
+# Every operator CLI under tools/ and every benchmark under benchmarks/ must import and
+# parse its arguments when invoked the documented way, `python -m tools.<name>` /
+# `python -m benchmarks.<name>` from the repository root (no database is touched by
+# --help).
+#
+# Run from the repository root: python -m pytest -q tests
+
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLI_MODULES = [
+    "tools.reconcile_category_totals",
+    "tools.month_end_leakage",
+    "tools.recompute_projection_curves",
+    "tools.insight_campaign",
+]
+
+BENCHMARK_MODULES = [
+    "benchmarks.bench_batch_ingest",
+    "benchmarks.bench_leakage",
+    "benchmarks.bench_leakage_history",
+    "benchmarks.bench_consent",
+    "benchmarks.bench_transfer_executor",
+]
+
+
+@pytest.mark.parametrize("module_name", CLI_MODULES + BENCHMARK_MODULES)
+def test_cli_module_imports(module_name):
+    module = importlib.import_module(module_name)
+    assert callable(module.main)
+
+
+@pytest.mark.parametrize("module_name", CLI_MODULES + BENCHMARK_MODULES)
+def test_cli_runs_as_module(module_name):
+    completed = subprocess.run(
+        [sys.executable, "-m", module_name, "--help"],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=60,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "usage:" in completed.stdout
@@ -0,0 +1,60 @@
+# tests/test_insight_rules_reload.py
+#
+# Hot reload of services/insight_rules must stay off the request path: evaluate() only
+# schedules the mtime check, which stats, reads and recompiles INSIGHT_RULES_PATH in a
+# worker thread. The evaluation that triggered it uses the current rule set; the new
+# set is swapped in once the check finishes.
+#
+# Run from the repository root: python -m pytest -q tests
+
+import asyncio
+import copy
+import json
+import os
+import threading
+
+import services.insight_rules as insight_rules
+from services.insight_rules import DEFAULT_INSIGHT_RULES, InsightRuleEngine
+
+BUCKET = {
+    "category": "Pure_Discretionary_DiningOut", "sds_weight_class": "Pure_Discretionary",
+    "spend": "900.00", "baseline_threshold": "0.00", "leak_amount": "900.00",
+}
+
+
+def _write_rules(path, title: str):
+    rule = copy.deepcopy(next(spec for spec in DEFAULT_INSIGHT_RULES if spec["id"] == "discretionary_leak_alert"))
+    rule["title"] = title
+    path.write_text(json.dumps([rule]), encoding="utf-8")
+
+
+def test_changed_rule_file_is_reloaded_off_the_request_path(tmp_path, monkeypatch):
+    rules_file = tmp_path / "insight_rules.json"
+    _write_rules(rules_file, "old title")
+    engine = InsightRuleEngine(path=str(rules_file), reload_seconds=0)
+
+    _write_rules(rules_file, "new title")
+    mtime = os.path.getmtime(rules_file) + 10
+    os.utime(rules_file, (mtime, mtime))
+
+    stat_threads = []
+    getmtime = insight_rules.os.path.getmtime
+
+    def recording_getmtime(path):
+        stat_threads.append(threading.get_ident())
+        return getmtime(path)
+
+    monkeypatch.setattr(insight_rules.os.path, "getmtime", recording_getmtime)
+
+    async def scenario():
+        during = await engine.evaluate(1, [BUCKET], apply_cooldowns=False)
+        await engine._reload_check
+        after = await engine.evaluate(1, [BUCKET], apply_cooldowns=False)
+        return during, after
+
+    during, after = asyncio.run(scenario())
+
+    assert [card["title"] for card in during] == ["old title"]
+    assert [card["title"] for card in after] == ["new title"]
+    assert stat_threads and threading.get_ident() not in stat_threads
+    assert engine.reloads == 2
@@ -0,0 +1,77 @@
+# tests/test_sms_credit_ingest.py
+#
+# SMS ingestion stores outflows only: a credit the bank templates recognize (categorized
+# 'Income_Credit', which has no SDS class) must not reach the transactions table as
+# variable-essential spend. The batch path reports it as 'skipped', the single path raises
+# CreditMessageSkipped before any insert. Debits in the same batch are still written.
+#
+# Run from the repository root: python -m pytest -q tests
+
+import asyncio
+import re
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from api.v1.schemas.transaction import RawTransactionIn
+from services.transaction_service import CreditMessageSkipped, TransactionService
+
+DEBIT_SMS = "Rs.250.00 debited from a/c **1234 on 12-10-25 to VPA swiggy@icici"
+CREDIT_SMS = "Rs.50000.00 credited to a/c **1234 on 01-10-25 by a/c linked to VPA acme.payroll@hdfc"
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class _InsertRecordingSession:
+    """Answers the multi-row INSERT ... RETURNING with the inserted rows (no database needed)."""
+
+    def __init__(self):
+        self.inserted = []
+
+    async def execute(self, stmt):
+        # Multi-row VALUES binds are suffixed _m<row>
+        rows = defaultdict(dict)
+        for name, value in stmt.compile(dialect=postgresql.dialect()).params.items():
+            match = re.fullmatch(r"(.+)_m(\d+)", name)
+            column, row = (match.group(1), int(match.group(2))) if match else (name, 0)
+            rows[row][column] = value
+        rows = [rows[row] for row in sorted(rows)]
+        self.inserted.extend(rows)
+        return _Result([SimpleNamespace(id=index + 1, **row) for index, row in enumerate(rows)])
+
+    async def commit(self):
+        pass
+
+
+def _sms(text: str, received_at: str) -> RawTransactionIn:
+    return RawTransactionIn(transaction_text=text, sms_date_time=received_at, bank_identifier="HDFC")
+
+
+def test_batch_skips_credits_and_stores_debits():
+    db = _InsertRecordingSession()
+    credit = _sms(CREDIT_SMS, "2025-10-01T09:00:00")
+    results = asyncio.run(TransactionService(db).process_raw_transactions_batch(
+        [credit, _sms(DEBIT_SMS, "2025-10-12T20:15:00"), credit], user_id=1,
+    ))
+
+    assert [result["status"] for result in results] == ["skipped", "ingested", "skipped"]
+    assert [row["description"] for row in db.inserted] == [DEBIT_SMS]
+    assert "Income_Credit" not in {row["category"] for row in db.inserted}
+
+
+def test_single_ingest_rejects_a_credit_before_writing():
+    db = _InsertRecordingSession()
+    with pytest.raises(CreditMessageSkipped):
+        asyncio.run(TransactionService(db).process_raw_transaction(_sms(CREDIT_SMS, "2025-10-02T09:00:00"), user_id=1))
+    assert db.inserted == []
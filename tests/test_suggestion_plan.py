@@ -0,0 +1,59 @@
+# tests/test_suggestion_plan.py
+#
+# A Smart Rule create/update/delete must make the materialized suggestion plan stale:
+# api/v1/smart_rule bumps the rules version of the integer users.id that the v2 plan
+# reads (api/dependencies.get_current_user_id), and services/suggestion_plan.is_current
+# rejects a plan computed against the previous version.
+#
+# Run from the repository root: python -m pytest -q tests
+
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from api.dependencies import get_current_user_id
+from services.suggestion_plan import bump_rules_version, is_current
+
+TODAY = date(2026, 10, 16)
+
+
+class _RecordingSession:
+    """Captures the statements bump_rules_version executes (no database needed)."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+
+
+def _plan(rules_version: int, profile_version: int = 3):
+    return SimpleNamespace(profile_version=profile_version, rules_version=rules_version, valid_on=TODAY)
+
+
+def test_rule_edit_bumps_the_v2_user_id():
+    user_id = asyncio.run(get_current_user_id())
+    db = _RecordingSession()
+    asyncio.run(bump_rules_version(db, user_id))
+
+    (stmt,) = db.statements
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    assert isinstance(user_id, int)
+    assert compiled.params["user_id"] == user_id
+    assert "ON CONFLICT (user_id) DO UPDATE SET version = (smart_rule_versions.version +" in str(compiled)
+
+
+def test_rule_edit_makes_the_plan_stale():
+    plan = _plan(rules_version=4)
+    assert is_current(plan, profile_version=3, rules_version=4, today=TODAY)
+    # The bump moves the stored counter past the version the plan was computed against
+    assert not is_current(plan, profile_version=3, rules_version=5, today=TODAY)
+
+
+def test_first_rule_edit_makes_a_plan_from_no_rules_stale():
+    # Before the first edit the counter row is absent and load_suggestion_plan reads 0
+    plan = _plan(rules_version=0)
+    assert is_current(plan, profile_version=3, rules_version=0, today=TODAY)
+    assert not is_current(plan, profile_version=3, rules_version=1, today=TODAY)
@@ -0,0 +1,166 @@
+# tests/test_transfer_resume.py
+#
+# The resume sweeper must never claim a transfer a worker still has in flight: its
+# threshold is derived from the executor's longest submit + poll cycle, which the
+# executor enforces as a deadline from submission (time queued behind the user's other
+# transfers included). The claim statement is evaluated against an in-memory table of
+# smart_transfer_logs, with the database clock moved forward instead of waiting.
+#
+# Run from the repository root: python -m pytest -q tests
+
+import asyncio
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import httpx
+
+import services.transfer_executor as transfer_executor_module
+from services.transfer_executor import COMPLETED, PENDING, TransferExecutor, TransferRequest
+from services.transfer_resume_sweeper import TransferResumeSweeper
+
+
+class _Gateway:
+    """Accepts every POST; status polls are slow, and settle after settle_after_polls (or never)."""
+
+    def __init__(self, poll_seconds: float, settle_after_polls=None):
+        self.poll_seconds = poll_seconds
+        self.settle_after_polls = settle_after_polls
+        self.posts = 0
+        self.polls = 0
+        self.poll_in_flight = asyncio.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            self.posts += 1
+            return httpx.Response(202, json={"status": PENDING})
+        self.polls += 1
+        self.poll_in_flight.set()
+        await asyncio.sleep(self.poll_seconds)
+        settled = self.settle_after_polls is not None and self.polls >= self.settle_after_polls
+        return httpx.Response(200, json={"status": COMPLETED if settled else PENDING, "gateway_reference": "gw-1"})
+
+
+class _TransferLogs:
+    """smart_transfer_logs in memory: answers the claim statement and records outcomes."""
+
+    def __init__(self):
+        self.rows = {}
+        self.clock_offset = 0.0 # seconds the "database clock" runs ahead
+
+    def now(self) -> float:
+        return time.monotonic() + self.clock_offset
+
+    def add(self, transfer: TransferRequest):
+        self.rows[transfer.log_id] = {"transfer": transfer, "status": PENDING, "executed_at": self.now(), "lease_until": None}
+
+    async def record(self, transfer, outcome) -> bool:
+        row = self.rows[transfer.log_id]
+        if row["status"] != PENDING:
+            return False
+        row["status"] = outcome.status
+        return True
+
+    def session(self):
+        return _ClaimSession(self)
+
+
+class _ClaimSession:
+    def __init__(self, logs: _TransferLogs):
+        self.logs = logs
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params):
+        now = self.logs.now()
+        claimed = []
+        for row in self.logs.rows.values():
+            if (row["status"] == params["pending"] and row["executed_at"] < now - params["older_than_seconds"]
+                    and (row["lease_until"] is None or row["lease_until"] < now)):
+                row["lease_until"] = now + params["lease_seconds"]
+                transfer = row["transfer"]
+                claimed.append(SimpleNamespace(
+                    log_id=transfer.log_id, user_id=transfer.user_id, rule_id=transfer.rule_id,
+                    amount_transferred=transfer.amount, destination_goal=transfer.destination,
+                ))
+        return SimpleNamespace(all=lambda: claimed[:params["limit"]])
+
+    async def commit(self):
+        pass
+
+
+def _transfer(log_id: int) -> TransferRequest:
+    return TransferRequest(log_id, user_id=1, rule_id=10, amount=Decimal("500.00"), destination="Emergency Fund")
+
+
+def _executor(gateway: _Gateway, logs: _TransferLogs) -> TransferExecutor:
+    return TransferExecutor(
+        base_url="http://gateway.test", per_user_concurrency=1, timeout_seconds=0.2,
+        poll_interval_seconds=0.05, max_polls=4, recorder=logs.record, transport=httpx.MockTransport(gateway),
+    )
+
+
+def test_sweep_during_a_slow_poll_leaves_the_transfer_to_its_worker():
+    async def scenario():
+        logs, gateway = _TransferLogs(), _Gateway(poll_seconds=0.15, settle_after_polls=3)
+        executor = _executor(gateway, logs)
+        await executor.start()
+        transfer = _transfer(1)
+        logs.add(transfer)
+        executor.submit([transfer])
+
+        await gateway.poll_in_flight.wait()
+        # The sweep runs as late as the transfer could possibly still be in flight
+        logs.clock_offset = executor.max_in_flight_seconds
+        claimed = await TransferResumeSweeper(executor, session_factory=logs.session).sweep_once()
+
+        await executor.wait_idle()
+        await executor.stop()
+        return claimed, logs.rows[1]["status"], gateway.posts
+
+    claimed, status, posts = asyncio.run(scenario())
+    assert claimed == 0
+    assert status == COMPLETED
+    assert posts == 1
+
+
+def test_default_threshold_and_lease_exceed_the_longest_cycle():
+    executor = TransferExecutor(base_url=None)
+    # 3 submits timing out at 5 s with two 3 s backoffs, then 40 polls of 0.5 s + a 5 s timeout
+    assert executor.max_in_flight_seconds == 241.0
+    assert executor.resume_after_seconds > executor.max_in_flight_seconds
+    assert executor.resume_lease_seconds > executor.max_in_flight_seconds
+
+
+def test_transfers_queued_past_the_deadline_are_given_up_then_resumed(monkeypatch):
+    # No backoff allowance: the deadline is 0.6 s of submit attempts + 1.0 s of polls
+    monkeypatch.setattr(transfer_executor_module, "TRANSFER_BACKOFF_CAP_SECONDS", 0.0)
+
+    async def scenario():
+        logs, gateway = _TransferLogs(), _Gateway(poll_seconds=10.0)
+        executor = _executor(gateway, logs)
+        await executor.start()
+        transfers = [_transfer(log_id) for log_id in (1, 2, 3)]
+        for transfer in transfers:
+            logs.add(transfer)
+        started_at = time.monotonic()
+        executor.submit(transfers) # one user slot: 2 and 3 queue behind 1's hung polls
+
+        await executor.wait_idle()
+        in_flight_for = time.monotonic() - started_at
+        deadline, metrics = executor.max_in_flight_seconds, executor.metrics()
+
+        logs.clock_offset = executor.resume_after_seconds
+        claimed = await TransferResumeSweeper(executor, session_factory=logs.session).sweep_once()
+        await executor.stop(grace_seconds=0)
+        return in_flight_for, deadline, metrics, claimed
+
+    in_flight_for, deadline, metrics, claimed = asyncio.run(scenario())
+    assert in_flight_for < deadline + 0.5
+    assert metrics["unknown_total"] == 3
+    assert metrics["deadline_exceeded_total"] == 2
+    assert claimed == 3
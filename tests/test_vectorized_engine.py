@@ -0,0 +1,175 @@
+# tests/test_vectorized_engine.py
+#
+# ml/vectorized_engine must match the scalar Decimal functions it replaces to the paisa:
+# calculate_dynamic_baseline (compute_dynamic_baselines), calculate_dynamic_minimal_baseline
+# (compute_minimal_baselines) and the per-category leak max(spend - threshold, 0)
+# (compute_leaks). Seeded random cohorts plus hand-picked exact .005 ties, which the
+# scalar code rounds ROUND_HALF_EVEN.
+#
+# The scalar side runs under an exact Decimal context (ml/scaling_logic sets prec=4
+# process-wide, which rounds the intermediate products).
+#
+# Run from the repository root: python -m pytest -q tests
+
+import random
+from decimal import Decimal, localcontext
+
+import numpy as np
+import pytest
+
+from ml.scaling_logic import BASE_NEEDS_INDEX, CITY_COST_MULTIPLIERS, DEFAULT_EFFICIENCY_FACTORS, calculate_dynamic_baseline
+from ml.vectorized_engine import (
+    city_multiplier_column,
+    compute_dynamic_baselines,
+    compute_leaks,
+    compute_minimal_baselines,
+    base_needs_paise,
+    efficiency_factor_column,
+    from_paise,
+    to_fixed_point,
+)
+from services.dmb_logic.dmb_calculator import SDS_WEIGHTS, calculate_dynamic_minimal_baseline
+
+CITY_TIERS = list(CITY_COST_MULTIPLIERS) + ["Unknown Tier"]
+INCOME_SLABS = list(DEFAULT_EFFICIENCY_FACTORS) + ["Unknown Slab"]
+DMB_CATEGORIES = list(SDS_WEIGHTS) + ["Uncategorized"]
+CATEGORIES = list(BASE_NEEDS_INDEX)
+SEEDS = [7, 11, 2024]
+
+
+def _cohort(users: int, rng: random.Random):
+    """Two-place EFS, factors and spend, like the database columns."""
+    efs = [Decimal(rng.randint(100, 900)).scaleb(-2) for _ in range(users)]
+    tiers = [rng.choice(CITY_TIERS) for _ in range(users)]
+    slabs = [rng.choice(INCOME_SLABS) for _ in range(users)]
+    benchmarks = [Decimal(rng.randint(70, 130)).scaleb(-2) if rng.random() < 0.3 else None for _ in range(users)]
+    spend = [[Decimal(rng.randint(0, 4_000_000)).scaleb(-2) for _ in CATEGORIES] for _ in range(users)]
+    return efs, tiers, slabs, benchmarks, spend
+
+
+def _exact(function, *args):
+    with localcontext() as ctx:
+        ctx.prec = 28
+        return function(*args)
+
+
+def _vectorized_baselines(efs, tiers, slabs, benchmarks):
+    return compute_dynamic_baselines(
+        to_fixed_point(efs, 2), city_multiplier_column(tiers), efficiency_factor_column(slabs, benchmarks),
+    )
+
+
+def _baselines_row(baselines, i: int):
+    """User i of a CohortBaselines as the dict calculate_dynamic_baseline returns."""
+    row = dict(zip(baselines.categories, from_paise(baselines.thresholds[i])))
+    (row["Total_Leakage_Threshold"],) = from_paise(baselines.total_leakage_threshold[i])
+    (row["Total_Minimal_Need_DMB"],) = from_paise(baselines.total_minimal_need_dmb[i])
+    (row["Potential_Recoverable_Fund"],) = from_paise(baselines.potential_recoverable_fund[i])
+    return row
+
+
+def _threshold_ties(category_dmb: np.ndarray) -> int:
+    # DMB * 0.85 lands on an exact half paisa when DMB * 85 % 100 == 50
+    return int(((category_dmb * 85) % 100 == 50).sum())
+
+
+# ----------------------------------------------------------------------
+# RANDOMIZED PARITY
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("seed", SEEDS)
+def test_dynamic_baselines_match_scalar(seed):
+    efs, tiers, slabs, benchmarks, _ = _cohort(2000, random.Random(seed))
+    baselines = _vectorized_baselines(efs, tiers, slabs, benchmarks)
+
+    # The cohort must exercise the half-even rounding, or the parity says little
+    assert _threshold_ties(baselines.category_dmb) > 0
+    for i in range(len(efs)):
+        expected = _exact(calculate_dynamic_baseline, Decimal("0"), efs[i], tiers[i], slabs[i], benchmarks[i])
+        assert _baselines_row(baselines, i) == expected, f"user {i}: efs={efs[i]} tier={tiers[i]} slab={slabs[i]}"
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_minimal_baselines_match_scalar(seed):
+    efs, *_ = _cohort(2000, random.Random(seed))
+    dmb = compute_minimal_baselines(to_fixed_point(efs, 2), SDS_WEIGHTS, DMB_CATEGORIES)
+
+    for i in range(len(efs)):
+        expected = [_exact(calculate_dynamic_minimal_baseline, category, efs[i]) for category in DMB_CATEGORIES]
+        assert from_paise(dmb[i]) == expected, f"user {i}: efs={efs[i]}"
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_leaks_match_scalar(seed):
+    efs, tiers, slabs, benchmarks, spend = _cohort(2000, random.Random(seed))
+    baselines = _vectorized_baselines(efs, tiers, slabs, benchmarks)
+    spend_paise = to_fixed_point([value for row in spend for value in row], 2).reshape(len(efs), -1)
+    leaks, totals = compute_leaks(spend_paise, baselines.thresholds)
+
+    for i in range(len(efs)):
+        with localcontext() as ctx:
+            ctx.prec = 28
+            thresholds = calculate_dynamic_baseline(Decimal("0"), efs[i], tiers[i], slabs[i], benchmarks[i])
+            expected = [max(spend[i][k] - thresholds[category], Decimal("0.00")) for k, category in enumerate(CATEGORIES)]
+            expected_total = sum(expected, Decimal("0.00"))
+        assert from_paise(leaks[i]) == expected, f"user {i}"
+        assert from_paise(totals[i]) == [expected_total], f"user {i}"
+
+
+# ----------------------------------------------------------------------
+# EXACT .005 TIES
+# ----------------------------------------------------------------------
+# (EFS, city tier, income slab, benchmark factor) whose category DMB or threshold is an
+# exact half paisa before rounding, once with an even and once with an odd last paisa
+TIE_USERS = [
+    # Transport DMB 2500 * 1.01 * 1.25 * 0.90 = 2840.625 -> 2840.62
+    # Health DMB    1500 * 1.01 * 1.25 * 0.90 = 1704.375 -> 1704.38
+    (Decimal("1.01"), "Tier 1", "High", None),
+    # Same products through the benchmark factor path
+    (Decimal("1.01"), "Tier 1", "Medium", Decimal("0.90")),
+    # Transport threshold 2812.50 * 0.85 = 2390.625 -> 2390.62
+    # Health threshold    1687.50 * 0.85 = 1434.375 -> 1434.38
+    (Decimal("1.00"), "Tier 1", "High", None),
+]
+
+
+def _dmb_ties(efs, tiers, slabs, benchmarks) -> int:
+    # Base * EFS * City * Efficiency (hundredths^3 x paise) lands on an exact half paisa
+    combined = to_fixed_point(efs, 2) * city_multiplier_column(tiers) * efficiency_factor_column(slabs, benchmarks)
+    _, base_cost = base_needs_paise()
+    return int(((combined[:, None] * base_cost[None, :]) % 10 ** 6 == 5 * 10 ** 5).sum())
+
+
+def test_tie_users_hit_half_paisa():
+    efs, tiers, slabs, benchmarks = (list(column) for column in zip(*TIE_USERS))
+    baselines = _vectorized_baselines(efs, tiers, slabs, benchmarks)
+    assert _dmb_ties(efs, tiers, slabs, benchmarks) >= 4
+    assert _threshold_ties(baselines.category_dmb) >= 2
+
+
+@pytest.mark.parametrize("efs, tier, slab, benchmark", TIE_USERS)
+def test_dynamic_baselines_ties_round_half_even(efs, tier, slab, benchmark):
+    baselines = _vectorized_baselines([efs], [tier], [slab], [benchmark])
+    expected = _exact(calculate_dynamic_baseline, Decimal("0"), efs, tier, slab, benchmark)
+    assert _baselines_row(baselines, 0) == expected
+
+
+@pytest.mark.parametrize("efs", [Decimal("1.01"), Decimal("1.03"), Decimal("0.05"), Decimal("0.15"), Decimal("8.99")])
+def test_minimal_baselines_ties_round_half_even(efs):
+    # Whole-rupee SDS weights times a two-place EFS never tie: add weights that do
+    # (0.50 * 1.01 = 0.505 -> 0.50, 0.50 * 1.03 = 0.515 -> 0.52, 12.50 * 0.05 = 0.625 -> 0.62)
+    weights = dict(SDS_WEIGHTS, Half_Rupee=Decimal("0.50"), Odd_Paisa=Decimal("12.50"))
+    categories = list(weights)
+    dmb = compute_minimal_baselines(to_fixed_point([efs], 2), weights, categories)
+
+    with localcontext() as ctx:
+        ctx.prec = 28
+        expected = [(weights[category] * efs).quantize(Decimal("0.01")) for category in categories]
+    assert from_paise(dmb[0]) == expected
+
+
+def test_leaks_at_threshold_and_one_paisa_above():
+    thresholds = np.array([[107313, 0, 50]], dtype=np.int64)
+    spend = np.array([[107313, 1, 49]], dtype=np.int64)
+    leaks, totals = compute_leaks(spend, thresholds)
+    assert leaks.tolist() == [[0, 1, 0]]
+    assert totals.tolist() == [1]
@@ -0,0 +1,8 @@
+# tools/__init__.py
+#
+# Operator CLIs, run from the repository root (python -m tools.<name>): resolve the
+# application modules as one package before any CLI imports them (see app_package.py).
+
+import app_package
+
+app_package.install()
@@ -0,0 +1,432 @@
+# tools/bulk_load.py
+#
+# Bulk loader for legacy-user migrations and performance-environment seeding.
+# Streams CSV or NDJSON into `transactions` / `raw_transactions` through PostgreSQL
+# COPY FROM STDIN (asyncpg binary COPY), one chunk per COPY, instead of ORM inserts.
+#
+# Usage:
+#   python -m tools.bulk_load transactions legacy_transactions.csv
+#   python -m tools.bulk_load raw_transactions sms_export.ndjson --format ndjson --chunk-size 100000
+#   python -m tools.bulk_load transactions seed.csv --drop-indexes --rejects rejects.ndjson
+#   python -m tools.bulk_load transactions seed.csv --dry-run    # parse + validate only (no DB)
+#   python -m tools.bulk_load transactions seed.csv --skip-rows 1500000   # resume after a failure
+#
+# Input columns (CSV header / NDJSON keys):
+#   transactions:     user_id, amount, transaction_date, description, category, sds_class,
+#                     [status, is_manual_override, created_at, sms_fingerprint]
+#   raw_transactions: user_id, raw_text, [source_type, timestamp, sms_fingerprint, is_processed]
+#
+# Loaded raw_transactions rows are unprocessed by default and get categorized by the
+# retry sweeper at its capped rate; pass is_processed=true for already-migrated rows.
+#
+# Each chunk is COPied into a temporary staging table and moved over with
+# INSERT ... ON CONFLICT DO NOTHING, so a (user_id, sms_fingerprint) that is already
+# stored (e.g. when re-running a file) is written to --rejects instead of aborting the load.
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from db.enums import SDSWeightClass, TransactionStatus
+from services.categorization_cache import infer_sds_class
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("BULK_LOAD_CHUNK_SIZE", "50000"))
+
+# Categories follow '<SDS class>_<Name>' and must agree with the row's sds_class
+# (services/categorization_cache.infer_sds_class); income credits are not spend rows
+MAX_CATEGORY_LENGTH = 100 # transactions.category is VARCHAR(100)
+VALID_SDS_CLASSES = {sds_class.value for sds_class in SDSWeightClass}
+VALID_STATUSES = {status.value for status in TransactionStatus}
+MAX_AMOUNT = Decimal("99999999.99") # DECIMAL(10, 2)
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+
+
+# ----------------------------------------------------------------------
+# COLUMN CONVERTERS (text -> the Python types asyncpg's binary COPY expects)
+# ----------------------------------------------------------------------
+def _to_int(value: Any) -> int:
+    return int(value)
+
+
+def _to_amount(value: Any) -> Decimal:
+    amount = Decimal(str(value).replace(",", "")).quantize(Decimal("0.01"))
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"amount out of range: {value}")
+    return amount
+
+
+def _to_datetime(value: Any) -> datetime:
+    parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    # Columns are naive UTC (datetime.utcnow defaults)
+    return parsed.replace(tzinfo=None) - parsed.utcoffset() if parsed.tzinfo else parsed
+
+
+def _to_bool(value: Any) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in _TRUE
+
+
+def _to_text(value: Any) -> str:
+    return str(value)
+
+
+def _to_optional_text(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+class TableSpec:
+    """Target table layout: COPY column order, converters and per-row defaults."""
+
+    def __init__(self, name: str, columns: List[Tuple[str, Callable[[Any], Any], bool]], defaults: Dict[str, Callable[[], Any]]):
+        self.name = name
+        self.columns = [column for column, _, _ in columns]
+        self.converters = {column: converter for column, converter, _ in columns}
+        self.required = {column for column, _, required in columns if required}
+        self.defaults = defaults
+
+
+TABLE_SPECS: Dict[str, TableSpec] = {
+    "transactions": TableSpec(
+        "transactions",
+        [
+            ("user_id", _to_int, True),
+            ("amount", _to_amount, True),
+            ("transaction_date", _to_datetime, True),
+            ("description", _to_text, True),
+            ("category", _to_text, True),
+            ("sds_class", _to_text, True),
+            ("status", _to_text, False),
+            ("is_manual_override", _to_bool, False),
+            ("created_at", _to_datetime, False),
+            ("sms_fingerprint", _to_optional_text, False),
+        ],
+        {
+            "status": lambda: TransactionStatus.COMPLETED.value,
+            "is_manual_override": lambda: False,
+            "created_at": datetime.utcnow,
+            "sms_fingerprint": lambda: None,
+        },
+    ),
+    "raw_transactions": TableSpec(
+        "raw_transactions",
+        [
+            ("user_id", _to_int, True),
+            ("raw_text", _to_text, True),
+            ("source_type", _to_text, False),
+            ("timestamp", _to_datetime, False),
+            ("sms_fingerprint", _to_optional_text, False),
+            ("is_processed", _to_bool, False),
+            ("categorization_attempts", _to_int, False),
+            ("next_attempt_at", _to_datetime, False),
+        ],
+        {
+            "source_type": lambda: "SMS",
+            "timestamp": datetime.utcnow,
+            "sms_fingerprint": lambda: None,
+            "is_processed": lambda: False,
+            "categorization_attempts": lambda: 0,
+            "next_attempt_at": datetime.utcnow,
+        },
+    ),
+}
+
+
+# ----------------------------------------------------------------------
+# STREAMING READERS (constant memory: one chunk of dicts at a time)
+# ----------------------------------------------------------------------
+def _open_text(path: str) -> io.TextIOBase:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def iter_records(path: str, input_format: str) -> Iterator[Dict[str, Any]]:
+    with _open_text(path) as handle:
+        if input_format == "csv":
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_chunks(records: Iterator[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ----------------------------------------------------------------------
+# CHUNK VALIDATION (column-at-a-time)
+# ----------------------------------------------------------------------
+def _invalid_categories(values: List[Any]) -> set:
+    """Checks each DISTINCT category once per chunk (a chunk has few distinct categories)."""
+    return {
+        value for value in set(values)
+        if not isinstance(value, str) or len(value) > MAX_CATEGORY_LENGTH or infer_sds_class(value) is None
+    }
+
+
+def _mismatched_sds_classes(categories: List[Any], sds_classes: List[Any]) -> set:
+    """(category, sds_class) pairs whose sds_class is not the one the category implies, checked per DISTINCT pair."""
+    mismatched = set()
+    for category, sds_class in set(zip(categories, sds_classes)):
+        if not isinstance(category, str) or sds_class is None:
+            continue
+        implied = infer_sds_class(category)
+        if implied is not None and implied.value != sds_class:
+            mismatched.add((category, sds_class))
+    return mismatched
+
+
+def _repeated_fingerprints(user_ids: List[Any], fingerprints: List[Any]) -> List[int]:
+    """Positions of a (user_id, sms_fingerprint) already seen earlier in the chunk (the first one is kept)."""
+    seen = set()
+    repeated = []
+    for index, key in enumerate(zip(user_ids, fingerprints)):
+        if key[1] is None:
+            continue
+        if key in seen:
+            repeated.append(index)
+        seen.add(key)
+    return repeated
+
+
+def convert_chunk(spec: TableSpec, chunk: List[Dict[str, Any]]) -> Tuple[List[tuple], List[Dict[str, Any]]]:
+    """
+    Validates and converts one chunk column by column. Enum-like columns are checked
+    against their distinct values with set operations, then all bad row positions are
+    masked out at once. Returns (COPY records, rejected rows with a reason).
+    """
+    size = len(chunk)
+    reasons: List[Optional[str]] = [None] * size
+    columns: Dict[str, List[Any]] = {}
+
+    # 1. Extract + convert each column in one pass over the chunk
+    for column in spec.columns:
+        converter = spec.converters[column]
+        default = spec.defaults.get(column)
+        values: List[Any] = [None] * size
+        for index, record in enumerate(chunk):
+            raw = record.get(column)
+            if raw is None or raw == "":
+                if column in spec.required:
+                    reasons[index] = reasons[index] or f"missing {column}"
+                elif default is not None:
+                    values[index] = default()
+                continue
+            try:
+                values[index] = converter(raw)
+            except (ValueError, TypeError, InvalidOperation):
+                reasons[index] = reasons[index] or f"invalid {column}: {raw!r}"
+        columns[column] = values
+
+    # 2. Domain checks on distinct values
+    if spec.name == "transactions":
+        for column, invalid in (
+            ("category", _invalid_categories(columns["category"])),
+            ("sds_class", set(columns["sds_class"]) - VALID_SDS_CLASSES - {None}),
+            ("status", set(columns["status"]) - VALID_STATUSES - {None}),
+        ):
+            if invalid:
+                for index, value in enumerate(columns[column]):
+                    if value in invalid:
+                        reasons[index] = reasons[index] or f"invalid {column}: {value!r}"
+
+        mismatched = _mismatched_sds_classes(columns["category"], columns["sds_class"])
+        if mismatched:
+            for index, pair in enumerate(zip(columns["category"], columns["sds_class"])):
+                if pair in mismatched:
+                    implied = infer_sds_class(pair[0]).value
+                    reasons[index] = reasons[index] or f"sds_class {pair[1]!r} does not match category {pair[0]!r} (expected {implied!r})"
+
+    # 3. One row per (user_id, sms_fingerprint) per chunk: a repeat would abort the chunk's INSERT
+    for index in _repeated_fingerprints(columns["user_id"], columns["sms_fingerprint"]):
+        reasons[index] = reasons[index] or "duplicate sms_fingerprint earlier in the same chunk"
+
+    # 4. Mask out rejected rows; transpose the surviving columns into COPY records
+    keep = [index for index in range(size) if reasons[index] is None]
+    records = list(zip(*([values[index] for index in keep] for values in columns.values()))) if keep else []
+    rejects = [{"reason": reasons[index], "row": chunk[index]} for index in range(size) if reasons[index] is not None]
+    return records, rejects
+
+
+# ----------------------------------------------------------------------
+# SECONDARY INDEXES (optional drop before the load, rebuilt afterwards)
+# ----------------------------------------------------------------------
+# Plain secondary indexes only: PK/unique indexes stay so ON CONFLICT still skips
+# duplicate fingerprints during the load rather than breaking the rebuild afterwards.
+SECONDARY_INDEXES_SQL = """
+    SELECT i.relname AS name, pg_get_indexdef(x.indexrelid) AS definition
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_class t ON t.oid = x.indrelid
+    WHERE t.relname = $1 AND NOT x.indisprimary AND NOT x.indisunique
+"""
+
+
+async def drop_secondary_indexes(conn, table: str) -> List[Tuple[str, str]]:
+    indexes = [(row["name"], row["definition"]) for row in await conn.fetch(SECONDARY_INDEXES_SQL, table)]
+    for name, _ in indexes:
+        await conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    return indexes
+
+
+async def rebuild_indexes(conn, table: str, indexes: List[Tuple[str, str]]):
+    for name, definition in indexes:
+        started = time.perf_counter()
+        await conn.execute(definition)
+        print(f"  rebuilt {name} in {time.perf_counter() - started:.1f}s")
+    await conn.execute(f'ANALYZE "{table}"')
+
+
+# ----------------------------------------------------------------------
+# LOAD
+# ----------------------------------------------------------------------
+def _asyncpg_dsn(url: Optional[str]) -> str:
+    """Accepts the app's DATABASE_URL (incl. SQLAlchemy '+driver' forms) for asyncpg."""
+    if not url:
+        raise SystemExit("DATABASE_URL is not set (or pass --dsn).")
+    scheme, _, rest = url.partition("://")
+    return f"{scheme.split('+', 1)[0]}://{rest}"
+
+
+# ----------------------------------------------------------------------
+# STAGED COPY (COPY into a temp table, then INSERT ... ON CONFLICT DO NOTHING)
+# ----------------------------------------------------------------------
+STAGE_TABLE = "bulk_load_stage"
+
+
+async def create_stage_table(conn, spec: TableSpec):
+    """Session-local staging table with the loaded columns; emptied by every chunk's commit."""
+    columns = ", ".join(f'"{column}"' for column in spec.columns)
+    await conn.execute(
+        f'CREATE TEMP TABLE "{STAGE_TABLE}" ON COMMIT DELETE ROWS AS '
+        f'SELECT {columns} FROM "{spec.name}" WITH NO DATA'
+    )
+
+
+async def load_chunk(conn, spec: TableSpec, records: List[tuple]) -> List[int]:
+    """
+    Loads one chunk in one transaction and returns the positions of the records skipped
+    because their (user_id, sms_fingerprint) is already stored.
+    """
+    columns = ", ".join(f'"{column}"' for column in spec.columns)
+    async with conn.transaction():
+        await conn.copy_records_to_table(STAGE_TABLE, records=records, columns=spec.columns)
+        inserted = await conn.fetch(
+            f'INSERT INTO "{spec.name}" ({columns}) SELECT {columns} FROM "{STAGE_TABLE}" '
+            f'ON CONFLICT DO NOTHING RETURNING user_id, sms_fingerprint'
+        )
+    if len(inserted) == len(records):
+        return []
+    # Fingerprints are unique per user within the chunk (convert_chunk), and a row without
+    # one has no unique key to conflict on, so the missing keys are exactly the skipped rows
+    stored = {(row["user_id"], row["sms_fingerprint"]) for row in inserted}
+    user_index = spec.columns.index("user_id")
+    fingerprint_index = spec.columns.index("sms_fingerprint")
+    return [
+        index for index, record in enumerate(records)
+        if record[fingerprint_index] is not None and (record[user_index], record[fingerprint_index]) not in stored
+    ]
+
+
+async def run(args) -> int:
+    spec = TABLE_SPECS[args.table]
+    conn = None
+    dropped: List[Tuple[str, str]] = []
+    if not args.dry_run:
+        import asyncpg
+
+        conn = await asyncpg.connect(_asyncpg_dsn(args.dsn or os.getenv("DATABASE_URL")))
+
+    rejects_file = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+    loaded = rejected = duplicates = 0
+    read = args.skip_rows
+    started = time.perf_counter()
+    try:
+        if conn is not None:
+            await create_stage_table(conn, spec)
+        if conn is not None and args.drop_indexes:
+            dropped = await drop_secondary_indexes(conn, spec.name)
+            print(f"Dropped {len(dropped)} secondary index(es) on {spec.name}: {', '.join(name for name, _ in dropped) or '-'}")
+
+        records_iter = itertools.islice(iter_records(args.path, args.format), args.skip_rows, None)
+        for chunk in iter_chunks(records_iter, args.chunk_size):
+            records, rejects = convert_chunk(spec, chunk)
+            skipped: List[int] = []
+            if conn is not None and records:
+                # One transaction per chunk: a failure loses at most one chunk, and every
+                # input row before it is committed (the resume point printed below)
+                try:
+                    skipped = await load_chunk(conn, spec, records)
+                except Exception:
+                    print(f"Load failed in the chunk starting at input row {read + 1}; "
+                          f"rows before it are committed. Resume with --skip-rows {read}.")
+                    raise
+                if skipped:
+                    rejects.extend({"reason": "duplicate sms_fingerprint (already stored)", "row": dict(zip(spec.columns, records[index]))} for index in skipped)
+                    duplicates += len(skipped)
+            read += len(chunk)
+            loaded += len(records) - len(skipped)
+            rejected += len(rejects)
+            if rejects_file is not None:
+                for reject in rejects:
+                    rejects_file.write(json.dumps(reject, default=str) + "\n")
+
+            elapsed = time.perf_counter() - started
+            print(f"  {read:12d} read   {loaded:12d} loaded   {rejected:8d} rejected ({duplicates} duplicates)   {loaded / elapsed:10.0f} rows/s")
+    finally:
+        if conn is not None:
+            if dropped:
+                print(f"Rebuilding {len(dropped)} index(es)...")
+                await rebuild_indexes(conn, spec.name, dropped)
+            await conn.close()
+        if rejects_file is not None:
+            rejects_file.close()
+
+    elapsed = time.perf_counter() - started
+    action = "validated" if args.dry_run else f"loaded into {spec.name}"
+    print(f"Done: {loaded} rows {action} in {elapsed:.1f}s ({loaded / elapsed if elapsed else 0:.0f} rows/s), {rejected} rejected ({duplicates} duplicates).")
+    return 1 if rejected and args.strict else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY-based bulk loader for transactions and raw_transactions.")
+    parser.add_argument("table", choices=sorted(TABLE_SPECS))
+    parser.add_argument("path", help="Input file (.csv/.ndjson, optionally .gz) or '-' for stdin.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults from the file extension (csv).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--drop-indexes", action="store_true", help="Drop plain secondary indexes during the load and rebuild them after.")
+    parser.add_argument("--rejects", help="Write rejected rows (with reasons) to this NDJSON file.")
+    parser.add_argument("--strict", action="store_true", help="Exit non-zero if any row was rejected.")
+    parser.add_argument("--skip-rows", type=int, default=0, help="Skip the first N input rows (resume after a failed load).")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and validate only; no database connection.")
+    parser.add_argument("--dsn", help="PostgreSQL URL (default: $DATABASE_URL).")
+    args = parser.parse_args()
+
+    if args.format is None:
+        args.format = "ndjson" if ".ndjson" in args.path or ".jsonl" in args.path else "csv"
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
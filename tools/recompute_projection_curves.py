@@ -0,0 +1,85 @@
+# tools/recompute_projection_curves.py
+#
+# Nightly pass for the month-end spend projection: rebuilds every user's
+# spend_projection_curves from the last full months of category_daily_spend, one
+# user-id batch per transaction, all series of a batch vectorized at once
+# (services/spend_projection.recompute_projection_curves).
+#
+# Usage:
+#   python -m tools.recompute_projection_curves                          # as of today
+#   python -m tools.recompute_projection_curves --batch-size 5000 --prune
+#   python -m tools.recompute_projection_curves --install-triggers --rebuild-since 2025-04-01
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from api.database_setup import AsyncSessionLocal, engine
+from services.spend_projection import (
+    install_daily_spend_triggers,
+    prune_daily_spend,
+    rebuild_daily_spend,
+    recompute_projection_curves,
+)
+
+
+async def run(args) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.install_triggers:
+                await install_daily_spend_triggers(db)
+                await db.commit()
+                print("Installed category_daily_spend delta triggers on transactions.")
+
+            if args.rebuild_since:
+                rows = await rebuild_daily_spend(db, args.rebuild_since)
+                await db.commit()
+                print(f"Rebuilt category_daily_spend from {args.rebuild_since}: {rows} day groups.")
+
+            low, high = (await db.execute(text("SELECT MIN(user_id), MAX(user_id) FROM category_daily_spend"))).one()
+            await db.rollback()
+            if low is None:
+                print("No daily spend rows; nothing to do.")
+                return 0
+
+            started = time.perf_counter()
+            curves_total = 0
+            for batch_start in range(low, high + 1, args.batch_size):
+                batch_end = batch_start + args.batch_size
+                curves_total += await recompute_projection_curves(db, args.as_of, batch_start, batch_end)
+                await db.commit()
+
+                elapsed = time.perf_counter() - started
+                users_done = min(batch_end, high + 1) - low
+                print(f"  users [{batch_start}, {batch_end})   {curves_total:10d} curves   {users_done / elapsed:10.1f} user ids/s")
+
+            if args.prune:
+                pruned = await prune_daily_spend(db, args.as_of)
+                await db.commit()
+                print(f"Pruned {pruned} daily spend row(s) older than the curve window.")
+    finally:
+        await engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {curves_total} curves in {elapsed:.1f}s.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the spend projection curves from category_daily_spend.")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=datetime.utcnow().date(), help="Curves use the full months before this date's month.")
+    parser.add_argument("--batch-size", type=int, default=2000, help="User ids per batch (one transaction each).")
+    parser.add_argument("--prune", action="store_true", help="Delete daily spend older than the curve window afterwards.")
+    parser.add_argument("--install-triggers", action="store_true", help="(Re)create the daily spend delta triggers first.")
+    parser.add_argument("--rebuild-since", type=date.fromisoformat, help="Re-aggregate category_daily_spend from transactions from this date first.")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# tools/reconcile_category_totals.py
+#
+# Reconciliation job for the incremental category_period_totals aggregate: rebuilds the
+# totals from the raw `transactions` rows, reports drift, and optionally repairs it.
+# Run it nightly (report only) and after any load that bypassed the triggers.
+#
+# Usage:
+#   python -m tools.reconcile_category_totals                       # report drift, all history
+#   python -m tools.reconcile_category_totals --since 2025-04-01 --user-id 42
+#   python -m tools.reconcile_category_totals --since 2025-10-01 --fix
+#   python -m tools.reconcile_category_totals --install-triggers    # existing databases
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+
+from api.database_setup import AsyncSessionLocal, engine
+from services.category_totals import reconcile_category_totals, install_category_totals_triggers
+
+MAX_PRINTED_GROUPS = 50
+
+
+async def run(args) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.install_triggers:
+                await install_category_totals_triggers(db)
+                await db.commit()
+                print("Installed category_period_totals delta triggers on transactions.")
+
+            started = time.perf_counter()
+            report = await reconcile_category_totals(db, since=args.since, user_id=args.user_id, fix=args.fix)
+            await db.commit()
+            elapsed = time.perf_counter() - started
+    finally:
+        await engine.dispose()
+
+    for item in report["drift"][:MAX_PRINTED_GROUPS]:
+        print(
+            f"  user {item['user_id']:>8}  {item['period']}  {item['category']:<40} {item['sds_class']:<20} "
+            f"stored {item['stored_spend']:>12} ({item['stored_count']:>6})   actual {item['actual_spend']:>12} ({item['actual_count']:>6})"
+        )
+    if report["drifted_groups"] > MAX_PRINTED_GROUPS:
+        print(f"  ... {report['drifted_groups'] - MAX_PRINTED_GROUPS} more drifted group(s)")
+
+    print(
+        f"Drifted groups: {report['drifted_groups']}   total spend drift: {report['spend_drift']}   "
+        f"repaired: {report['groups_repaired']}   ({elapsed:.1f}s)"
+    )
+    # Non-zero exit on unrepaired drift, so a scheduled report-only run can alert
+    return 1 if report["drifted_groups"] and not args.fix else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild category_period_totals from transactions and report drift.")
+    parser.add_argument("--since", type=date.fromisoformat, help="First month to check (YYYY-MM-DD; default: all history).")
+    parser.add_argument("--user-id", type=int, help="Only reconcile this user.")
+    parser.add_argument("--fix", action="store_true", help="Overwrite drifted totals with the rebuilt values.")
+    parser.add_argument("--install-triggers", action="store_true", help="(Re)create the delta triggers first.")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()